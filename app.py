@@ -1,8 +1,261 @@
-from tui.app import MusicScraperApp
+import argparse
+import re
+import sys
+
+from scraper.defaults import (
+    DEFAULT_COOKIE_FILE,
+    DEFAULT_MAX_WORKERS,
+    DEFAULT_STATUS_PORT,
+    DEFAULT_WATCH_INTERVAL,
+)
+from scraper.scheduling import JobOrder, SchedulePolicy, parse_size
+from scraper.sources import sources_for
+from scraper.transcode import OutputFormat, OutputMode
+
+_BITRATE_RE = re.compile(r"^\d+[kK]?$")
 
 
 def main():
-    app = MusicScraperApp()
+    parser = argparse.ArgumentParser(description="Download YouTube liked videos as audio files.")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help=f"number of concurrent downloads (default: {DEFAULT_MAX_WORKERS})",
+    )
+    sources = parser.add_argument_group(
+        "sources", "every playlist is synced under every cookie profile; repeat to add more"
+    )
+    sources.add_argument(
+        "--playlist",
+        action="append",
+        metavar="URL_OR_ID",
+        help='playlist URL or ID to sync, or "liked" (default: liked)',
+    )
+    sources.add_argument(
+        "--cookies",
+        action="append",
+        metavar="FILE",
+        help=f"cookie file of an account to sync with; the first one is also used to "
+        f"download (default: {DEFAULT_COOKIE_FILE})",
+    )
+    output = parser.add_argument_group("output")
+    output.add_argument(
+        "--format",
+        choices=[mode.value for mode in OutputMode],
+        default=OutputMode.MP3.value,
+        help="native: keep the file as downloaded; remux: copy the audio into an .opus/.m4a "
+        "container without re-encoding; mp3/opus: encode (default: mp3)",
+    )
+    output.add_argument(
+        "--bitrate", help="encoder bitrate for mp3/opus, such as 192k (default: encoder default)"
+    )
+    output.add_argument(
+        "--ffmpeg-threads", type=int, metavar="N", help="threads per ffmpeg process"
+    )
+    output.add_argument(
+        "--stream",
+        action="store_true",
+        help="pipe downloads straight into ffmpeg and write only the final file "
+        "(no raw copy on disk; interrupted downloads restart instead of resuming)",
+    )
+    output.add_argument(
+        "--normalize",
+        type=float,
+        nargs="?",
+        const=-14.0,
+        metavar="LUFS",
+        help="adjust each track's gain to this integrated loudness (default target: -14)",
+    )
+    output.add_argument(
+        "--trim-silence",
+        action="store_true",
+        help="cut silence longer than half a second from the start and end of each track",
+    )
+    output.add_argument(
+        "--no-enrich",
+        action="store_true",
+        help="name files after the channel and video title instead of looking up "
+        "each track's artist and song title",
+    )
+    output.add_argument(
+        "--no-tags",
+        action="store_true",
+        help="don't write artist, title, album and cover art tags into the files",
+    )
+    output.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="fingerprint downloaded audio and flag listed tracks that sound like one "
+        "already downloaded or listed (reads the first 1 MB of each listed track's audio)",
+    )
+    scheduling = parser.add_argument_group("scheduling")
+    scheduling.add_argument(
+        "--order",
+        choices=[order.value for order in JobOrder],
+        default=JobOrder.PLAYLIST.value,
+        help="playlist: as listed; shortest: quick tracks first; largest: biggest "
+        "estimated downloads first, so long mixes don't finish last (default: playlist)",
+    )
+    scheduling.add_argument(
+        "--max-rate",
+        metavar="RATE",
+        help="cap the combined download speed, in bytes per second, such as 2M or 500K",
+    )
+    scheduling.add_argument(
+        "--min-free-space",
+        metavar="SIZE",
+        help="keep SIZE free in downloads/, such as 5G: new downloads wait for ones in "
+        "flight to finish, and fail if that doesn't make room (default: off)",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="append per-track phase timings to FILE as JSON lines",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        metavar="FILE",
+        help="write Prometheus metrics for each batch to FILE (textfile collector format)",
+    )
+    headless = parser.add_argument_group(
+        "headless mode", "sync and download without the TUI, printing JSON-lines progress"
+    )
+    headless.add_argument(
+        "--headless", action="store_true", help="download every new track non-interactively"
+    )
+    headless.add_argument(
+        "--match",
+        metavar="REGEX",
+        help='only download tracks whose "channel - title" matches (case-insensitive)',
+    )
+    headless.add_argument("--limit", type=int, help="download at most this many tracks")
+    headless.add_argument(
+        "--full-sync", action="store_true", help="refetch the whole playlist, ignoring the cache"
+    )
+    headless.add_argument(
+        "--dry-run", action="store_true", help="list the tracks that would be downloaded"
+    )
+    headless.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running, syncing and downloading new tracks every --interval",
+    )
+    headless.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_WATCH_INTERVAL / 60,
+        metavar="MINUTES",
+        help=f"minutes between polls in --watch mode (default: {DEFAULT_WATCH_INTERVAL // 60})",
+    )
+    headless.add_argument(
+        "--status-port",
+        type=int,
+        default=DEFAULT_STATUS_PORT,
+        metavar="PORT",
+        help="serve --watch status as JSON on 127.0.0.1:PORT/status, 0 to disable "
+        f"(default: {DEFAULT_STATUS_PORT})",
+    )
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.limit is not None and args.limit < 1:
+        parser.error("--limit must be at least 1")
+    if args.bitrate is not None:
+        if not _BITRATE_RE.match(args.bitrate):
+            parser.error("--bitrate must look like 128k or 192000")
+        if args.format not in (OutputMode.MP3.value, OutputMode.OPUS.value):
+            parser.error("--bitrate only applies to --format mp3 or opus")
+    if args.ffmpeg_threads is not None and args.ffmpeg_threads < 1:
+        parser.error("--ffmpeg-threads must be at least 1")
+    if args.normalize is not None or args.trim_silence:
+        if args.format not in (OutputMode.MP3.value, OutputMode.OPUS.value):
+            parser.error("--normalize and --trim-silence only apply to --format mp3 or opus")
+        if args.stream:
+            parser.error("--normalize and --trim-silence can't be combined with --stream")
+    output_format = OutputFormat(
+        OutputMode(args.format),
+        args.bitrate,
+        args.ffmpeg_threads,
+        loudness=args.normalize,
+        trim_silence=args.trim_silence,
+    )
+    try:
+        max_rate = parse_size(args.max_rate) if args.max_rate is not None else None
+    except ValueError:
+        parser.error("--max-rate must look like 2M or 500K")
+    if max_rate == 0:
+        parser.error("--max-rate must be positive")
+    try:
+        min_free_space = parse_size(args.min_free_space) if args.min_free_space else None
+    except ValueError:
+        parser.error("--min-free-space must look like 1G or 500M")
+    schedule = SchedulePolicy(JobOrder(args.order), max_rate, min_free_space or None)
+    cookie_files = args.cookies or [DEFAULT_COOKIE_FILE]
+    try:
+        sync_sources = sources_for(args.playlist or ["liked"], cookie_files)
+    except ValueError as e:
+        parser.error(f"--playlist: {e}")
+    if args.match is not None:
+        try:
+            re.compile(args.match)
+        except re.error as e:
+            parser.error(f"--match is not a valid regular expression: {e}")
+    if args.watch:
+        if args.dry_run:
+            parser.error("--watch can't be combined with --dry-run")
+        if args.interval <= 0:
+            parser.error("--interval must be positive")
+        if not 0 <= args.status_port <= 65535:
+            parser.error("--status-port must be between 0 and 65535")
+
+    if args.headless or args.watch:
+        # Imported here so the TUI stack (Textual) is never loaded
+        from scraper.headless import run_headless
+
+        headless_kwargs = dict(
+            cookie_file=cookie_files[0],
+            sources=sync_sources,
+            max_workers=args.workers,
+            pattern=args.match,
+            limit=args.limit,
+            full=args.full_sync,
+            trace_path=args.trace,
+            metrics_path=args.metrics_file,
+            output_format=output_format,
+            streaming=args.stream,
+            enrich=not args.no_enrich,
+            tags=not args.no_tags,
+            dedupe=args.dedupe,
+            schedule=schedule,
+        )
+        if args.watch:
+            from scraper.watch import run_watch
+
+            sys.exit(
+                run_watch(
+                    interval=args.interval * 60,
+                    status_port=args.status_port or None,
+                    **headless_kwargs,
+                )
+            )
+        sys.exit(run_headless(dry_run=args.dry_run, **headless_kwargs))
+
+    from tui.app import MusicScraperApp
+
+    app = MusicScraperApp(
+        sources=sync_sources,
+        max_workers=args.workers,
+        trace_path=args.trace,
+        metrics_path=args.metrics_file,
+        output_format=output_format,
+        streaming=args.stream,
+        enrich=not args.no_enrich,
+        tags=not args.no_tags,
+        dedupe=args.dedupe,
+        schedule=schedule,
+    )
     app.run()
 
 
@@ -0,0 +1,421 @@
+"""Microbenchmarks for the hot paths of the scraper package and the track list.
+
+Everything runs offline on synthetic libraries of each size:
+
+    ytdlp.parse_entries     fetch_liked_videos turning playlist entries into
+                            Tracks (YoutubeDL replaced by a fake that returns
+                            the entries at once)
+    tracker.load            ProgressTracker.load of a catalog holding N ids
+    tracker.save            ProgressTracker.save after 100 fresh marks
+    tracker.is_downloaded   N lookups, half of them hits
+    filename.sanitize       sanitize_filename on N adversarial Unicode names
+    models.duration_str     Track.duration_str for N durations
+    browse.mount            BrowseScreen with N tracks pushed and drawn,
+                            driven by Textual's headless pilot
+    browse.filter_ready     ...until its background search index is attached
+
+Results are written as JSON keyed by benchmark and size, together with the
+commit they were measured at; pass an earlier file to --compare to see the
+change per benchmark and exit with status 1 if anything got slower than
+--threshold allows.
+
+    python -m benchmarks.micro [--sizes 1000,10000,50000,200000] [--only GROUP,...]
+                               [--repeat N] [--json FILE] [--compare FILE]
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from unittest.mock import patch
+
+from scraper import ytdlp_client
+from scraper.filename import sanitize_filename
+from scraper.models import Track
+from scraper.tracker import ProgressTracker
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_SIZES = (1_000, 10_000, 50_000, 200_000)
+DEFAULT_REPEAT = 5
+# A benchmark regresses when its best time grows by more than this factor
+DEFAULT_THRESHOLD = 1.25
+
+# name -> seconds per repetition
+Timings = dict[str, list[float]]
+
+
+def _time(body: Callable[[], object], repeat: int, prepare: Callable[[], object] | None = None):
+    """Seconds per call of body, with the garbage collector paused like timeit."""
+    times = []
+    for _ in range(repeat):
+        if prepare is not None:
+            prepare()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            body()
+            times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return times
+
+
+# -- synthetic data -----------------------------------------------------------
+
+_COMBINING = [chr(c) for c in range(0x0300, 0x0370)]
+_INVISIBLE = ["\u200b", "\u200c", "\u200d", "\u2060", "\ufeff", "\u00ad"]
+_BIDI = ["\u202a", "\u202b", "\u202d", "\u202e", "\u2066", "\u2067", "\u2069", "\u200f"]
+_SPACES = ["\t", "\n", "\r", "\u00a0", "\u2003", "\u2009", "\u3000", "\u200a\u202f"]
+_ILLEGAL = list('<>:"/\\|?*') + [chr(c) for c in range(0x20)]
+_SCRIPTS = [
+    "\uff26\uff55\uff4c\uff4c\uff57\uff49\uff44\uff54\uff48",  # fullwidth
+    "\u6771\u4eac\u4e8b\u5909 - \u7fa4\u9752\u65e5\u548c",
+    "\u0645\u0648\u0633\u064a\u0642\u0649",
+    "\u0395\u03bb\u03bb\u03b7\u03bd\u03b9\u03ba\u03ac",
+    "\u041a\u0438\u0440\u0438\u043b\u043b\u0438\u0446\u0430",
+    # Emoji ZWJ family, rainbow flag, regional-indicator flag
+    "\U0001f469\u200d\U0001f469\u200d\U0001f467\u200d\U0001f466"
+    "\U0001f3f3\ufe0f\u200d\U0001f308\U0001f1ef\U0001f1f5",
+    "\ufb01\ufb02 ligatures",
+    "\u00e9 vs e\u0301",
+    "...---...",
+]
+
+
+def adversarial_name(rng: random.Random) -> str:
+    """A title built to hit every branch of sanitize_filename at once."""
+    parts = []
+    for _ in range(rng.randint(2, 12)):
+        kind = rng.randrange(7)
+        if kind == 0:
+            # "Zalgo" text: a letter buried under stacked combining marks
+            marks = rng.choices(_COMBINING, k=rng.randint(5, 40))
+            parts.append(rng.choice("aeiouxyz") + "".join(marks))
+        elif kind == 1:
+            parts.append(rng.choice(_INVISIBLE) * rng.randint(1, 20))
+        elif kind == 2:
+            parts.append(rng.choice(_BIDI))
+        elif kind == 3:
+            parts.append("".join(rng.choices(_SPACES, k=rng.randint(1, 6))))
+        elif kind == 4:
+            parts.append("".join(rng.choices(_ILLEGAL, k=rng.randint(1, 10))))
+        elif kind == 5:
+            parts.append(rng.choice(_SCRIPTS))
+        else:
+            # Long enough to need truncating
+            parts.append(rng.choice(_SCRIPTS) * rng.randint(10, 40))
+    return "".join(parts)
+
+
+def playlist_entries(size: int) -> list[dict]:
+    """Flat playlist entries the way yt-dlp returns them, some fields missing."""
+    entries = []
+    for i in range(size):
+        entry = {
+            "_type": "url",
+            "ie_key": "Youtube",
+            "id": f"vid{i:08d}",
+            "url": f"https://www.youtube.com/watch?v=vid{i:08d}",
+            "title": f"Song {i}",
+            "duration": 60 + i % 600,
+            "view_count": i * 37,
+            "thumbnails": [{"url": f"https://i.ytimg.com/vi/vid{i:08d}/hqdefault.jpg"}],
+        }
+        if i % 7:
+            entry["uploader"] = f"Artist {i % 500}"
+        else:
+            entry["channel"] = f"Channel {i % 300}"
+        if i % 13 == 0:
+            entry["duration"] = None
+        entries.append(entry)
+    return entries
+
+
+def synthetic_tracks(size: int) -> list[Track]:
+    return [
+        Track(f"vid{i:08d}", f"Song {i} (Live)", f"Artist {i % 500}", 60 + i % 600)
+        for i in range(size)
+    ]
+
+
+class FakeYoutubeDL:
+    """Stands in for yt_dlp.YoutubeDL, returning a prepared flat playlist."""
+
+    entries: list[dict] = []
+
+    def __init__(self, params=None):
+        self.params = params
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def extract_info(self, url, download=True):
+        return {"_type": "playlist", "id": "LL", "entries": self.entries}
+
+
+# -- benchmarks ---------------------------------------------------------------
+
+
+def bench_ytdlp(size: int, repeat: int) -> Timings:
+    FakeYoutubeDL.entries = playlist_entries(size)
+    with patch.object(ytdlp_client.yt_dlp, "YoutubeDL", FakeYoutubeDL):
+        times = _time(ytdlp_client.fetch_liked_videos, repeat)
+    FakeYoutubeDL.entries = []
+    return {"ytdlp.parse_entries": times}
+
+
+def bench_tracker(size: int, repeat: int) -> Timings:
+    with tempfile.TemporaryDirectory() as tmp:
+        seed = ProgressTracker(tmp)
+        seed.load()
+        seed.catalog.add_ids(f"vid{i:08d}" for i in range(size))
+        seed.close()
+
+        trackers = []
+
+        def load():
+            tracker = ProgressTracker(tmp)
+            trackers.append(tracker)
+            tracker.load()
+
+        load_times = _time(load, repeat)
+        for tracker in trackers:
+            tracker.close()
+
+        tracker = ProgressTracker(tmp)
+        tracker.load()
+        marked = 0
+
+        def mark():
+            nonlocal marked
+            for _ in range(100):
+                tracker.mark_downloaded(f"new{marked:08d}")
+                marked += 1
+
+        save_times = _time(tracker.save, repeat, prepare=mark)
+
+        # Every other probe is an id that was never downloaded
+        probes = [f"vid{i:08d}" if i % 2 else f"miss{i:08d}" for i in range(size)]
+        is_downloaded = tracker.is_downloaded
+        lookup_times = _time(lambda: [is_downloaded(vid) for vid in probes], repeat)
+        tracker.close()
+    return {
+        "tracker.load": load_times,
+        "tracker.save": save_times,
+        "tracker.is_downloaded": lookup_times,
+    }
+
+
+def bench_filename(size: int, repeat: int) -> Timings:
+    rng = random.Random(size)
+    names = [(adversarial_name(rng), adversarial_name(rng)) for _ in range(size)]
+    times = _time(lambda: [sanitize_filename(artist, title) for artist, title in names], repeat)
+    return {"filename.sanitize": times}
+
+
+def bench_models(size: int, repeat: int) -> Timings:
+    rng = random.Random(size)
+    # Mostly songs, some hour-long mixes, and the odd bogus negative duration
+    durations = rng.choices(
+        [rng.randint(30, 599), rng.randint(3600, 36_000), -1], weights=[90, 9, 1], k=size
+    )
+    tracks = [Track(f"vid{i:08d}", "Song", "Artist", d) for i, d in enumerate(durations)]
+    times = _time(lambda: [t.duration_str for t in tracks], repeat)
+    return {"models.duration_str": times}
+
+
+def bench_browse(size: int, repeat: int) -> Timings:
+    # Imported here so the other groups run without Textual loaded
+    from textual.app import App
+
+    from tui.screens.browse import BrowseScreen
+
+    tracks = synthetic_tracks(size)
+    mount_times = []
+    ready_times = []
+
+    async def run_once(downloads_dir: str) -> None:
+        tracker = ProgressTracker(downloads_dir)
+        app = App()
+        async with app.run_test(headless=True, size=(120, 40)) as pilot:
+            gc.collect()
+            start = time.perf_counter()
+            screen = BrowseScreen(tracks, 0, tracker)
+            await app.push_screen(screen)
+            # Process pending messages and draw, without waiting for the
+            # index thread to go idle the way pause() would
+            await pilot.pause(0)
+            mount_times.append(time.perf_counter() - start)
+            while not screen.model.is_indexed:
+                await pilot.pause(0.001)
+            ready_times.append(time.perf_counter() - start)
+        tracker.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(repeat):
+            asyncio.run(run_once(tmp))
+    return {"browse.mount": mount_times, "browse.filter_ready": ready_times}
+
+
+BENCHMARKS: dict[str, Callable[[int, int], Timings]] = {
+    "ytdlp": bench_ytdlp,
+    "tracker": bench_tracker,
+    "filename": bench_filename,
+    "models": bench_models,
+    "browse": bench_browse,
+}
+
+
+# -- results ------------------------------------------------------------------
+
+
+def run_benchmarks(
+    sizes=DEFAULT_SIZES,
+    groups=tuple(BENCHMARKS),
+    repeat: int = DEFAULT_REPEAT,
+    on_result: Callable[[str, int, dict], None] | None = None,
+) -> dict:
+    """Run each group at each size; returns {name: {str(size): stats}}."""
+    results: dict[str, dict[str, dict]] = {}
+    for group in groups:
+        for size in sizes:
+            for name, times in BENCHMARKS[group](size, repeat).items():
+                stats = summarize(times, size)
+                results.setdefault(name, {})[str(size)] = stats
+                if on_result:
+                    on_result(name, size, stats)
+    return results
+
+
+def summarize(times: list[float], size: int) -> dict:
+    median = statistics.median(times)
+    return {
+        "median_ms": round(median * 1000, 4),
+        "min_ms": round(min(times) * 1000, 4),
+        "per_item_us": round(median * 1e6 / size, 4),
+        "runs": len(times),
+    }
+
+
+def environment() -> dict:
+    def git(*args: str) -> str:
+        try:
+            result = subprocess.run(
+                ["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=30
+            )
+        except OSError:
+            return ""
+        return result.stdout.strip() if result.returncode == 0 else ""
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD") or None,
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": round(time.time()),
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD):
+    """Rows of (name, size, old_ms, new_ms, ratio) for results in both runs,
+    and the subset that slowed down by more than threshold.
+
+    Runs are compared by their fastest repetition, which is far less noisy
+    than the median for sub-millisecond benchmarks.
+    """
+    rows = []
+    for name, by_size in current["results"].items():
+        for size, stats in by_size.items():
+            old = baseline["results"].get(name, {}).get(size)
+            if old is None or not old["min_ms"]:
+                continue
+            ratio = stats["min_ms"] / old["min_ms"]
+            rows.append((name, int(size), old["min_ms"], stats["min_ms"], ratio))
+    regressions = [row for row in rows if row[4] > threshold]
+    return rows, regressions
+
+
+def _print_result(name: str, size: int, stats: dict) -> None:
+    print(
+        f"  {name:<24} {size:>8}  {stats['median_ms']:>11.3f} ms"
+        f"  {stats['per_item_us']:>10.3f} us/item",
+        flush=True,
+    )
+
+
+def _sizes(text: str) -> list[int]:
+    sizes = [int(part) for part in text.split(",") if part]
+    if not sizes or min(sizes) < 1:
+        raise argparse.ArgumentTypeError("sizes must be positive integers")
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=_sizes,
+        default=list(DEFAULT_SIZES),
+        help="comma-separated library sizes (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--only", help=f"comma-separated groups to run, from: {', '.join(BENCHMARKS)}"
+    )
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument(
+        "--json", help="where to write the results (default: benchmarks/results/<commit>.json)"
+    )
+    parser.add_argument("--compare", metavar="FILE", help="results of an earlier run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    groups = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [g for g in groups if g not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown group: {', '.join(unknown)}")
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    env = environment()
+    print(f"commit {env['commit']}{' (dirty)' if env['dirty'] else ''}, Python {env['python']}")
+    print(f"  {'benchmark':<24} {'size':>8}  {'median':>14}  {'per item':>16}")
+    report = {
+        "environment": env,
+        "sizes": args.sizes,
+        "results": run_benchmarks(args.sizes, groups, args.repeat, on_result=_print_result),
+    }
+
+    path = args.json or os.path.join(RESULTS_DIR, f"{env['commit'] or 'results'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {path}")
+
+    if not args.compare:
+        return
+    with open(args.compare, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows, regressions = compare(baseline, report, args.threshold)
+    print(f"best times compared with {baseline['environment'].get('commit')}:")
+    for name, size, old, new, ratio in rows:
+        flag = "  REGRESSION" if ratio > args.threshold else ""
+        print(f"  {name:<24} {size:>8}  {old:>11.3f} -> {new:>11.3f} ms  x{ratio:5.2f}{flag}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""CPU and wall time per track for each output mode.
+
+Generates synthetic YouTube-like sources with ffmpeg (Opus in WebM and AAC
+in MP4, a few minutes of tones each), then runs scraper.transcode.convert on
+copies of them in every mode. CPU time is the user + system time of the
+ffmpeg child processes, which is what a large batch spends on the transcode
+pool; native and remux should be close to free next to an encode.
+
+    python -m benchmarks.output_modes [--tracks N] [--seconds S] [--bitrate 128k] [--threads N]
+"""
+
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+
+from scraper.transcode import FFMPEG, OutputFormat, OutputMode, convert
+
+SOURCES = {
+    "webm": ["-codec:a", "libopus", "-b:a", "128k"],
+    "m4a": ["-codec:a", "aac", "-b:a", "128k"],
+}
+
+
+def make_source(directory: str, extension: str, seconds: int) -> str:
+    path = os.path.join(directory, f"source.{extension}")
+    subprocess.run(
+        [
+            FFMPEG, "-y", "-nostdin", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+            "-f", "lavfi", "-i", f"sine=frequency=660:duration={seconds}",
+            "-filter_complex", "amerge=inputs=2",
+            *SOURCES[extension], path,
+        ],
+        check=True,
+    )
+    return path
+
+
+def child_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def measure(source: str, output_format: OutputFormat, tracks: int, workdir: str):
+    """(cpu seconds, wall seconds) per track."""
+    cpu = wall = 0.0
+    for i in range(tracks):
+        src = os.path.join(workdir, f"raw{i}{os.path.splitext(source)[1]}")
+        shutil.copyfile(source, src)
+        dst = os.path.join(workdir, f"out{i}{output_format.extension(src)}")
+        cpu_before, start = child_cpu(), time.perf_counter()
+        path = convert(src, dst, output_format)
+        wall += time.perf_counter() - start
+        cpu += child_cpu() - cpu_before
+        os.remove(path)
+        if os.path.exists(src):
+            os.remove(src)
+    return cpu / tracks, wall / tracks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tracks", type=int, default=5, help="conversions per mode and source")
+    parser.add_argument("--seconds", type=int, default=240, help="length of each source track")
+    parser.add_argument("--bitrate", help="bitrate for the mp3 and opus encodes")
+    parser.add_argument("--threads", type=int, help="ffmpeg -threads")
+    args = parser.parse_args()
+
+    if shutil.which(FFMPEG) is None:
+        parser.error(f"{FFMPEG} is not on PATH")
+
+    formats = [
+        OutputFormat(OutputMode.NATIVE),
+        OutputFormat(OutputMode.REMUX, threads=args.threads),
+        OutputFormat(OutputMode.MP3, args.bitrate, args.threads),
+        OutputFormat(OutputMode.OPUS, args.bitrate, args.threads),
+    ]
+    print(f"{args.tracks} tracks of {args.seconds}s per mode and source")
+    print(f"  {'source':<6} {'mode':<7} {'output':<7} {'cpu/track':>10} {'wall/track':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for extension in SOURCES:
+            source = make_source(tmp, extension, args.seconds)
+            for output_format in formats:
+                cpu, wall = measure(source, output_format, args.tracks, tmp)
+                mode = output_format.mode.value
+                output = output_format.extension(source)
+                print(
+                    f"  {extension:<6} {mode:<7} {output:<7}"
+                    f" {cpu * 1000:8.0f} ms {wall * 1000:8.0f} ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
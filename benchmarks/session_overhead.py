@@ -0,0 +1,82 @@
+"""Per-track YoutubeDL setup overhead: one instance per track vs a pooled session.
+
+Runs offline. Each iteration performs the setup a real download triggers
+before its first request: parsing cookies.txt, building the request
+handlers and instantiating the YouTube extractor. No network I/O happens.
+
+    python -m benchmarks.session_overhead [--tracks N] [--cookies N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import yt_dlp
+
+from scraper.session import YoutubeDLSession
+from scraper.ytdlp_client import _JS_RUNTIMES, raw_outtmpl
+
+
+def write_cookie_file(path: str, count: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# Netscape HTTP Cookie File\n")
+        for i in range(count):
+            f.write(f".youtube.com\tTRUE\t/\tTRUE\t2147483647\tCOOKIE_{i}\t{'v' * 40}{i}\n")
+
+
+def _warm_up(ydl: yt_dlp.YoutubeDL) -> None:
+    ydl.cookiejar
+    ydl._request_director
+    ydl.get_info_extractor("Youtube")
+
+
+def per_track_instances(cookie_file: str, downloads_dir: str, tracks: int) -> float:
+    start = time.perf_counter()
+    for i in range(tracks):
+        opts = {
+            "cookiefile": cookie_file,
+            "js_runtimes": _JS_RUNTIMES,
+            "format": "bestaudio/best",
+            "outtmpl": raw_outtmpl(f"vid{i}", downloads_dir),
+            "quiet": True,
+        }
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            _warm_up(ydl)
+    return (time.perf_counter() - start) / tracks
+
+
+def pooled_session(cookie_file: str, downloads_dir: str, tracks: int) -> float:
+    session = YoutubeDLSession(cookie_file)
+    ydl = session._ydl
+    _warm_up(ydl)
+    start = time.perf_counter()
+    for i in range(tracks):
+        ydl.params["outtmpl"]["default"] = raw_outtmpl(f"vid{i}", downloads_dir)
+        session._progress_hook = None
+        _warm_up(ydl)
+    elapsed = time.perf_counter() - start
+    session.close()
+    return elapsed / tracks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tracks", type=int, default=200)
+    parser.add_argument("--cookies", type=int, default=60, help="cookies in the synthetic cookies.txt")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cookie_file = os.path.join(tmp, "cookies.txt")
+        write_cookie_file(cookie_file, args.cookies)
+        before = per_track_instances(cookie_file, tmp, args.tracks)
+        after = pooled_session(cookie_file, tmp, args.tracks)
+
+    print(f"tracks: {args.tracks}, cookies: {args.cookies}")
+    print(f"new YoutubeDL per track: {before * 1000:8.3f} ms/track")
+    print(f"pooled session:          {after * 1000:8.3f} ms/track")
+    print(f"saved per track:         {(before - after) * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Cold-start latency of the TUI: time to first frame and import cost per module.
+
+Every run starts a fresh interpreter in a scratch directory holding a cached
+playlist snapshot, so the measured path is the common one: the app opens
+LoadingScreen, then BrowseScreen with the cached list while the background
+sync starts. Reports the median of each milestone plus the slowest top-level
+imports (from python -X importtime), and exits with status 1 if a median is
+over budget or yt-dlp was already imported when the track list appeared.
+
+    python -m benchmarks.startup [--runs N] [--tracks N] [--budget FILE] [--json FILE]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from scraper.models import Track
+from scraper.snapshot import PlaylistSnapshot
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+
+# Modules that must not be loaded before the cached track list is on screen
+DEFERRED_MODULES = ("yt_dlp",)
+
+_PROBE = """
+import time
+start = time.perf_counter()
+import asyncio, json, os, sys
+sys.path.insert(0, {root!r})
+
+from tui.app import MusicScraperApp
+
+marks = {{"import_ms": (time.perf_counter() - start) * 1000}}
+push_screen = MusicScraperApp.push_screen
+
+
+def recording_push_screen(self, screen, *args, **kwargs):
+    # The startup worker is blocked in call_from_thread here, so this is
+    # exactly what had been imported when the track list was pushed
+    if type(screen).__name__ == "BrowseScreen":
+        marks["deferred_loaded"] = [m for m in {deferred!r} if m in sys.modules]
+    return push_screen(self, screen, *args, **kwargs)
+
+
+MusicScraperApp.push_screen = recording_push_screen
+
+
+async def main():
+    app = MusicScraperApp()
+    async with app.run_test(headless=True) as pilot:
+        while True:
+            name = type(app.screen).__name__
+            now = (time.perf_counter() - start) * 1000
+            if name == "LoadingScreen":
+                marks.setdefault("loading_ms", now)
+            elif name in ("BrowseScreen", "ResumeScreen"):
+                marks.setdefault("loading_ms", now)
+                marks["browse_ms"] = now
+                break
+            await pilot.pause(0.002)
+    return marks
+
+
+try:
+    asyncio.run(asyncio.wait_for(main(), 30))
+except Exception:
+    # Report whatever milestones were reached
+    pass
+print(json.dumps(marks), flush=True)
+# Skip interpreter teardown; the background sync thread may be mid-request
+os._exit(0)
+"""
+
+
+def write_snapshot(directory: str, count: int) -> None:
+    downloads = os.path.join(directory, "downloads")
+    os.makedirs(downloads, exist_ok=True)
+    tracks = [Track(f"vid{i:07d}", f"Song {i}", f"Artist {i % 500}", 200) for i in range(count)]
+    PlaylistSnapshot(downloads).save(tracks)
+
+
+def time_to_first_frame(workdir: str) -> dict:
+    probe = _PROBE.format(root=ROOT, deferred=DEFERRED_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=workdir,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    lines = result.stdout.strip().splitlines()
+    if not lines:
+        raise RuntimeError(f"startup probe produced no output:\n{result.stderr}")
+    return json.loads(lines[-1])
+
+
+def import_times(module: str = "tui.app", top: int = 10) -> list[tuple[str, float]]:
+    """Cumulative import time of the slowest top-level imports, in ms."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        # Nested imports are indented under the module that triggered them
+        if name == name.lstrip():
+            rows.append((name, int(cumulative) / 1000))
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return rows[:top]
+
+
+def check_budget(results: dict, budget: dict) -> list[str]:
+    failures = []
+    for key, limit in budget.items():
+        value = results.get(key)
+        if value is not None and value > limit:
+            failures.append(f"{key}: {value:.0f} ms over budget of {limit:.0f} ms")
+    if results.get("deferred_loaded"):
+        failures.append(
+            f"loaded before first frame: {', '.join(results['deferred_loaded'])}"
+        )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tracks", type=int, default=5000, help="tracks in the cached snapshot")
+    parser.add_argument("--budget", default=DEFAULT_BUDGET, help="JSON file of limits in ms")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        write_snapshot(tmp, args.tracks)
+        for _ in range(args.runs):
+            runs.append(time_to_first_frame(tmp))
+            # Each run starts from an empty catalog, like a first launch
+            for name in os.listdir(os.path.join(tmp, "downloads")):
+                if name.startswith("library.db"):
+                    os.remove(os.path.join(tmp, "downloads", name))
+
+    results = {
+        key: statistics.median(run[key] for run in runs if key in run)
+        for key in ("import_ms", "loading_ms", "browse_ms")
+        if any(key in run for run in runs)
+    }
+    results["deferred_loaded"] = sorted({m for run in runs for m in run.get("deferred_loaded", [])})
+    results["imports"] = import_times()
+
+    print(f"Cold start, {args.tracks} cached tracks, median of {args.runs} runs")
+    print(f"  import tui.app:       {results.get('import_ms', 0):8.1f} ms")
+    print(f"  LoadingScreen shown:  {results.get('loading_ms', 0):8.1f} ms")
+    print(f"  BrowseScreen shown:   {results.get('browse_ms', 0):8.1f} ms")
+    print("Slowest imports (cumulative):")
+    for name, ms in results["imports"]:
+        print(f"  {name:<30} {ms:8.1f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    budget = {}
+    if args.budget and os.path.isfile(args.budget):
+        with open(args.budget, "r", encoding="utf-8") as f:
+            budget = json.load(f)
+    failures = check_budget(results, budget)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
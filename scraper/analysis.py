@@ -0,0 +1,214 @@
+"""Loudness and silence analysis, applied in the final encode.
+
+With a loudness target or silence trimming, a track is decoded once to raw
+32-bit float PCM next to its raw download. That file is memory-mapped and
+measured with NumPy in 100 ms segments, a minute of audio at a time:
+
+- integrated loudness per ITU-R BS.1770 (400 ms gating blocks with 75%
+  overlap, absolute and relative gates), with the K-weighting filter applied
+  as its magnitude response on each segment's spectrum rather than as a
+  time-domain IIR filter, so every segment of a chunk is filtered in one
+  vectorised FFT;
+- the sample peak;
+- how long each end stays below the silence threshold.
+
+The encode then reads the same PCM file, cut to the non-silent part with
+-ss/-t and adjusted with a volume filter, so the compressed source is only
+decoded once. When a track was analysed before (the results are kept in
+the tracker), the PCM step is skipped and the encode reads the source
+directly.
+
+NumPy is only imported when this stage is enabled.
+"""
+
+import os
+import subprocess
+
+import numpy as np
+
+from scraper.models import AudioAnalysis
+from scraper.transcode import (
+    FFMPEG,
+    OutputFormat,
+    TranscodeError,
+    encoder_args,
+    run_ffmpeg,
+)
+
+SAMPLE_RATE = 48000
+CHANNELS = 2
+# Quieter than this (dBFS, mean square over a 100 ms segment) counts as silence
+SILENCE_THRESHOLD = -60.0
+# Shorter runs of silence at either end are left alone, so fades survive
+MIN_SILENCE = 0.5
+# Silence kept before and after the music when trimming
+TRIM_PADDING = 0.1
+# Gain is capped so the sample peak stays below this (dBFS)
+PEAK_CEILING = -1.0
+
+_SEGMENT = SAMPLE_RATE // 10
+_SEGMENTS_PER_BLOCK = 4
+_SEGMENTS_PER_CHUNK = 600
+_ABSOLUTE_GATE = -70.0
+_RELATIVE_GATE = -10.0
+# BS.1770 pre-filter (high shelf) and RLB high-pass at 48 kHz
+_K_WEIGHTING = [
+    (
+        [1.53512485958697, -2.69169618940638, 1.19839281085285],
+        [1.0, -1.69065929318241, 0.73248077421585],
+    ),
+    ([1.0, -2.0, 1.0], [1.0, -1.99004745483398, 0.99007225036621]),
+]
+_PCM_INPUT = ("-f", "f32le", "-ar", str(SAMPLE_RATE), "-ac", str(CHANNELS))
+
+
+def convert_analysed(
+    src: str,
+    dst: str,
+    known: AudioAnalysis | None = None,
+    output_format: OutputFormat = OutputFormat(),
+) -> tuple[str, AudioAnalysis]:
+    """Encode src into dst with output_format's gain and silence trimming.
+
+    Analyses src first unless known has its measurements already. Returns
+    the output filepath and the analysis. Runs in a worker process like
+    transcode.convert; partial() binds the format.
+    """
+    if known is not None:
+        return _encode(src, dst, known, output_format, ()), known
+    pcm = os.path.splitext(src)[0] + ".pcm"
+    try:
+        decode_pcm(src, pcm)
+        analysis = analyse_pcm(pcm)
+        return _encode(pcm, dst, analysis, output_format, _PCM_INPUT), analysis
+    finally:
+        if os.path.exists(pcm):
+            os.remove(pcm)
+
+
+def decode_pcm(src: str, pcm: str) -> None:
+    """Decode src's audio to raw stereo float32 at SAMPLE_RATE."""
+    cmd = [FFMPEG, "-y", "-nostdin", "-loglevel", "error", "-i", src, "-vn"]
+    cmd += ["-map", "0:a:0", "-ac", str(CHANNELS), "-ar", str(SAMPLE_RATE), "-f", "f32le", pcm]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().splitlines()
+        raise TranscodeError(lines[-1] if lines else f"ffmpeg exited with {proc.returncode}")
+
+
+def analyse_pcm(pcm: str) -> AudioAnalysis:
+    """Measure a raw stereo float32 file written by decode_pcm."""
+    frames = os.path.getsize(pcm) // (4 * CHANNELS)
+    if frames < _SEGMENT:
+        return AudioAnalysis(frames / SAMPLE_RATE, None, -np.inf)
+    samples = np.memmap(pcm, dtype="<f4", mode="r", shape=(frames, CHANNELS))
+    weighting = _k_weighting_power(_SEGMENT)
+
+    weighted = []  # K-weighted mean square per segment, summed over channels
+    levels = []  # plain mean square per segment, averaged over channels
+    peak = 0.0
+    segments = frames // _SEGMENT
+    for start in range(0, segments, _SEGMENTS_PER_CHUNK):
+        stop = min(start + _SEGMENTS_PER_CHUNK, segments)
+        # (segments, samples, channels), read from the mapping a chunk at a time
+        chunk = np.asarray(samples[start * _SEGMENT : stop * _SEGMENT], dtype=np.float64)
+        chunk = chunk.reshape(stop - start, _SEGMENT, CHANNELS)
+        peak = max(peak, float(np.abs(chunk).max(initial=0.0)))
+        levels.append(np.mean(chunk**2, axis=(1, 2)))
+        spectrum = np.abs(np.fft.rfft(chunk, axis=1)) ** 2
+        weighted.append(_mean_square(spectrum * weighting[:, None]).sum(axis=1))
+    del samples
+
+    weighted_ms = np.concatenate(weighted)
+    leading, trailing = _silences(np.concatenate(levels))
+    return AudioAnalysis(
+        duration=frames / SAMPLE_RATE,
+        loudness=_integrated_loudness(weighted_ms),
+        peak=_db(peak),
+        leading_silence=leading,
+        trailing_silence=trailing,
+    )
+
+
+def gain(analysis: AudioAnalysis, target: float) -> float:
+    """dB to add to reach target LUFS, capped to keep the peak under PEAK_CEILING."""
+    if analysis.loudness is None:
+        return 0.0
+    return min(target - analysis.loudness, PEAK_CEILING - analysis.peak)
+
+
+def trim_range(analysis: AudioAnalysis) -> tuple[float, float]:
+    """(start, end) in seconds of the audio to keep once silence is trimmed."""
+    start, end = 0.0, analysis.duration
+    if analysis.leading_silence >= MIN_SILENCE:
+        start = analysis.leading_silence - TRIM_PADDING
+    if analysis.trailing_silence >= MIN_SILENCE:
+        end = analysis.duration - analysis.trailing_silence + TRIM_PADDING
+    if end <= start:
+        # Silent throughout; keep it whole rather than write an empty file
+        return 0.0, analysis.duration
+    return start, end
+
+
+def _encode(
+    src: str,
+    dst: str,
+    analysis: AudioAnalysis,
+    output_format: OutputFormat,
+    input_args: tuple[str, ...],
+) -> str:
+    if output_format.trim_silence:
+        start, end = trim_range(analysis)
+        if start > 0 or end < analysis.duration:
+            input_args += ("-ss", f"{start:.3f}", "-t", f"{end - start:.3f}")
+    audio_filter = None
+    if output_format.loudness is not None:
+        audio_filter = f"volume={gain(analysis, output_format.loudness):.2f}dB"
+    return run_ffmpeg(
+        src, dst, encoder_args(output_format), output_format.threads, input_args, audio_filter
+    )
+
+
+def _k_weighting_power(n: int) -> np.ndarray:
+    """|H|^2 of the K-weighting filter at the rfft bins of an n-sample segment."""
+    z = np.exp(-1j * np.pi * np.arange(n // 2 + 1) / (n // 2))
+    response = np.ones_like(z)
+    for b, a in _K_WEIGHTING:
+        response *= (b[0] + b[1] * z + b[2] * z**2) / (a[0] + a[1] * z + a[2] * z**2)
+    return np.abs(response) ** 2
+
+
+def _mean_square(power: np.ndarray) -> np.ndarray:
+    """Mean square of segments from their rfft power spectra along axis 1 (Parseval)."""
+    n = (power.shape[1] - 1) * 2
+    total = 2 * power.sum(axis=1) - power[:, 0] - power[:, -1]
+    return total / (n * n)
+
+
+def _integrated_loudness(segment_ms: np.ndarray) -> float | None:
+    if len(segment_ms) < _SEGMENTS_PER_BLOCK:
+        return None
+    # Each 400 ms block is four consecutive 100 ms segments (75% overlap)
+    kernel = np.ones(_SEGMENTS_PER_BLOCK) / _SEGMENTS_PER_BLOCK
+    blocks = np.convolve(segment_ms, kernel, mode="valid")
+    with np.errstate(divide="ignore"):
+        loudness = -0.691 + 10 * np.log10(blocks)
+    gated = blocks[loudness > _ABSOLUTE_GATE]
+    if not len(gated):
+        return None
+    relative = -0.691 + 10 * np.log10(gated.mean()) + _RELATIVE_GATE
+    gated = blocks[(loudness > _ABSOLUTE_GATE) & (loudness > relative)]
+    return float(-0.691 + 10 * np.log10(gated.mean()))
+
+
+def _silences(levels: np.ndarray) -> tuple[float, float]:
+    with np.errstate(divide="ignore"):
+        loud = np.flatnonzero(10 * np.log10(levels) > SILENCE_THRESHOLD)
+    seconds = _SEGMENT / SAMPLE_RATE
+    if not len(loud):
+        return len(levels) * seconds, len(levels) * seconds
+    return loud[0] * seconds, (len(levels) - 1 - loud[-1]) * seconds
+
+
+def _db(amplitude: float) -> float:
+    return float(20 * np.log10(amplitude)) if amplitude > 0 else -np.inf
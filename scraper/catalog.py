@@ -0,0 +1,252 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, fields
+
+# Applied in order; PRAGMA user_version records how many have run
+_MIGRATIONS = [
+    """
+    CREATE TABLE tracks (
+        video_id TEXT PRIMARY KEY,
+        path TEXT,
+        size INTEGER,
+        duration INTEGER,
+        title TEXT,
+        channel TEXT,
+        downloaded_at REAL,
+        source_format TEXT
+    );
+    CREATE INDEX idx_tracks_channel ON tracks (channel);
+    CREATE INDEX idx_tracks_downloaded_at ON tracks (downloaded_at);
+    CREATE INDEX idx_tracks_path ON tracks (path);
+    CREATE TABLE meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    """,
+    """
+    CREATE TABLE jobs (
+        video_id TEXT PRIMARY KEY,
+        title TEXT NOT NULL,
+        channel TEXT NOT NULL,
+        duration INTEGER NOT NULL,
+        state TEXT NOT NULL,
+        raw_path TEXT,
+        error TEXT,
+        position INTEGER NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE INDEX idx_jobs_state ON jobs (state);
+    """,
+    """
+    ALTER TABLE tracks ADD COLUMN output_format TEXT;
+    """,
+    """
+    CREATE TABLE track_sources (
+        video_id TEXT NOT NULL,
+        source TEXT NOT NULL,
+        first_seen REAL NOT NULL,
+        last_seen REAL NOT NULL,
+        PRIMARY KEY (video_id, source)
+    );
+    CREATE INDEX idx_track_sources_source ON track_sources (source);
+    """,
+    """
+    CREATE TABLE track_metadata (
+        video_id TEXT PRIMARY KEY,
+        artist TEXT,
+        track TEXT,
+        album TEXT,
+        release_year INTEGER,
+        thumbnail TEXT,
+        fetched_at REAL NOT NULL
+    );
+    CREATE INDEX idx_track_metadata_fetched_at ON track_metadata (fetched_at);
+    """,
+    """
+    CREATE TABLE thumbnail_blobs (
+        digest TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        last_used REAL NOT NULL
+    );
+    CREATE INDEX idx_thumbnail_blobs_last_used ON thumbnail_blobs (last_used);
+    CREATE TABLE thumbnail_urls (
+        url TEXT PRIMARY KEY,
+        digest TEXT NOT NULL
+    );
+    CREATE INDEX idx_thumbnail_urls_digest ON thumbnail_urls (digest);
+    """,
+    """
+    CREATE TABLE track_analysis (
+        video_id TEXT PRIMARY KEY,
+        duration REAL NOT NULL,
+        loudness REAL,
+        peak REAL NOT NULL,
+        leading_silence REAL NOT NULL,
+        trailing_silence REAL NOT NULL,
+        analysed_at REAL NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE fingerprints (
+        video_id TEXT PRIMARY KEY,
+        hashes BLOB NOT NULL,
+        preview INTEGER NOT NULL,
+        fingerprinted_at REAL NOT NULL
+    );
+    """,
+]
+
+
+@dataclass
+class CatalogEntry:
+    video_id: str
+    path: str | None = None
+    size: int | None = None
+    duration: int | None = None
+    title: str | None = None
+    channel: str | None = None
+    downloaded_at: float | None = None
+    source_format: str | None = None
+    output_format: str | None = None
+
+
+_COLUMNS = [f.name for f in fields(CatalogEntry)]
+
+
+class LibraryCatalog:
+    """SQLite index of downloaded tracks, keyed by video_id.
+
+    Other stores (such as the persistent job queue) keep their tables in the
+    same database and go through execute/query.
+
+    One connection is shared by all threads and serialised with a lock.
+    Every write is committed immediately with synchronous=FULL, so a
+    recorded download survives a crash.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._migrate()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _migrate(self):
+        with self._lock:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            for i, script in enumerate(_MIGRATIONS[version:], start=version + 1):
+                self._conn.executescript(f"BEGIN; {script} PRAGMA user_version = {i}; COMMIT;")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # -- tracks --------------------------------------------------------------
+
+    def add(self, entry: CatalogEntry):
+        """Insert or replace the entry for entry.video_id."""
+        if entry.downloaded_at is None:
+            entry.downloaded_at = time.time()
+        values = [getattr(entry, c) for c in _COLUMNS]
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO tracks ({', '.join(_COLUMNS)}) VALUES ({placeholders})",
+                values,
+            )
+
+    def add_ids(self, video_ids: list[str]):
+        """Bulk-insert bare IDs, keeping any entries that already exist."""
+        now = time.time()
+        self.executemany(
+            "INSERT OR IGNORE INTO tracks (video_id, downloaded_at) VALUES (?, ?)",
+            [(vid, now) for vid in video_ids],
+        )
+
+    def get(self, video_id: str) -> CatalogEntry | None:
+        rows = self._select("WHERE video_id = ?", (video_id,))
+        return rows[0] if rows else None
+
+    def __contains__(self, video_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM tracks WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+
+    def video_ids(self) -> set[str]:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT video_id FROM tracks")}
+
+    def by_channel(self, channel: str) -> list[CatalogEntry]:
+        return self._select("WHERE channel = ? ORDER BY downloaded_at", (channel,))
+
+    def by_path(self, path: str) -> CatalogEntry | None:
+        rows = self._select("WHERE path = ?", (path,))
+        return rows[0] if rows else None
+
+    def downloaded_between(self, start: float, end: float) -> list[CatalogEntry]:
+        return self._select(
+            "WHERE downloaded_at >= ? AND downloaded_at < ? ORDER BY downloaded_at",
+            (start, end),
+        )
+
+    def total_size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM tracks").fetchone()[0]
+
+    def _select(self, where: str, params: tuple) -> list[CatalogEntry]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM tracks {where}", params
+            ).fetchall()
+        return [CatalogEntry(*row) for row in rows]
+
+    # -- meta ----------------------------------------------------------------
+
+    def get_meta(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+            )
+
+    # -- raw access for other stores sharing the database --------------------
+
+    def execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            self._conn.execute(sql, params)
+
+    def executemany(self, sql: str, rows: list[tuple]):
+        """Run sql once per row inside a single transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(sql, rows)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def checkpoint(self):
+        """Fold the write-ahead log back into the main database file."""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
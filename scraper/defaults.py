@@ -0,0 +1,26 @@
+"""Defaults shared by the CLI, the TUI and the download pipeline.
+
+Kept free of heavy imports so app.py can build its argument parser and the
+TUI can draw its first screen without loading yt-dlp.
+"""
+
+import os
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_TRANSCODE_WORKERS = os.cpu_count() or 1
+# Raw files waiting for ffmpeg; fetch workers block once this many pile up
+DEFAULT_QUEUE_SIZE = 8
+DEFAULT_COOKIE_FILE = "cookies.txt"
+# Playlists enumerated at once when syncing several sources
+DEFAULT_SYNC_WORKERS = 4
+# Videos whose full metadata is resolved at once
+DEFAULT_ENRICH_WORKERS = 4
+# How long resolved metadata is trusted before it is looked up again
+DEFAULT_METADATA_TTL = 30 * 24 * 60 * 60
+# Disk space cover art may take up before the least recently used is evicted
+DEFAULT_THUMBNAIL_CACHE_BYTES = 64 * 1024 * 1024
+# Listed tracks whose audio preview is fingerprinted at once
+DEFAULT_DEDUPE_WORKERS = 2
+# Watch mode: seconds between playlist polls, and the local status port
+DEFAULT_WATCH_INTERVAL = 15 * 60
+DEFAULT_STATUS_PORT = 8765
@@ -0,0 +1,724 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from functools import partial
+from typing import TYPE_CHECKING
+
+from scraper.defaults import DEFAULT_MAX_WORKERS, DEFAULT_QUEUE_SIZE, DEFAULT_TRANSCODE_WORKERS
+from scraper.enrich import MetadataCache
+from scraper.jobqueue import JobQueue, JobState
+from scraper.metrics import BatchMetrics
+from scraper.models import Track, TrackMetadata
+from scraper.progress import ProgressBus
+from scraper.retry import Job, RetryPolicy, RetryScheduler, TokenBucket
+from scraper.scheduling import (
+    BandwidthLimiter,
+    DiskSpaceGuard,
+    InsufficientDiskSpace,
+    SchedulePolicy,
+    estimated_size,
+    order_key,
+)
+from scraper.session import SessionPool
+from scraper.tracker import ProgressTracker
+from scraper.transcode import OutputFormat, TranscodeError, convert
+from scraper.ytdlp_client import (
+    DEFAULT_COOKIE_FILE,
+    DownloadCancelled,
+    StreamingUnsupported,
+    output_path,
+)
+
+if TYPE_CHECKING:
+    # NumPy and mutagen are only loaded when a batch fingerprints or tags
+    from scraper.fingerprint import FingerprintIndex
+    from scraper.tagging import Tagger
+
+_STOP = object()
+_JOIN_INTERVAL = 0.2
+
+
+@dataclass
+class DownloadResult:
+    track: Track
+    path: str | None = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class StageStats:
+    """Point-in-time counters for one pipeline stage."""
+
+    name: str
+    workers: int
+    queued: int = 0
+    active: int = 0
+    completed: int = 0
+    failed: int = 0
+    retries: int = 0
+    bytes: int = 0
+    started_at: float | None = field(default=None, repr=False)
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return time.monotonic() - self.started_at
+
+    @property
+    def tracks_per_sec(self) -> float:
+        elapsed = self.elapsed
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def bytes_per_sec(self) -> float:
+        elapsed = self.elapsed
+        return self.bytes / elapsed if elapsed > 0 else 0.0
+
+
+class BatchDownloader:
+    """Downloads a batch of tracks through a two-stage pipeline.
+
+    Fetch workers (threads) pull raw audio from YouTube and hand each file to
+    a bounded queue. Transcode workers drain the queue and run ffmpeg on a
+    separate process pool sized to the core count, so network and CPU work
+    overlap instead of alternating. Each optional collaborator (job queue,
+    progress bus, metrics, metadata, tagger, fingerprints) is skipped when
+    None.
+    """
+
+    def __init__(
+        self,
+        tracker: ProgressTracker,
+        downloads_dir: str = "downloads",
+        cookie_file: str = DEFAULT_COOKIE_FILE,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        transcode_workers: int = DEFAULT_TRANSCODE_WORKERS,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        on_job_start: Callable[[int, Track], None] | None = None,
+        on_job_progress: Callable[[int, dict], None] | None = None,
+        on_job_fetched: Callable[[int, Track], None] | None = None,
+        on_job_retry: Callable[[int, Track, float, str], None] | None = None,
+        on_job_done: Callable[[DownloadResult], None] | None = None,
+        fetch: Callable[..., str] | None = None,
+        stream: Callable[..., str] | None = None,
+        streaming: bool = False,
+        session_pool: SessionPool | None = None,
+        transcode: Callable[[str, str], str] | None = None,
+        output_format: OutputFormat = OutputFormat(),
+        transcode_executor: Executor | None = None,
+        retry_policy: RetryPolicy | None = None,
+        rate_limiter: TokenBucket | None = None,
+        job_queue: JobQueue | None = None,
+        progress: ProgressBus | None = None,
+        metrics: BatchMetrics | None = None,
+        metadata: MetadataCache | None = None,
+        tagger: "Tagger | None" = None,
+        fingerprints: "FingerprintIndex | None" = None,
+        schedule: SchedulePolicy = SchedulePolicy(),
+        on_disk_space: Callable[[bool, int], None] | None = None,
+    ):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if transcode_workers < 1:
+            raise ValueError("transcode_workers must be at least 1")
+        self.tracker = tracker
+        self.downloads_dir = downloads_dir
+        self.cookie_file = cookie_file
+        self.max_workers = max_workers
+        self.transcode_workers = transcode_workers
+        # Callbacks fire on worker threads, with the fetch worker's slot
+        # (0 .. max_workers - 1) so a UI can keep one row per download; a
+        # ProgressBus gets the same lifecycle plus bytes, merged for polling
+        self._on_job_start = on_job_start
+        self._on_job_progress = on_job_progress
+        self._on_job_fetched = on_job_fetched
+        self._on_job_retry = on_job_retry
+        self._on_job_done = on_job_done
+        self._fetch = fetch
+        self._stream = stream
+        # Streaming pipes the audio into ffmpeg as it downloads, writing only
+        # the final file. Analysis needs the whole file before the encode starts
+        self.streaming = (streaming or stream is not None) and not output_format.analyses
+        self._session_pool = session_pool
+        self.output_format = output_format
+        # Bound with partial() so it still pickles into the process pool
+        if transcode is None:
+            transcode = partial(convert, output_format=output_format)
+            if output_format.analyses:
+                # Imported here so NumPy is only loaded when it's needed
+                from scraper.analysis import convert_analysed
+
+                transcode = partial(convert_analysed, output_format=output_format)
+        self._transcode = transcode
+        self._transcode_executor = transcode_executor
+        self._handoff: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._retry_policy = retry_policy
+        self._rate_limiter = rate_limiter
+        self._job_queue = job_queue
+        self.progress = progress
+        self.metrics = metrics
+        self.metadata = metadata
+        self.tagger = tagger
+        self.fingerprints = fingerprints
+        self.schedule = schedule
+        # Fetch workers wait in their progress hook once the batch is over
+        # max_rate; min_free_space holds new downloads back (see DiskSpaceGuard)
+        self._bandwidth = BandwidthLimiter(schedule.max_rate) if schedule.max_rate else None
+        self.disk_guard = None
+        if schedule.min_free_space:
+            self.disk_guard = DiskSpaceGuard(
+                downloads_dir, schedule.min_free_space, on_change=on_disk_space
+            )
+        self._scheduler: RetryScheduler | None = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._fetch_stats = StageStats("fetch", max_workers)
+        self._transcode_stats = StageStats("transcode", transcode_workers)
+        self.results: list[DownloadResult] = []
+        # Output path -> video ID writing it, so two jobs never share a file
+        self._claimed_paths: dict[str, str] = {}
+        # Video ID -> bytes it holds in disk_guard until the track is finished
+        self._reservations: dict[str, int] = {}
+
+    @property
+    def errors(self) -> list[DownloadResult]:
+        with self._lock:
+            return [r for r in self.results if not r.ok]
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Stop the batch: no new jobs start and in-flight downloads give up.
+
+        Safe to call from any thread. Streams in progress are aborted and their
+        partial output removed. Cancelled jobs get no result and stay
+        unfinished in the JobQueue, so the next run picks them up; run()
+        returns once the workers have wound down.
+        """
+        self._cancelled.set()
+        with self._lock:
+            scheduler = self._scheduler
+        if scheduler is not None:
+            scheduler.cancel()
+
+    def stats(self) -> dict[str, StageStats]:
+        """Snapshot of per-stage queue depth and throughput."""
+        with self._lock:
+            pending = self._scheduler.pending if self._scheduler else 0
+            fetch = replace(self._fetch_stats, queued=pending)
+            transcode = replace(self._transcode_stats, queued=self._handoff.qsize())
+        return {"fetch": fetch, "transcode": transcode}
+
+    def run(self, tracks: list[Track]) -> list[DownloadResult]:
+        """Download all tracks, blocking until every job has finished.
+
+        Unless a fetch function or session pool was given, fetches run on a
+        pool of reusable YoutubeDL sessions that lives for this call.
+        """
+        own_pool = None
+        needs_pool = self._fetch is None or (self.streaming and self._stream is None)
+        if needs_pool and self._session_pool is None:
+            own_pool = SessionPool(self.cookie_file, size=self.max_workers)
+        pool = self._session_pool or own_pool
+        fetch = self._fetch or pool.fetch_audio
+        stream = None
+        if self.streaming:
+            stream = self._stream or pool.stream_audio
+        executor = self._transcode_executor or ProcessPoolExecutor(
+            max_workers=self.transcode_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        with self._lock:
+            self._fetch_stats.started_at = time.monotonic()
+            self._transcode_stats.started_at = time.monotonic()
+
+        consumers = [
+            threading.Thread(
+                target=self._transcode_loop,
+                args=(executor,),
+                name=f"transcode-{i}",
+                daemon=True,
+            )
+            for i in range(self.transcode_workers)
+        ]
+        for t in consumers:
+            t.start()
+        if self._job_queue is not None:
+            self._job_queue.enqueue(tracks)
+        if self.progress is not None:
+            self.progress.start_batch(len(tracks))
+        if self.metrics is not None:
+            self.metrics.start_batch(len(tracks))
+        # Transient and rate-limit failures come back with jittered backoff,
+        # every attempt waiting on the shared token bucket
+        scheduler = RetryScheduler(
+            self._retry_policy, self._rate_limiter, priority=order_key(self.schedule.order)
+        )
+        scheduler.add(tracks)
+        with self._lock:
+            self._scheduler = scheduler
+        if self._cancelled.is_set():
+            scheduler.cancel()
+        fetchers = [
+            threading.Thread(
+                target=self._fetch_loop,
+                args=(scheduler, fetch, stream, slot),
+                name=f"fetch-{slot}",
+                daemon=True,
+            )
+            for slot in range(self.max_workers)
+        ]
+        for t in fetchers:
+            t.start()
+        try:
+            try:
+                for t in fetchers:
+                    # Timed joins let a Ctrl+C through while workers are busy
+                    while t.is_alive():
+                        t.join(_JOIN_INTERVAL)
+            except BaseException:
+                # Interrupted (Ctrl+C): let in-flight jobs clean up after themselves
+                self.cancel()
+                for t in fetchers:
+                    t.join()
+                raise
+        finally:
+            for _ in consumers:
+                self._handoff.put(_STOP)
+            for t in consumers:
+                t.join()
+            if self._transcode_executor is None:
+                executor.shutdown()
+            if own_pool is not None:
+                own_pool.close()
+            self.tracker.save()
+            if self.progress is not None:
+                self.progress.finish_batch()
+            if self.metrics is not None:
+                self.metrics.finish_batch()
+        if self._job_queue is not None:
+            self._job_queue.prune()
+        return list(self.results)
+
+    # -- fetch stage ---------------------------------------------------------
+
+    def _fetch_loop(
+        self,
+        scheduler: RetryScheduler,
+        fetch: Callable[..., str],
+        stream: Callable[..., str] | None,
+        slot: int,
+    ) -> None:
+        """One fetch worker; its slot number doubles as its UI row."""
+        while (job := scheduler.next_job()) is not None:
+            self._fetch_job(scheduler, fetch, stream, slot, job)
+
+    def _fetch_job(
+        self,
+        scheduler: RetryScheduler,
+        fetch: Callable[..., str],
+        stream: Callable[..., str] | None,
+        slot: int,
+        job: Job,
+    ) -> None:
+        track = job.item
+        raw_path = self._resumable_raw(track)
+        if raw_path is not None:
+            scheduler.succeeded(job)
+            self._handoff.put((track, raw_path, self._now()))
+            return
+
+        size = estimated_size(track)
+        if self.disk_guard is not None:
+            try:
+                admitted = self.disk_guard.admit(size, self._cancelled)
+            except InsufficientDiskSpace as e:
+                scheduler.failed(job, e)
+                with self._lock:
+                    self._fetch_stats.failed += 1
+                self._set_job_state(track, JobState.FAILED, error=str(e))
+                self._finish(DownloadResult(track, error=str(e)))
+                return
+            if not admitted:
+                # Cancelled while waiting for space; the job stays unfinished
+                return
+            # Held until the track is finished: its transcode writes the
+            # final file while the raw one is still on disk
+            with self._lock:
+                self._reservations[track.video_id] = size
+        with self._lock:
+            self._fetch_stats.active += 1
+        self._set_job_state(track, JobState.DOWNLOADING)
+        if self.progress is not None:
+            self.progress.job_started(track.video_id, track.title, slot)
+        if self.metrics is not None:
+            self.metrics.start_attempt(track.video_id, track.title)
+        source_format = None
+        path = None
+        streamed = 0
+        try:
+            if self._on_job_start:
+                self._on_job_start(slot, track)
+            if stream is not None:
+                try:
+                    source_format, path, streamed = self._stream_one(stream, slot, track)
+                except StreamingUnsupported:
+                    pass
+            if path is None:
+                raw_path = self._fetch_one(
+                    slot,
+                    track,
+                    lambda hook: fetch(
+                        track.video_id,
+                        downloads_dir=self.downloads_dir,
+                        cookie_file=self.cookie_file,
+                        progress_hook=hook,
+                    ),
+                )
+        except Exception as e:
+            if self._cancelled.is_set():
+                # Not a failure: the job stays unfinished for the next run
+                with self._lock:
+                    self._fetch_stats.active -= 1
+                self._release_space(track)
+                return
+            delay = scheduler.failed(job, e)
+            if self.metrics is not None and delay is not None:
+                self.metrics.add_retry(track.video_id)
+            with self._lock:
+                self._fetch_stats.active -= 1
+                if delay is None:
+                    self._fetch_stats.failed += 1
+                else:
+                    self._fetch_stats.retries += 1
+            if delay is None:
+                self._set_job_state(track, JobState.FAILED, error=str(e))
+                self._finish(DownloadResult(track, error=str(e)))
+                return
+            # Admitted again when the retry comes up
+            self._release_space(track)
+            if self.progress is not None:
+                self.progress.job_retrying(track.video_id, delay, str(e))
+            if self._on_job_retry:
+                self._on_job_retry(slot, track, delay, str(e))
+            return
+
+        scheduler.succeeded(job)
+        if path is not None:
+            self._finish_streamed(track, path, source_format, streamed)
+            return
+        self._set_job_state(track, JobState.TRANSCODING, raw_path=raw_path)
+        raw_size = _file_size(raw_path)
+        with self._lock:
+            self._fetch_stats.active -= 1
+            self._fetch_stats.completed += 1
+            self._fetch_stats.bytes += raw_size
+        if self.metrics is not None:
+            self.metrics.add_bytes(track.video_id, downloaded=raw_size)
+        if self.progress is not None:
+            self.progress.job_fetched(track.video_id)
+        # Blocks while the transcode queue is full, holding the slot
+        self._handoff.put((track, raw_path, self._now()))
+        if self._on_job_fetched:
+            self._on_job_fetched(slot, track)
+
+    def _stream_one(
+        self, stream: Callable[..., str], slot: int, track: Track
+    ) -> tuple[str | None, str, int]:
+        """Stream a track into its final file.
+
+        Returns the served format, the output path and the bytes downloaded.
+        """
+        source_format = None
+        downloaded = 0
+
+        def dst_for(extension: str) -> str:
+            nonlocal source_format
+            source_format = extension or None
+            return self._output_path(track, self.output_format.extension(f"stream.{extension}"))
+
+        def counting(hook: Callable[[dict], None]) -> Callable[[dict], None]:
+            def counted(d: dict) -> None:
+                nonlocal downloaded
+                downloaded = d.get("downloaded_bytes") or downloaded
+                hook(d)
+
+            return counted
+
+        path = self._fetch_one(
+            slot,
+            track,
+            lambda hook: stream(
+                track.video_id,
+                dst_for=dst_for,
+                output_format=self.output_format,
+                cookie_file=self.cookie_file,
+                progress_hook=counting(hook),
+                cancelled=self._cancelled,
+            ),
+        )
+        return source_format, path, downloaded
+
+    def _finish_streamed(
+        self, track: Track, path: str, source_format: str | None, downloaded: int
+    ) -> None:
+        try:
+            if self.tagger is not None or self.fingerprints is not None:
+                with self._span(track, "transcode"):
+                    self._tag(track, path)
+                    self._fingerprint(track, path)
+            with self._span(track, "manifest"):
+                self.tracker.mark_downloaded(
+                    track.video_id, track=track, path=path, source_format=source_format
+                )
+        except Exception as e:
+            with self._lock:
+                self._fetch_stats.active -= 1
+                self._fetch_stats.failed += 1
+            self._set_job_state(track, JobState.FAILED, error=str(e))
+            self._finish(DownloadResult(track, error=str(e)))
+            return
+        self._set_job_state(track, JobState.DONE)
+        size = _file_size(path)
+        with self._lock:
+            self._fetch_stats.active -= 1
+            self._fetch_stats.completed += 1
+            self._fetch_stats.bytes += downloaded
+        if self.metrics is not None:
+            self.metrics.add_bytes(track.video_id, downloaded=downloaded, written=size)
+        self._finish(DownloadResult(track, path=path))
+
+    def _fetch_one(self, slot: int, track: Track, call: Callable[[Callable], str]) -> str:
+        """Run one download attempt, call(progress_hook), timing and relaying its progress."""
+        metrics = self.metrics
+        started = self._now()
+        # Set when the first byte arrives; everything before it is extraction
+        network_started: float | None = None
+        # Bytes charged to the bandwidth cap; None until the first report,
+        # whose count may include a .part file resumed from an earlier run
+        charged: int | None = None
+
+        def hook(d: dict) -> None:
+            nonlocal network_started, charged
+            if self._cancelled.is_set():
+                # yt-dlp keeps its .part file, so a cancelled fetch resumes next run
+                raise DownloadCancelled(track.video_id)
+            if d.get("status") == "downloading":
+                if metrics is not None and network_started is None:
+                    network_started = metrics.now()
+                    metrics.record(track.video_id, "extract", started, network_started)
+                if self._bandwidth is not None:
+                    received = d.get("downloaded_bytes") or 0
+                    if charged is not None and received >= charged:
+                        if not self._bandwidth.consume(received - charged, self._cancelled):
+                            raise DownloadCancelled(track.video_id)
+                    charged = received
+                if self.progress is not None:
+                    self.progress.job_progress(
+                        track.video_id,
+                        d.get("downloaded_bytes") or 0,
+                        d.get("total_bytes") or d.get("total_bytes_estimate"),
+                    )
+            if self._on_job_progress:
+                self._on_job_progress(slot, d)
+
+        try:
+            return call(hook)
+        finally:
+            if metrics is not None:
+                # An attempt that failed, or found the file already complete,
+                # never reached the transfer
+                if network_started is None:
+                    metrics.record(track.video_id, "extract", started, metrics.now())
+                else:
+                    metrics.record(track.video_id, "network", network_started, metrics.now())
+
+    def _metadata_for(self, track: Track) -> TrackMetadata:
+        if self.metadata is not None:
+            metadata = self.metadata.get(track.video_id)
+            if metadata is not None:
+                return metadata
+        return TrackMetadata()
+
+    def _names(self, track: Track) -> tuple[str, str]:
+        """(artist, title) for track's output file."""
+        return self._metadata_for(track).names(track)
+
+    def _output_path(self, track: Track, extension: str) -> str:
+        """Final path for track's file, made unique if another video has its name.
+
+        Enriched names collide more often than channel and title did: the
+        official video and a lyric upload both resolve to the same artist and
+        track. A path another video has already claimed in this batch, or
+        that exists and isn't this video's in the catalog, gets the video ID
+        appended instead of being overwritten; should that be taken too, a
+        counter follows it.
+        """
+        artist, title = self._names(track)
+        path = output_path(artist, title, self.downloads_dir, extension)
+        with self._lock:
+            copy = 1
+            while self._path_taken(track.video_id, path):
+                # After truncation, so a long title can't cut the ID off
+                suffix = f" [{track.video_id}]" if copy == 1 else f" [{track.video_id}] ({copy})"
+                path = output_path(artist, title, self.downloads_dir, extension, suffix)
+                copy += 1
+            self._claimed_paths[path] = track.video_id
+        return path
+
+    def _path_taken(self, video_id: str, path: str) -> bool:
+        claimed = self._claimed_paths.get(path)
+        if claimed is not None:
+            return claimed != video_id
+        owner = self.tracker.catalog.by_path(path)
+        if owner is not None:
+            return owner.video_id != video_id
+        return os.path.exists(path)
+
+    def _tag(self, track: Track, path: str) -> None:
+        if self.tagger is not None:
+            self.tagger.tag(path, track, self._metadata_for(track))
+
+    def _fingerprint(self, track: Track, path: str) -> None:
+        if self.fingerprints is None:
+            return
+        from scraper.fingerprint import fingerprint_file
+
+        try:
+            self.fingerprints.add(track.video_id, fingerprint_file(path))
+        except (TranscodeError, OSError):
+            # Only costs the duplicate check; the file itself is fine
+            pass
+
+    def _now(self) -> float:
+        return self.metrics.now() if self.metrics is not None else 0.0
+
+    def _resumable_raw(self, track: Track) -> str | None:
+        """Raw file an interrupted run already fetched for this track, if any."""
+        if self._job_queue is None:
+            return None
+        raw_path = self._job_queue.raw_path(track.video_id)
+        if raw_path and os.path.isfile(raw_path):
+            return raw_path
+        return None
+
+    def _set_job_state(self, track: Track, state: JobState, **kwargs) -> None:
+        if self._job_queue is not None:
+            with self._span(track, "manifest"):
+                self._job_queue.set_state(track.video_id, state, **kwargs)
+
+    @contextmanager
+    def _span(self, track: Track, phase: str) -> Iterator[None]:
+        if self.metrics is None:
+            yield
+            return
+        start = self.metrics.now()
+        try:
+            yield
+        finally:
+            self.metrics.record(track.video_id, phase, start, self.metrics.now())
+
+    # -- transcode stage -----------------------------------------------------
+
+    def _transcode_loop(self, executor: Executor) -> None:
+        while True:
+            item = self._handoff.get()
+            if item is _STOP:
+                return
+            track, raw_path, queued_at = item
+            if self._cancelled.is_set():
+                # Left TRANSCODING with its raw file, for the next run
+                self._release_space(track)
+                continue
+            if self.metrics is not None:
+                self.metrics.record(track.video_id, "queued", queued_at, self.metrics.now())
+            with self._lock:
+                self._transcode_stats.active += 1
+            dst = self._output_path(track, self.output_format.extension(raw_path))
+            try:
+                with self._span(track, "transcode"):
+                    path = self._convert(executor, track, raw_path, dst)
+                    self._tag(track, path)
+                    self._fingerprint(track, path)
+                with self._span(track, "manifest"):
+                    self.tracker.mark_downloaded(
+                        track.video_id,
+                        track=track,
+                        path=path,
+                        source_format=os.path.splitext(raw_path)[1].lstrip(".") or None,
+                    )
+            except Exception as e:
+                with self._lock:
+                    self._transcode_stats.active -= 1
+                    self._transcode_stats.failed += 1
+                self._set_job_state(track, JobState.FAILED, error=str(e))
+                self._finish(DownloadResult(track, error=str(e)))
+                continue
+
+            self._set_job_state(track, JobState.DONE)
+            _remove_quietly(raw_path)
+            size = _file_size(path)
+            with self._lock:
+                self._transcode_stats.active -= 1
+                self._transcode_stats.completed += 1
+                self._transcode_stats.bytes += size
+            if self.metrics is not None:
+                self.metrics.add_bytes(track.video_id, written=size)
+            self._finish(DownloadResult(track, path=path))
+
+    def _convert(self, executor: Executor, track: Track, raw_path: str, dst: str) -> str:
+        if not self.output_format.analyses:
+            return executor.submit(self._transcode, raw_path, dst).result()
+        # Measured once per video; later runs reuse the stored analysis
+        known = self.tracker.analysis(track.video_id)
+        path, analysis = executor.submit(self._transcode, raw_path, dst, known).result()
+        if known is None:
+            self.tracker.record_analysis(track.video_id, analysis)
+        return path
+
+    def _release_space(self, track: Track) -> None:
+        """Give back the disk space reserved for track, if any."""
+        with self._lock:
+            size = self._reservations.pop(track.video_id, 0)
+        if size:
+            self.disk_guard.release(size)
+
+    def _finish(self, result: DownloadResult) -> None:
+        self._release_space(result.track)
+        with self._lock:
+            self.results.append(result)
+        if self.progress is not None:
+            self.progress.job_finished(
+                result.track.video_id, result.track.title, path=result.path, error=result.error
+            )
+        if self.metrics is not None:
+            self.metrics.finish_track(result.track.video_id, result.track.title, result.error)
+        if self._on_job_done:
+            self._on_job_done(result)
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,192 @@
+"""Full music metadata per video, resolved concurrently and cached.
+
+A flat playlist fetch only lists each video's title, channel and duration.
+Enrichment looks every video up once more for the artist, track, album,
+release year and thumbnail YouTube knows, and keeps the answer in the
+library catalog so a video is only looked up again once its entry expires.
+
+Kept free of heavy imports (no yt-dlp): the lookup itself is passed in,
+usually SessionPool.fetch_metadata.
+"""
+
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from scraper.catalog import LibraryCatalog
+from scraper.defaults import DEFAULT_ENRICH_WORKERS, DEFAULT_METADATA_TTL
+from scraper.models import TrackMetadata
+
+# Bound parameters per SELECT ... IN (...), well under SQLite's limit
+_QUERY_CHUNK = 500
+# on_resolved is called at most this often while lookups complete
+_REPORT_INTERVAL = 0.25
+
+
+class MetadataCache:
+    """Resolved metadata by video_id, persisted in the library catalog.
+
+    Entries older than ttl seconds are treated as missing, so the next
+    enrichment looks them up again and replaces them. A video with no music
+    metadata at all is cached too, as an empty TrackMetadata.
+    """
+
+    def __init__(
+        self,
+        catalog: LibraryCatalog,
+        ttl: float = DEFAULT_METADATA_TTL,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._catalog = catalog
+        self.ttl = ttl
+        self._clock = clock
+
+    def get(self, video_id: str) -> TrackMetadata | None:
+        return self.get_many([video_id]).get(video_id)
+
+    def get_many(self, video_ids: Iterable[str]) -> dict[str, TrackMetadata]:
+        """Unexpired entries for video_ids; missing and expired ones are left out."""
+        ids = list(dict.fromkeys(video_ids))
+        oldest = self._clock() - self.ttl
+        found = {}
+        for start in range(0, len(ids), _QUERY_CHUNK):
+            chunk = ids[start : start + _QUERY_CHUNK]
+            rows = self._catalog.query(
+                f"""
+                SELECT video_id, artist, track, album, release_year, thumbnail
+                FROM track_metadata
+                WHERE video_id IN ({", ".join("?" for _ in chunk)}) AND fetched_at >= ?
+                """,
+                (*chunk, oldest),
+            )
+            for video_id, *values in rows:
+                found[video_id] = TrackMetadata(*values)
+        return found
+
+    def put(self, video_id: str, metadata: TrackMetadata) -> None:
+        self._catalog.execute(
+            """
+            INSERT OR REPLACE INTO track_metadata
+                (video_id, artist, track, album, release_year, thumbnail, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                video_id,
+                metadata.artist,
+                metadata.track,
+                metadata.album,
+                metadata.release_year,
+                metadata.thumbnail,
+                self._clock(),
+            ),
+        )
+
+
+@dataclass
+class EnrichResult:
+    """Metadata for every video that has some, and what it took to get it."""
+
+    metadata: dict[str, TrackMetadata] = field(default_factory=dict)
+    cached: int = 0
+    resolved: int = 0
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+class Enricher:
+    """Resolves metadata for many videos on a thread pool, through a MetadataCache.
+
+    Each lookup is a full extraction that mostly waits on YouTube, so up to
+    max_workers run at once. A video that is already being looked up (for an
+    earlier enrich() call still in progress) is waited on rather than looked
+    up twice. Failed lookups are not cached, so a later enrichment retries
+    them. close() drops the lookups that have not started.
+    """
+
+    def __init__(
+        self,
+        cache: MetadataCache,
+        resolve: Callable[[str], TrackMetadata],
+        max_workers: int = DEFAULT_ENRICH_WORKERS,
+    ):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.cache = cache
+        self._resolve = resolve
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="enrich")
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, Future] = {}
+        self._closed = threading.Event()
+
+    def enrich(
+        self,
+        video_ids: Iterable[str],
+        on_resolved: Callable[[dict[str, TrackMetadata]], None] | None = None,
+    ) -> EnrichResult:
+        """Metadata for video_ids, blocking until every lookup has finished.
+
+        on_resolved, if given, receives the cached entries straight away and
+        then newly resolved ones in small batches as they arrive, so a UI can
+        fill them in while the rest are still being looked up.
+        """
+        ids = list(dict.fromkeys(video_ids))
+        result = EnrichResult(metadata=self.cache.get_many(ids))
+        result.cached = len(result.metadata)
+        if on_resolved is not None and result.metadata:
+            on_resolved(dict(result.metadata))
+
+        futures = {}
+        with self._lock:
+            for video_id in ids:
+                if video_id in result.metadata:
+                    continue
+                future = self._in_flight.get(video_id)
+                if future is None:
+                    try:
+                        future = self._pool.submit(self._lookup, video_id)
+                    except RuntimeError:
+                        # Closed
+                        break
+                    self._in_flight[video_id] = future
+                futures[future] = video_id
+
+        pending: dict[str, TrackMetadata] = {}
+        last_report = time.monotonic()
+        for future in as_completed(futures):
+            video_id = futures[future]
+            try:
+                metadata = future.result()
+            except CancelledError:
+                continue
+            except Exception as e:
+                result.errors[video_id] = str(e)
+                continue
+            result.metadata[video_id] = metadata
+            result.resolved += 1
+            pending[video_id] = metadata
+            if on_resolved is not None and time.monotonic() - last_report >= _REPORT_INTERVAL:
+                on_resolved(pending)
+                pending = {}
+                last_report = time.monotonic()
+        if on_resolved is not None and pending:
+            on_resolved(pending)
+        return result
+
+    def _lookup(self, video_id: str) -> TrackMetadata:
+        try:
+            if self._closed.is_set():
+                raise CancelledError(video_id)
+            metadata = self._resolve(video_id)
+            self.cache.put(video_id, metadata)
+            return metadata
+        finally:
+            with self._lock:
+                self._in_flight.pop(video_id, None)
+
+    def close(self) -> None:
+        """Cancel lookups that have not started; those running are left to finish."""
+        # Not shutdown(cancel_futures=True): futures cancelled that way never
+        # wake up an as_completed() that is waiting on them
+        self._closed.set()
+        self._pool.shutdown(wait=False)
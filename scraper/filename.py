@@ -2,13 +2,20 @@ import re
 import uuid
 
 
-def sanitize_filename(artist: str, title: str) -> str:
-    """Create a safe MP3 filename from artist and title."""
+def sanitize_filename(artist: str, title: str, extension: str = ".mp3", suffix: str = "") -> str:
+    """Create a safe filename from artist and title, ending in extension.
+
+    suffix goes right before the extension and is kept whole when the name
+    is truncated.
+    """
+    if extension and not extension.startswith("."):
+        extension = "." + extension
     raw = f"{artist} - {title}"
 
     # Strip characters illegal on Windows and control chars
     raw = re.sub(r'[<>:"/\\|?*]', "", raw)
     raw = re.sub(r"[\x00-\x1f]", "", raw)
+    suffix = re.sub(r'[<>:"/\\|?*\x00-\x1f]', "", suffix)
 
     # Collapse whitespace
     raw = re.sub(r"\s+", " ", raw).strip()
@@ -16,11 +23,11 @@ def sanitize_filename(artist: str, title: str) -> str:
     # Strip leading/trailing dots and dashes
     raw = raw.strip(".- ")
 
-    # Truncate (leave room for .mp3)
-    max_stem = 200 - 4  # 4 for ".mp3"
+    # Truncate, leaving room for the suffix and extension
+    max_stem = 200 - len(suffix) - len(extension)
     raw = raw[:max_stem].rstrip()
 
     if not raw:
         raw = uuid.uuid4().hex
 
-    return f"{raw}.mp3"
+    return f"{raw}{suffix}{extension}"
@@ -0,0 +1,369 @@
+"""Acoustic fingerprints, for spotting one song uploaded as several videos.
+
+The same recording liked as an official video, a lyric video and a
+"Topic" upload has three video IDs, so the tracker can't tell them apart.
+Their audio can: a fingerprint is a 32-bit sub-fingerprint every 23 ms,
+each bit saying whether the energy difference between two neighbouring
+frequency bands (300-2000 Hz) grew or shrank since the previous frame. Two
+encodes of one recording agree on most bits even at different bitrates,
+volumes and offsets; unrelated audio agrees on about half.
+
+A FingerprintIndex keeps every fingerprint in the library catalog and looks
+them up approximately: each 16-bit half of a sub-fingerprint is a key into
+sorted NumPy arrays, so a query finds the few tracks (and their time
+offsets) that share many exact halves, and only those are compared bit by
+bit. Downloaded files are fingerprinted whole; a track that is only listed
+is fingerprinted from a preview of its first megabyte of audio, which is
+enough to flag it before it is downloaded.
+"""
+
+import subprocess
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+
+import numpy as np
+
+from scraper.catalog import LibraryCatalog
+from scraper.defaults import DEFAULT_DEDUPE_WORKERS
+from scraper.transcode import FFMPEG, TranscodeError
+
+SAMPLE_RATE = 5512
+# Only the start of a file is fingerprinted; six minutes covers most songs
+MAX_SECONDS = 360
+# Fraction of differing bits up to which two aligned fingerprints are the
+# same recording; unrelated audio differs in about half
+MAX_BIT_ERROR = 0.3
+# Audio two fingerprints must share to be compared at all
+MIN_OVERLAP_SECONDS = 10
+
+_FRAME = 2048  # 0.37 s
+_HOP = 128  # 23 ms
+_CHUNK_FRAMES = 1024
+_BAND_EDGES = np.geomspace(300, 2000, 34)
+_MIN_OVERLAP = int(MIN_OVERLAP_SECONDS * SAMPLE_RATE / _HOP)
+# Only every eighth sub-fingerprint of a stored track is indexed; a query
+# uses all of its own, so every alignment is still found
+_INDEX_STRIDE = 8
+# Keys this common (mostly silence) say nothing about which track matches
+_MAX_KEY_HITS = 1000
+_MIN_VOTES = 3
+# Best-voted tracks compared bit by bit per query
+_CANDIDATES = 10
+_OFFSET_BIAS = 1 << 20
+
+
+@dataclass(frozen=True)
+class Match:
+    """A fingerprinted track that sounds like the query.
+
+    similarity is the fraction of matching bits (1.0 is identical); offset
+    is how many seconds into the match's audio the query starts, negative
+    if the query starts earlier.
+    """
+
+    video_id: str
+    similarity: float
+    offset: float
+
+
+def fingerprint_pcm(samples: np.ndarray) -> np.ndarray:
+    """Sub-fingerprints (uint32) of mono samples at SAMPLE_RATE."""
+    samples = np.asarray(samples, dtype=np.float32)[: MAX_SECONDS * SAMPLE_RATE]
+    if len(samples) < _FRAME + _HOP:
+        return np.zeros(0, dtype=np.uint32)
+    frames = np.lib.stride_tricks.sliding_window_view(samples, _FRAME)[::_HOP]
+    window = np.hanning(_FRAME).astype(np.float32)
+    energy = np.concatenate(
+        [
+            (np.abs(np.fft.rfft(frames[start : start + _CHUNK_FRAMES] * window, axis=1)) ** 2)
+            @ _BANDS
+            for start in range(0, len(frames), _CHUNK_FRAMES)
+        ]
+    )
+    slope = energy[:, :-1] - energy[:, 1:]
+    bits = (slope[1:] - slope[:-1] > 0).astype(np.uint32)
+    # Distinct powers of two, so the sum is the bitwise OR
+    return (bits << np.arange(32, dtype=np.uint32)).sum(axis=1, dtype=np.uint32)
+
+
+def fingerprint_file(path: str) -> np.ndarray:
+    """Fingerprint of an audio file's first MAX_SECONDS."""
+    return fingerprint_pcm(_decode(["-i", path]))
+
+
+def fingerprint_bytes(data: bytes) -> np.ndarray:
+    """Fingerprint of the start of an audio stream, which may be cut off anywhere."""
+    return fingerprint_pcm(_decode(["-i", "pipe:0"], data))
+
+
+def _decode(input_args: list[str], data: bytes | None = None) -> np.ndarray:
+    cmd = [FFMPEG, "-nostdin", "-loglevel", "error", *input_args, "-vn", "-map", "0:a:0"]
+    cmd += ["-ac", "1", "-ar", str(SAMPLE_RATE), "-t", str(MAX_SECONDS), "-f", "f32le", "pipe:1"]
+    proc = subprocess.run(cmd, input=data, capture_output=True)
+    # A truncated preview ends in a decode error; whatever came before it counts
+    if not proc.stdout:
+        lines = proc.stderr.decode(errors="replace").strip().splitlines()
+        raise TranscodeError(lines[-1] if lines else f"ffmpeg exited with {proc.returncode}")
+    return np.frombuffer(proc.stdout, dtype="<f4", count=len(proc.stdout) // 4)
+
+
+def _band_matrix() -> np.ndarray:
+    """(frequency bins, bands) matrix summing a power spectrum into _BAND_EDGES."""
+    band = np.searchsorted(_BAND_EDGES, np.fft.rfftfreq(_FRAME, 1 / SAMPLE_RATE), "right") - 1
+    return (band[:, None] == np.arange(len(_BAND_EDGES) - 1)).astype(np.float32)
+
+
+_BANDS = _band_matrix()
+
+
+class FingerprintIndex:
+    """Fingerprints by video_id, persisted in the library catalog.
+
+    A fingerprint taken from a preview is replaced by the full one once the
+    track is downloaded, never the other way round. The lookup arrays are
+    built from the catalog on first use; later additions go into small
+    sorted segments that are folded together as they pile up. Safe to use
+    from several threads.
+    """
+
+    def __init__(self, catalog: LibraryCatalog):
+        self._catalog = catalog
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._ids: list[str] = []  # by index row
+        self._rows: dict[str, int] = {}  # current row of each video_id
+        self._segments: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+    def __contains__(self, video_id: str) -> bool:
+        rows = self._catalog.query("SELECT 1 FROM fingerprints WHERE video_id = ?", (video_id,))
+        return bool(rows)
+
+    def get(self, video_id: str) -> np.ndarray | None:
+        rows = self._catalog.query(
+            "SELECT hashes FROM fingerprints WHERE video_id = ?", (video_id,)
+        )
+        return np.frombuffer(rows[0][0], dtype="<u4") if rows else None
+
+    def add(self, video_id: str, hashes: np.ndarray, preview: bool = False) -> None:
+        hashes = np.asarray(hashes, dtype="<u4")
+        with self._lock:
+            if preview and self._has_full(video_id):
+                return
+            self._catalog.execute(
+                """
+                INSERT OR REPLACE INTO fingerprints (video_id, hashes, preview, fingerprinted_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (video_id, hashes.tobytes(), int(preview), time.time()),
+            )
+            if self._loaded:
+                self._add_row(video_id, hashes)
+
+    def unfingerprinted(self) -> list[tuple[str, str]]:
+        """(video_id, path) of downloaded files without a full fingerprint yet."""
+        return self._catalog.query(
+            """
+            SELECT t.video_id, t.path FROM tracks t
+            LEFT JOIN fingerprints f ON f.video_id = t.video_id AND f.preview = 0
+            WHERE t.path IS NOT NULL AND f.video_id IS NULL
+            """
+        )
+
+    def match(self, hashes: np.ndarray, exclude: str | None = None) -> list[Match]:
+        """Fingerprinted tracks that sound like hashes, most similar first."""
+        hashes = np.asarray(hashes, dtype=np.uint32)
+        if len(hashes) < _MIN_OVERLAP:
+            return []
+        with self._lock:
+            self._load()
+            segments = list(self._segments)
+            ids = list(self._ids)
+            rows = dict(self._rows)
+
+        positions = np.arange(len(hashes))
+        query_keys = _keys(hashes)
+        query_positions = np.concatenate([positions, positions])
+        votes = []
+        for keys, tracks, stored_positions in segments:
+            lo = np.searchsorted(keys, query_keys, "left")
+            counts = np.searchsorted(keys, query_keys, "right") - lo
+            counts[counts > _MAX_KEY_HITS] = 0
+            total = int(counts.sum())
+            if not total:
+                continue
+            # Every (query key, stored entry) pair with equal keys
+            entries = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(total)
+            offsets = stored_positions[entries].astype(np.int64) - np.repeat(
+                query_positions, counts
+            )
+            votes.append((tracks[entries].astype(np.int64) << 32) | (offsets + _OFFSET_BIAS))
+        if not votes:
+            return []
+
+        pairs, counts = np.unique(np.concatenate(votes), return_counts=True)
+        matches: dict[str, Match] = {}
+        compared = 0
+        for i in np.argsort(counts)[::-1]:
+            if counts[i] < _MIN_VOTES or compared >= _CANDIDATES:
+                break
+            row = int(pairs[i] >> 32)
+            video_id = ids[row]
+            if rows.get(video_id) != row or video_id == exclude or video_id in matches:
+                continue
+            compared += 1
+            stored = self.get(video_id)
+            if stored is None:
+                continue
+            offset = int(pairs[i] & 0xFFFFFFFF) - _OFFSET_BIAS
+            # Encodes can drift by a frame against each other
+            error, offset = min(
+                (_bit_error(hashes, stored, o), o) for o in range(offset - 1, offset + 2)
+            )
+            if error <= MAX_BIT_ERROR:
+                matches[video_id] = Match(video_id, 1 - error, offset * _HOP / SAMPLE_RATE)
+        return sorted(matches.values(), key=lambda m: m.similarity, reverse=True)
+
+    def _has_full(self, video_id: str) -> bool:
+        return bool(
+            self._catalog.query(
+                "SELECT 1 FROM fingerprints WHERE video_id = ? AND preview = 0", (video_id,)
+            )
+        )
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        for video_id, blob in self._catalog.query("SELECT video_id, hashes FROM fingerprints"):
+            self._add_row(video_id, np.frombuffer(blob, dtype="<u4"), merge=False)
+        self._merge()
+        self._loaded = True
+
+    def _add_row(self, video_id: str, hashes: np.ndarray, merge: bool = True) -> None:
+        row = len(self._ids)
+        self._ids.append(video_id)
+        self._rows[video_id] = row
+        positions = np.arange(0, len(hashes), _INDEX_STRIDE, dtype=np.uint32)
+        keys = _keys(hashes[positions])
+        entries = (keys, np.full(len(keys), row, np.uint32), np.concatenate([positions, positions]))
+        order = np.argsort(keys, kind="stable")
+        self._segments.append(tuple(a[order] for a in entries))
+        if merge and len(self._segments) > 8:
+            self._merge()
+
+    def _merge(self) -> None:
+        if len(self._segments) < 2:
+            return
+        keys, tracks, positions = (np.concatenate(arrays) for arrays in zip(*self._segments))
+        # Rows that were replaced since are dropped for good
+        live = np.zeros(len(self._ids), dtype=bool)
+        live[list(self._rows.values())] = True
+        keep = live[tracks]
+        keys, tracks, positions = keys[keep], tracks[keep], positions[keep]
+        order = np.argsort(keys, kind="stable")
+        self._segments = [(keys[order], tracks[order], positions[order])]
+
+
+def _keys(hashes: np.ndarray) -> np.ndarray:
+    """Both 16-bit halves of each sub-fingerprint, the high ones kept apart."""
+    hashes = hashes.astype(np.uint32)
+    return np.concatenate([hashes & 0xFFFF, (hashes >> 16) | 0x10000])
+
+
+def _bit_error(query: np.ndarray, stored: np.ndarray, offset: int) -> float:
+    """Fraction of differing bits with query[i] aligned to stored[i + offset]."""
+    start, stop = max(0, -offset), min(len(query), len(stored) - offset)
+    if stop - start < _MIN_OVERLAP:
+        return 1.0
+    diff = np.ascontiguousarray(query[start:stop] ^ stored[start + offset : stop + offset])
+    return float(np.unpackbits(diff.view(np.uint8)).sum()) / (32 * (stop - start))
+
+
+class DuplicateFinder:
+    """Flags listed tracks that sound like a fingerprinted one.
+
+    Each track is fingerprinted once with the fingerprint callable (usually
+    a preview downloaded through the session pool), added to the index as a
+    preview and matched against everything else in it: the library and
+    other listed tracks alike. Up to max_workers tracks are handled at
+    once; close() drops the ones that have not started.
+    """
+
+    def __init__(
+        self,
+        index: FingerprintIndex,
+        fingerprint: Callable[[str], np.ndarray],
+        max_workers: int = DEFAULT_DEDUPE_WORKERS,
+    ):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.index = index
+        self._fingerprint = fingerprint
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dedupe")
+        self._closed = threading.Event()
+
+    def backfill(self) -> int:
+        """Fingerprint downloaded files that have none yet. Returns how many were added."""
+        futures = {}
+        for video_id, path in self.index.unfingerprinted():
+            try:
+                futures[self._pool.submit(self._run, fingerprint_file, path)] = video_id
+            except RuntimeError:
+                # Closed
+                break
+        added = 0
+        for future in as_completed(futures):
+            try:
+                self.index.add(futures[future], future.result())
+            except (CancelledError, TranscodeError, OSError):
+                # Cancelled, or the file is gone or unreadable
+                continue
+            added += 1
+        return added
+
+    def find(
+        self,
+        video_ids: Iterable[str],
+        on_found: Callable[[dict[str, list[Match]]], None] | None = None,
+    ) -> dict[str, list[Match]]:
+        """Matches for each of video_ids that has any, blocking until all are checked.
+
+        on_found, if given, receives each track's matches as soon as they are
+        known. Tracks whose audio can't be fetched are left out.
+        """
+        futures = {}
+        for video_id in dict.fromkeys(video_ids):
+            try:
+                futures[self._pool.submit(self._run, self._check, video_id)] = video_id
+            except RuntimeError:
+                break
+        found = {}
+        for future in as_completed(futures):
+            try:
+                matches = future.result()
+            except Exception:
+                continue
+            if matches:
+                found[futures[future]] = matches
+                if on_found is not None:
+                    on_found({futures[future]: matches})
+        return found
+
+    def _check(self, video_id: str) -> list[Match]:
+        hashes = self.index.get(video_id)
+        if hashes is None:
+            hashes = self._fingerprint(video_id)
+            self.index.add(video_id, hashes, preview=True)
+        return self.index.match(hashes, exclude=video_id)
+
+    def _run(self, fn, *args):
+        if self._closed.is_set():
+            raise CancelledError()
+        return fn(*args)
+
+    def close(self) -> None:
+        """Cancel tracks that have not started; those running are left to finish."""
+        self._closed.set()
+        self._pool.shutdown(wait=False)
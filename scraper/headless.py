@@ -0,0 +1,334 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections.abc import Callable
+from typing import TextIO
+
+from scraper.defaults import DEFAULT_ENRICH_WORKERS
+from scraper.downloader import DEFAULT_MAX_WORKERS, BatchDownloader, DownloadResult
+from scraper.enrich import Enricher, MetadataCache
+from scraper.jobqueue import JobQueue
+from scraper.metrics import BatchMetrics
+from scraper.models import Track, TrackMetadata
+from scraper.progress import JobStatus, ProgressBus, ProgressSnapshot
+from scraper.sources import Source, SourceIndex
+from scraper.sync import SyncResult, sync_sources
+from scraper.tracker import ProgressTracker
+from scraper.ytdlp_client import DEFAULT_COOKIE_FILE
+
+EXIT_OK = 0
+# Some downloads failed; the rest were saved
+EXIT_DOWNLOAD_FAILED = 1
+# argparse already exits with 2 on usage errors
+EXIT_SYNC_FAILED = 3
+# Interrupted with Ctrl+C; unfinished jobs resume on the next run
+EXIT_CANCELLED = 130
+
+_SYNC_PROGRESS_INTERVAL = 1.0
+# Download progress events per second, at most one per active job
+_DOWNLOAD_PROGRESS_FPS = 1
+
+
+class JsonLinesReporter:
+    """Writes one JSON object per line for each progress event.
+
+    Every event has an "event" name and a "time" (Unix seconds). Download
+    callbacks fire on worker threads, so writes are serialised.
+    """
+
+    def __init__(self, stream: TextIO | None = None):
+        self._stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields) -> None:
+        line = json.dumps({"event": event, "time": round(time.time(), 3), **fields})
+        with self._lock:
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+
+def select_tracks(
+    tracks: list[Track],
+    tracker: ProgressTracker,
+    pattern: str | None = None,
+    limit: int | None = None,
+) -> list[Track]:
+    """Tracks not downloaded yet, optionally filtered and capped.
+
+    pattern is a case-insensitive regular expression matched against
+    "channel - title".
+    """
+    regex = re.compile(pattern, re.IGNORECASE) if pattern else None
+    selected = []
+    seen = set()
+    for track in tracks:
+        if track.video_id in seen or tracker.is_downloaded(track.video_id):
+            continue
+        seen.add(track.video_id)
+        if regex and not regex.search(f"{track.channel} - {track.title}"):
+            continue
+        selected.append(track)
+        if limit is not None and len(selected) >= limit:
+            break
+    return selected
+
+
+def run_headless(
+    downloads_dir: str = "downloads",
+    cookie_file: str = DEFAULT_COOKIE_FILE,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    pattern: str | None = None,
+    limit: int | None = None,
+    full: bool = False,
+    dry_run: bool = False,
+    reporter: JsonLinesReporter | None = None,
+    trace_path: str | None = None,
+    metrics_path: str | None = None,
+    sources: list[Source] | None = None,
+    sync: Callable[..., SyncResult] = sync_sources,
+    enrich: bool = False,
+    resolve: Callable[[str], TrackMetadata] | None = None,
+    tags: bool = False,
+    dedupe: bool = False,
+    **downloader_kwargs,
+) -> int:
+    """Sync the playlists and download every new track without a UI.
+
+    sources defaults to the liked playlist of cookie_file, which is also the
+    account downloads use. Sources are synced concurrently and a track in
+    several of them is downloaded once; the catalog records which sources
+    reference each track. A source that fails to sync is reported and
+    skipped. Unfinished jobs from an interrupted run are picked up first.
+    With enrich, the selected tracks' artist and track names are resolved
+    (through resolve, or a pool of cookie_file sessions) and cached before
+    downloading, and files are named after them. With tags, each file gets
+    artist, title, album, year and cover art tags. With dedupe, each file is
+    fingerprinted into the library's index for later duplicate checks.
+    A schedule (in downloader_kwargs) orders and paces the downloads; while
+    it holds them back for disk space, "disk_low" and "disk_ok" events say so.
+    Progress is reported as JSON lines, ending with a "summary" event; byte-level
+    "progress" and "batch_progress" events are coalesced to one per second.
+    The summary carries per-phase timings; trace_path and metrics_path also
+    export them as a JSON-lines trace and a Prometheus textfile. Ctrl+C
+    cancels the batch, removing partial output, and still ends with a
+    summary. Returns the process exit code.
+    """
+    reporter = reporter or JsonLinesReporter()
+    started = time.monotonic()
+    tracker = ProgressTracker(downloads_dir)
+    try:
+        tracker.load()
+        job_queue = JobQueue(tracker.catalog)
+        sources = sources or [Source(cookie_file=cookie_file)]
+        reporter.emit("sync_start", full=full, sources=[s.key for s in sources])
+        try:
+            result = sync(
+                sources,
+                downloads_dir=downloads_dir,
+                on_progress=_sync_progress(reporter),
+                full=full,
+            )
+            if not result.by_source:
+                raise RuntimeError("; ".join(f"{k}: {e}" for k, e in result.errors.items()))
+        except Exception as e:
+            reporter.emit("sync_failed", error=str(e))
+            reporter.emit("summary", status="sync_failed", elapsed=_elapsed(started))
+            return EXIT_SYNC_FAILED
+        for key, error in result.errors.items():
+            reporter.emit("source_failed", source=key, error=error)
+        index = SourceIndex(tracker.catalog)
+        for key, video_ids in result.by_source.items():
+            index.record(key, video_ids)
+
+        resumed = job_queue.unfinished()
+        selected = select_tracks(resumed + result.tracks, tracker, pattern, limit)
+        reporter.emit(
+            "sync_done",
+            total=len(result.tracks),
+            new=len(result.new),
+            # Entries dropped because another source already had the video
+            duplicates=sum(len(ids) for ids in result.by_source.values()) - len(result.tracks),
+            resumed=len(resumed),
+            selected=len(selected),
+        )
+        metadata = None
+        if enrich and selected:
+            metadata = MetadataCache(tracker.catalog)
+            _enrich(reporter, metadata, selected, cookie_file, resolve)
+        if dry_run or not selected:
+            for track in selected:
+                reporter.emit("pending", **_track_fields(track))
+            reporter.emit(
+                "summary",
+                status="ok",
+                selected=len(selected),
+                downloaded=0,
+                failed=0,
+                elapsed=_elapsed(started),
+            )
+            return EXIT_OK
+
+        tagger = None
+        if tags:
+            # Imported here so mutagen is only loaded when files get tagged
+            from scraper.tagging import THUMBNAIL_SUBDIR, Tagger, ThumbnailCache
+
+            thumbnails = os.path.join(downloads_dir, THUMBNAIL_SUBDIR)
+            tagger = Tagger(ThumbnailCache(tracker.catalog, thumbnails))
+        metrics = BatchMetrics(trace_path, metrics_path)
+        progress = ProgressBus()
+        progress.subscribe(lambda snapshot: _report_progress(reporter, snapshot))
+        downloader = BatchDownloader(
+            tracker,
+            downloads_dir=downloads_dir,
+            cookie_file=cookie_file,
+            max_workers=min(max_workers, len(selected)),
+            on_job_start=lambda slot, t: reporter.emit("start", slot=slot, **_track_fields(t)),
+            on_job_fetched=lambda slot, t: reporter.emit("fetched", slot=slot, **_track_fields(t)),
+            on_job_retry=lambda slot, t, delay, error: reporter.emit(
+                "retry", delay=round(delay, 1), error=error, **_track_fields(t)
+            ),
+            on_job_done=lambda result: _report_result(reporter, result),
+            on_disk_space=lambda paused, free: reporter.emit(
+                "disk_low" if paused else "disk_ok", free=free
+            ),
+            job_queue=job_queue,
+            progress=progress,
+            metrics=metrics,
+            metadata=metadata,
+            tagger=tagger,
+            fingerprints=_fingerprint_index(tracker) if dedupe else None,
+            **downloader_kwargs,
+        )
+        stop_progress = progress.start_flusher(_DOWNLOAD_PROGRESS_FPS)
+        try:
+            results = downloader.run(selected)
+        except KeyboardInterrupt:
+            # run() has already cancelled and waited for in-flight jobs
+            results = list(downloader.results)
+        finally:
+            stop_progress()
+        failed = sum(1 for r in results if not r.ok)
+        if downloader.cancelled:
+            status = "cancelled"
+        else:
+            status = "failed" if failed else "ok"
+        reporter.emit(
+            "summary",
+            status=status,
+            selected=len(selected),
+            downloaded=len(results) - failed,
+            failed=failed,
+            elapsed=_elapsed(started),
+            phases=_phase_fields(metrics),
+        )
+        if downloader.cancelled:
+            return EXIT_CANCELLED
+        return EXIT_DOWNLOAD_FAILED if failed else EXIT_OK
+    finally:
+        tracker.close()
+
+
+def _fingerprint_index(tracker: ProgressTracker):
+    # Imported here so NumPy is only loaded with dedupe
+    from scraper.fingerprint import FingerprintIndex
+
+    return FingerprintIndex(tracker.catalog)
+
+
+def _enrich(
+    reporter: JsonLinesReporter,
+    cache: MetadataCache,
+    tracks: list[Track],
+    cookie_file: str,
+    resolve: Callable[[str], TrackMetadata] | None,
+) -> None:
+    pool = None
+    if resolve is None:
+        from scraper.session import SessionPool
+
+        pool = SessionPool(cookie_file, size=DEFAULT_ENRICH_WORKERS)
+        resolve = pool.fetch_metadata
+    enricher = Enricher(cache, resolve)
+    try:
+        result = enricher.enrich(t.video_id for t in tracks)
+    finally:
+        enricher.close()
+        if pool is not None:
+            pool.close()
+    # Unresolved tracks keep their channel and title, so this never fails the run
+    reporter.emit(
+        "enrich_done",
+        cached=result.cached,
+        resolved=result.resolved,
+        failed=len(result.errors),
+    )
+
+
+def _sync_progress(reporter: JsonLinesReporter) -> Callable[[int, int], None]:
+    last = 0.0
+
+    def on_progress(current: int, total: int) -> None:
+        nonlocal last
+        now = time.monotonic()
+        if now - last >= _SYNC_PROGRESS_INTERVAL:
+            last = now
+            reporter.emit("sync_progress", current=current, total=total)
+
+    return on_progress
+
+
+def _report_progress(reporter: JsonLinesReporter, snapshot: ProgressSnapshot) -> None:
+    for job in snapshot.jobs:
+        if job.status is JobStatus.DOWNLOADING and job.downloaded_bytes:
+            reporter.emit(
+                "progress",
+                video_id=job.video_id,
+                downloaded=job.downloaded_bytes,
+                total=job.total_bytes,
+                speed=round(job.speed),
+                eta=_round(job.eta),
+            )
+    batch = snapshot.batch
+    if not batch.finished:
+        reporter.emit(
+            "batch_progress",
+            completed=batch.completed,
+            total=batch.total,
+            speed=round(batch.speed),
+            eta=_round(batch.eta),
+        )
+
+
+def _phase_fields(metrics: BatchMetrics) -> dict:
+    return {
+        phase: {
+            "total": round(s.total, 3),
+            "p50": round(s.p50, 3),
+            "p95": round(s.p95, 3),
+            "max": round(s.max, 3),
+        }
+        for phase, s in metrics.summary().items()
+    }
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 1)
+
+
+def _report_result(reporter: JsonLinesReporter, result: DownloadResult) -> None:
+    if result.ok:
+        reporter.emit("done", path=result.path, **_track_fields(result.track))
+    else:
+        reporter.emit("failed", error=result.error, **_track_fields(result.track))
+
+
+def _track_fields(track: Track) -> dict:
+    return {"video_id": track.video_id, "title": track.title, "channel": track.channel}
+
+
+def _elapsed(started: float) -> float:
+    return round(time.monotonic() - started, 3)
@@ -0,0 +1,96 @@
+import time
+from enum import Enum
+
+from scraper.catalog import LibraryCatalog
+from scraper.models import Track
+
+
+class JobState(Enum):
+    PENDING = "pending"
+    DOWNLOADING = "downloading"
+    TRANSCODING = "transcoding"
+    DONE = "done"
+    FAILED = "failed"
+
+
+UNFINISHED_STATES = (JobState.PENDING, JobState.DOWNLOADING, JobState.TRANSCODING)
+
+
+class JobQueue:
+    """The current download batch, persisted in the library catalog.
+
+    Every state change is committed as it happens, so after a crash the
+    unfinished jobs (and the raw files they already fetched) can be resumed.
+    """
+
+    def __init__(self, catalog: LibraryCatalog):
+        self._catalog = catalog
+
+    def enqueue(self, tracks: list[Track]):
+        """Add tracks as pending, keeping any raw file a previous run fetched."""
+        now = time.time()
+        self._catalog.executemany(
+            """
+            INSERT INTO jobs (video_id, title, channel, duration, state, position, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (video_id) DO UPDATE SET
+                state = excluded.state,
+                error = NULL,
+                position = excluded.position,
+                updated_at = excluded.updated_at
+            """,
+            [
+                (t.video_id, t.title, t.channel, t.duration, JobState.PENDING.value, i, now)
+                for i, t in enumerate(tracks)
+            ],
+        )
+
+    def set_state(
+        self,
+        video_id: str,
+        state: JobState,
+        raw_path: str | None = None,
+        error: str | None = None,
+    ):
+        self._catalog.execute(
+            """
+            UPDATE jobs SET state = ?, raw_path = COALESCE(?, raw_path), error = ?, updated_at = ?
+            WHERE video_id = ?
+            """,
+            (state.value, raw_path, error, time.time(), video_id),
+        )
+
+    def raw_path(self, video_id: str) -> str | None:
+        """Raw file an earlier attempt fetched but did not get to transcode."""
+        rows = self._catalog.query("SELECT raw_path FROM jobs WHERE video_id = ?", (video_id,))
+        return rows[0][0] if rows else None
+
+    def state(self, video_id: str) -> JobState | None:
+        rows = self._catalog.query("SELECT state FROM jobs WHERE video_id = ?", (video_id,))
+        return JobState(rows[0][0]) if rows else None
+
+    def unfinished(self) -> list[Track]:
+        """Tracks from an interrupted batch, in their original order."""
+        placeholders = ", ".join("?" for _ in UNFINISHED_STATES)
+        rows = self._catalog.query(
+            f"""
+            SELECT video_id, title, channel, duration FROM jobs
+            WHERE state IN ({placeholders}) ORDER BY position
+            """,
+            tuple(s.value for s in UNFINISHED_STATES),
+        )
+        return [Track(*row) for row in rows]
+
+    def counts(self) -> dict[JobState, int]:
+        rows = self._catalog.query("SELECT state, COUNT(*) FROM jobs GROUP BY state")
+        return {JobState(state): n for state, n in rows}
+
+    def prune(self):
+        """Forget finished jobs once a batch has run to completion."""
+        self._catalog.execute(
+            "DELETE FROM jobs WHERE state IN (?, ?)",
+            (JobState.DONE.value, JobState.FAILED.value),
+        )
+
+    def clear(self):
+        self._catalog.execute("DELETE FROM jobs")
@@ -0,0 +1,305 @@
+import json
+import math
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field, replace
+
+# Phases a track goes through, in pipeline order:
+#   extract    yt-dlp resolving the video (page fetch, JS challenge solving)
+#              until the first byte of audio arrives
+#   network    transferring the audio stream (and, when streaming, encoding it)
+#   queued     waiting for a free transcode worker
+#   transcode  ffmpeg
+#   manifest   catalog writes: job states and the final download record
+PHASES = ("extract", "network", "queued", "transcode", "manifest")
+
+# Upper bounds of the Prometheus histogram buckets, in seconds
+HISTOGRAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+METRIC_PREFIX = "music_scraper"
+
+
+@dataclass
+class Span:
+    phase: str
+    # Seconds since the batch started
+    start: float
+    duration: float
+    attempt: int = 1
+
+
+@dataclass
+class TrackTiming:
+    video_id: str
+    title: str = ""
+    spans: list[Span] = field(default_factory=list)
+    retries: int = 0
+    bytes_downloaded: int = 0
+    bytes_written: int = 0
+    status: str | None = None
+    error: str | None = None
+
+    def phase_seconds(self, phase: str) -> float:
+        return sum(s.duration for s in self.spans if s.phase == phase)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(s.duration for s in self.spans)
+
+    @property
+    def slowest_phase(self) -> str | None:
+        if not self.spans:
+            return None
+        return max(PHASES, key=self.phase_seconds)
+
+
+@dataclass
+class PhaseSummary:
+    phase: str
+    count: int = 0
+    total: float = 0.0
+    p50: float = 0.0
+    p95: float = 0.0
+    max: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class BatchMetrics:
+    """Per-track phase spans, bytes and retry counts for a download batch.
+
+    BatchDownloader records into it from its worker threads. With a
+    trace_path, every span and finished track is appended to that file as a
+    JSON line as soon as it is recorded, so an interrupted batch still leaves
+    a trace. With a textfile_path, Prometheus metrics for the batch are
+    written there when it ends (atomically, for node_exporter's textfile
+    collector).
+    """
+
+    def __init__(
+        self,
+        trace_path: str | None = None,
+        textfile_path: str | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.trace_path = trace_path
+        self.textfile_path = textfile_path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tracks: dict[str, TrackTiming] = {}
+        self._attempts: dict[str, int] = {}
+        self._started_at: float | None = None
+        self._started_wall: float | None = None
+        self._ended_at: float | None = None
+        self._trace = None
+
+    def now(self) -> float:
+        return self._clock()
+
+    # -- recording (any thread) ----------------------------------------------
+
+    def start_batch(self, total: int) -> None:
+        with self._lock:
+            self._tracks = {}
+            self._attempts = {}
+            self._started_at = self._clock()
+            self._started_wall = time.time()
+            self._ended_at = None
+            if self.trace_path:
+                _makedirs_for(self.trace_path)
+                self._trace = open(self.trace_path, "a", encoding="utf-8")
+            self._write_trace(
+                {"type": "batch_start", "time": round(self._started_wall, 3), "tracks": total}
+            )
+
+    def start_attempt(self, video_id: str, title: str = "") -> int:
+        """Count a fetch attempt; returns its number, starting at 1."""
+        with self._lock:
+            self._track(video_id, title)
+            attempt = self._attempts.get(video_id, 0) + 1
+            self._attempts[video_id] = attempt
+            return attempt
+
+    def record(self, video_id: str, phase: str, start: float, end: float) -> None:
+        """Add a span; start and end are readings of now()."""
+        with self._lock:
+            offset = start - (self._started_at if self._started_at is not None else start)
+            span = Span(phase, offset, max(end - start, 0.0), self._attempts.get(video_id, 1))
+            self._track(video_id).spans.append(span)
+            self._write_trace(
+                {
+                    "type": "span",
+                    "video_id": video_id,
+                    "phase": phase,
+                    "start": round(span.start, 6),
+                    "duration": round(span.duration, 6),
+                    "attempt": span.attempt,
+                }
+            )
+
+    def add_retry(self, video_id: str) -> None:
+        with self._lock:
+            self._track(video_id).retries += 1
+
+    def add_bytes(self, video_id: str, downloaded: int = 0, written: int = 0) -> None:
+        with self._lock:
+            timing = self._track(video_id)
+            timing.bytes_downloaded += downloaded
+            timing.bytes_written += written
+
+    def finish_track(self, video_id: str, title: str, error: str | None = None) -> None:
+        with self._lock:
+            timing = self._track(video_id, title)
+            timing.status = "failed" if error else "done"
+            timing.error = error
+            phases = {p: round(timing.phase_seconds(p), 6) for p in PHASES}
+            self._write_trace(
+                {
+                    "type": "track",
+                    "video_id": video_id,
+                    "title": timing.title,
+                    "status": timing.status,
+                    "error": error,
+                    "retries": timing.retries,
+                    "bytes_downloaded": timing.bytes_downloaded,
+                    "bytes_written": timing.bytes_written,
+                    "phases": phases,
+                }
+            )
+
+    def finish_batch(self) -> None:
+        with self._lock:
+            self._ended_at = self._clock()
+            started = self._started_at if self._started_at is not None else self._ended_at
+            done = sum(1 for t in self._tracks.values() if t.status == "done")
+            failed = sum(1 for t in self._tracks.values() if t.status == "failed")
+            self._write_trace(
+                {
+                    "type": "batch_end",
+                    "time": round(time.time(), 3),
+                    "duration": round(self._ended_at - started, 6),
+                    "done": done,
+                    "failed": failed,
+                }
+            )
+            if self._trace is not None:
+                self._trace.close()
+                self._trace = None
+        if self.textfile_path:
+            self.write_prometheus(self.textfile_path)
+
+    def _track(self, video_id: str, title: str = "") -> TrackTiming:
+        timing = self._tracks.get(video_id)
+        if timing is None:
+            timing = self._tracks[video_id] = TrackTiming(video_id, title)
+        elif title and not timing.title:
+            timing.title = title
+        return timing
+
+    def _write_trace(self, record: dict) -> None:
+        if self._trace is not None:
+            self._trace.write(json.dumps(record) + "\n")
+            self._trace.flush()
+
+    # -- reading -------------------------------------------------------------
+
+    def tracks(self) -> list[TrackTiming]:
+        with self._lock:
+            return [replace(t, spans=list(t.spans)) for t in self._tracks.values()]
+
+    @property
+    def elapsed(self) -> float:
+        with self._lock:
+            if self._started_at is None:
+                return 0.0
+            end = self._ended_at if self._ended_at is not None else self._clock()
+            return end - self._started_at
+
+    def summary(self) -> dict[str, PhaseSummary]:
+        """Per-phase totals and percentiles over tracks that went through it."""
+        tracks = self.tracks()
+        result = {}
+        for phase in PHASES:
+            values = sorted(
+                t.phase_seconds(phase) for t in tracks if any(s.phase == phase for s in t.spans)
+            )
+            summary = PhaseSummary(phase, len(values), sum(values))
+            if values:
+                summary.p50 = _percentile(values, 0.50)
+                summary.p95 = _percentile(values, 0.95)
+                summary.max = values[-1]
+            result[phase] = summary
+        return result
+
+    def slowest(self, count: int = 5) -> list[TrackTiming]:
+        return sorted(self.tracks(), key=lambda t: t.total_seconds, reverse=True)[:count]
+
+    # -- export --------------------------------------------------------------
+
+    def prometheus_text(self) -> str:
+        """The batch's metrics in the Prometheus text exposition format."""
+        tracks = self.tracks()
+        p = METRIC_PREFIX
+        lines = [
+            f"# HELP {p}_phase_seconds Time a track spent in each download phase.",
+            f"# TYPE {p}_phase_seconds histogram",
+        ]
+        for phase in PHASES:
+            values = [
+                t.phase_seconds(phase) for t in tracks if any(s.phase == phase for s in t.spans)
+            ]
+            for bound in HISTOGRAM_BUCKETS:
+                count = sum(1 for v in values if v <= bound)
+                lines.append(f'{p}_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {count}')
+            lines.append(f'{p}_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {len(values)}')
+            lines.append(f'{p}_phase_seconds_sum{{phase="{phase}"}} {sum(values):.6f}')
+            lines.append(f'{p}_phase_seconds_count{{phase="{phase}"}} {len(values)}')
+
+        statuses = {"done": 0, "failed": 0}
+        for t in tracks:
+            if t.status in statuses:
+                statuses[t.status] += 1
+        lines += [
+            f"# HELP {p}_tracks Tracks finished in the last batch, by outcome.",
+            f"# TYPE {p}_tracks gauge",
+            *(f'{p}_tracks{{status="{s}"}} {n}' for s, n in statuses.items()),
+            f"# HELP {p}_retries Fetch retries in the last batch.",
+            f"# TYPE {p}_retries gauge",
+            f"{p}_retries {sum(t.retries for t in tracks)}",
+            f"# HELP {p}_bytes Bytes fetched and written in the last batch.",
+            f"# TYPE {p}_bytes gauge",
+            f'{p}_bytes{{direction="downloaded"}} {sum(t.bytes_downloaded for t in tracks)}',
+            f'{p}_bytes{{direction="written"}} {sum(t.bytes_written for t in tracks)}',
+            f"# HELP {p}_batch_duration_seconds Wall time of the last batch.",
+            f"# TYPE {p}_batch_duration_seconds gauge",
+            f"{p}_batch_duration_seconds {self.elapsed:.6f}",
+        ]
+        if self._started_wall is not None:
+            lines += [
+                f"# HELP {p}_batch_start_time_seconds Unix time the last batch started.",
+                f"# TYPE {p}_batch_start_time_seconds gauge",
+                f"{p}_batch_start_time_seconds {self._started_wall:.3f}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Replace path with the current metrics; readers never see a partial file."""
+        _makedirs_for(path)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    index = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+def _makedirs_for(path: str) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
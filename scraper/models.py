@@ -18,3 +18,49 @@ class Track:
         if hours:
             return f"{hours}:{minutes:02d}:{seconds:02d}"
         return f"{minutes}:{seconds:02d}"
+
+
+@dataclass(frozen=True)
+class TrackMetadata:
+    """Music metadata YouTube has for a video, beyond what a playlist lists.
+
+    Any field can be missing: most uploads that aren't from a label's
+    "Topic" channel or YouTube Music carry none of it.
+    """
+
+    artist: str | None = None
+    track: str | None = None
+    album: str | None = None
+    release_year: int | None = None
+    thumbnail: str | None = None
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.artist or self.track or self.album or self.release_year or self.thumbnail)
+
+    def names(self, track: Track) -> tuple[str, str]:
+        """(artist, title) to name track's file by.
+
+        The resolved artist and track only replace the channel and video
+        title together, so a half-known track never gets a mixed name.
+        """
+        if self.artist and self.track:
+            return self.artist, self.track
+        return track.channel, track.title
+
+
+@dataclass(frozen=True)
+class AudioAnalysis:
+    """Level and silence measurements of a track's decoded audio.
+
+    loudness is the integrated loudness in LUFS (EBU R128 / ITU-R BS.1770),
+    or None for a track that is silent throughout; peak is the sample peak
+    in dBFS. The silences are how many seconds at each end stay below the
+    silence threshold.
+    """
+
+    duration: float
+    loudness: float | None
+    peak: float
+    leading_silence: float = 0.0
+    trailing_silence: float = 0.0
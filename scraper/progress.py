@@ -0,0 +1,262 @@
+import math
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field, replace
+from enum import Enum
+
+# Seconds over which speed samples are averaged
+DEFAULT_SMOOTHING = 3.0
+DEFAULT_FPS = 10
+
+
+class JobStatus(Enum):
+    DOWNLOADING = "downloading"
+    RETRYING = "retrying"
+    TRANSCODING = "transcoding"
+    DONE = "done"
+    FAILED = "failed"
+
+
+@dataclass
+class JobProgress:
+    video_id: str
+    title: str
+    slot: int | None = None
+    status: JobStatus = JobStatus.DOWNLOADING
+    downloaded_bytes: int = 0
+    total_bytes: int | None = None
+    speed: float = 0.0
+    error: str | None = None
+    retry_delay: float | None = None
+    path: str | None = None
+    _sampled_at: float | None = field(default=None, repr=False)
+
+    @property
+    def fraction(self) -> float:
+        if self.status in (JobStatus.TRANSCODING, JobStatus.DONE):
+            return 1.0
+        if not self.total_bytes:
+            return 0.0
+        return min(self.downloaded_bytes / self.total_bytes, 1.0)
+
+    @property
+    def eta(self) -> float | None:
+        """Seconds left in the fetch at the smoothed speed, if known."""
+        if self.status is not JobStatus.DOWNLOADING or not self.total_bytes or self.speed <= 0:
+            return None
+        return max(self.total_bytes - self.downloaded_bytes, 0) / self.speed
+
+
+@dataclass
+class BatchProgress:
+    total: int = 0
+    done: int = 0
+    failed: int = 0
+    speed: float = 0.0
+    # Smoothed finished tracks per second
+    track_rate: float = 0.0
+    finished: bool = False
+
+    @property
+    def completed(self) -> int:
+        return self.done + self.failed
+
+    @property
+    def eta(self) -> float | None:
+        """Seconds until the batch is through, at the smoothed track rate."""
+        remaining = self.total - self.completed
+        if remaining <= 0:
+            return 0.0
+        if self.track_rate <= 0:
+            return None
+        return remaining / self.track_rate
+
+
+@dataclass
+class ProgressSnapshot:
+    """Everything that changed since the previous flush.
+
+    jobs holds the latest state of each job that changed (intermediate
+    updates are merged away); finished holds every job that ended, in order,
+    so no result is lost to coalescing.
+    """
+
+    jobs: list[JobProgress]
+    finished: list[JobProgress]
+    batch: BatchProgress
+
+
+class ProgressBus:
+    """Thread-safe aggregator between download workers and their consumers.
+
+    Workers publish as often as yt-dlp calls back; each call only updates a
+    per-job record under a lock and never waits on a consumer. Consumers get
+    one merged ProgressSnapshot per flush(), which a UI calls from its own
+    timer (so subscribers run on the UI thread) and headless code can drive
+    from a thread with start_flusher().
+    """
+
+    def __init__(
+        self,
+        smoothing: float = DEFAULT_SMOOTHING,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._smoothing = smoothing
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._jobs: dict[str, JobProgress] = {}
+        self._dirty: dict[str, None] = {}
+        self._finished: list[JobProgress] = []
+        self._batch = BatchProgress()
+        self._batch_dirty = False
+        self._last_finish_at: float | None = None
+        self._subscribers: list[Callable[[ProgressSnapshot], None]] = []
+
+    def subscribe(self, callback: Callable[[ProgressSnapshot], None]) -> Callable[[], None]:
+        """Call callback with every flushed snapshot. Returns an unsubscribe function."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    # -- publishing (any thread) ---------------------------------------------
+
+    def start_batch(self, total: int) -> None:
+        with self._lock:
+            self._batch = BatchProgress(total=total)
+            self._batch_dirty = True
+            self._last_finish_at = self._clock()
+
+    def job_started(self, video_id: str, title: str, slot: int | None = None) -> None:
+        with self._lock:
+            self._jobs[video_id] = JobProgress(video_id, title, slot, _sampled_at=self._clock())
+            self._dirty[video_id] = None
+
+    def job_progress(self, video_id: str, downloaded_bytes: int, total_bytes: int | None) -> None:
+        with self._lock:
+            job = self._jobs.get(video_id)
+            if job is None:
+                return
+            now = self._clock()
+            if job._sampled_at is not None and downloaded_bytes >= job.downloaded_bytes:
+                elapsed = now - job._sampled_at
+                if elapsed > 0:
+                    instant = (downloaded_bytes - job.downloaded_bytes) / elapsed
+                    job.speed = self._smooth(job.speed, instant, elapsed)
+            job._sampled_at = now
+            job.downloaded_bytes = downloaded_bytes
+            job.total_bytes = total_bytes or job.total_bytes
+            job.status = JobStatus.DOWNLOADING
+            self._dirty[video_id] = None
+
+    def job_retrying(self, video_id: str, delay: float, error: str) -> None:
+        self._set_status(video_id, JobStatus.RETRYING, retry_delay=delay, error=error)
+
+    def job_fetched(self, video_id: str) -> None:
+        self._set_status(video_id, JobStatus.TRANSCODING, speed=0.0)
+
+    def job_finished(
+        self,
+        video_id: str,
+        title: str,
+        path: str | None = None,
+        error: str | None = None,
+    ) -> None:
+        with self._lock:
+            job = self._jobs.pop(video_id, None) or JobProgress(video_id, title)
+            self._dirty.pop(video_id, None)
+            job.status = JobStatus.FAILED if error else JobStatus.DONE
+            job.error = error
+            job.path = path
+            job.speed = 0.0
+            self._finished.append(replace(job))
+
+            now = self._clock()
+            if self._last_finish_at is not None:
+                elapsed = now - self._last_finish_at
+                if elapsed > 0:
+                    self._batch.track_rate = self._smooth(
+                        self._batch.track_rate, 1 / elapsed, elapsed
+                    )
+            self._last_finish_at = now
+            if error:
+                self._batch.failed += 1
+            else:
+                self._batch.done += 1
+            self._batch_dirty = True
+
+    def finish_batch(self) -> None:
+        with self._lock:
+            self._batch.finished = True
+            self._batch_dirty = True
+
+    def _set_status(self, video_id: str, status: JobStatus, **fields) -> None:
+        with self._lock:
+            job = self._jobs.get(video_id)
+            if job is None:
+                return
+            job.status = status
+            for name, value in fields.items():
+                setattr(job, name, value)
+            self._dirty[video_id] = None
+
+    def _smooth(self, average: float, sample: float, elapsed: float) -> float:
+        """Time-weighted exponential moving average."""
+        if average <= 0:
+            return sample
+        alpha = 1 - math.exp(-elapsed / self._smoothing)
+        return average + alpha * (sample - average)
+
+    # -- consuming -----------------------------------------------------------
+
+    def flush(self) -> ProgressSnapshot | None:
+        """Hand everything that changed to the subscribers.
+
+        Returns the snapshot, or None if nothing changed since the last flush.
+        """
+        with self._lock:
+            if not self._dirty and not self._finished and not self._batch_dirty:
+                return None
+            jobs = [replace(self._jobs[vid]) for vid in self._dirty]
+            self._batch.speed = sum(
+                j.speed for j in self._jobs.values() if j.status is JobStatus.DOWNLOADING
+            )
+            snapshot = ProgressSnapshot(jobs, self._finished, replace(self._batch))
+            self._dirty = {}
+            self._finished = []
+            self._batch_dirty = False
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            callback(snapshot)
+        return snapshot
+
+    def active_jobs(self) -> list[JobProgress]:
+        with self._lock:
+            return [replace(job) for job in self._jobs.values()]
+
+    def start_flusher(self, fps: float = DEFAULT_FPS) -> Callable[[], None]:
+        """Flush from a background thread at fps. Returns a function that stops it.
+
+        Stopping flushes one last time, so the final results are delivered.
+        """
+        stop = threading.Event()
+
+        def run() -> None:
+            while not stop.wait(1 / fps):
+                self.flush()
+
+        thread = threading.Thread(target=run, name="progress-flusher", daemon=True)
+        thread.start()
+
+        def stop_flusher() -> None:
+            stop.set()
+            thread.join()
+            self.flush()
+
+        return stop_flusher
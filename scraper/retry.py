@@ -0,0 +1,279 @@
+import errno
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any
+
+
+class ErrorKind(Enum):
+    TRANSIENT = "transient"
+    RATE_LIMIT = "rate_limit"
+    PERMANENT = "permanent"
+
+
+_RATE_LIMIT_RE = re.compile(
+    r"HTTP Error 429|Too Many Requests|rate[- ]limit|confirm you.re not a bot",
+    re.IGNORECASE,
+)
+_PERMANENT_RE = re.compile(
+    r"Video unavailable|Private video|This video is not available|has been removed"
+    r"|copyright|Sign in to confirm your age|members[- ]only|Requested format is not available"
+    r"|HTTP Error (?:400|401|404|410)",
+    re.IGNORECASE,
+)
+_TRANSIENT_RE = re.compile(
+    r"HTTP Error 5\d\d|timed out|Connection (?:reset|refused|aborted)|IncompleteRead"
+    r"|Temporary failure in name resolution|Unable to download webpage|Remote end closed",
+    re.IGNORECASE,
+)
+
+
+def _error_chain(exc: BaseException):
+    """The exception plus everything it wraps (yt-dlp nests the real cause)."""
+    seen = set()
+    stack = [exc]
+    while stack:
+        e = stack.pop()
+        if e is None or id(e) in seen:
+            continue
+        seen.add(id(e))
+        yield e
+        exc_info = getattr(e, "exc_info", None)
+        if isinstance(exc_info, tuple) and len(exc_info) > 1:
+            stack.append(exc_info[1])
+        stack.extend([getattr(e, "cause", None), e.__cause__, e.__context__])
+
+
+def classify_error(exc: BaseException) -> ErrorKind:
+    """Sort a download failure into transient, rate-limit or permanent."""
+    chain = [e for e in _error_chain(exc) if isinstance(e, BaseException)]
+    for e in chain:
+        status = getattr(e, "status", None) or getattr(e, "code", None)
+        if status == 429:
+            return ErrorKind.RATE_LIMIT
+    if any(isinstance(e, OSError) and e.errno == errno.ENOSPC for e in chain):
+        # Retrying can't make room; the disk needs freeing first
+        return ErrorKind.PERMANENT
+    messages = " | ".join(str(e) for e in chain)
+    if _RATE_LIMIT_RE.search(messages):
+        return ErrorKind.RATE_LIMIT
+    if _PERMANENT_RE.search(messages):
+        return ErrorKind.PERMANENT
+    if _TRANSIENT_RE.search(messages):
+        return ErrorKind.TRANSIENT
+    if any(isinstance(e, (TimeoutError, ConnectionError)) for e in chain):
+        return ErrorKind.TRANSIENT
+    if any(isinstance(e, (FileNotFoundError, PermissionError)) for e in chain):
+        return ErrorKind.PERMANENT
+    # Unknown failures get the benefit of the doubt and a bounded retry
+    return ErrorKind.TRANSIENT
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 5
+    base_delay: float = 2.0
+    rate_limit_delay: float = 30.0
+    max_delay: float = 300.0
+
+    def delay(self, attempt: int, kind: ErrorKind, rng: random.Random = random) -> float:
+        """Full-jitter exponential backoff before the next attempt."""
+        base = self.rate_limit_delay if kind is ErrorKind.RATE_LIMIT else self.base_delay
+        cap = min(self.max_delay, base * 2 ** (attempt - 1))
+        return rng.uniform(cap / 2, cap) if kind is ErrorKind.RATE_LIMIT else rng.uniform(0, cap)
+
+
+class TokenBucket:
+    """Global request-rate limiter that backs off when YouTube returns 429s.
+
+    The refill rate is halved on every rate-limit response and grows back
+    additively with each success (AIMD), between min_rate and max_rate.
+    """
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        capacity: float = 4.0,
+        min_rate: float = 0.05,
+        max_rate: float = 4.0,
+        increase: float = 0.05,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available; otherwise return the seconds to wait."""
+        with self._cond:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, cancelled: threading.Event | None = None) -> bool:
+        """Block until a token is available. Returns False if cancelled first."""
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return True
+            with self._cond:
+                self._cond.wait(wait)
+            if cancelled is not None and cancelled.is_set():
+                return False
+
+    def on_rate_limited(self):
+        with self._cond:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+
+    def on_success(self):
+        with self._cond:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            self._cond.notify_all()
+
+
+@dataclass(order=True)
+class Job:
+    ready_at: float
+    seq: int
+    item: Any = field(compare=False)
+    attempt: int = field(default=1, compare=False)
+    last_error: str | None = field(default=None, compare=False)
+    last_kind: ErrorKind | None = field(default=None, compare=False)
+
+
+class RetryScheduler:
+    """Work queue that puts failed jobs back with a backoff delay.
+
+    Workers call next_job() until it returns None, then report each job with
+    succeeded() or failed(). failed() classifies the error: permanent errors
+    and jobs out of attempts are given up, everything else is re-queued, and
+    rate-limit errors also slow the shared token bucket.
+
+    Of the jobs that are due, the one with the lowest priority(item) goes
+    first; without a priority key, jobs go first-come, first-served.
+    """
+
+    def __init__(
+        self,
+        policy: RetryPolicy | None = None,
+        bucket: TokenBucket | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        rng: random.Random | None = None,
+        priority: Callable[[Any], Any] | None = None,
+    ):
+        self.policy = policy or RetryPolicy()
+        self.bucket = bucket or TokenBucket(clock=clock)
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._priority = priority or (lambda item: 0)
+        # Jobs waiting out a backoff, by due time; due ones move to _ready
+        self._heap: list[Job] = []
+        self._ready: list[tuple[Any, int, Job]] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self.cancelled = threading.Event()
+        self.retries = 0
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._heap) + len(self._ready)
+
+    def add(self, items):
+        now = self._clock()
+        with self._cond:
+            for item in items:
+                heapq.heappush(self._heap, Job(now, next(self._seq), item))
+            self._cond.notify_all()
+
+    def next_job(self) -> Job | None:
+        """Block until a job is due and the rate limit allows it.
+
+        Returns None once every job has finished (or the scheduler is cancelled).
+        """
+        with self._cond:
+            while True:
+                if self.cancelled.is_set():
+                    return None
+                now = self._clock()
+                while self._heap and self._heap[0].ready_at <= now:
+                    due = heapq.heappop(self._heap)
+                    heapq.heappush(self._ready, (self._priority(due.item), due.seq, due))
+                if self._ready:
+                    job = heapq.heappop(self._ready)[2]
+                    self._in_flight += 1
+                    break
+                if self._heap:
+                    self._cond.wait(self._heap[0].ready_at - now)
+                elif self._in_flight:
+                    # A running job may still come back for a retry
+                    self._cond.wait()
+                else:
+                    return None
+        if not self.bucket.acquire(self.cancelled):
+            self._done()
+            return None
+        return job
+
+    def succeeded(self, job: Job):
+        self.bucket.on_success()
+        self._done()
+
+    def failed(self, job: Job, exc: BaseException) -> float | None:
+        """Record a failed attempt.
+
+        Returns the backoff delay if the job was re-queued, or None if it was
+        given up.
+        """
+        kind = classify_error(exc)
+        job.last_error = str(exc)
+        job.last_kind = kind
+        if kind is ErrorKind.RATE_LIMIT:
+            self.bucket.on_rate_limited()
+        if kind is ErrorKind.PERMANENT or job.attempt >= self.policy.max_attempts:
+            self._done()
+            return None
+
+        delay = self.policy.delay(job.attempt, kind, self._rng)
+        with self._cond:
+            job.attempt += 1
+            job.ready_at = self._clock() + delay
+            job.seq = next(self._seq)
+            heapq.heappush(self._heap, job)
+            self._in_flight -= 1
+            self.retries += 1
+            self._cond.notify_all()
+        return delay
+
+    def cancel(self):
+        self.cancelled.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _done(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
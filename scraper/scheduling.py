@@ -0,0 +1,234 @@
+"""How a batch's downloads are ordered, paced and admitted.
+
+A SchedulePolicy picks the order jobs start in, caps the bandwidth all
+downloads share, and keeps a minimum of free disk space in the downloads
+directory. Stdlib only, so app.py can parse its options without loading
+the download stack.
+"""
+
+import errno
+import re
+import shutil
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from enum import Enum
+
+from scraper.models import Track
+
+# Typical bitrate of YouTube's best audio stream (Opus, ~160 kbit/s), used to
+# guess a download's size from the track's duration
+ESTIMATED_BYTES_PER_SECOND = 20_000
+# A track of unknown length is assumed to be about this long
+_UNKNOWN_DURATION = 5 * 60
+# How often a paused admission checks the free space again
+DISK_POLL_INTERVAL = 2.0
+# Longest admission stays paused before the waiting downloads fail
+MAX_DISK_WAIT = 10 * 60
+
+_SIZE_RE = re.compile(r"^(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?$", re.IGNORECASE)
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+class JobOrder(Enum):
+    # As listed: the order the playlist (and resumed jobs) came in
+    PLAYLIST = "playlist"
+    # Shortest tracks first: the most tracks finished soonest
+    SHORTEST = "shortest"
+    # Largest estimated download first: long mixes start early instead of
+    # leaving one worker busy with them after the rest have finished
+    LARGEST = "largest"
+
+
+@dataclass(frozen=True)
+class SchedulePolicy:
+    """Order, bandwidth and disk space limits for a batch.
+
+    max_rate caps the bytes per second of all downloads together;
+    min_free_space is how many bytes must stay free in the downloads
+    directory, counting downloads in flight at their estimated size. None
+    turns either limit off.
+    """
+
+    order: JobOrder = JobOrder.PLAYLIST
+    max_rate: int | None = None
+    min_free_space: int | None = None
+
+
+def estimated_size(track: Track) -> int:
+    """Bytes a track's audio download is expected to take."""
+    duration = track.duration if track.duration > 0 else _UNKNOWN_DURATION
+    return duration * ESTIMATED_BYTES_PER_SECOND
+
+
+def order_key(order: JobOrder) -> Callable[[Track], int] | None:
+    """Sort key putting tracks in order, or None to keep them as listed."""
+    if order is JobOrder.SHORTEST:
+        return estimated_size
+    if order is JobOrder.LARGEST:
+        return lambda track: -estimated_size(track)
+    return None
+
+
+def parse_size(text: str) -> int:
+    """Bytes in a size such as "500K", "1.5G" or "2GiB" (binary units)."""
+    m = _SIZE_RE.match(text.strip())
+    if not m:
+        raise ValueError(f"not a size: {text!r}")
+    return int(float(m.group(1)) * _SIZE_UNITS[m.group(2).upper()])
+
+
+class BandwidthLimiter:
+    """Byte-rate cap shared by every download of a batch.
+
+    Downloads report the bytes they received and are held back until the
+    shared budget has caught up, so the combined rate stays at rate bytes per
+    second however many run at once. Up to burst bytes (one second's worth
+    by default) may pass without waiting after an idle spell.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, nbytes: int) -> float:
+        """Charge nbytes to the budget. Returns the seconds to wait before going on."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= nbytes
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def consume(self, nbytes: int, cancelled: threading.Event | None = None) -> bool:
+        """Charge nbytes and wait out any overrun. Returns False if cancelled first."""
+        wait = self.reserve(nbytes)
+        if wait <= 0:
+            return True
+        if cancelled is None:
+            time.sleep(wait)
+            return True
+        return not cancelled.wait(wait)
+
+
+class InsufficientDiskSpace(OSError):
+    """A download can't start without leaving less than the minimum free.
+
+    An OSError with errno ENOSPC, so the retry scheduler gives the job up
+    like any other full-disk failure.
+    """
+
+    def __init__(self, message: str):
+        super().__init__(errno.ENOSPC, message)
+
+    def __str__(self) -> str:
+        return self.strerror
+
+
+class DiskSpaceGuard:
+    """Holds back new downloads while the downloads directory is nearly full.
+
+    admit() lets a download start once the free space, less what tracks in
+    flight are still expected to write, leaves at least min_free bytes after
+    it; release() gives the reservation back once the track is finished
+    (transcoded and its raw file removed) or has failed. While other tracks
+    are in flight, admit() waits for them, checking again every
+    poll_interval seconds. It raises InsufficientDiskSpace instead when
+    nothing is in flight (no release is coming) or admission has been
+    paused for max_wait seconds, so a batch on a full disk ends with failed
+    jobs rather than hanging. on_change(paused, free) fires whenever
+    admission pauses or resumes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        min_free: int,
+        on_change: Callable[[bool, int], None] | None = None,
+        poll_interval: float = DISK_POLL_INTERVAL,
+        max_wait: float = MAX_DISK_WAIT,
+        free_space: Callable[[], int] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.path = path
+        self.min_free = min_free
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self._on_change = on_change
+        self._free_space = free_space or (lambda: shutil.disk_usage(path).free)
+        self._clock = clock
+        self._reserved = 0
+        self._paused_since: float | None = None
+        self._lock = threading.Lock()
+        self.paused = False
+        self.free = 0
+
+    def admit(self, size: int, cancelled: threading.Event | None = None) -> bool:
+        """Block until size bytes fit. Returns False if cancelled first.
+
+        Raises InsufficientDiskSpace when waiting can't help.
+        """
+        cancelled = cancelled or threading.Event()
+        while True:
+            with self._lock:
+                self.free = free = self._free_space()
+                fits = free - self._reserved - size >= self.min_free
+                error = None
+                if not fits:
+                    now = self._clock()
+                    if self._reserved == 0:
+                        error = InsufficientDiskSpace(self._shortfall(free, size))
+                    elif self._paused_since is None:
+                        self._paused_since = now
+                    elif now - self._paused_since >= self.max_wait:
+                        error = InsufficientDiskSpace(
+                            f"{self._shortfall(free, size)} "
+                            f"(paused for {self.max_wait / 60:.0f} min)"
+                        )
+                else:
+                    self._reserved += size
+                # Giving up ends the pause as much as admitting does
+                paused = not fits and error is None
+                if not paused:
+                    self._paused_since = None
+                changed = self.paused != paused
+                self.paused = paused
+            if changed and self._on_change is not None:
+                self._on_change(paused, free)
+            if error is not None:
+                raise error
+            if fits:
+                return True
+            if cancelled.wait(self.poll_interval):
+                return False
+
+    def release(self, size: int) -> None:
+        with self._lock:
+            self._reserved = max(0, self._reserved - size)
+
+    def _shortfall(self, free: int, size: int) -> str:
+        return (
+            f"not enough disk space: {_format_size(free)} free in {self.path}, "
+            f"a download of about {_format_size(size)} must leave "
+            f"{_format_size(self.min_free)} free"
+        )
+
+
+def _format_size(nbytes: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if nbytes < 1024:
+            return f"{nbytes:.0f} {unit}" if unit == "B" else f"{nbytes:.1f} {unit}"
+        nbytes /= 1024
+    return f"{nbytes:.1f} TB"
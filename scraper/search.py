@@ -0,0 +1,300 @@
+import bisect
+import re
+import shlex
+from array import array
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+
+from scraper.models import Track
+
+# Words are indexed under each of their prefixes up to this length
+_PREFIX_LEN = 3
+_WORD_RE = re.compile(r"\w+")
+_DURATION_RE = re.compile(r"^\d+(?::\d+){0,2}$")
+_EMPTY = array("q")
+
+
+class FilterError(ValueError):
+    """A filter expression that could not be parsed."""
+
+
+@dataclass(frozen=True)
+class TrackFilter:
+    """A parsed filter: free-text terms plus structured constraints.
+
+    Each term is one or more words; a track matches a term when its title or
+    channel contains those words in order, the last one possibly cut short
+    ("daft pu" matches "Daft Punk").
+    """
+
+    terms: tuple[str, ...] = ()
+    channel: str | None = None
+    min_duration: int | None = None
+    max_duration: int | None = None
+
+    @property
+    def is_empty(self) -> bool:
+        return self == TrackFilter()
+
+    def narrows(self, other: "TrackFilter") -> bool:
+        """True if every track matching self also matches other."""
+        if other.channel is not None and other.channel != self.channel:
+            return False
+        if other.min_duration is not None and (
+            self.min_duration is None or self.min_duration < other.min_duration
+        ):
+            return False
+        if other.max_duration is not None and (
+            self.max_duration is None or self.max_duration > other.max_duration
+        ):
+            return False
+        return all(any(t.startswith(o) for t in self.terms) for o in other.terms)
+
+
+def parse_duration(text: str) -> int:
+    """Seconds from "SS", "M:SS" or "H:MM:SS"."""
+    text = text.strip()
+    if not _DURATION_RE.match(text):
+        raise FilterError(f"invalid duration: {text!r}")
+    seconds = 0
+    for part in text.split(":"):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def parse_filter(query: str) -> TrackFilter:
+    """Parse a filter expression.
+
+    Plain words (or "quoted phrases") match titles and channels by word
+    prefix. Structured filters:
+
+        channel:NAME          channel equals NAME (case-insensitive; quote spaces)
+        duration:<3:00        shorter than; > for longer than, <= and >= too
+        duration:2:00-5:00    between, inclusive (plain numbers are seconds)
+    """
+    try:
+        tokens = shlex.split(query)
+    except ValueError:
+        # An unterminated quote while the user is still typing
+        tokens = shlex.split(query + '"')
+    terms = []
+    channel = None
+    min_duration = max_duration = None
+    for token in tokens:
+        key, sep, value = token.partition(":")
+        key = key.lower()
+        if sep and key == "channel":
+            if not value:
+                raise FilterError("channel: needs a name")
+            channel = value.casefold()
+        elif sep and key in ("duration", "length"):
+            min_duration, max_duration = _parse_duration_range(value)
+        else:
+            term = " ".join(_words(token))
+            if term:
+                terms.append(term)
+    return TrackFilter(tuple(terms), channel, min_duration, max_duration)
+
+
+def _parse_duration_range(value: str) -> tuple[int | None, int | None]:
+    if value.startswith(">="):
+        return parse_duration(value[2:]), None
+    if value.startswith("<="):
+        return None, parse_duration(value[2:])
+    if value.startswith(">"):
+        return parse_duration(value[1:]) + 1, None
+    if value.startswith("<"):
+        return None, parse_duration(value[1:]) - 1
+    low, sep, high = value.partition("-")
+    if sep:
+        return (parse_duration(low) if low else None, parse_duration(high) if high else None)
+    exact = parse_duration(value)
+    return exact, exact
+
+
+def _words(text: str) -> list[str]:
+    return _WORD_RE.findall(text.casefold())
+
+
+class TrackView(Sequence):
+    """Read-only tracks for a list of ranks, resolved only when accessed.
+
+    Lets a query hand its posting list to the table as-is: the table only
+    ever looks up the rows it draws.
+    """
+
+    def __init__(self, ranks: Sequence[int], by_rank: dict[int, tuple]):
+        self._ranks = ranks
+        self._by_rank = by_rank
+
+    def __len__(self) -> int:
+        return len(self._ranks)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._by_rank[r][0] for r in self._ranks[index]]
+        return self._by_rank[self._ranks[index]][0]
+
+
+class TrackIndex:
+    """Word-prefix index over track titles and channels for instant filtering.
+
+    Every word is indexed under its first one to three characters and under
+    the whole word, and every channel under its full name. Each track gets a
+    rank that orders it like the list it came from (appended tracks count up,
+    prepended ones count down), so posting lists stay sorted and results come
+    out in list order.
+
+    A single word that is at most three characters long, or that only one
+    indexed word starts with, is answered by its posting list directly.
+    Anything else verifies the candidates from the shortest posting list
+    involved, or from the previous query's matches when the new query narrows
+    it (as typing another character does) and they are fewer.
+    """
+
+    def __init__(self, tracks: Iterable[Track] = ()):
+        # Prefix keys are the word start itself; whole words are "=word"
+        self._postings: dict[str, array] = {}
+        self._channels: dict[str, array] = {}
+        self._vocab: list[str] = []
+        # rank -> (track, " word word ...", posting keys)
+        self._by_rank: dict[int, tuple[Track, str, tuple[str, ...]]] = {}
+        self._rank_of: dict[str, int] = {}
+        self._low = 0
+        self._high = 0
+        self._all: array | None = None
+        self._last: tuple[TrackFilter, Sequence[int]] | None = None
+        self.append(tracks)
+
+    def __len__(self) -> int:
+        return len(self._by_rank)
+
+    def __contains__(self, video_id: str) -> bool:
+        return video_id in self._rank_of
+
+    def video_ids(self) -> list[str]:
+        return list(self._rank_of)
+
+    def append(self, tracks: Iterable[Track]) -> None:
+        for track in tracks:
+            if track.video_id not in self._rank_of:
+                self._insert(track, self._high, at_start=False)
+                self._high += 1
+
+    def prepend(self, tracks: Iterable[Track]) -> None:
+        fresh = [t for t in tracks if t.video_id not in self._rank_of]
+        # Insert backwards so the first track ends up with the lowest rank
+        for track in reversed(fresh):
+            self._low -= 1
+            self._insert(track, self._low, at_start=True)
+
+    def _insert(self, track: Track, rank: int, at_start: bool) -> None:
+        words = _WORD_RE.findall(f"{track.title} {track.channel}".casefold())
+        keys = {"=" + w for w in words}
+        keys.update(w[:1] for w in words)
+        keys.update(w[:2] for w in words if len(w) > 1)
+        keys.update(w[:3] for w in words if len(w) > 2)
+        self._by_rank[rank] = (track, " " + " ".join(words), tuple(keys))
+        self._rank_of[track.video_id] = rank
+        channel = track.channel.casefold()
+        postings = self._postings
+        for table, key in [(self._channels, channel), *((postings, k) for k in keys)]:
+            posting = table.get(key)
+            if posting is None:
+                table[key] = array("q", (rank,))
+                if table is postings and key[0] == "=":
+                    bisect.insort(self._vocab, key[1:])
+            elif at_start:
+                posting.insert(0, rank)
+            else:
+                posting.append(rank)
+        self._all = None
+        # New tracks may match the last query, so it can't be narrowed from
+        self._last = None
+
+    def remove(self, video_ids: Iterable[str]) -> None:
+        """Drop tracks, rewriting each affected posting list once."""
+        doomed: dict[str, set[int]] = {}
+        channels: dict[str, set[int]] = {}
+        for video_id in video_ids:
+            rank = self._rank_of.pop(video_id, None)
+            if rank is None:
+                continue
+            track, _, keys = self._by_rank.pop(rank)
+            for key in keys:
+                doomed.setdefault(key, set()).add(rank)
+            channels.setdefault(track.channel.casefold(), set()).add(rank)
+        if not channels:
+            return
+        for table, removals in ((self._postings, doomed), (self._channels, channels)):
+            for key, ranks in removals.items():
+                kept = array("q", (r for r in table[key] if r not in ranks))
+                if kept:
+                    table[key] = kept
+                    continue
+                del table[key]
+                if key[0] == "=" and table is self._postings:
+                    del self._vocab[bisect.bisect_left(self._vocab, key[1:])]
+        self._all = None
+        self._last = None
+
+    def _all_ranks(self) -> array:
+        if self._all is None:
+            self._all = array("q", sorted(self._by_rank))
+        return self._all
+
+    def _word_postings(self, word: str) -> tuple[Sequence[int], bool]:
+        """Posting list for tracks with a word starting with `word`.
+
+        The flag is True if the list is exact rather than a superset.
+        """
+        if len(word) <= _PREFIX_LEN:
+            return self._postings.get(word, _EMPTY), True
+        lo = bisect.bisect_left(self._vocab, word)
+        hi = bisect.bisect_left(self._vocab, word + "\U0010ffff", lo)
+        if hi - lo == 1:
+            return self._postings["=" + self._vocab[lo]], True
+        if hi == lo:
+            return _EMPTY, True
+        return self._postings.get(word[:_PREFIX_LEN], _EMPTY), False
+
+    def search(self, flt: TrackFilter) -> Sequence[Track]:
+        """Tracks matching flt, in list order."""
+        if flt.is_empty:
+            return TrackView(self._all_ranks(), self._by_rank)
+
+        best = None
+        if flt.channel is not None:
+            best = self._channels.get(flt.channel, _EMPTY)
+        for term in flt.terms:
+            for word in term.split(" "):
+                posting, exact = self._word_postings(word)
+                if best is None or len(posting) < len(best):
+                    best = posting
+        if flt == TrackFilter(flt.terms) and len(flt.terms) == 1 and " " not in flt.terms[0]:
+            if exact:
+                # The posting list is the answer as it stands
+                self._last = (flt, best)
+                return TrackView(best, self._by_rank)
+        ranks = self._all_ranks() if best is None else best
+        last = self._last
+        if last is not None and flt.narrows(last[0]) and len(last[1]) < len(ranks):
+            ranks = last[1]
+
+        by_rank = self._by_rank
+        needles = [" " + term for term in flt.terms]
+        low, high = flt.min_duration, flt.max_duration
+        channel = flt.channel
+        matched = array("q")
+        for rank in ranks:
+            track, text, _ = by_rank[rank]
+            if channel is not None and track.channel.casefold() != channel:
+                continue
+            if low is not None and track.duration < low:
+                continue
+            if high is not None and track.duration > high:
+                continue
+            if all(needle in text for needle in needles):
+                matched.append(rank)
+        self._last = (flt, matched)
+        return TrackView(matched, by_rank)
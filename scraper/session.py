@@ -0,0 +1,188 @@
+import queue
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+import yt_dlp
+
+from scraper.models import TrackMetadata
+from scraper.transcode import OutputFormat
+from scraper.ytdlp_client import (
+    _JS_RUNTIMES,
+    DEFAULT_COOKIE_FILE,
+    downloaded_path,
+    raw_outtmpl,
+    read_preview,
+    resolve_metadata,
+    stream_to_file,
+    video_url,
+)
+
+
+class YoutubeDLSession:
+    """A long-lived YoutubeDL reused for many downloads by one worker.
+
+    Building a YoutubeDL per track re-parses cookies.txt, rebuilds the HTTP
+    request handlers (dropping keep-alive connections) and re-instantiates
+    extractors. A session pays that once; per-job options (output template
+    and progress hook) are swapped in for each download.
+    """
+
+    def __init__(self, cookie_file: str = DEFAULT_COOKIE_FILE, cookiejar=None):
+        params = {
+            "js_runtimes": _JS_RUNTIMES,
+            "format": "bestaudio/best",
+            # Raw paths are named by video ID, so a retried or resumed
+            # download picks its .part file up from where it stopped
+            "continuedl": True,
+            "quiet": True,
+        }
+        if cookiejar is None:
+            # This session owns the cookie file and writes it back on close
+            params["cookiefile"] = cookie_file
+        self._ydl = yt_dlp.YoutubeDL(params)
+        if cookiejar is not None:
+            # YoutubeDL.cookiejar is a cached_property; seeding the instance
+            # dict makes every session in a pool read and update one jar
+            self._ydl.__dict__["cookiejar"] = cookiejar
+        self._progress_hook: Callable | None = None
+        self._ydl.add_progress_hook(self._dispatch_progress)
+
+    @property
+    def cookiejar(self):
+        return self._ydl.cookiejar
+
+    def _dispatch_progress(self, d: dict) -> None:
+        if self._progress_hook is not None:
+            self._progress_hook(d)
+
+    def fetch_audio(
+        self,
+        video_id: str,
+        downloads_dir: str = "downloads",
+        progress_hook: Callable | None = None,
+    ) -> str:
+        """Same as ytdlp_client.fetch_audio, on this session's YoutubeDL."""
+        self._ydl.params["outtmpl"]["default"] = raw_outtmpl(video_id, downloads_dir)
+        self._progress_hook = progress_hook
+        try:
+            info = self._ydl.extract_info(video_url(video_id), download=True)
+            return downloaded_path(self._ydl, info)
+        finally:
+            self._progress_hook = None
+
+    def stream_audio(
+        self,
+        video_id: str,
+        dst_for: Callable[[str], str],
+        output_format: OutputFormat = OutputFormat(),
+        progress_hook: Callable | None = None,
+        cancelled: threading.Event | None = None,
+    ) -> str:
+        """Same as ytdlp_client.stream_audio, on this session's YoutubeDL."""
+        return stream_to_file(
+            self._ydl, video_id, dst_for, output_format, progress_hook, cancelled
+        )
+
+    def fetch_metadata(self, video_id: str) -> TrackMetadata:
+        """Same as ytdlp_client.fetch_metadata, on this session's YoutubeDL."""
+        return resolve_metadata(self._ydl, video_id)
+
+    def fetch_preview(self, video_id: str) -> bytes:
+        """Same as ytdlp_client.fetch_preview, on this session's YoutubeDL."""
+        return read_preview(self._ydl, video_id)
+
+    def close(self):
+        self._ydl.close()
+
+
+class SessionPool:
+    """Hands out up to `size` YoutubeDLSessions that share one cookie jar.
+
+    Sessions are created on first use and kept until close(), so each worker
+    thread reuses a warm instance with open keep-alive connections.
+    """
+
+    def __init__(self, cookie_file: str = DEFAULT_COOKIE_FILE, size: int = 1):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.cookie_file = cookie_file
+        self.size = size
+        self._idle: queue.LifoQueue[YoutubeDLSession] = queue.LifoQueue()
+        self._sessions: list[YoutubeDLSession] = []
+        self._lock = threading.Lock()
+        self._available = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def session(self) -> Iterator[YoutubeDLSession]:
+        self._available.acquire()
+        try:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                session = self._new_session()
+            try:
+                yield session
+            finally:
+                self._idle.put(session)
+        finally:
+            self._available.release()
+
+    def _new_session(self) -> YoutubeDLSession:
+        with self._lock:
+            if not self._sessions:
+                # The first session loads cookies.txt; the rest borrow its jar
+                session = YoutubeDLSession(self.cookie_file)
+            else:
+                session = YoutubeDLSession(self.cookie_file, self._sessions[0].cookiejar)
+            self._sessions.append(session)
+            return session
+
+    def fetch_audio(
+        self,
+        video_id: str,
+        downloads_dir: str = "downloads",
+        cookie_file: str | None = None,
+        progress_hook: Callable | None = None,
+    ) -> str:
+        """Drop-in for ytdlp_client.fetch_audio that runs on a pooled session.
+
+        cookie_file is accepted for signature compatibility; the pool's cookie
+        file is always used.
+        """
+        with self.session() as session:
+            return session.fetch_audio(video_id, downloads_dir, progress_hook)
+
+    def stream_audio(
+        self,
+        video_id: str,
+        dst_for: Callable[[str], str],
+        output_format: OutputFormat = OutputFormat(),
+        cookie_file: str | None = None,
+        progress_hook: Callable | None = None,
+        cancelled: threading.Event | None = None,
+    ) -> str:
+        """Drop-in for ytdlp_client.stream_audio that runs on a pooled session."""
+        with self.session() as session:
+            return session.stream_audio(
+                video_id, dst_for, output_format, progress_hook, cancelled
+            )
+
+    def fetch_metadata(self, video_id: str, cookie_file: str | None = None) -> TrackMetadata:
+        """Drop-in for ytdlp_client.fetch_metadata that runs on a pooled session."""
+        with self.session() as session:
+            return session.fetch_metadata(video_id)
+
+    def fetch_preview(self, video_id: str, cookie_file: str | None = None) -> bytes:
+        """Drop-in for ytdlp_client.fetch_preview that runs on a pooled session."""
+        with self.session() as session:
+            return session.fetch_preview(video_id)
+
+    def close(self):
+        with self._lock:
+            # Close borrowers first so the owner saves the final cookie state
+            for session in reversed(self._sessions):
+                session.close()
+            self._sessions.clear()
+        while not self._idle.empty():
+            self._idle.get_nowait()
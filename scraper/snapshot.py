@@ -0,0 +1,64 @@
+import json
+import os
+import time
+
+from scraper.models import Track
+
+SNAPSHOT_VERSION = 1
+
+
+class PlaylistSnapshot:
+    """On-disk copy of the last fetched liked-videos playlist, newest first."""
+
+    def __init__(self, downloads_dir: str, filename: str = "liked_snapshot.json"):
+        os.makedirs(downloads_dir, exist_ok=True)
+        self._path = os.path.join(downloads_dir, filename)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def load(self) -> list[Track] | None:
+        """Return the cached tracks, or None if there is no usable snapshot."""
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != SNAPSHOT_VERSION:
+            return None
+        return [
+            Track(
+                video_id=t["video_id"],
+                title=t["title"],
+                channel=t["channel"],
+                duration=t["duration"],
+            )
+            for t in data.get("tracks", [])
+        ]
+
+    def save(self, tracks: list[Track]):
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "fetched_at": time.time(),
+            "tracks": [
+                {
+                    "video_id": t.video_id,
+                    "title": t.title,
+                    "channel": t.channel,
+                    "duration": t.duration,
+                }
+                for t in tracks
+            ],
+        }
+        # Write aside and swap in so a crash never leaves a truncated snapshot
+        tmp = self._path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self._path)
+
+
+def merge_tracks(new: list[Track], cached: list[Track]) -> list[Track]:
+    """Put newly fetched tracks ahead of the cached list, dropping repeats."""
+    seen = {t.video_id for t in new}
+    return new + [t for t in cached if t.video_id not in seen]
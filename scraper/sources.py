@@ -0,0 +1,144 @@
+"""Playlists to sync and the accounts to read them with.
+
+Kept free of heavy imports (no yt-dlp) so app.py can parse sources before
+anything else is loaded.
+"""
+
+import os
+import re
+import time
+from dataclasses import dataclass
+from urllib.parse import parse_qs, urlparse
+
+from scraper.catalog import LibraryCatalog
+from scraper.defaults import DEFAULT_COOKIE_FILE
+
+LIKED_PLAYLIST = "LL"
+# Snapshot file of the original single source, kept so upgrades reuse it
+_DEFAULT_SNAPSHOT = "liked_snapshot.json"
+_PLAYLIST_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+_SLUG_RE = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+@dataclass(frozen=True)
+class Source:
+    """A playlist as one cookie profile (YouTube account) sees it."""
+
+    playlist: str = LIKED_PLAYLIST
+    cookie_file: str = DEFAULT_COOKIE_FILE
+
+    @property
+    def url(self) -> str:
+        return f"https://www.youtube.com/playlist?list={self.playlist}"
+
+    @property
+    def profile(self) -> str:
+        """The cookie file without its extension, such as "cookies" or "work/cookies"."""
+        return os.path.splitext(self.cookie_file)[0]
+
+    @property
+    def key(self) -> str:
+        """Stable name recorded in the catalog, such as "cookies:LL"."""
+        return f"{self.profile}:{self.playlist}"
+
+    @property
+    def newest_first(self) -> bool:
+        """Whether new videos appear at the top, so an incremental sync can stop early."""
+        return self.playlist == LIKED_PLAYLIST
+
+    @property
+    def snapshot_filename(self) -> str:
+        if self == Source():
+            return _DEFAULT_SNAPSHOT
+        return f"snapshot_{_SLUG_RE.sub('_', self.key)}.json"
+
+
+def playlist_id(value: str) -> str:
+    """The playlist ID in a playlist URL, a bare ID, or "liked".
+
+    Raises ValueError for anything else.
+    """
+    if value.lower() == "liked":
+        return LIKED_PLAYLIST
+    if "/" in value:
+        url = value if "://" in value else f"https://{value}"
+        ids = parse_qs(urlparse(url).query).get("list")
+        if not ids:
+            raise ValueError(f"no playlist in {value!r}")
+        value = ids[0]
+    if not _PLAYLIST_ID_RE.match(value):
+        raise ValueError(f"not a playlist ID: {value!r}")
+    return value
+
+
+def sources_for(playlists: list[str], cookie_files: list[str]) -> list[Source]:
+    """Every playlist under every cookie profile, profile by profile.
+
+    Raises ValueError for a playlist that can't be parsed.
+    """
+    ids = list(dict.fromkeys(playlist_id(p) for p in playlists))
+    return [Source(p, c) for c in dict.fromkeys(cookie_files) for p in ids]
+
+
+class SourceIndex:
+    """Which sources reference each track, persisted in the library catalog.
+
+    Every sync replaces a source's membership with what it saw, so a video
+    removed from a playlist stops being attributed to it; first_seen
+    survives for videos that stay.
+    """
+
+    def __init__(self, catalog: LibraryCatalog):
+        self._catalog = catalog
+
+    def record(self, source: str, video_ids: list[str]) -> None:
+        """Set the videos source currently references."""
+        now = time.time()
+        self._catalog.executemany(
+            """
+            INSERT INTO track_sources (video_id, source, first_seen, last_seen)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (video_id, source) DO UPDATE SET last_seen = excluded.last_seen
+            """,
+            [(vid, source, now, now) for vid in dict.fromkeys(video_ids)],
+        )
+        self._catalog.execute(
+            "DELETE FROM track_sources WHERE source = ? AND last_seen < ?", (source, now)
+        )
+
+    def sources(self, video_id: str) -> list[str]:
+        """Sources referencing video_id, in the order they first did."""
+        rows = self._catalog.query(
+            "SELECT source FROM track_sources WHERE video_id = ? ORDER BY first_seen, source",
+            (video_id,),
+        )
+        return [row[0] for row in rows]
+
+    def video_ids(self, source: str) -> set[str]:
+        rows = self._catalog.query(
+            "SELECT video_id FROM track_sources WHERE source = ?", (source,)
+        )
+        return {row[0] for row in rows}
+
+    def counts(self) -> dict[str, int]:
+        """Tracks per source."""
+        rows = self._catalog.query(
+            "SELECT source, COUNT(*) FROM track_sources GROUP BY source ORDER BY source"
+        )
+        return dict(rows)
+
+    def shared(self) -> dict[str, list[str]]:
+        """Tracks referenced by more than one source, with their sources."""
+        rows = self._catalog.query(
+            """
+            SELECT video_id, source FROM track_sources
+            WHERE video_id IN (
+                SELECT video_id FROM track_sources GROUP BY video_id HAVING COUNT(*) > 1
+            )
+            ORDER BY video_id, first_seen, source
+            """
+        )
+        result: dict[str, list[str]] = {}
+        for video_id, source in rows:
+            result.setdefault(video_id, []).append(source)
+        return result
@@ -0,0 +1,182 @@
+import threading
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from scraper.defaults import DEFAULT_SYNC_WORKERS
+from scraper.models import Track
+from scraper.snapshot import PlaylistSnapshot, merge_tracks
+from scraper.sources import Source
+from scraper.ytdlp_client import (
+    DEFAULT_COOKIE_FILE,
+    fetch_new_playlist_videos,
+    fetch_playlist,
+    iter_playlist,
+)
+
+
+def sync_liked_videos(
+    snapshot: PlaylistSnapshot,
+    cookie_file: str = DEFAULT_COOKIE_FILE,
+    on_progress: Callable[[int, int], None] | None = None,
+    full: bool = False,
+) -> tuple[list[Track], list[Track]]:
+    """Bring the snapshot up to date with the liked playlist."""
+    return sync_playlist(snapshot, Source(cookie_file=cookie_file), on_progress, full)
+
+
+def sync_playlist(
+    snapshot: PlaylistSnapshot,
+    source: Source,
+    on_progress: Callable[[int, int], None] | None = None,
+    full: bool = False,
+) -> tuple[list[Track], list[Track]]:
+    """Bring the snapshot up to date with a source's playlist.
+
+    Without a snapshot (or with full=True) the whole playlist is fetched.
+    Otherwise, for newest-first playlists such as the liked list, only the
+    new head is paged in and merged with the cached list; tracks removed
+    since the snapshot are only dropped by a full sync. Other playlists are
+    fetched in full every time.
+
+    Returns (all_tracks, new_tracks).
+    """
+    cached = None if full else snapshot.load()
+    if cached is None or not source.newest_first:
+        tracks = fetch_playlist(source.url, cookie_file=source.cookie_file, on_progress=on_progress)
+        snapshot.save(tracks)
+        if cached is None:
+            return tracks, tracks
+        known_ids = {t.video_id for t in cached}
+        return tracks, [t for t in tracks if t.video_id not in known_ids]
+
+    known_ids = {t.video_id for t in cached}
+    new = fetch_new_playlist_videos(
+        source.url, known_ids, cookie_file=source.cookie_file, on_progress=on_progress
+    )
+    tracks = merge_tracks(new, cached)
+    if new:
+        snapshot.save(tracks)
+    return tracks, new
+
+
+def stream_liked_videos(
+    snapshot: PlaylistSnapshot,
+    cookie_file: str = DEFAULT_COOKIE_FILE,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> Iterator[list[Track]]:
+    """Full fetch of the liked playlist that yields batches as they arrive."""
+    return stream_playlist(snapshot, Source(cookie_file=cookie_file), on_progress)
+
+
+def stream_playlist(
+    snapshot: PlaylistSnapshot,
+    source: Source,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> Iterator[list[Track]]:
+    """Full fetch that yields batches as they arrive.
+
+    The snapshot is only replaced once the whole playlist has been read, so an
+    interrupted stream never leaves a partial snapshot behind.
+    """
+    tracks: list[Track] = []
+    for batch in iter_playlist(source.url, source.cookie_file, on_progress=on_progress):
+        tracks.extend(batch)
+        yield batch
+    snapshot.save(tracks)
+
+
+@dataclass
+class SyncResult:
+    """Several sources synced and merged.
+
+    tracks and new are de-duplicated by video_id, in source order. by_source
+    lists each synced source's video IDs by Source.key; failed sources are
+    in errors instead.
+    """
+
+    tracks: list[Track] = field(default_factory=list)
+    new: list[Track] = field(default_factory=list)
+    by_source: dict[str, list[str]] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+
+    def sources(self, video_id: str) -> list[str]:
+        return [key for key, ids in self.by_source.items() if video_id in ids]
+
+
+def sync_sources(
+    sources: list[Source],
+    downloads_dir: str = "downloads",
+    on_progress: Callable[[int, int], None] | None = None,
+    full: bool = False,
+    max_workers: int = DEFAULT_SYNC_WORKERS,
+    sync: Callable[..., tuple[list[Track], list[Track]]] = sync_playlist,
+) -> SyncResult:
+    """Sync every source concurrently and merge them, dropping repeats.
+
+    Enumerating a playlist is mostly waiting on YouTube, so sources run on
+    a thread pool. A video in several sources (liked on two accounts, or in
+    two playlists) appears once, under the first source that has it, and
+    only counts as new if no source knew it before. A source that fails is
+    reported in errors and the rest still count; with a single source its
+    exception propagates instead. on_progress receives the combined count
+    of entries seen across all sources.
+    """
+    progress = _CombinedProgress(on_progress) if on_progress else None
+
+    def run(index: int, source: Source) -> tuple[list[Track], list[Track]]:
+        snapshot = PlaylistSnapshot(downloads_dir, source.snapshot_filename)
+        report = progress.for_source(index) if progress else None
+        return sync(snapshot, source, on_progress=report, full=full)
+
+    result = SyncResult()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sources)))) as pool:
+        futures = [pool.submit(run, i, source) for i, source in enumerate(sources)]
+        outcomes = []
+        for source, future in zip(sources, futures):
+            try:
+                outcomes.append((source, *future.result()))
+            except Exception as e:
+                if len(sources) == 1:
+                    raise
+                result.errors[source.key] = str(e)
+
+    # New to at least one source and not already known through another
+    new_ids: set[str] = set()
+    known_ids: set[str] = set()
+    for _, tracks, new in outcomes:
+        added = {t.video_id for t in new}
+        new_ids |= added
+        known_ids |= {t.video_id for t in tracks} - added
+    new_ids -= known_ids
+
+    seen: set[str] = set()
+    for source, tracks, _ in outcomes:
+        result.by_source[source.key] = [t.video_id for t in tracks]
+        for track in tracks:
+            if track.video_id in seen:
+                continue
+            seen.add(track.video_id)
+            result.tracks.append(track)
+            if track.video_id in new_ids:
+                result.new.append(track)
+    return result
+
+
+class _CombinedProgress:
+    """Sums (current, total) progress reported by several concurrent syncs."""
+
+    def __init__(self, on_progress: Callable[[int, int], None]):
+        self._on_progress = on_progress
+        self._lock = threading.Lock()
+        self._counts: dict[int, tuple[int, int]] = {}
+
+    def for_source(self, index: int) -> Callable[[int, int], None]:
+        def report(current: int, total: int) -> None:
+            with self._lock:
+                self._counts[index] = (current, total)
+                current = sum(c for c, _ in self._counts.values())
+                total = sum(t for _, t in self._counts.values())
+            self._on_progress(current, total)
+
+        return report
@@ -0,0 +1,289 @@
+"""Artist, title and cover art tags for downloaded files.
+
+Tags are written into the existing file with mutagen, so the audio is never
+re-encoded: ID3v2 for MP3, Vorbis comments for Ogg (Opus, Vorbis) and iTunes
+atoms for M4A. Matroska and WebM (native and some remux outputs) are left
+untagged; mutagen can't write them.
+
+Cover art comes from a ThumbnailCache: one download per thumbnail URL,
+stored by a hash of its content so identical artwork is kept once, with the
+least recently used images evicted beyond a size limit.
+"""
+
+import base64
+import hashlib
+import os
+import subprocess
+import threading
+import time
+import urllib.request
+from collections.abc import Callable
+
+import mutagen
+from mutagen.flac import Picture
+from mutagen.id3 import APIC, ID3, TALB, TDRC, TIT2, TPE1, ID3NoHeaderError
+from mutagen.mp4 import MP4, MP4Cover
+from mutagen.ogg import OggFileType
+
+from scraper.catalog import LibraryCatalog
+from scraper.defaults import DEFAULT_THUMBNAIL_CACHE_BYTES
+from scraper.models import Track, TrackMetadata
+from scraper.transcode import FFMPEG
+
+THUMBNAIL_SUBDIR = ".thumbnails"
+_FETCH_TIMEOUT = 30
+_JPEG_MAGIC = b"\xff\xd8\xff"
+_PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+# ID3 and FLAC picture type for the front cover
+_FRONT_COVER = 3
+
+
+class ThumbnailCache:
+    """Cover images on disk, by SHA-256 of their content, bounded to max_bytes.
+
+    The catalog maps each thumbnail URL to the digest of what it served and
+    keeps a size and last-used time per image; files live under
+    directory/<first two hex digits>/<digest>. Images other than JPEG and
+    PNG (YouTube mostly serves WebP) are converted to JPEG with ffmpeg
+    first, since that is what every tag format can carry. Once the
+    images add up to more than max_bytes, the least recently used ones are
+    deleted. Safe to use from several threads; concurrent requests for one
+    URL share a single download.
+    """
+
+    def __init__(
+        self,
+        catalog: LibraryCatalog,
+        directory: str,
+        max_bytes: int = DEFAULT_THUMBNAIL_CACHE_BYTES,
+        fetch: Callable[[str], bytes] | None = None,
+    ):
+        self._catalog = catalog
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._fetch = fetch or _download
+        self._lock = threading.Lock()
+        # Per-URL lock and the number of get() calls holding or waiting on
+        # it; dropped only once none are, so every caller shares one lock
+        self._url_locks: dict[str, threading.Lock] = {}
+        self._url_users: dict[str, int] = {}
+
+    def get(self, url: str) -> bytes | None:
+        """The image at url, downloading it only if it isn't cached.
+
+        Returns None if it can't be fetched or converted.
+        """
+        with self._lock:
+            url_lock = self._url_locks.setdefault(url, threading.Lock())
+            self._url_users[url] = self._url_users.get(url, 0) + 1
+        try:
+            with url_lock:
+                data = self._cached(url)
+                if data is None:
+                    data = self._store(url)
+                return data
+        finally:
+            with self._lock:
+                self._url_users[url] -= 1
+                if not self._url_users[url]:
+                    del self._url_users[url]
+                    del self._url_locks[url]
+
+    def total_size(self) -> int:
+        return self._catalog.query("SELECT COALESCE(SUM(size), 0) FROM thumbnail_blobs")[0][0]
+
+    def _cached(self, url: str) -> bytes | None:
+        rows = self._catalog.query("SELECT digest FROM thumbnail_urls WHERE url = ?", (url,))
+        if not rows:
+            return None
+        digest = rows[0][0]
+        try:
+            with open(self._path(digest), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        self._catalog.execute(
+            "UPDATE thumbnail_blobs SET last_used = ? WHERE digest = ?", (time.time(), digest)
+        )
+        return data
+
+    def _store(self, url: str) -> bytes | None:
+        try:
+            data = _as_cover(self._fetch(url))
+        except (OSError, ValueError):
+            return None
+        if data is None:
+            return None
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not os.path.isfile(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.part"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        self._catalog.execute(
+            """
+            INSERT INTO thumbnail_blobs (digest, size, last_used) VALUES (?, ?, ?)
+            ON CONFLICT (digest) DO UPDATE SET last_used = excluded.last_used
+            """,
+            (digest, len(data), time.time()),
+        )
+        self._catalog.execute(
+            "INSERT OR REPLACE INTO thumbnail_urls (url, digest) VALUES (?, ?)", (url, digest)
+        )
+        self._evict(keep=digest)
+        return data
+
+    def _evict(self, keep: str) -> None:
+        with self._lock:
+            excess = self.total_size() - self.max_bytes
+            if excess <= 0:
+                return
+            rows = self._catalog.query(
+                "SELECT digest, size FROM thumbnail_blobs WHERE digest != ? ORDER BY last_used",
+                (keep,),
+            )
+            doomed = []
+            for digest, size in rows:
+                if excess <= 0:
+                    break
+                doomed.append((digest,))
+                excess -= size
+            self._catalog.executemany("DELETE FROM thumbnail_urls WHERE digest = ?", doomed)
+            self._catalog.executemany("DELETE FROM thumbnail_blobs WHERE digest = ?", doomed)
+        for (digest,) in doomed:
+            try:
+                os.remove(self._path(digest))
+            except OSError:
+                pass
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+
+class Tagger:
+    """Writes a track's names, album, year and cover art into its file."""
+
+    def __init__(self, thumbnails: ThumbnailCache | None = None):
+        self.thumbnails = thumbnails
+
+    def tag(self, path: str, track: Track, metadata: TrackMetadata | None = None) -> bool:
+        """Tag path in place. Returns False if it couldn't be tagged.
+
+        The artist and title follow the file name: the resolved ones when
+        both are known, else the channel and video title. Cover art is the
+        resolved thumbnail, or the video's own; a file is still tagged if
+        the image can't be fetched.
+        """
+        writer = _WRITERS.get(os.path.splitext(path)[1].lstrip(".").lower())
+        if writer is None:
+            return False
+        metadata = metadata or TrackMetadata()
+        artist, title = metadata.names(track)
+        cover = None
+        if self.thumbnails is not None:
+            try:
+                cover = self.thumbnails.get(metadata.thumbnail or thumbnail_url(track.video_id))
+            except OSError:
+                # The cache directory is unwritable; tag without artwork
+                pass
+        try:
+            writer(path, artist, title, metadata.album, metadata.release_year, cover)
+        except (mutagen.MutagenError, OSError):
+            return False
+        return True
+
+
+def thumbnail_url(video_id: str) -> str:
+    """A video's own thumbnail, which every video has, as a JPEG."""
+    return f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"
+
+
+def _write_id3(path, artist, title, album, year, cover) -> None:
+    try:
+        tags = ID3(path)
+    except ID3NoHeaderError:
+        tags = ID3()
+    tags.setall("TPE1", [TPE1(encoding=3, text=artist)])
+    tags.setall("TIT2", [TIT2(encoding=3, text=title)])
+    if album:
+        tags.setall("TALB", [TALB(encoding=3, text=album)])
+    if year:
+        tags.setall("TDRC", [TDRC(encoding=3, text=str(year))])
+    if cover is not None:
+        tags.setall(
+            "APIC",
+            [APIC(encoding=3, mime=_mime(cover), type=_FRONT_COVER, desc="Cover", data=cover)],
+        )
+    tags.save(path, v2_version=3)
+
+
+def _write_vorbis(path, artist, title, album, year, cover) -> None:
+    audio = mutagen.File(path)
+    if not isinstance(audio, OggFileType):
+        raise mutagen.MutagenError(f"not an Ogg file: {path}")
+    if audio.tags is None:
+        audio.add_tags()
+    audio["artist"] = artist
+    audio["title"] = title
+    if album:
+        audio["album"] = album
+    if year:
+        audio["date"] = str(year)
+    if cover is not None:
+        picture = Picture()
+        picture.type = _FRONT_COVER
+        picture.mime = _mime(cover)
+        picture.data = cover
+        audio["metadata_block_picture"] = base64.b64encode(picture.write()).decode("ascii")
+    audio.save()
+
+
+def _write_mp4(path, artist, title, album, year, cover) -> None:
+    audio = MP4(path)
+    if audio.tags is None:
+        audio.add_tags()
+    audio["\xa9ART"] = [artist]
+    audio["\xa9nam"] = [title]
+    if album:
+        audio["\xa9alb"] = [album]
+    if year:
+        audio["\xa9day"] = [str(year)]
+    if cover is not None:
+        image_format = MP4Cover.FORMAT_PNG if _mime(cover) == "image/png" else MP4Cover.FORMAT_JPEG
+        audio["covr"] = [MP4Cover(cover, imageformat=image_format)]
+    audio.save()
+
+
+_WRITERS = {
+    "mp3": _write_id3,
+    "opus": _write_vorbis,
+    "ogg": _write_vorbis,
+    "m4a": _write_mp4,
+    "mp4": _write_mp4,
+}
+
+
+def _mime(image: bytes) -> str:
+    return "image/png" if image.startswith(_PNG_MAGIC) else "image/jpeg"
+
+
+def _as_cover(data: bytes) -> bytes | None:
+    """data as JPEG or PNG, converting anything else with ffmpeg."""
+    if data.startswith(_JPEG_MAGIC) or data.startswith(_PNG_MAGIC):
+        return data
+    cmd = [FFMPEG, "-nostdin", "-loglevel", "error", "-i", "pipe:0"]
+    cmd += ["-frames:v", "1", "-f", "image2", "-c:v", "mjpeg", "pipe:1"]
+    try:
+        proc = subprocess.run(cmd, input=data, capture_output=True)
+    except OSError:
+        return None
+    if proc.returncode != 0 or not proc.stdout.startswith(_JPEG_MAGIC):
+        return None
+    return proc.stdout
+
+
+def _download(url: str) -> bytes:
+    with urllib.request.urlopen(url, timeout=_FETCH_TIMEOUT) as response:
+        return response.read()
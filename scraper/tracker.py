@@ -1,28 +1,125 @@
 import json
 import os
+import threading
+import time
+
+from scraper.catalog import CatalogEntry, LibraryCatalog
+from scraper.models import AudioAnalysis, Track
+
+CATALOG_FILENAME = "library.db"
+_MIGRATED_KEY = "manifest_migrated"
 
 
 class ProgressTracker:
+    """Tracks which videos have been downloaded, backed by the library catalog.
+
+    The set of downloaded IDs is cached in memory for fast is_downloaded checks;
+    every mark_downloaded is written through to the catalog straight away.
+    Manifests from older versions (manifest.json plus manifest.journal) are
+    imported once on the first load and then left untouched.
+    """
+
     def __init__(self, downloads_dir: str):
         os.makedirs(downloads_dir, exist_ok=True)
+        self._dir = downloads_dir
         self._path = os.path.join(downloads_dir, "manifest.json")
+        self._journal_path = os.path.join(downloads_dir, "manifest.journal")
+        self.catalog = LibraryCatalog(os.path.join(downloads_dir, CATALOG_FILENAME))
         self._downloaded_ids: set[str] = set()
+        # Download workers mark concurrently
+        self._lock = threading.Lock()
 
     def load(self):
-        if os.path.isfile(self._path):
-            with open(self._path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            self._downloaded_ids = set(data.get("downloaded", []))
-        else:
-            self._downloaded_ids = set()
+        if self.catalog.get_meta(_MIGRATED_KEY) is None:
+            self._migrate_manifest()
+        downloaded = self.catalog.video_ids()
+        with self._lock:
+            self._downloaded_ids = downloaded
+
+    def _migrate_manifest(self):
+        legacy = read_legacy_manifest(self._path, self._journal_path)
+        if legacy:
+            self.catalog.add_ids(sorted(legacy))
+        self.catalog.set_meta(_MIGRATED_KEY, str(len(legacy)))
 
     def is_downloaded(self, video_id: str) -> bool:
         return video_id in self._downloaded_ids
 
-    def mark_downloaded(self, video_id: str):
-        self._downloaded_ids.add(video_id)
+    def mark_downloaded(
+        self,
+        video_id: str,
+        track: Track | None = None,
+        path: str | None = None,
+        source_format: str | None = None,
+    ):
+        output_format = None
+        if path is not None:
+            # The extension says what was kept: mp3, opus, m4a, webm...
+            output_format = os.path.splitext(path)[1].lstrip(".").lower() or None
+        entry = CatalogEntry(
+            video_id, path=path, source_format=source_format, output_format=output_format
+        )
+        if track is not None:
+            entry.title = track.title
+            entry.channel = track.channel
+            entry.duration = track.duration
+        if path is not None and os.path.isfile(path):
+            entry.size = os.path.getsize(path)
+        with self._lock:
+            self.catalog.add(entry)
+            self._downloaded_ids.add(video_id)
+
+    def analysis(self, video_id: str) -> AudioAnalysis | None:
+        """The stored loudness and silence measurements of a track, if analysed."""
+        rows = self.catalog.query(
+            """
+            SELECT duration, loudness, peak, leading_silence, trailing_silence
+            FROM track_analysis WHERE video_id = ?
+            """,
+            (video_id,),
+        )
+        return AudioAnalysis(*rows[0]) if rows else None
+
+    def record_analysis(self, video_id: str, analysis: AudioAnalysis):
+        self.catalog.execute(
+            """
+            INSERT OR REPLACE INTO track_analysis
+                (video_id, duration, loudness, peak, leading_silence, trailing_silence,
+                 analysed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                video_id,
+                analysis.duration,
+                analysis.loudness,
+                analysis.peak,
+                analysis.leading_silence,
+                analysis.trailing_silence,
+                time.time(),
+            ),
+        )
 
     def save(self):
-        data = {"downloaded": sorted(self._downloaded_ids)}
-        with open(self._path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        """Checkpoint the catalog; marks are already durable when they return."""
+        self.catalog.checkpoint()
+
+    def close(self):
+        self.catalog.close()
+
+
+def read_legacy_manifest(manifest_path: str, journal_path: str) -> set[str]:
+    """Read IDs from a manifest.json snapshot plus its append-only journal."""
+    downloaded: set[str] = set()
+    if os.path.isfile(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        downloaded.update(data.get("downloaded", []))
+    if os.path.isfile(journal_path):
+        with open(journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    downloaded.add(json.loads(line)["downloaded"])
+                except ValueError:
+                    # Torn final line from a crash mid-append
+                    continue
+    return downloaded
@@ -0,0 +1,274 @@
+import os
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from enum import Enum
+
+FFMPEG = "ffmpeg"
+
+
+class TranscodeError(RuntimeError):
+    pass
+
+
+class OutputMode(Enum):
+    # Keep the downloaded file exactly as YouTube served it
+    NATIVE = "native"
+    # Copy the audio stream into its usual standalone container, no re-encode
+    REMUX = "remux"
+    MP3 = "mp3"
+    OPUS = "opus"
+
+
+# Where REMUX puts each source's audio. YouTube serves Opus in WebM and AAC
+# in fragmented MP4; Matroska audio takes anything else.
+_REMUX_EXTENSIONS = {
+    "webm": "opus",
+    "weba": "opus",
+    "opus": "opus",
+    "ogg": "ogg",
+    "m4a": "m4a",
+    "mp4": "m4a",
+    "aac": "m4a",
+    "mp3": "mp3",
+}
+# Sources whose audio is (almost always) already Opus
+_OPUS_SOURCES = {"webm", "weba", "opus"}
+# ffmpeg muxer per output extension; the .part name hides it from ffmpeg
+_MUXERS = {"mp3": "mp3", "opus": "opus", "ogg": "ogg", "m4a": "ipod", "mka": "matroska"}
+_ENCODERS = {OutputMode.MP3: "libmp3lame", OutputMode.OPUS: "libopus"}
+_COPY = ["-codec:a", "copy"]
+
+
+@dataclass(frozen=True)
+class OutputFormat:
+    """What to turn a downloaded audio stream into.
+
+    bitrate (such as "192k") applies to MP3 and Opus; None keeps the
+    encoder's default. threads is passed to ffmpeg as -threads; None lets
+    ffmpeg choose. loudness (a target in LUFS) and trim_silence need the
+    audio analysed first (scraper.analysis) and only apply to the encoding
+    modes.
+    """
+
+    mode: OutputMode = OutputMode.MP3
+    bitrate: str | None = None
+    threads: int | None = None
+    loudness: float | None = None
+    trim_silence: bool = False
+
+    def extension(self, src: str) -> str:
+        """Extension, with its dot, of the file made from src."""
+        source = _extension(src)
+        if self.mode is OutputMode.NATIVE:
+            return f".{source}" if source else ""
+        if self.mode is OutputMode.REMUX:
+            return "." + _REMUX_EXTENSIONS.get(source, "mka")
+        return "." + self.mode.value
+
+    @property
+    def encodes(self) -> bool:
+        return self.mode in _ENCODERS
+
+    @property
+    def analyses(self) -> bool:
+        """Whether the audio is measured before the encode to adjust gain or trim it."""
+        return self.encodes and (self.loudness is not None or self.trim_silence)
+
+
+def convert(src: str, dst: str, output_format: OutputFormat = OutputFormat()) -> str:
+    """Turn a downloaded stream into dst according to output_format.
+
+    Returns the output filepath, which differs from dst only when a remux is
+    not possible and the native file is kept instead. Runs in a worker
+    process, so it must stay a picklable module-level function; partial()
+    binds the format. Output is written next to dst and renamed into place
+    when complete.
+    """
+    codec = _codec(output_format, _extension(src))
+    if codec is None:
+        os.replace(src, dst)
+        return dst
+    try:
+        return run_ffmpeg(src, dst, codec, output_format.threads)
+    except TranscodeError:
+        if codec is not _COPY:
+            raise
+        if output_format.mode is OutputMode.REMUX:
+            # A codec the target container can't hold; keep the original
+            native = os.path.splitext(dst)[0] + OutputFormat(OutputMode.NATIVE).extension(src)
+            os.replace(src, native)
+            return native
+        # Not Opus after all; encode it
+        return run_ffmpeg(src, dst, encoder_args(output_format), output_format.threads)
+
+
+class StreamEncoder:
+    """Turns an audio stream into dst while it is still downloading.
+
+    Chunks passed to write() go through ffmpeg's stdin, or straight to disk
+    when output_format keeps the stream as served, so no raw copy of the
+    download is ever stored. Output goes to dst + ".part" and finish() renames
+    it into place. abort() kills ffmpeg and removes the partial output; a with
+    block that is left without finish() does that too.
+
+    Unlike convert() there is no second try: the stream is gone once it has
+    been read, so a failed stream copy raises TranscodeError instead of
+    falling back.
+    """
+
+    def __init__(self, dst: str, output_format: OutputFormat, source_extension: str):
+        self.dst = dst
+        self.tmp = dst + ".part"
+        self._finished = False
+        self._file = None
+        self._process: subprocess.Popen | None = None
+        self._stderr = None
+        codec = _codec(output_format, source_extension.lstrip(".").lower())
+        if codec is None:
+            self._file = open(self.tmp, "wb")
+            return
+        # A file rather than a pipe, so ffmpeg can never block on a full stderr
+        self._stderr = tempfile.TemporaryFile()
+        cmd = _ffmpeg_command("pipe:0", dst, codec, output_format.threads)
+        self._process = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr
+        )
+
+    def __enter__(self) -> "StreamEncoder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if not self._finished:
+            self.abort()
+
+    def write(self, chunk: bytes) -> None:
+        if self._process is None:
+            self._file.write(chunk)
+            return
+        try:
+            self._process.stdin.write(chunk)
+        except BrokenPipeError:
+            # ffmpeg stopped reading; its exit status and stderr say why
+            self._process.wait()
+            raise self._failure() from None
+
+    def finish(self) -> str:
+        """Flush the last of the stream and move the output into place."""
+        if self._process is None:
+            self._file.close()
+        else:
+            try:
+                self._process.stdin.close()
+            except BrokenPipeError:
+                pass
+            if self._process.wait() != 0:
+                raise self._failure()
+            self._stderr.close()
+        os.replace(self.tmp, self.dst)
+        self._finished = True
+        return self.dst
+
+    def abort(self) -> None:
+        """Stop ffmpeg and remove the partial output. Safe to call twice."""
+        if self._process is not None:
+            if self._process.poll() is None:
+                self._process.kill()
+            self._process.wait()
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass
+            self._stderr.close()
+        if self._file is not None:
+            self._file.close()
+        try:
+            os.remove(self.tmp)
+        except OSError:
+            pass
+
+    def _failure(self) -> TranscodeError:
+        self._stderr.seek(0)
+        lines = self._stderr.read().decode(errors="replace").strip().splitlines()
+        returncode = self._process.returncode
+        self.abort()
+        return TranscodeError(lines[-1] if lines else f"ffmpeg exited with {returncode}")
+
+
+def transcode_to_mp3(src: str, dst: str) -> str:
+    """Encode an audio file to MP3 with ffmpeg. Returns the output filepath."""
+    return convert(src, dst, OutputFormat(OutputMode.MP3))
+
+
+def run_ffmpeg(
+    src: str,
+    dst: str,
+    codec: list[str],
+    threads: int | None,
+    input_args: tuple[str, ...] = (),
+    audio_filter: str | None = None,
+) -> str:
+    """Turn src's first audio stream into dst with ffmpeg. Returns dst.
+
+    codec is the ffmpeg codec options (see encoder_args), input_args go
+    before -i and audio_filter is an -af filter graph. ffmpeg writes to
+    dst + ".part", which is renamed into place once it succeeds.
+    """
+    tmp = dst + ".part"
+    cmd = _ffmpeg_command(src, dst, codec, threads, input_args, audio_filter)
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        lines = proc.stderr.strip().splitlines()
+        raise TranscodeError(lines[-1] if lines else f"ffmpeg exited with {proc.returncode}")
+    os.replace(tmp, dst)
+    return dst
+
+
+def _ffmpeg_command(
+    src: str,
+    dst: str,
+    codec: list[str],
+    threads: int | None,
+    input_args: tuple[str, ...] = (),
+    audio_filter: str | None = None,
+) -> list[str]:
+    """ffmpeg arguments turning src's first audio stream into dst + ".part".
+
+    input_args go before -i (such as a raw PCM format, or -ss/-t to cut the
+    input); audio_filter is an -af filter graph.
+    """
+    cmd = [FFMPEG, "-y", "-nostdin", "-loglevel", "error", *input_args, "-i", src, "-vn"]
+    cmd += ["-map", "0:a:0", *codec]
+    if audio_filter:
+        cmd += ["-af", audio_filter]
+    if threads is not None:
+        cmd += ["-threads", str(threads)]
+    cmd += ["-f", _MUXERS.get(_extension(dst), "matroska"), dst + ".part"]
+    return cmd
+
+
+def _codec(output_format: OutputFormat, source: str) -> list[str] | None:
+    """ffmpeg codec options for output_format, or None to keep the stream as served."""
+    mode = output_format.mode
+    if mode is OutputMode.NATIVE:
+        return None
+    if mode is OutputMode.REMUX:
+        return _COPY
+    if mode is OutputMode.OPUS and output_format.bitrate is None and source in _OPUS_SOURCES:
+        # Already Opus: re-encoding at the default bitrate would only lose quality
+        return _COPY
+    return encoder_args(output_format)
+
+
+def encoder_args(output_format: OutputFormat) -> list[str]:
+    """ffmpeg options encoding to output_format's codec and bitrate."""
+    codec = ["-codec:a", _ENCODERS[output_format.mode]]
+    if output_format.bitrate:
+        codec += ["-b:a", output_format.bitrate]
+    return codec
+
+
+def _extension(path: str) -> str:
+    return os.path.splitext(path)[1].lstrip(".").lower()
@@ -0,0 +1,318 @@
+"""Watch mode: keep the library in sync without anyone launching the app.
+
+Every interval the playlists are synced incrementally and whatever is new
+is downloaded, each poll being one run_headless call: the same job queue,
+retries, JSON-lines events and exit codes. A poll closes its tracker,
+sessions and worker pools when it ends, so between polls the process only
+holds a small status record and sleeps on an event.
+
+That record is served as JSON on a local HTTP endpoint (127.0.0.1 only):
+what the current poll is doing, the jobs in flight, recent failures and
+throughput. SIGTERM and Ctrl+C stop the watch; a batch in progress is
+cancelled the way Ctrl+C cancels one in headless mode (partial files
+removed, unfinished jobs kept for the next run) and the catalog is closed
+before the process exits.
+"""
+
+import gc
+import json
+import signal
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TextIO
+
+from scraper.defaults import DEFAULT_STATUS_PORT, DEFAULT_WATCH_INTERVAL
+from scraper.headless import EXIT_CANCELLED, EXIT_OK, JsonLinesReporter, run_headless
+
+# Failures kept for the status endpoint, newest last
+RECENT_FAILURES = 20
+# How often the status server checks whether it should stop
+_SERVER_POLL_INTERVAL = 1.0
+
+
+class WatchStatus:
+    """What the watch is doing, built from the events a poll emits.
+
+    record() is called from download worker threads and snapshot() from the
+    HTTP server's, so both hold a lock.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        max_failures: int = RECENT_FAILURES,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.interval = interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.started_at = clock()
+        self.state = "starting"
+        self.polls = 0
+        self.last_poll: dict | None = None
+        self.next_poll_at: float | None = None
+        self._selected = 0
+        self._completed = 0
+        self._failed = 0
+        self._active: dict[str, str] = {}
+        self._speed = 0
+        self._eta: float | None = None
+        self._downloaded_total = 0
+        self._failed_total = 0
+        self._failures: deque[dict] = deque(maxlen=max_failures)
+        self._disk_low: int | None = None
+
+    @property
+    def busy(self) -> bool:
+        """Whether a poll is running."""
+        # No lock: this is read from a signal handler, which may have
+        # interrupted record() on the same thread
+        return self.state in ("syncing", "downloading")
+
+    def record(self, event: str, fields: dict) -> None:
+        now = self._clock()
+        with self._lock:
+            if event == "sync_start":
+                self.state = "syncing"
+                self.polls += 1
+                self.next_poll_at = None
+                self._selected = self._completed = self._failed = 0
+                self._active.clear()
+                self._speed, self._eta = 0, None
+            elif event == "sync_done":
+                self._selected = fields.get("selected", 0)
+                if self._selected:
+                    self.state = "downloading"
+            elif event == "sync_failed":
+                self._failures.append({"time": now, "error": fields.get("error")})
+            elif event == "start":
+                self._active[fields["video_id"]] = fields.get("title", "")
+            elif event == "done":
+                self._active.pop(fields["video_id"], None)
+                self._completed += 1
+                self._downloaded_total += 1
+            elif event == "failed":
+                self._active.pop(fields["video_id"], None)
+                self._failed += 1
+                self._failed_total += 1
+                self._failures.append(
+                    {
+                        "time": now,
+                        "video_id": fields["video_id"],
+                        "title": fields.get("title"),
+                        "error": fields.get("error"),
+                    }
+                )
+            elif event == "disk_low":
+                self._disk_low = fields.get("free")
+            elif event == "disk_ok":
+                self._disk_low = None
+            elif event == "batch_progress":
+                self._speed, self._eta = fields.get("speed", 0), fields.get("eta")
+            elif event == "summary":
+                self.state = "idle"
+                self._disk_low = None
+                self._active.clear()
+                self._speed, self._eta = 0, None
+                self.last_poll = {"finished_at": now, **fields}
+
+    def poll_finished(self, next_poll_at: float | None) -> None:
+        with self._lock:
+            self.state = "idle" if next_poll_at is not None else "stopping"
+            self.next_poll_at = next_poll_at
+
+    def stopping(self) -> None:
+        with self._lock:
+            self.state = "stopping"
+            self.next_poll_at = None
+
+    def snapshot(self) -> dict:
+        """The status as served, ready for json.dumps."""
+        now = self._clock()
+        with self._lock:
+            uptime = max(now - self.started_at, 1e-9)
+            return {
+                "state": self.state,
+                "started_at": round(self.started_at, 3),
+                "uptime": round(uptime, 3),
+                "interval": self.interval,
+                "polls": self.polls,
+                "next_poll_at": _round(self.next_poll_at),
+                "last_poll": self.last_poll,
+                "queue": {
+                    "selected": self._selected,
+                    "completed": self._completed,
+                    "failed": self._failed,
+                    "pending": max(0, self._selected - self._completed - self._failed),
+                    # Bytes free while new downloads wait for disk space
+                    "paused_for_disk": self._disk_low,
+                    "active": [
+                        {"video_id": video_id, "title": title}
+                        for video_id, title in self._active.items()
+                    ],
+                },
+                "throughput": {
+                    "speed": self._speed,
+                    "eta": self._eta,
+                    "downloaded": self._downloaded_total,
+                    "failed": self._failed_total,
+                    "downloads_per_hour": round(self._downloaded_total * 3600 / uptime, 2),
+                },
+                "recent_failures": list(self._failures),
+            }
+
+
+class WatchReporter(JsonLinesReporter):
+    """JSON-lines events that also keep a WatchStatus up to date."""
+
+    def __init__(self, status: WatchStatus, stream: TextIO | None = None):
+        super().__init__(stream)
+        self.status = status
+
+    def emit(self, event: str, **fields) -> None:
+        self.status.record(event, fields)
+        super().emit(event, **fields)
+
+
+class StatusServer:
+    """Serves a WatchStatus on a local port from a background thread.
+
+    GET /status returns the snapshot as JSON and GET /healthz a plain "ok";
+    anything else is a 404. Port 0 picks a free port (see address).
+    """
+
+    def __init__(self, status: WatchStatus, port: int = DEFAULT_STATUS_PORT, host="127.0.0.1"):
+        handler = type("Handler", (_StatusHandler,), {"status": status})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            kwargs={"poll_interval": _SERVER_POLL_INTERVAL},
+            name="status-server",
+            daemon=True,
+        )
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return self._server.server_address[:2]
+
+    @property
+    def url(self) -> str:
+        host, port = self.address
+        return f"http://{host}:{port}/status"
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._server.shutdown()
+        self._server.server_close()
+
+
+class _StatusHandler(BaseHTTPRequestHandler):
+    status: WatchStatus
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if path == "/status":
+            self._send(200, "application/json", json.dumps(self.status.snapshot()))
+        elif path == "/healthz":
+            self._send(200, "text/plain", "ok\n")
+        else:
+            self._send(404, "text/plain", "not found\n")
+
+    def _send(self, code: int, content_type: str, body: str) -> None:
+        data = body.encode()
+        self.send_response(code)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args) -> None:
+        # stdout carries the JSON-lines events; requests aren't among them
+        pass
+
+
+def run_watch(
+    interval: float = DEFAULT_WATCH_INTERVAL,
+    status_port: int | None = DEFAULT_STATUS_PORT,
+    stop: threading.Event | None = None,
+    stream: TextIO | None = None,
+    run: Callable[..., int] = run_headless,
+    handle_signals: bool = True,
+    full: bool = False,
+    **headless_kwargs,
+) -> int:
+    """Poll and download every interval seconds until stopped.
+
+    headless_kwargs go to run_headless on every poll; full only applies to
+    the first one, later polls are incremental. status_port None serves no
+    status. With handle_signals (main thread only), SIGTERM and SIGINT stop
+    the watch; stop can also be set from another thread, which ends it
+    after the current poll. Emits "watch_start" and "watch_stop" around the
+    polls' own events. Returns EXIT_OK once stopped.
+    """
+    stop = stop or threading.Event()
+    status = WatchStatus(interval)
+    reporter = WatchReporter(status, stream)
+    server = None
+    if status_port is not None:
+        server = StatusServer(status, status_port)
+        server.start()
+    restore = _handle_signals(stop, status) if handle_signals else None
+    reporter.emit(
+        "watch_start", interval=interval, status_url=server.url if server is not None else None
+    )
+    try:
+        while not stop.is_set():
+            try:
+                code = run(reporter=reporter, full=full, **headless_kwargs)
+            except KeyboardInterrupt:
+                # Stopped while syncing; run_headless has closed the catalog
+                code = EXIT_CANCELLED
+            full = False
+            if code == EXIT_CANCELLED:
+                stop.set()
+            if stop.is_set():
+                break
+            status.poll_finished(time.time() + interval)
+            # Let the poll's pools and buffers go before sleeping
+            gc.collect()
+            stop.wait(interval)
+    finally:
+        status.stopping()
+        if restore is not None:
+            restore()
+        if server is not None:
+            server.close()
+        reporter.emit("watch_stop", polls=status.polls)
+    return EXIT_OK
+
+
+def _handle_signals(stop: threading.Event, status: WatchStatus) -> Callable[[], None]:
+    """Make SIGTERM and SIGINT stop the watch. Returns a function undoing that."""
+
+    def handler(signum, frame):
+        first = not stop.is_set()
+        stop.set()
+        if first and status.busy:
+            # Interrupt the poll like Ctrl+C does in headless mode; a second
+            # signal must not cut that cleanup short
+            raise KeyboardInterrupt
+
+    previous = {sig: signal.signal(sig, handler) for sig in (signal.SIGTERM, signal.SIGINT)}
+
+    def restore():
+        for sig, old in previous.items():
+            signal.signal(sig, old)
+
+    return restore
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 3)
@@ -1,17 +1,42 @@
 import os
 import re
-from collections.abc import Callable
+import threading
+from collections.abc import Callable, Iterator
 
 import yt_dlp
+from yt_dlp.networking import Request
 
+from scraper.defaults import DEFAULT_COOKIE_FILE
 from scraper.filename import sanitize_filename
-from scraper.models import Track
+from scraper.models import Track, TrackMetadata
+from scraper.transcode import OutputFormat, StreamEncoder
 
 LIKED_VIDEOS_URL = "https://www.youtube.com/playlist?list=LL"
-DEFAULT_COOKIE_FILE = "cookies.txt"
+RAW_SUBDIR = ".raw"
+# Consecutive already-known entries that end an incremental fetch
+KNOWN_RUN_LENGTH = 10
+STREAM_BATCH_SIZE = 50
 _JS_RUNTIMES = {"node": {}}
+# Bytes per ranged request when streaming; YouTube throttles long unranged
+# reads, which is why yt-dlp itself asks for 10 MiB at a time
+STREAM_CHUNK_SIZE = 10 * 1024 * 1024
+_STREAM_READ_SIZE = 64 * 1024
+# Start of a track's audio read for a fingerprint: about a minute at
+# YouTube's usual audio bitrates
+PREVIEW_BYTES = 1024 * 1024
+_STREAMABLE_PROTOCOLS = {"http", "https"}
 
 _ITEM_PROGRESS_RE = re.compile(r"Downloading item (\d+) of (\d+)")
+_YEAR_RE = re.compile(r"^(\d{4})")
+_CONTENT_RANGE_TOTAL_RE = re.compile(r"/(\d+)\s*$")
+
+
+class DownloadCancelled(Exception):
+    """Raised inside a download when its batch has been cancelled."""
+
+
+class StreamingUnsupported(Exception):
+    """The chosen format can't be read as one byte stream (HLS, DASH fragments)."""
 
 
 class _FetchLogger:
@@ -41,6 +66,15 @@ def fetch_liked_videos(
     on_progress: Callable[[int, int], None] | None = None,
 ) -> list[Track]:
     """Fetch liked videos metadata using yt-dlp with cookie file auth."""
+    return fetch_playlist(LIKED_VIDEOS_URL, cookie_file, on_progress)
+
+
+def fetch_playlist(
+    url: str,
+    cookie_file: str = DEFAULT_COOKIE_FILE,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> list[Track]:
+    """Fetch the metadata of every video in a playlist, as cookie_file's account sees it."""
     ydl_opts = {
         "cookiefile": cookie_file,
         "extract_flat": "in_playlist",
@@ -48,54 +82,343 @@ def fetch_liked_videos(
         "logger": _FetchLogger(on_progress),
     }
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(LIKED_VIDEOS_URL, download=False)
+        info = ydl.extract_info(url, download=False)
+
+    return [_entry_to_track(entry) for entry in info.get("entries", [])]
+
+
+def iter_liked_videos(
+    cookie_file: str = DEFAULT_COOKIE_FILE,
+    batch_size: int = STREAM_BATCH_SIZE,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> Iterator[list[Track]]:
+    """Yield liked videos in small batches as yt-dlp pages through the playlist."""
+    return iter_playlist(LIKED_VIDEOS_URL, cookie_file, batch_size, on_progress)
+
+
+def iter_playlist(
+    url: str,
+    cookie_file: str = DEFAULT_COOKIE_FILE,
+    batch_size: int = STREAM_BATCH_SIZE,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> Iterator[list[Track]]:
+    """Yield a playlist's videos in small batches as yt-dlp pages through it.
+
+    Pages are only requested as the caller iterates, so stopping early skips
+    the rest of the playlist.
+    """
+    batch = []
+    for entry in _iter_playlist_entries(url, cookie_file, on_progress):
+        batch.append(_entry_to_track(entry))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def fetch_new_liked_videos(
+    known_ids: set[str],
+    cookie_file: str = DEFAULT_COOKIE_FILE,
+    on_progress: Callable[[int, int], None] | None = None,
+    stop_after: int = KNOWN_RUN_LENGTH,
+) -> list[Track]:
+    """Fetch liked videos that are not in known_ids, newest first."""
+    return fetch_new_playlist_videos(
+        LIKED_VIDEOS_URL, known_ids, cookie_file, on_progress, stop_after
+    )
+
+
+def fetch_new_playlist_videos(
+    url: str,
+    known_ids: set[str],
+    cookie_file: str = DEFAULT_COOKIE_FILE,
+    on_progress: Callable[[int, int], None] | None = None,
+    stop_after: int = KNOWN_RUN_LENGTH,
+) -> list[Track]:
+    """Fetch videos of a newest-first playlist that are not in known_ids.
 
+    Paging stops as soon as stop_after consecutive entries are already
+    known, so this only suits playlists that grow at the top, like the
+    liked list.
+    """
     tracks = []
-    for entry in info.get("entries", []):
-        tracks.append(
-            Track(
-                video_id=entry["id"],
-                title=entry.get("title", "Unknown"),
-                channel=entry.get("uploader", entry.get("channel", "Unknown")),
-                duration=entry.get("duration") or 0,
-            )
-        )
+    known_run = 0
+    entries = _iter_playlist_entries(url, cookie_file, on_progress)
+    try:
+        for entry in entries:
+            if entry["id"] in known_ids:
+                known_run += 1
+                if known_run >= stop_after:
+                    break
+                continue
+            known_run = 0
+            tracks.append(_entry_to_track(entry))
+    finally:
+        entries.close()
     return tracks
 
 
-def download_track(
+def _iter_playlist_entries(
+    url: str, cookie_file: str, on_progress: Callable[[int, int], None] | None
+) -> Iterator[dict]:
+    ydl_opts = {
+        "cookiefile": cookie_file,
+        "extract_flat": "in_playlist",
+        "js_runtimes": _JS_RUNTIMES,
+        "logger": _FetchLogger(),
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        # process=False leaves the entries as a lazy generator that only
+        # requests the next page when iteration reaches it
+        info = ydl.extract_info(url, download=False, process=False)
+        total = info.get("playlist_count") or 0
+        for seen, entry in enumerate(info.get("entries") or [], start=1):
+            if on_progress:
+                on_progress(seen, max(total, seen))
+            yield entry
+
+
+def _entry_to_track(entry: dict) -> Track:
+    return Track(
+        video_id=entry["id"],
+        title=entry.get("title", "Unknown"),
+        channel=entry.get("uploader", entry.get("channel", "Unknown")),
+        duration=entry.get("duration") or 0,
+    )
+
+
+def fetch_metadata(video_id: str, cookie_file: str = DEFAULT_COOKIE_FILE) -> TrackMetadata:
+    """Look up a video's music metadata (artist, track, album, year, thumbnail).
+
+    Builds a one-off YoutubeDL; SessionPool.fetch_metadata reuses instances.
+    """
+    ydl_opts = {
+        "cookiefile": cookie_file,
+        "js_runtimes": _JS_RUNTIMES,
+        "quiet": True,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        return resolve_metadata(ydl, video_id)
+
+
+def resolve_metadata(ydl: yt_dlp.YoutubeDL, video_id: str) -> TrackMetadata:
+    """fetch_metadata on an existing YoutubeDL."""
+    # process=False stops after the extractor: no format selection, which
+    # is where most of a full extraction's time goes
+    info = ydl.extract_info(video_url(video_id), download=False, process=False)
+    return _info_to_metadata(info)
+
+
+def _info_to_metadata(info: dict) -> TrackMetadata:
+    artists = info.get("artists") or info.get("creators") or []
+    artist = info.get("artist") or info.get("creator") or (", ".join(artists) or None)
+    year = info.get("release_year")
+    if year is None:
+        m = _YEAR_RE.match(str(info.get("release_date") or ""))
+        year = int(m.group(1)) if m else None
+    thumbnail = info.get("thumbnail")
+    if thumbnail is None and info.get("thumbnails"):
+        # Unprocessed results list every size; take the one yt-dlp would prefer
+        best = max(
+            info["thumbnails"],
+            key=lambda t: (t.get("preference") or 0, t.get("width") or 0),
+        )
+        thumbnail = best.get("url")
+    return TrackMetadata(
+        artist=artist,
+        track=info.get("track"),
+        album=info.get("album"),
+        release_year=year,
+        thumbnail=thumbnail,
+    )
+
+
+def fetch_audio(
     video_id: str,
-    artist: str,
-    title: str,
     downloads_dir: str = "downloads",
     cookie_file: str = DEFAULT_COOKIE_FILE,
     progress_hook: Callable | None = None,
 ) -> str:
-    """Download a YouTube video as MP3. Returns the output filepath."""
-    filename = sanitize_filename(artist, title)
-    # yt-dlp adds the extension via postprocessor, so strip .mp3 from outtmpl
-    stem = filename.removesuffix(".mp3")
-    output_path = os.path.join(downloads_dir, stem)
+    """Download the best audio stream without converting it. Returns the raw filepath.
 
+    Builds a one-off YoutubeDL; use scraper.session.SessionPool to reuse
+    instances across many downloads.
+    """
     ydl_opts = {
         "cookiefile": cookie_file,
         "js_runtimes": _JS_RUNTIMES,
         "format": "bestaudio/best",
-        "outtmpl": output_path,
+        "outtmpl": raw_outtmpl(video_id, downloads_dir),
+        "continuedl": True,
         "quiet": True,
-        "postprocessors": [
-            {
-                "key": "FFmpegExtractAudio",
-                "preferredcodec": "mp3",
-            }
-        ],
     }
 
     if progress_hook is not None:
         ydl_opts["progress_hooks"] = [progress_hook]
 
-    url = f"https://www.youtube.com/watch?v={video_id}"
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        ydl.download([url])
+        info = ydl.extract_info(video_url(video_id), download=True)
+        return downloaded_path(ydl, info)
+
+
+def stream_audio(
+    video_id: str,
+    dst_for: Callable[[str], str],
+    output_format: OutputFormat = OutputFormat(),
+    cookie_file: str = DEFAULT_COOKIE_FILE,
+    progress_hook: Callable | None = None,
+    cancelled: threading.Event | None = None,
+) -> str:
+    """Download the best audio stream straight into its final file. Returns the filepath.
+
+    Builds a one-off YoutubeDL; see stream_to_file for the details and
+    scraper.session.SessionPool for the reusable version.
+    """
+    ydl_opts = {
+        "cookiefile": cookie_file,
+        "js_runtimes": _JS_RUNTIMES,
+        "format": "bestaudio/best",
+        "quiet": True,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        return stream_to_file(ydl, video_id, dst_for, output_format, progress_hook, cancelled)
+
+
+def stream_to_file(
+    ydl: yt_dlp.YoutubeDL,
+    video_id: str,
+    dst_for: Callable[[str], str],
+    output_format: OutputFormat,
+    progress_hook: Callable | None = None,
+    cancelled: threading.Event | None = None,
+) -> str:
+    """Pipe a video's audio stream through a StreamEncoder as it downloads.
+
+    dst_for maps the served extension (such as "webm") to the output path.
+    Nothing but the .part of that path touches the disk, and it is removed
+    if the download fails or cancelled is set. progress_hook gets the same
+    "downloading" dicts a yt-dlp download would send. Raises
+    StreamingUnsupported, before anything is written, for formats that
+    are not a single HTTP resource.
+    """
+    info = ydl.extract_info(video_url(video_id), download=False)
+    if info.get("protocol") not in _STREAMABLE_PROTOCOLS or not info.get("url"):
+        raise StreamingUnsupported(f"{info.get('protocol') or 'unknown'} streams can't be piped")
+    dst = dst_for(info.get("ext") or "")
+    with StreamEncoder(dst, output_format, info.get("ext") or "") as encoder:
+        downloaded = 0
+        for chunk, total in _iter_stream(ydl, info, cancelled):
+            encoder.write(chunk)
+            downloaded += len(chunk)
+            if progress_hook is not None:
+                progress_hook(
+                    {
+                        "status": "downloading",
+                        "downloaded_bytes": downloaded,
+                        "total_bytes": total,
+                        "filename": dst,
+                    }
+                )
+        path = encoder.finish()
+    if progress_hook is not None:
+        progress_hook({"status": "finished", "downloaded_bytes": downloaded, "filename": path})
+    return path
+
 
-    return os.path.join(downloads_dir, filename)
+def fetch_preview(
+    video_id: str, cookie_file: str = DEFAULT_COOKIE_FILE, max_bytes: int = PREVIEW_BYTES
+) -> bytes:
+    """The first max_bytes of a video's best audio stream, as served.
+
+    Builds a one-off YoutubeDL; see read_preview.
+    """
+    ydl_opts = {
+        "cookiefile": cookie_file,
+        "js_runtimes": _JS_RUNTIMES,
+        "format": "bestaudio/best",
+        "quiet": True,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        return read_preview(ydl, video_id, max_bytes)
+
+
+def read_preview(ydl: yt_dlp.YoutubeDL, video_id: str, max_bytes: int = PREVIEW_BYTES) -> bytes:
+    """The start of a video's audio stream in a single ranged request.
+
+    Enough to fingerprint a track without downloading it. Raises
+    StreamingUnsupported for formats that are not a single HTTP resource.
+    """
+    info = ydl.extract_info(video_url(video_id), download=False)
+    if info.get("protocol") not in _STREAMABLE_PROTOCOLS or not info.get("url"):
+        raise StreamingUnsupported(f"{info.get('protocol') or 'unknown'} streams can't be read")
+    headers = dict(info.get("http_headers") or {})
+    request = Request(info["url"], headers={**headers, "Range": f"bytes=0-{max_bytes - 1}"})
+    with ydl.urlopen(request) as response:
+        # A server that ignores the range would send the whole file
+        return response.read(max_bytes)
+
+
+def _iter_stream(
+    ydl: yt_dlp.YoutubeDL, info: dict, cancelled: threading.Event | None
+) -> Iterator[tuple[bytes, int | None]]:
+    """Yield (chunk, total size if known) for a format's URL, in ranged requests."""
+    headers = dict(info.get("http_headers") or {})
+    chunk_size = (info.get("downloader_options") or {}).get("http_chunk_size") or STREAM_CHUNK_SIZE
+    total = info.get("filesize")
+    position = 0
+    while total is None or position < total:
+        end = position + chunk_size - 1
+        if total is not None:
+            end = min(end, total - 1)
+        request = Request(info["url"], headers={**headers, "Range": f"bytes={position}-{end}"})
+        requested, received = end - position + 1, 0
+        with ydl.urlopen(request) as response:
+            whole = response.status == 200
+            if whole:
+                if position:
+                    raise ConnectionError("server ignored the Range header mid-stream")
+                length = response.headers.get("Content-Length")
+                total = int(length) if length else None
+            elif total is None:
+                m = _CONTENT_RANGE_TOTAL_RE.search(response.headers.get("Content-Range") or "")
+                total = int(m.group(1)) if m else None
+            while data := response.read(_STREAM_READ_SIZE):
+                if cancelled is not None and cancelled.is_set():
+                    raise DownloadCancelled(info.get("id") or "")
+                position += len(data)
+                received += len(data)
+                yield data, total
+        # Without a known size, a short range is the end of the stream
+        if whole or received == 0 or (total is None and received < requested):
+            break
+    if total is not None and position < total:
+        raise ConnectionError(f"IncompleteRead: stream ended at {position} of {total} bytes")
+
+
+def video_url(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def raw_outtmpl(video_id: str, downloads_dir: str = "downloads") -> str:
+    """Output template for a raw download: a hidden subfolder, named by video ID."""
+    return os.path.join(downloads_dir, RAW_SUBDIR, f"{video_id}.%(ext)s")
+
+
+def downloaded_path(ydl: yt_dlp.YoutubeDL, info: dict) -> str:
+    """Filepath yt-dlp wrote for a processed download."""
+    downloads = info.get("requested_downloads") or []
+    if downloads and downloads[0].get("filepath"):
+        return downloads[0]["filepath"]
+    return ydl.prepare_filename(info)
+
+
+def output_path(
+    artist: str,
+    title: str,
+    downloads_dir: str = "downloads",
+    extension: str = ".mp3",
+    suffix: str = "",
+) -> str:
+    """Final filepath for a track."""
+    return os.path.join(downloads_dir, sanitize_filename(artist, title, extension, suffix))
@@ -0,0 +1,159 @@
+import os
+
+import numpy as np
+import pytest
+
+from scraper import analysis
+from scraper.analysis import (
+    SAMPLE_RATE,
+    analyse_pcm,
+    convert_analysed,
+    gain,
+    trim_range,
+)
+from scraper.models import AudioAnalysis
+from scraper.transcode import OutputFormat, OutputMode, TranscodeError
+
+
+def _tone(seconds, amplitude=0.1, frequency=1000):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    mono = amplitude * np.sin(2 * np.pi * frequency * t)
+    return np.column_stack([mono, mono])
+
+
+def _silence(seconds):
+    return np.zeros((int(seconds * SAMPLE_RATE), 2))
+
+
+def _write_pcm(path, samples):
+    samples.astype("<f4").tofile(path)
+    return str(path)
+
+
+def test_loudness_of_a_sine_matches_bs1770(tmp_path):
+    # A 1 kHz sine at -20 dBFS RMS per channel reads -20 LUFS on a mono
+    # meter; in stereo both channels add up, so -17 LUFS here
+    pcm = _write_pcm(tmp_path / "a.pcm", _tone(5, amplitude=0.1 * np.sqrt(2)))
+
+    result = analyse_pcm(pcm)
+
+    assert result.loudness == pytest.approx(-17.0, abs=0.1)
+    assert result.peak == pytest.approx(-16.99, abs=0.01)
+    assert result.duration == pytest.approx(5.0)
+    assert (result.leading_silence, result.trailing_silence) == (0.0, 0.0)
+
+
+def test_low_frequencies_are_weighted_down(tmp_path):
+    low = analyse_pcm(_write_pcm(tmp_path / "low.pcm", _tone(3, frequency=40)))
+    mid = analyse_pcm(_write_pcm(tmp_path / "mid.pcm", _tone(3, frequency=1000)))
+
+    assert low.peak == pytest.approx(mid.peak, abs=0.01)
+    assert mid.loudness - low.loudness > 1.0
+
+
+def test_silence_is_measured_at_each_end_and_gated_out(tmp_path):
+    samples = np.concatenate([_silence(2), _tone(60), _silence(1.5)])
+    pcm = _write_pcm(tmp_path / "a.pcm", samples)
+
+    result = analyse_pcm(pcm)
+
+    assert result.leading_silence == pytest.approx(2.0)
+    assert result.trailing_silence == pytest.approx(1.5)
+    # The silent blocks don't drag the loudness down
+    tone_only = analyse_pcm(_write_pcm(tmp_path / "b.pcm", _tone(60)))
+    assert result.loudness == pytest.approx(tone_only.loudness, abs=0.05)
+
+
+def test_silent_and_tiny_files_have_no_loudness(tmp_path):
+    silent = analyse_pcm(_write_pcm(tmp_path / "silent.pcm", _silence(3)))
+    tiny = analyse_pcm(_write_pcm(tmp_path / "tiny.pcm", _tone(0.01)))
+
+    assert silent.loudness is None
+    assert silent.leading_silence == pytest.approx(3.0)
+    assert tiny.loudness is None
+    assert trim_range(silent) == (0.0, 3.0)
+
+
+def test_gain_is_capped_below_clipping():
+    quiet = AudioAnalysis(100.0, -24.0, -12.0)
+    peaky = AudioAnalysis(100.0, -24.0, -3.0)
+
+    assert gain(quiet, -14.0) == pytest.approx(10.0)
+    assert gain(peaky, -14.0) == pytest.approx(2.0)
+    assert gain(AudioAnalysis(100.0, -8.0, -0.1), -14.0) == pytest.approx(-6.0)
+    assert gain(AudioAnalysis(3.0, None, -80.0), -14.0) == 0.0
+
+
+def test_only_long_silences_are_trimmed():
+    result = AudioAnalysis(100.0, -14.0, -1.0, leading_silence=2.0, trailing_silence=0.3)
+
+    assert trim_range(result) == pytest.approx((1.9, 100.0))
+
+
+class _FakeFFmpeg:
+    """Writes synthetic PCM for the decode and a stub file for the encode."""
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.commands = []
+
+    def __call__(self, cmd, **kwargs):
+        self.commands.append(cmd)
+        if cmd[-2:-1] == ["f32le"]:
+            _write_pcm(cmd[-1], self.samples)
+        else:
+            with open(cmd[-1], "wb") as f:
+                f.write(b"encoded")
+        return type("Proc", (), {"returncode": 0, "stderr": ""})()
+
+
+def test_decodes_once_and_encodes_from_the_pcm(tmp_path, monkeypatch):
+    fake = _FakeFFmpeg(np.concatenate([_silence(2), _tone(10)]))
+    monkeypatch.setattr(analysis.subprocess, "run", fake)
+    monkeypatch.setattr("scraper.transcode.subprocess.run", fake)
+    src = str(tmp_path / "raw.webm")
+    open(src, "wb").close()
+    output_format = OutputFormat(OutputMode.OPUS, loudness=-14.0, trim_silence=True)
+
+    path, result = convert_analysed(src, str(tmp_path / "song.opus"), output_format=output_format)
+
+    assert path == str(tmp_path / "song.opus")
+    assert result.leading_silence == pytest.approx(2.0)
+    decode, encode = fake.commands
+    assert decode[decode.index("-i") + 1] == src
+    # The encode reads the decoded PCM, cut and turned up in one pass
+    assert encode[encode.index("-i") + 1] == str(tmp_path / "raw.pcm")
+    assert encode[encode.index("-ss") + 1] == "1.900"
+    assert encode[encode.index("-af") + 1] == f"volume={-14.0 - result.loudness:.2f}dB"
+    assert encode.index("-ss") < encode.index("-i")
+    assert not os.path.exists(tmp_path / "raw.pcm")
+
+
+def test_known_analysis_skips_the_decode(tmp_path, monkeypatch):
+    fake = _FakeFFmpeg(None)
+    monkeypatch.setattr(analysis.subprocess, "run", fake)
+    monkeypatch.setattr("scraper.transcode.subprocess.run", fake)
+    known = AudioAnalysis(100.0, -20.0, -10.0)
+
+    _, result = convert_analysed(
+        "raw.webm", str(tmp_path / "song.mp3"), known, OutputFormat(loudness=-14.0)
+    )
+
+    (encode,) = fake.commands
+    assert result is known
+    assert encode[encode.index("-i") + 1] == "raw.webm"
+    assert "-ss" not in encode
+    assert encode[encode.index("-af") + 1] == "volume=6.00dB"
+
+
+def test_decode_failure_raises_and_leaves_no_pcm(tmp_path, monkeypatch):
+    def fail(cmd, **kwargs):
+        open(cmd[-1], "wb").close()
+        return type("Proc", (), {"returncode": 1, "stderr": "Invalid data found\n"})()
+
+    monkeypatch.setattr(analysis.subprocess, "run", fail)
+    src = str(tmp_path / "raw.webm")
+
+    with pytest.raises(TranscodeError, match="Invalid data found"):
+        convert_analysed(src, str(tmp_path / "song.mp3"), output_format=OutputFormat(loudness=-5))
+    assert not os.path.exists(tmp_path / "raw.pcm")
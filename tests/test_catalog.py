@@ -0,0 +1,70 @@
+import sqlite3
+
+from scraper.catalog import CatalogEntry, LibraryCatalog
+
+
+def _catalog(tmp_path):
+    return LibraryCatalog(str(tmp_path / "library.db"))
+
+
+def test_add_and_get(tmp_path):
+    catalog = _catalog(tmp_path)
+    catalog.add(CatalogEntry("v1", path="dl/a.mp3", size=10, channel="X"))
+
+    entry = catalog.get("v1")
+    assert entry.path == "dl/a.mp3"
+    assert entry.size == 10
+    assert entry.downloaded_at is not None
+    assert catalog.get("missing") is None
+    assert "v1" in catalog
+    assert "missing" not in catalog
+
+
+def test_add_replaces_existing_entry(tmp_path):
+    catalog = _catalog(tmp_path)
+    catalog.add(CatalogEntry("v1", path="old.mp3"))
+    catalog.add(CatalogEntry("v1", path="new.mp3"))
+
+    assert len(catalog) == 1
+    assert catalog.get("v1").path == "new.mp3"
+
+
+def test_add_ids_keeps_existing_entries(tmp_path):
+    catalog = _catalog(tmp_path)
+    catalog.add(CatalogEntry("v1", path="a.mp3"))
+    catalog.add_ids(["v1", "v2"])
+
+    assert catalog.video_ids() == {"v1", "v2"}
+    assert catalog.get("v1").path == "a.mp3"
+
+
+def test_lookups(tmp_path):
+    catalog = _catalog(tmp_path)
+    catalog.add(CatalogEntry("v1", path="a.mp3", size=5, channel="X", downloaded_at=100.0))
+    catalog.add(CatalogEntry("v2", path="b.mp3", size=7, channel="Y", downloaded_at=200.0))
+    catalog.add(CatalogEntry("v3", path="c.mp3", size=None, channel="X", downloaded_at=300.0))
+
+    assert [e.video_id for e in catalog.by_channel("X")] == ["v1", "v3"]
+    assert catalog.by_path("b.mp3").video_id == "v2"
+    assert catalog.by_path("zzz.mp3") is None
+    assert [e.video_id for e in catalog.downloaded_between(150.0, 300.0)] == ["v2"]
+    assert catalog.total_size() == 12
+
+
+def test_indexes_exist(tmp_path):
+    _catalog(tmp_path).close()
+    conn = sqlite3.connect(str(tmp_path / "library.db"))
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    assert {"idx_tracks_channel", "idx_tracks_downloaded_at", "idx_tracks_path"} <= names
+
+
+def test_meta_and_reopen(tmp_path):
+    catalog = _catalog(tmp_path)
+    catalog.set_meta("k", "v")
+    catalog.add(CatalogEntry("v1"))
+    catalog.close()
+
+    reopened = _catalog(tmp_path)
+    assert reopened.get_meta("k") == "v"
+    assert reopened.get_meta("other") is None
+    assert reopened.video_ids() == {"v1"}
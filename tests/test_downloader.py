@@ -0,0 +1,747 @@
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from scraper.downloader import BatchDownloader
+from scraper.enrich import MetadataCache
+from scraper.filename import sanitize_filename
+from scraper.fingerprint import FingerprintIndex
+from scraper.jobqueue import JobQueue, JobState
+from scraper.metrics import PHASES, BatchMetrics
+from scraper.models import AudioAnalysis, Track, TrackMetadata
+from scraper.progress import JobStatus, ProgressBus
+from scraper.retry import RetryPolicy, TokenBucket
+from scraper.scheduling import JobOrder, SchedulePolicy
+from scraper.tracker import ProgressTracker
+from scraper.transcode import OutputFormat, OutputMode
+from scraper.ytdlp_client import DownloadCancelled, StreamingUnsupported
+
+
+def _tracks(n):
+    return [Track(f"v{i}", f"Song {i}", "Artist", 100) for i in range(n)]
+
+
+def _fake_fetch(video_id, downloads_dir, cookie_file, progress_hook):
+    if progress_hook:
+        progress_hook({"status": "finished"})
+    raw = os.path.join(downloads_dir, f"{video_id}.webm")
+    with open(raw, "wb") as f:
+        f.write(b"x" * 10)
+    return raw
+
+
+def _fake_transcode(src, dst):
+    with open(dst, "wb") as f:
+        f.write(b"mp3")
+    return dst
+
+
+def _unlimited():
+    return TokenBucket(rate=1e9, capacity=1e9, max_rate=1e9)
+
+
+def _downloader(tmp_path, tracker, **kwargs):
+    kwargs.setdefault("fetch", _fake_fetch)
+    kwargs.setdefault("transcode", _fake_transcode)
+    kwargs.setdefault("transcode_workers", 2)
+    kwargs.setdefault("transcode_executor", ThreadPoolExecutor(max_workers=2))
+    kwargs.setdefault("retry_policy", RetryPolicy(max_attempts=1))
+    kwargs.setdefault("rate_limiter", _unlimited())
+    return BatchDownloader(tracker, downloads_dir=str(tmp_path), **kwargs)
+
+
+def test_downloads_all_tracks_and_marks_tracker(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    tracker.load()
+    downloader = _downloader(tmp_path, tracker, max_workers=3)
+
+    results = downloader.run(_tracks(20))
+
+    assert len(results) == 20
+    assert all(r.ok for r in results)
+    assert all(tracker.is_downloaded(f"v{i}") for i in range(20))
+    assert os.path.isfile(tmp_path / "Artist - Song 0.mp3")
+    # Raw files are removed once transcoded
+    assert not os.path.exists(tmp_path / "v0.webm")
+
+    reloaded = ProgressTracker(str(tmp_path))
+    reloaded.load()
+    assert all(reloaded.is_downloaded(f"v{i}") for i in range(20))
+
+
+def test_runs_fetches_concurrently_up_to_limit(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+    barrier = threading.Barrier(3, timeout=5)
+
+    def fetch(video_id, **kwargs):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+        with lock:
+            active -= 1
+        return video_id
+
+    _downloader(tmp_path, tracker, max_workers=3, fetch=fetch).run(_tracks(9))
+
+    assert peak == 3
+
+
+def test_errors_are_recorded_per_stage(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+
+    def fetch(video_id, **kwargs):
+        if video_id == "v1":
+            raise RuntimeError("network boom")
+        return video_id
+
+    def transcode(src, dst):
+        if src == "v3":
+            raise RuntimeError("ffmpeg boom")
+        return dst
+
+    downloader = _downloader(tmp_path, tracker, max_workers=2, fetch=fetch, transcode=transcode)
+    downloader.run(_tracks(5))
+
+    errors = {r.track.video_id: r.error for r in downloader.errors}
+    assert errors == {"v1": "network boom", "v3": "ffmpeg boom"}
+    assert not tracker.is_downloaded("v1")
+    assert not tracker.is_downloaded("v3")
+    assert tracker.is_downloaded("v2")
+
+
+def test_slots_are_unique_among_active_fetches(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    lock = threading.Lock()
+    active_slots: set[int] = set()
+    clashes = []
+
+    def on_start(slot, track):
+        with lock:
+            if slot in active_slots:
+                clashes.append(slot)
+            active_slots.add(slot)
+
+    def on_fetched(slot, track):
+        with lock:
+            active_slots.discard(slot)
+
+    done = []
+    downloader = _downloader(
+        tmp_path,
+        tracker,
+        max_workers=4,
+        on_job_start=on_start,
+        on_job_fetched=on_fetched,
+        on_job_done=done.append,
+    )
+    downloader.run(_tracks(50))
+
+    assert clashes == []
+    assert active_slots == set()
+    assert len(done) == 50
+
+
+def test_progress_callback_receives_slot(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    seen = []
+    downloader = _downloader(
+        tmp_path,
+        tracker,
+        max_workers=1,
+        on_job_progress=lambda slot, d: seen.append((slot, d["status"])),
+    )
+    downloader.run(_tracks(2))
+
+    assert seen == [(0, "finished"), (0, "finished")]
+
+
+def test_handoff_queue_is_bounded(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    release = threading.Event()
+    peak_queued = 0
+    downloader = None
+
+    def transcode(src, dst):
+        release.wait(timeout=5)
+        return dst
+
+    def fetch(video_id, **kwargs):
+        nonlocal peak_queued
+        peak_queued = max(peak_queued, downloader.stats()["transcode"].queued)
+        return video_id
+
+    downloader = _downloader(
+        tmp_path,
+        tracker,
+        max_workers=1,
+        fetch=fetch,
+        transcode=transcode,
+        transcode_workers=1,
+        queue_size=2,
+    )
+    # Fetching stalls on the full queue until the transcoder is let go
+    threading.Timer(0.2, release.set).start()
+    downloader.run(_tracks(10))
+
+    assert peak_queued == 2
+    assert len(downloader.results) == 10
+
+
+def test_stage_stats_after_run(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    downloader = _downloader(tmp_path, tracker, max_workers=2)
+    downloader.run(_tracks(6))
+
+    stats = downloader.stats()
+    assert stats["fetch"].completed == 6
+    assert stats["fetch"].queued == 0
+    assert stats["fetch"].bytes == 60
+    assert stats["transcode"].completed == 6
+    assert stats["transcode"].active == 0
+    assert stats["transcode"].tracks_per_sec > 0
+
+
+def test_rejects_zero_workers(tmp_path):
+    with pytest.raises(ValueError):
+        BatchDownloader(ProgressTracker(str(tmp_path)), max_workers=0)
+
+
+def test_transient_failures_are_requeued(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    attempts = {}
+    retried = []
+
+    def fetch(video_id, **kwargs):
+        attempts[video_id] = attempts.get(video_id, 0) + 1
+        if video_id == "v1" and attempts[video_id] < 3:
+            raise RuntimeError("HTTP Error 503: Service Unavailable")
+        return video_id
+
+    downloader = _downloader(
+        tmp_path,
+        tracker,
+        max_workers=2,
+        fetch=fetch,
+        retry_policy=RetryPolicy(max_attempts=5, base_delay=0.01),
+        on_job_retry=lambda slot, track, delay, error: retried.append(track.video_id),
+    )
+    downloader.run(_tracks(3))
+
+    assert attempts["v1"] == 3
+    assert retried == ["v1", "v1"]
+    assert downloader.errors == []
+    assert tracker.is_downloaded("v1")
+    assert downloader.stats()["fetch"].retries == 2
+
+
+def test_permanent_failures_are_not_retried(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    attempts = []
+
+    def fetch(video_id, **kwargs):
+        attempts.append(video_id)
+        raise RuntimeError("ERROR: [youtube] v0: Video unavailable")
+
+    downloader = _downloader(
+        tmp_path,
+        tracker,
+        fetch=fetch,
+        retry_policy=RetryPolicy(max_attempts=5, base_delay=0.01),
+    )
+    downloader.run(_tracks(1))
+
+    assert attempts == ["v0"]
+    assert len(downloader.errors) == 1
+
+
+def test_gives_up_after_max_attempts(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    attempts = []
+
+    def fetch(video_id, **kwargs):
+        attempts.append(video_id)
+        raise TimeoutError("read timed out")
+
+    downloader = _downloader(
+        tmp_path,
+        tracker,
+        fetch=fetch,
+        retry_policy=RetryPolicy(max_attempts=3, base_delay=0.01),
+    )
+    downloader.run(_tracks(1))
+
+    assert attempts == ["v0", "v0", "v0"]
+    assert downloader.errors[0].error == "read timed out"
+
+
+def test_job_queue_records_each_outcome(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    job_queue = JobQueue(tracker.catalog)
+    states = []
+
+    def fetch(video_id, downloads_dir, **kwargs):
+        states.append((video_id, "fetch", job_queue.state(video_id)))
+        if video_id == "v1":
+            raise RuntimeError("ERROR: Video unavailable")
+        return _fake_fetch(video_id, downloads_dir, None, None)
+
+    def transcode(src, dst):
+        video_id = os.path.splitext(os.path.basename(src))[0]
+        states.append((video_id, "transcode", job_queue.state(video_id)))
+        return _fake_transcode(src, dst)
+
+    downloader = _downloader(
+        tmp_path, tracker, max_workers=1, fetch=fetch, transcode=transcode, job_queue=job_queue
+    )
+    downloader.run(_tracks(2))
+
+    # v0's transcode and v1's fetch run on different threads, in either order
+    assert sorted(states) == [
+        ("v0", "fetch", JobState.DOWNLOADING),
+        ("v0", "transcode", JobState.TRANSCODING),
+        ("v1", "fetch", JobState.DOWNLOADING),
+    ]
+    # Finished and failed jobs are forgotten once the batch completes
+    assert job_queue.counts() == {}
+
+
+def test_resumes_from_raw_file_of_interrupted_run(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    job_queue = JobQueue(tracker.catalog)
+    tracks = _tracks(2)
+    job_queue.enqueue(tracks)
+    raw = _fake_fetch("v0", str(tmp_path), None, None)
+    job_queue.set_state("v0", JobState.TRANSCODING, raw_path=raw)
+    fetched = []
+
+    def fetch(video_id, downloads_dir, **kwargs):
+        fetched.append(video_id)
+        return _fake_fetch(video_id, downloads_dir, None, None)
+
+    downloader = _downloader(tmp_path, tracker, fetch=fetch, job_queue=job_queue)
+    results = downloader.run(job_queue.unfinished())
+
+    assert fetched == ["v1"]
+    assert all(r.ok for r in results)
+    assert tracker.is_downloaded("v0") and tracker.is_downloaded("v1")
+    assert not os.path.exists(raw)
+
+
+
+def test_progress_bus_sees_bytes_and_every_result(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+
+    def fetch(video_id, downloads_dir, cookie_file, progress_hook):
+        progress_hook({"status": "downloading", "downloaded_bytes": 5, "total_bytes": 10})
+        if video_id == "v1":
+            raise RuntimeError("boom")
+        return _fake_fetch(video_id, downloads_dir, cookie_file, progress_hook)
+
+    bus = ProgressBus()
+    downloader = _downloader(tmp_path, tracker, fetch=fetch, max_workers=2, progress=bus)
+    downloader.run(_tracks(4))
+    snapshot = bus.flush()
+
+    assert sorted(j.video_id for j in snapshot.finished) == ["v0", "v1", "v2", "v3"]
+    failed = [j for j in snapshot.finished if j.status is JobStatus.FAILED]
+    assert [(j.video_id, j.error) for j in failed] == [("v1", "boom")]
+    assert (snapshot.batch.done, snapshot.batch.failed, snapshot.batch.finished) == (3, 1, True)
+    assert bus.active_jobs() == []
+
+
+def test_metrics_cover_every_phase(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    job_queue = JobQueue(tracker.catalog)
+    attempts = {}
+
+    def fetch(video_id, downloads_dir, cookie_file, progress_hook):
+        attempts[video_id] = attempts.get(video_id, 0) + 1
+        if video_id == "v1" and attempts[video_id] == 1:
+            raise ConnectionError("reset")
+        progress_hook({"status": "downloading", "downloaded_bytes": 5, "total_bytes": 10})
+        return _fake_fetch(video_id, downloads_dir, cookie_file, progress_hook)
+
+    metrics = BatchMetrics(trace_path=str(tmp_path / "trace.jsonl"))
+    downloader = _downloader(
+        tmp_path,
+        tracker,
+        fetch=fetch,
+        job_queue=job_queue,
+        metrics=metrics,
+        retry_policy=RetryPolicy(max_attempts=2, base_delay=0, max_delay=0),
+    )
+    downloader.run(_tracks(2))
+
+    timings = {t.video_id: t for t in metrics.tracks()}
+    assert {s.phase for s in timings["v0"].spans} == set(PHASES)
+    assert (timings["v0"].status, timings["v0"].retries) == ("done", 0)
+    assert (timings["v0"].bytes_downloaded, timings["v0"].bytes_written) == (10, 3)
+    # The failed first attempt only got as far as extraction
+    assert timings["v1"].retries == 1
+    assert [s.attempt for s in timings["v1"].spans if s.phase == "extract"] == [1, 2]
+    assert [s.attempt for s in timings["v1"].spans if s.phase == "network"] == [2]
+    types = [json.loads(line)["type"] for line in open(tmp_path / "trace.jsonl")]
+    assert (types[0], types[-1], types.count("track")) == ("batch_start", "batch_end", 2)
+
+
+def test_native_output_keeps_the_downloaded_file(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    downloader = _downloader(
+        tmp_path, tracker, transcode=None, output_format=OutputFormat(OutputMode.NATIVE)
+    )
+
+    (result,) = downloader.run(_tracks(1))
+
+    assert result.path == str(tmp_path / "Artist - Song 0.webm")
+    assert os.path.isfile(result.path)
+    assert tracker.catalog.get("v0").output_format == "webm"
+
+
+def test_files_are_named_after_resolved_metadata(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    metadata = MetadataCache(tracker.catalog)
+    metadata.put("v0", TrackMetadata("Real Artist", "Real Song", "Album", 2020))
+    metadata.put("v1", TrackMetadata(album="Album only"))
+    downloader = _downloader(tmp_path, tracker, metadata=metadata)
+
+    results = downloader.run(_tracks(3))
+
+    assert sorted(os.path.basename(r.path) for r in results) == [
+        "Artist - Song 1.mp3",
+        "Artist - Song 2.mp3",
+        "Real Artist - Real Song.mp3",
+    ]
+
+
+def test_videos_of_the_same_song_get_their_own_files(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    metadata = MetadataCache(tracker.catalog)
+    for video_id in ("v0", "v1", "v2"):
+        metadata.put(video_id, TrackMetadata("Real Artist", "Real Song"))
+    # A file nobody in the catalog owns is left alone too
+    (tmp_path / "Artist - Song 3.mp3").write_bytes(b"mine")
+    downloader = _downloader(tmp_path, tracker, max_workers=1, metadata=metadata)
+
+    results = downloader.run(_tracks(4))
+
+    paths = {r.track.video_id: r.path for r in results}
+    assert {k: os.path.basename(v) for k, v in paths.items()} == {
+        "v0": "Real Artist - Real Song.mp3",
+        "v1": "Real Artist - Real Song [v1].mp3",
+        "v2": "Real Artist - Real Song [v2].mp3",
+        "v3": "Artist - Song 3 [v3].mp3",
+    }
+    assert (tmp_path / "Artist - Song 3.mp3").read_bytes() == b"mine"
+    assert {v: tracker.catalog.get(v).path for v in paths} == paths
+
+    # Downloading a video again reuses its own file
+    rerun = _downloader(tmp_path, tracker, max_workers=1, metadata=metadata).run(_tracks(2))
+    assert {r.track.video_id: r.path for r in rerun} == {v: paths[v] for v in ("v0", "v1")}
+
+
+def test_long_titles_of_the_same_song_keep_their_video_id(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    metadata = MetadataCache(tracker.catalog)
+    title = "Extended Mix " * 20
+    for video_id in ("v0", "v1", "v2"):
+        metadata.put(video_id, TrackMetadata("Real Artist", title))
+    first = sanitize_filename("Real Artist", title)
+    # Left behind by a run whose catalog is gone: not v2's to overwrite
+    (tmp_path / sanitize_filename("Real Artist", title, suffix=" [v2]")).write_bytes(b"old")
+    downloader = _downloader(tmp_path, tracker, max_workers=1, metadata=metadata)
+
+    results = downloader.run(_tracks(3))
+
+    names = {r.track.video_id: os.path.basename(r.path) for r in results}
+    assert names["v0"] == first
+    assert names["v1"] == first[: 200 - len(" [v1].mp3")].rstrip() + " [v1].mp3"
+    assert names["v2"].endswith(" [v2] (2).mp3")
+    assert all(len(name) <= 200 for name in names.values())
+    assert len(set(names.values())) == 3
+
+
+def test_finished_files_are_tagged_with_their_metadata(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    metadata = MetadataCache(tracker.catalog)
+    metadata.put("v0", TrackMetadata("Real Artist", "Real Song"))
+    tagged = []
+
+    class _Tagger:
+        def tag(self, path, track, metadata):
+            tagged.append((os.path.basename(path), track.video_id, metadata.artist))
+            return True
+
+    downloader = _downloader(tmp_path, tracker, metadata=metadata, tagger=_Tagger())
+    downloader.run(_tracks(2))
+
+    assert sorted(tagged) == [
+        ("Artist - Song 1.mp3", "v1", None),
+        ("Real Artist - Real Song.mp3", "v0", "Real Artist"),
+    ]
+
+
+def test_finished_files_are_fingerprinted(tmp_path, monkeypatch):
+    tracker = ProgressTracker(str(tmp_path))
+    index = FingerprintIndex(tracker.catalog)
+    monkeypatch.setattr(
+        "scraper.fingerprint.fingerprint_file",
+        lambda path: np.full(3, 1 if path.endswith("Song 0.mp3") else 2, dtype=np.uint32),
+    )
+
+    downloader = _downloader(tmp_path, tracker, fingerprints=index)
+    downloader.run(_tracks(2))
+
+    assert list(index.get("v0")) == [1, 1, 1]
+    assert list(index.get("v1")) == [2, 2, 2]
+    assert index.unfingerprinted() == []
+
+
+def test_analysis_is_recorded_and_reused_on_the_next_run(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    analysed = AudioAnalysis(100.0, -9.0, -0.5, leading_silence=2.0)
+    known_seen = []
+
+    def transcode(src, dst, known):
+        known_seen.append(known)
+        _fake_transcode(src, dst)
+        return dst, known or analysed
+
+    output_format = OutputFormat(loudness=-14.0, trim_silence=True)
+    for _ in range(2):
+        downloader = _downloader(
+            tmp_path, tracker, transcode=transcode, output_format=output_format, streaming=True
+        )
+        (result,) = downloader.run(_tracks(1))
+        assert result.error is None
+
+    assert not downloader.streaming
+    assert known_seen == [None, analysed]
+    assert tracker.analysis("v0") == analysed
+
+
+def _fake_stream(video_id, dst_for, output_format, cookie_file, progress_hook, cancelled):
+    dst = dst_for("webm")
+    progress_hook({"status": "downloading", "downloaded_bytes": 4, "total_bytes": 8})
+    progress_hook({"status": "downloading", "downloaded_bytes": 8, "total_bytes": 8})
+    with open(dst, "wb") as f:
+        f.write(b"opus")
+    return dst
+
+
+def test_streaming_writes_only_the_final_files(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    job_queue = JobQueue(tracker.catalog)
+    metrics = BatchMetrics()
+    transcoded = []
+    downloader = _downloader(
+        tmp_path,
+        tracker,
+        stream=_fake_stream,
+        transcode=lambda src, dst: transcoded.append(src),
+        output_format=OutputFormat(OutputMode.OPUS),
+        job_queue=job_queue,
+        metrics=metrics,
+    )
+
+    results = downloader.run(_tracks(2))
+
+    assert sorted(r.path for r in results) == [
+        str(tmp_path / "Artist - Song 0.opus"),
+        str(tmp_path / "Artist - Song 1.opus"),
+    ]
+    assert transcoded == []
+    assert not (tmp_path / ".raw").exists()
+    assert tracker.catalog.get("v0").source_format == "webm"
+    assert job_queue.counts() == {}
+    timing = {t.video_id: t for t in metrics.tracks()}["v0"]
+    assert {s.phase for s in timing.spans} == {"extract", "network", "manifest"}
+    assert (timing.bytes_downloaded, timing.bytes_written) == (8, 4)
+    assert downloader.stats()["fetch"].bytes == 16
+
+
+def test_streaming_falls_back_for_formats_that_cannot_be_piped(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+
+    def stream(video_id, **kwargs):
+        if video_id == "v1":
+            raise StreamingUnsupported("m3u8_native streams can't be piped")
+        return _fake_stream(video_id, **kwargs)
+
+    downloader = _downloader(tmp_path, tracker, stream=stream)
+    results = {r.track.video_id: r for r in downloader.run(_tracks(2))}
+
+    assert results["v0"].path.endswith(".mp3") and results["v1"].ok
+    # v1 went through the raw file and the transcode queue
+    assert downloader.stats()["transcode"].completed == 1
+
+
+def test_cancel_stops_the_batch_and_keeps_jobs_for_the_next_run(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    job_queue = JobQueue(tracker.catalog)
+    downloader = None
+
+    def stream(video_id, dst_for, progress_hook, cancelled, **kwargs):
+        if video_id == "v0":
+            return _fake_stream(video_id, dst_for, None, None, progress_hook, cancelled)
+        part = dst_for("webm") + ".part"
+        open(part, "wb").close()
+        try:
+            downloader.cancel()
+            while True:
+                progress_hook({"status": "downloading", "downloaded_bytes": 1})
+        finally:
+            os.remove(part)
+
+    downloader = _downloader(tmp_path, tracker, max_workers=1, stream=stream, job_queue=job_queue)
+    results = downloader.run(_tracks(3))
+
+    assert downloader.cancelled
+    assert [(r.track.video_id, r.ok) for r in results] == [("v0", True)]
+    assert [p.name for p in tmp_path.glob("Artist - *")] == ["Artist - Song 0.mp3"]
+    assert [t.video_id for t in job_queue.unfinished()] == ["v1", "v2"]
+
+
+def test_jobs_start_in_schedule_order(tmp_path):
+    tracks = [Track(f"v{d}", f"Song {d}", "Artist", d) for d in (240, 10800, 0, 95)]
+
+    def started_order(order):
+        started = []
+
+        def fetch(video_id, **kwargs):
+            started.append(video_id)
+            return _fake_fetch(video_id, **kwargs)
+
+        tracker = ProgressTracker(str(tmp_path / order.value))
+        schedule = SchedulePolicy(order)
+        _downloader(tmp_path, tracker, max_workers=1, fetch=fetch, schedule=schedule).run(tracks)
+        return started
+
+    assert started_order(JobOrder.PLAYLIST) == ["v240", "v10800", "v0", "v95"]
+    # A track of unknown length counts as five minutes
+    assert started_order(JobOrder.SHORTEST) == ["v95", "v240", "v0", "v10800"]
+    assert started_order(JobOrder.LARGEST) == ["v10800", "v0", "v240", "v95"]
+
+
+def test_bandwidth_cap_is_shared_by_all_downloads(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+
+    def fetch(video_id, downloads_dir, cookie_file, progress_hook):
+        for chunk in range(1, 6):
+            progress_hook({"status": "downloading", "downloaded_bytes": chunk * 40_000})
+        return _fake_fetch(video_id, downloads_dir, cookie_file, None)
+
+    # 4 x 160 KB past the first chunks, with one second's 200 KB as a burst
+    schedule = SchedulePolicy(max_rate=200_000)
+    downloader = _downloader(tmp_path, tracker, max_workers=4, fetch=fetch, schedule=schedule)
+    started = time.monotonic()
+    results = downloader.run(_tracks(4))
+
+    assert all(r.ok for r in results)
+    assert time.monotonic() - started >= 2.0
+
+
+def _disk_free(monkeypatch, free):
+    monkeypatch.setattr(
+        "scraper.scheduling.shutil.disk_usage", lambda path: shutil._ntuple_diskusage(0, 0, free)
+    )
+
+
+def test_downloads_fail_when_the_disk_is_too_full(tmp_path, monkeypatch):
+    tracker = ProgressTracker(str(tmp_path))
+    fetched = []
+    _disk_free(monkeypatch, 500)
+
+    downloader = _downloader(
+        tmp_path,
+        tracker,
+        max_workers=2,
+        fetch=lambda video_id, **kwargs: fetched.append(video_id),
+        retry_policy=RetryPolicy(max_attempts=5, base_delay=0.01),
+        schedule=SchedulePolicy(min_free_space=1000),
+    )
+    results = downloader.run(_tracks(3))
+
+    assert fetched == []
+    assert len(results) == 3
+    assert all(r.error.startswith("not enough disk space: 500 B free") for r in results)
+    assert downloader.stats()["fetch"].failed == 3
+
+
+def test_downloads_wait_for_disk_space_while_others_are_in_flight(tmp_path, monkeypatch):
+    tracker = ProgressTracker(str(tmp_path))
+    job_queue = JobQueue(tracker.catalog)
+    paused = threading.Event()
+    fetched, changes = [], []
+    # Room for one 100 s track (about 2 MB) but not two
+    _disk_free(monkeypatch, 3_000_000)
+
+    def fetch(video_id, **kwargs):
+        fetched.append(video_id)
+        paused.wait(5)
+        downloader.cancel()
+        raise DownloadCancelled(video_id)
+
+    def on_disk_space(is_paused, free):
+        changes.append((is_paused, free))
+        paused.set()
+
+    downloader = _downloader(
+        tmp_path,
+        tracker,
+        max_workers=2,
+        fetch=fetch,
+        job_queue=job_queue,
+        schedule=SchedulePolicy(min_free_space=1000),
+        on_disk_space=on_disk_space,
+    )
+    results = downloader.run(_tracks(3))
+
+    assert results == [] and fetched == ["v0"]
+    assert changes == [(True, 3_000_000)]
+    assert len(job_queue.unfinished()) == 3
+
+
+def test_space_stays_reserved_until_the_transcode_is_done(tmp_path, monkeypatch):
+    tracker = ProgressTracker(str(tmp_path))
+    paused = threading.Event()
+    changes = []
+    # Room for one 100 s track (about 2 MB) but not two
+    _disk_free(monkeypatch, 3_000_000)
+
+    def transcode(src, dst):
+        # v0's raw file is on disk and no fetch is running: v1 has to wait
+        # for this transcode instead of failing
+        assert paused.wait(5)
+        return _fake_transcode(src, dst)
+
+    def on_disk_space(is_paused, free):
+        changes.append(is_paused)
+        paused.set()
+
+    downloader = _downloader(
+        tmp_path,
+        tracker,
+        max_workers=1,
+        transcode=transcode,
+        schedule=SchedulePolicy(min_free_space=1000),
+        on_disk_space=on_disk_space,
+    )
+    downloader.disk_guard.poll_interval = 0.01
+    results = downloader.run(_tracks(2))
+
+    assert sorted(r.track.video_id for r in results if r.ok) == ["v0", "v1"]
+    assert changes == [True, False]
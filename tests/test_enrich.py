@@ -0,0 +1,158 @@
+import threading
+
+import pytest
+
+from scraper.catalog import LibraryCatalog
+from scraper.enrich import Enricher, MetadataCache
+from scraper.models import TrackMetadata
+
+SONG = TrackMetadata("Artist", "Song", "Album", 2019, "https://i.ytimg.com/vi/v1/hq.jpg")
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _cache(tmp_path, **kwargs):
+    return MetadataCache(LibraryCatalog(str(tmp_path / "library.db")), **kwargs)
+
+
+def test_cache_round_trips_and_expires(tmp_path):
+    clock = _Clock()
+    cache = _cache(tmp_path, ttl=60, clock=clock)
+    cache.put("v1", SONG)
+    cache.put("v2", TrackMetadata())
+
+    assert cache.get("v1") == SONG
+    assert cache.get_many(["v1", "v2", "v3"]) == {"v1": SONG, "v2": TrackMetadata()}
+
+    clock.now += 61
+    assert cache.get("v1") is None
+    cache.put("v1", SONG)
+    assert cache.get_many(["v1", "v2"]) == {"v1": SONG}
+
+
+def test_cache_looks_up_more_ids_than_fit_in_one_query(tmp_path):
+    cache = _cache(tmp_path)
+    for i in range(0, 1200, 3):
+        cache.put(f"v{i}", SONG)
+
+    found = cache.get_many(f"v{i}" for i in range(1200))
+
+    assert set(found) == {f"v{i}" for i in range(0, 1200, 3)}
+
+
+def test_enricher_resolves_only_what_is_not_cached(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("v1", SONG)
+    resolved = []
+
+    def resolve(video_id):
+        resolved.append(video_id)
+        return TrackMetadata(artist=f"Artist {video_id}")
+
+    enricher = Enricher(cache, resolve, max_workers=2)
+    reported = []
+    result = enricher.enrich(["v1", "v2", "v3", "v2"], on_resolved=reported.append)
+    enricher.close()
+
+    assert sorted(resolved) == ["v2", "v3"]
+    assert (result.cached, result.resolved, result.errors) == (1, 2, {})
+    assert result.metadata["v3"] == TrackMetadata(artist="Artist v3")
+    # Cached entries are reported before any lookup finishes
+    assert reported[0] == {"v1": SONG}
+    assert {k: v for batch in reported for k, v in batch.items()} == result.metadata
+    assert cache.get("v2") == TrackMetadata(artist="Artist v2")
+
+
+def test_enricher_looks_up_concurrently(tmp_path):
+    barrier = threading.Barrier(3, timeout=5)
+
+    def resolve(video_id):
+        # Only returns once three lookups are running at the same time
+        barrier.wait()
+        return SONG
+
+    enricher = Enricher(_cache(tmp_path), resolve, max_workers=3)
+    result = enricher.enrich(["v1", "v2", "v3"])
+    enricher.close()
+
+    assert result.resolved == 3
+
+
+def test_failed_lookups_are_reported_and_not_cached(tmp_path):
+    cache = _cache(tmp_path)
+
+    def resolve(video_id):
+        if video_id == "v2":
+            raise RuntimeError("ERROR: Video unavailable")
+        return SONG
+
+    enricher = Enricher(cache, resolve)
+    result = enricher.enrich(["v1", "v2"])
+    enricher.close()
+
+    assert result.errors == {"v2": "ERROR: Video unavailable"}
+    assert set(result.metadata) == {"v1"}
+    assert cache.get("v2") is None
+
+
+def test_concurrent_requests_for_a_video_share_one_lookup(tmp_path):
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def resolve(video_id):
+        calls.append(video_id)
+        started.set()
+        release.wait(5)
+        return SONG
+
+    enricher = Enricher(_cache(tmp_path), resolve)
+    results = []
+    first = threading.Thread(target=lambda: results.append(enricher.enrich(["v1"])))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=lambda: results.append(enricher.enrich(["v1"])))
+    second.start()
+    release.set()
+    first.join(5)
+    second.join(5)
+    enricher.close()
+
+    assert calls == ["v1"]
+    assert [r.metadata for r in results] == [{"v1": SONG}, {"v1": SONG}]
+
+
+def test_close_drops_lookups_that_have_not_started(tmp_path):
+    release = threading.Event()
+    calls = []
+
+    def resolve(video_id):
+        calls.append(video_id)
+        release.wait(5)
+        return SONG
+
+    enricher = Enricher(_cache(tmp_path), resolve, max_workers=1)
+    results = []
+    worker = threading.Thread(target=lambda: results.append(enricher.enrich(["v1", "v2", "v3"])))
+    worker.start()
+    while not calls:
+        threading.Event().wait(0.01)
+    enricher.close()
+    release.set()
+    worker.join(5)
+
+    assert calls == ["v1"]
+    assert set(results[0].metadata) == {"v1"}
+    # Nothing more is looked up once closed
+    assert enricher.enrich(["v4"]).metadata == {}
+
+
+def test_rejects_zero_workers(tmp_path):
+    with pytest.raises(ValueError):
+        Enricher(_cache(tmp_path), lambda video_id: SONG, max_workers=0)
@@ -53,3 +53,22 @@ def test_control_chars_stripped():
     assert "\x00" not in result
     assert "\x1f" not in result
     assert result == "Artist - Title.mp3"
+
+
+def test_other_extensions():
+    assert sanitize_filename("Artist", "Title", ".opus") == "Artist - Title.opus"
+    assert sanitize_filename("Artist", "Title", "m4a") == "Artist - Title.m4a"
+    assert sanitize_filename("Artist", "Title", "") == "Artist - Title"
+
+
+def test_truncation_leaves_room_for_longer_extensions():
+    result = sanitize_filename("A" * 200, "B" * 200, ".opus")
+    assert len(result) <= 200
+    assert result == "A" * 195 + ".opus"
+
+
+def test_suffix_survives_truncation():
+    result = sanitize_filename("Artist", "B" * 300, suffix=" [abc123]")
+    assert len(result) == 200
+    assert result.endswith("B [abc123].mp3")
+    assert sanitize_filename("Artist", "Title", suffix=" [a/b]") == "Artist - Title [ab].mp3"
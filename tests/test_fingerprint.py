@@ -0,0 +1,210 @@
+import functools
+import threading
+
+import numpy as np
+import pytest
+
+from scraper.catalog import CatalogEntry, LibraryCatalog
+from scraper.fingerprint import (
+    SAMPLE_RATE,
+    DuplicateFinder,
+    FingerprintIndex,
+    fingerprint_bytes,
+    fingerprint_pcm,
+)
+from scraper.transcode import TranscodeError
+
+_NOTES = np.array([220, 262, 294, 330, 392, 440, 523, 587, 659, 784, 880, 1047, 1175, 1319])
+
+
+@functools.cache
+def _song(seed, seconds=40):
+    """A melody of decaying quarter-second notes over a little noise."""
+    rng = np.random.default_rng(seed)
+    note = SAMPLE_RATE // 4
+    count = seconds * 4
+    t = np.arange(note) / SAMPLE_RATE
+    freqs = rng.choice(_NOTES, count)[:, None]
+    notes = (0.3 * np.sin(2 * np.pi * freqs * t) + 0.15 * np.sin(4 * np.pi * freqs * t)) * np.exp(
+        -t / 0.1
+    )
+    return (notes.ravel() + 0.02 * rng.standard_normal(count * note)).astype(np.float32)
+
+
+def _reupload(samples, intro_seconds, seconds=30):
+    """The same audio behind a spoken intro, quieter and noisier, cut short."""
+    rng = np.random.default_rng(99)
+    intro = 0.05 * rng.standard_normal(int(intro_seconds * SAMPLE_RATE))
+    body = 0.5 * samples + 0.01 * rng.standard_normal(len(samples))
+    return np.concatenate([intro, body])[: seconds * SAMPLE_RATE]
+
+
+@functools.cache
+def _fingerprint(seed):
+    return fingerprint_pcm(_song(seed))
+
+
+def _index(tmp_path):
+    return FingerprintIndex(LibraryCatalog(str(tmp_path / "library.db")))
+
+
+def test_fingerprints_are_compact():
+    hashes = _fingerprint(1)
+
+    assert hashes.dtype == np.uint32
+    # About 43 sub-fingerprints a second
+    assert len(hashes) == pytest.approx(40 * SAMPLE_RATE / 128, rel=0.02)
+    assert len(fingerprint_pcm(np.zeros(100))) == 0
+
+
+def test_a_reupload_matches_at_its_offset(tmp_path):
+    index = _index(tmp_path)
+    index.add("official", _fingerprint(1))
+    index.add("other", _fingerprint(2))
+
+    matches = index.match(fingerprint_pcm(_reupload(_song(1), intro_seconds=3.71)))
+
+    assert [m.video_id for m in matches] == ["official"]
+    assert matches[0].similarity > 0.75
+    # The reupload starts 3.71 s before the official audio does
+    assert matches[0].offset == pytest.approx(-3.71, abs=0.05)
+
+
+def test_unrelated_audio_and_the_query_itself_do_not_match(tmp_path):
+    index = _index(tmp_path)
+    for seed in range(1, 6):
+        index.add(f"v{seed}", _fingerprint(seed))
+
+    assert index.match(_fingerprint(6)) == []
+    assert index.match(_fingerprint(3), exclude="v3") == []
+    assert index.match(_fingerprint(1)[:100]) == []
+
+
+def test_previews_never_replace_a_full_fingerprint(tmp_path):
+    index = _index(tmp_path)
+    index.add("v1", _fingerprint(1))
+    index.add("v1", _fingerprint(2)[:500], preview=True)
+    index.add("v2", _fingerprint(2)[:500], preview=True)
+    index.add("v2", _fingerprint(2))
+
+    reopened = _index(tmp_path)
+    assert np.array_equal(reopened.get("v1"), _fingerprint(1))
+    assert np.array_equal(reopened.get("v2"), _fingerprint(2))
+    assert "v3" not in reopened
+
+
+def test_replaced_fingerprints_stop_matching(tmp_path):
+    index = _index(tmp_path)
+    index.add("v1", _fingerprint(1), preview=True)
+    assert [m.video_id for m in index.match(_fingerprint(1))] == ["v1"]
+
+    index.add("v1", _fingerprint(2))
+    # Enough additions that the segments get folded together
+    for seed in range(3, 13):
+        index.add(f"v{seed}", _fingerprint(seed))
+
+    assert index.match(_fingerprint(1)) == []
+    assert [m.video_id for m in index.match(_fingerprint(2))] == ["v1"]
+
+
+def test_lists_downloaded_files_without_a_full_fingerprint(tmp_path):
+    index = _index(tmp_path)
+    catalog = index._catalog
+    for video_id in ("v1", "v2", "v3"):
+        catalog.add(CatalogEntry(video_id, path=f"/music/{video_id}.mp3"))
+    catalog.add_ids(["v4"])
+    index.add("v1", _fingerprint(1))
+    index.add("v2", _fingerprint(2), preview=True)
+
+    assert sorted(index.unfingerprinted()) == [("v2", "/music/v2.mp3"), ("v3", "/music/v3.mp3")]
+
+
+def test_finder_flags_listed_tracks_against_the_library_and_each_other(tmp_path):
+    index = _index(tmp_path)
+    index.add("library", _fingerprint(1))
+    previews = {
+        "lyric": fingerprint_pcm(_reupload(_song(1), intro_seconds=1.5)),
+        "new": _fingerprint(2),
+        "new-again": fingerprint_pcm(_reupload(_song(2), intro_seconds=0.4)),
+        "unrelated": _fingerprint(3),
+    }
+    fetched = []
+
+    def fingerprint(video_id):
+        fetched.append(video_id)
+        if video_id == "gone":
+            raise OSError("HTTP Error 403: Forbidden")
+        return previews[video_id]
+
+    finder = DuplicateFinder(index, fingerprint, max_workers=1)
+    reported = {}
+    found = finder.find(["lyric", "new", "gone", "new-again", "unrelated"], reported.update)
+    again = finder.find(["lyric"])
+    finder.close()
+
+    assert found == reported
+    assert {k: [m.video_id for m in v] for k, v in found.items()} == {
+        "lyric": ["library"],
+        "new-again": ["new"],
+    }
+    # Previews are kept, so tracks are only fetched once
+    assert "new" in index
+    assert sorted(fetched) == ["gone", "lyric", "new", "new-again", "unrelated"]
+    assert [m.video_id for m in again["lyric"]] == ["library"]
+
+
+def test_backfill_fingerprints_the_library(tmp_path, monkeypatch):
+    index = _index(tmp_path)
+    index._catalog.add(CatalogEntry("v1", path="/music/v1.mp3"))
+    index._catalog.add(CatalogEntry("v2", path="/music/missing.mp3"))
+
+    def fake_file(path):
+        if "missing" in path:
+            raise TranscodeError("No such file or directory")
+        return _fingerprint(1)
+
+    monkeypatch.setattr("scraper.fingerprint.fingerprint_file", fake_file)
+    finder = DuplicateFinder(index, lambda video_id: _fingerprint(2))
+
+    assert finder.backfill() == 1
+    finder.close()
+    assert index.unfingerprinted() == [("v2", "/music/missing.mp3")]
+
+
+def test_close_drops_checks_that_have_not_started(tmp_path):
+    release = threading.Event()
+    calls = []
+
+    def fingerprint(video_id):
+        calls.append(video_id)
+        release.wait(5)
+        return _fingerprint(1)
+
+    finder = DuplicateFinder(_index(tmp_path), fingerprint, max_workers=1)
+    results = []
+    worker = threading.Thread(target=lambda: results.append(finder.find(["v1", "v2", "v3"])))
+    worker.start()
+    while not calls:
+        threading.Event().wait(0.01)
+    finder.close()
+    release.set()
+    worker.join(5)
+
+    assert calls == ["v1"]
+    assert results == [{}]
+
+
+def test_a_cut_off_preview_still_decodes(monkeypatch):
+    pcm = _song(1).tobytes()
+    outputs = iter([(1, pcm, b"[matroska] Truncated packet\n"), (1, b"", b"Invalid data found\n")])
+
+    def fake_run(cmd, input, capture_output):
+        assert cmd[cmd.index("-i") + 1] == "pipe:0"
+        returncode, stdout, stderr = next(outputs)
+        return type("Proc", (), {"returncode": returncode, "stdout": stdout, "stderr": stderr})()
+
+    monkeypatch.setattr("scraper.fingerprint.subprocess.run", fake_run)
+
+    assert np.array_equal(fingerprint_bytes(b"webm"), _fingerprint(1))
+    with pytest.raises(TranscodeError, match="Invalid data found"):
+        fingerprint_bytes(b"junk")
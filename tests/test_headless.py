@@ -0,0 +1,212 @@
+import _thread
+import io
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from scraper.headless import (
+    EXIT_CANCELLED,
+    EXIT_DOWNLOAD_FAILED,
+    EXIT_OK,
+    EXIT_SYNC_FAILED,
+    JsonLinesReporter,
+    run_headless,
+    select_tracks,
+)
+from scraper.models import Track, TrackMetadata
+from scraper.retry import RetryPolicy, TokenBucket
+from scraper.sources import Source, SourceIndex
+from scraper.sync import SyncResult
+from scraper.tracker import ProgressTracker
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TRACKS = [
+    Track("v1", "Blue Song", "Alpha", 100),
+    Track("v2", "Red Song", "Beta", 100),
+    Track("v3", "Green Tune", "Alpha", 100),
+]
+
+
+def _sync(tracks):
+    def sync(sources, downloads_dir, on_progress, full):
+        on_progress(len(tracks), len(tracks))
+        return SyncResult(tracks, tracks, {sources[0].key: [t.video_id for t in tracks]})
+
+    return sync
+
+
+def _fetch(video_id, downloads_dir, **kwargs):
+    if video_id == "v2":
+        raise RuntimeError("ERROR: Video unavailable")
+    raw = os.path.join(downloads_dir, f"{video_id}.webm")
+    with open(raw, "wb") as f:
+        f.write(b"x")
+    return raw
+
+
+def _transcode(src, dst):
+    with open(dst, "wb") as f:
+        f.write(b"mp3")
+    return dst
+
+
+def _run(tmp_path, **kwargs):
+    out = io.StringIO()
+    kwargs.setdefault("sync", _sync(TRACKS))
+    kwargs.setdefault("fetch", _fetch)
+    code = run_headless(
+        downloads_dir=str(tmp_path),
+        reporter=JsonLinesReporter(out),
+        transcode=_transcode,
+        transcode_workers=1,
+        transcode_executor=ThreadPoolExecutor(max_workers=1),
+        retry_policy=RetryPolicy(max_attempts=1),
+        rate_limiter=TokenBucket(rate=1e9, capacity=1e9, max_rate=1e9),
+        **kwargs,
+    )
+    return code, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_select_tracks_filters_downloaded_and_matches(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    tracker.mark_downloaded("v1")
+
+    assert select_tracks(TRACKS, tracker) == TRACKS[1:]
+    assert select_tracks(TRACKS, tracker, pattern="alpha") == [TRACKS[2]]
+    assert select_tracks(TRACKS, tracker, pattern="song") == [TRACKS[1]]
+    assert select_tracks(TRACKS + TRACKS, tracker, limit=1) == [TRACKS[1]]
+
+
+def test_downloads_new_tracks_and_reports_json_lines(tmp_path):
+    code, events = _run(tmp_path)
+
+    assert code == EXIT_DOWNLOAD_FAILED
+    names = [e["event"] for e in events]
+    assert names[0] == "sync_start"
+    assert names[-1] == "summary"
+    assert {e["video_id"] for e in events if e["event"] == "done"} == {"v1", "v3"}
+    assert [e["video_id"] for e in events if e["event"] == "failed"] == ["v2"]
+    summary = events[-1]
+    assert (summary["downloaded"], summary["failed"], summary["status"]) == (2, 1, "failed")
+    assert os.path.isfile(tmp_path / "Alpha - Blue Song.mp3")
+
+
+def test_exports_phase_timings(tmp_path):
+    trace = tmp_path / "trace.jsonl"
+    textfile = tmp_path / "scraper.prom"
+    code, events = _run(tmp_path, trace_path=str(trace), metrics_path=str(textfile))
+
+    assert code == EXIT_DOWNLOAD_FAILED
+    phases = events[-1]["phases"]
+    assert set(phases) == {"extract", "network", "queued", "transcode", "manifest"}
+    assert phases["transcode"]["total"] >= 0
+    tracks = [json.loads(line) for line in trace.read_text().splitlines()]
+    assert {t["video_id"]: t["status"] for t in tracks if t["type"] == "track"} == {
+        "v1": "done",
+        "v2": "failed",
+        "v3": "done",
+    }
+    assert 'music_scraper_tracks{status="done"} 2' in textfile.read_text()
+
+
+def test_second_run_has_nothing_left(tmp_path):
+    _run(tmp_path, pattern="alpha")
+    code, events = _run(tmp_path, pattern="alpha")
+
+    assert code == EXIT_OK
+    assert events[-1]["selected"] == 0
+
+
+def test_dry_run_lists_pending_without_downloading(tmp_path):
+    code, events = _run(tmp_path, dry_run=True)
+
+    assert code == EXIT_OK
+    assert [e["video_id"] for e in events if e["event"] == "pending"] == ["v1", "v2", "v3"]
+    assert not any(e["event"] == "start" for e in events)
+
+
+def test_enrichment_names_files_after_the_resolved_artist(tmp_path):
+    def resolve(video_id):
+        if video_id == "v3":
+            raise RuntimeError("ERROR: Sign in to confirm your age")
+        if video_id == "v1":
+            return TrackMetadata("Real Alpha", "Real v1")
+        return TrackMetadata()
+
+    code, events = _run(tmp_path, enrich=True, resolve=resolve)
+
+    assert code == EXIT_DOWNLOAD_FAILED
+    enriched = next(e for e in events if e["event"] == "enrich_done")
+    assert (enriched["cached"], enriched["resolved"], enriched["failed"]) == (0, 2, 1)
+    assert os.path.isfile(tmp_path / "Real Alpha - Real v1.mp3")
+    assert os.path.isfile(tmp_path / "Alpha - Green Tune.mp3")
+
+
+def test_sync_failure_exit_code(tmp_path):
+    def sync(*args, **kwargs):
+        raise RuntimeError("cookies expired")
+
+    code, events = _run(tmp_path, sync=sync)
+
+    assert code == EXIT_SYNC_FAILED
+    assert (events[-2]["event"], events[-2]["error"]) == ("sync_failed", "cookies expired")
+    assert events[-1]["status"] == "sync_failed"
+
+
+def test_track_in_several_sources_downloads_once(tmp_path):
+    def sync(sources, downloads_dir, on_progress, full):
+        return SyncResult(
+            TRACKS,
+            TRACKS,
+            {"me:LL": ["v1", "v3"], "work:LL": ["v3", "v2"]},
+            {"work:PLx": "This playlist is private"},
+        )
+
+    sources = [Source(cookie_file="me.txt"), Source(cookie_file="work.txt")]
+    code, events = _run(tmp_path, sync=sync, sources=sources)
+
+    by_name = {e["event"]: e for e in events}
+    assert by_name["sync_start"]["sources"] == ["me:LL", "work:LL"]
+    assert (by_name["source_failed"]["source"], by_name["sync_done"]["duplicates"]) == (
+        "work:PLx",
+        1,
+    )
+    assert sorted(e["video_id"] for e in events if e["event"] == "start") == ["v1", "v2", "v3"]
+    tracker = ProgressTracker(str(tmp_path))
+    assert SourceIndex(tracker.catalog).sources("v3") == ["me:LL", "work:LL"]
+
+
+def test_all_sources_failing_is_a_sync_failure(tmp_path):
+    def sync(sources, downloads_dir, on_progress, full):
+        return SyncResult(errors={"me:LL": "cookies expired", "work:LL": "cookies expired"})
+
+    code, events = _run(tmp_path, sync=sync)
+
+    assert code == EXIT_SYNC_FAILED
+    assert "me:LL: cookies expired" in events[-2]["error"]
+
+
+def test_ctrl_c_cancels_and_still_reports_a_summary(tmp_path):
+    def fetch(video_id, downloads_dir, progress_hook, **kwargs):
+        # Ctrl+C lands on the main thread while this download is running
+        _thread.interrupt_main()
+        while True:
+            progress_hook({"status": "downloading", "downloaded_bytes": 1})
+
+    code, events = _run(tmp_path, fetch=fetch, pattern="red")
+
+    assert code == EXIT_CANCELLED
+    assert events[-1]["status"] == "cancelled"
+    assert not any(e["event"] in ("done", "failed") for e in events)
+
+
+def test_headless_entry_point_does_not_import_textual():
+    code = (
+        "import sys, app, scraper.headless; "
+        "sys.exit(any(m == 'textual' or m.startswith('textual.') for m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT)
+    assert result.returncode == 0
@@ -0,0 +1,59 @@
+from scraper.catalog import LibraryCatalog
+from scraper.jobqueue import JobQueue, JobState
+from scraper.models import Track
+
+
+def _queue(tmp_path):
+    return JobQueue(LibraryCatalog(str(tmp_path / "library.db")))
+
+
+def _tracks(n):
+    return [Track(f"v{i}", f"Song {i}", "Artist", 100) for i in range(n)]
+
+
+def test_enqueue_marks_tracks_pending_in_order(tmp_path):
+    queue = _queue(tmp_path)
+    queue.enqueue(_tracks(3))
+
+    assert queue.unfinished() == _tracks(3)
+    assert queue.counts() == {JobState.PENDING: 3}
+
+
+def test_unfinished_excludes_done_and_failed(tmp_path):
+    queue = _queue(tmp_path)
+    queue.enqueue(_tracks(4))
+    queue.set_state("v0", JobState.DONE)
+    queue.set_state("v1", JobState.FAILED, error="boom")
+    queue.set_state("v2", JobState.DOWNLOADING)
+
+    assert [t.video_id for t in queue.unfinished()] == ["v2", "v3"]
+
+
+def test_raw_path_survives_reopen_and_reenqueue(tmp_path):
+    queue = _queue(tmp_path)
+    queue.enqueue(_tracks(2))
+    queue.set_state("v0", JobState.TRANSCODING, raw_path="dl/.raw/v0.webm")
+
+    reopened = _queue(tmp_path)
+    assert reopened.state("v0") is JobState.TRANSCODING
+    assert reopened.raw_path("v0") == "dl/.raw/v0.webm"
+
+    reopened.enqueue(_tracks(2))
+    assert reopened.state("v0") is JobState.PENDING
+    assert reopened.raw_path("v0") == "dl/.raw/v0.webm"
+    assert reopened.raw_path("v1") is None
+
+
+def test_prune_forgets_finished_jobs(tmp_path):
+    queue = _queue(tmp_path)
+    queue.enqueue(_tracks(3))
+    queue.set_state("v0", JobState.DONE)
+    queue.set_state("v1", JobState.FAILED)
+    queue.prune()
+
+    assert queue.state("v0") is None
+    assert queue.state("v1") is None
+    assert queue.state("v2") is JobState.PENDING
+
+    queue.clear()
+    assert queue.unfinished() == []
@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from scraper.metrics import BatchMetrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _batch(tmp_path=None):
+    clock = FakeClock()
+    kwargs = {}
+    if tmp_path is not None:
+        kwargs = {
+            "trace_path": str(tmp_path / "trace.jsonl"),
+            "textfile_path": str(tmp_path / "prom" / "scraper.prom"),
+        }
+    return BatchMetrics(clock=clock, **kwargs), clock
+
+
+def test_spans_are_relative_to_batch_start_and_summed_per_phase():
+    metrics, clock = _batch()
+    metrics.start_batch(1)
+    metrics.start_attempt("v1", "Song")
+    metrics.record("v1", "extract", 101.0, 102.5)
+    metrics.add_retry("v1")
+    metrics.start_attempt("v1")
+    metrics.record("v1", "extract", 104.0, 105.0)
+    metrics.record("v1", "network", 105.0, 109.0)
+
+    (timing,) = metrics.tracks()
+
+    assert [(s.phase, s.start, s.attempt) for s in timing.spans] == [
+        ("extract", 1.0, 1),
+        ("extract", 4.0, 2),
+        ("network", 5.0, 2),
+    ]
+    assert timing.phase_seconds("extract") == pytest.approx(2.5)
+    assert timing.retries == 1
+    assert timing.slowest_phase == "network"
+
+
+def test_summary_percentiles_cover_tracks_that_reached_the_phase():
+    metrics, clock = _batch()
+    metrics.start_batch(10)
+    for i in range(10):
+        metrics.record(f"v{i}", "transcode", 0.0, float(i + 1))
+    metrics.record("v0", "extract", 0.0, 2.0)
+
+    summary = metrics.summary()
+
+    assert summary["transcode"].count == 10
+    assert summary["transcode"].total == pytest.approx(55)
+    assert (summary["transcode"].p50, summary["transcode"].p95) == (5.0, 10.0)
+    assert summary["extract"].count == 1
+    assert summary["queued"].count == 0
+
+
+def test_trace_is_written_as_it_happens(tmp_path):
+    metrics, clock = _batch(tmp_path)
+    metrics.start_batch(1)
+    metrics.start_attempt("v1", "Song")
+    metrics.record("v1", "extract", 100.0, 101.0)
+    metrics.add_bytes("v1", downloaded=1000, written=800)
+
+    lines = (tmp_path / "trace.jsonl").read_text().splitlines()
+    assert [json.loads(line)["type"] for line in lines] == ["batch_start", "span"]
+
+    metrics.finish_track("v1", "Song")
+    clock.now = 103.0
+    metrics.finish_batch()
+
+    records = [json.loads(line) for line in (tmp_path / "trace.jsonl").read_text().splitlines()]
+    track = records[2]
+    assert track["type"] == "track"
+    assert (track["status"], track["bytes_downloaded"], track["bytes_written"]) == (
+        "done",
+        1000,
+        800,
+    )
+    assert track["phases"]["extract"] == 1.0
+    end = records[3]
+    assert (end["type"], end["duration"], end["done"], end["failed"]) == ("batch_end", 3.0, 1, 0)
+
+
+def test_prometheus_textfile(tmp_path):
+    metrics, clock = _batch(tmp_path)
+    metrics.start_batch(2)
+    metrics.record("v1", "transcode", 100.0, 100.3)
+    metrics.record("v2", "transcode", 100.0, 107.0)
+    metrics.add_retry("v2")
+    metrics.finish_track("v1", "a")
+    metrics.finish_track("v2", "b", error="boom")
+    metrics.finish_batch()
+
+    text = (tmp_path / "prom" / "scraper.prom").read_text()
+    lines = set(text.splitlines())
+
+    assert 'music_scraper_phase_seconds_bucket{phase="transcode",le="0.5"} 1' in lines
+    assert 'music_scraper_phase_seconds_bucket{phase="transcode",le="10.0"} 2' in lines
+    assert 'music_scraper_phase_seconds_bucket{phase="transcode",le="+Inf"} 2' in lines
+    assert 'music_scraper_phase_seconds_count{phase="extract"} 0' in lines
+    assert 'music_scraper_tracks{status="failed"} 1' in lines
+    assert "music_scraper_retries 1" in lines
+    assert "# TYPE music_scraper_phase_seconds histogram" in lines
+    assert not list((tmp_path / "prom").glob("*.tmp"))
@@ -0,0 +1,61 @@
+import random
+
+from benchmarks.micro import adversarial_name, compare, run_benchmarks, summarize
+from scraper.filename import sanitize_filename
+
+
+def _report(results):
+    return {"environment": {"commit": "abc1234"}, "results": results}
+
+
+def test_results_are_keyed_by_benchmark_and_size():
+    results = run_benchmarks(sizes=[10, 20], groups=["tracker", "models"], repeat=2)
+
+    assert set(results) == {
+        "tracker.load",
+        "tracker.save",
+        "tracker.is_downloaded",
+        "models.duration_str",
+    }
+    assert set(results["tracker.load"]) == {"10", "20"}
+    assert results["models.duration_str"]["20"]["runs"] == 2
+
+
+def test_browse_group_mounts_the_screen_outside_the_full_app():
+    results = run_benchmarks(sizes=[5], groups=["browse"], repeat=1)
+
+    assert set(results) == {"browse.mount", "browse.filter_ready"}
+    assert results["browse.filter_ready"]["5"]["runs"] == 1
+
+
+def test_summarize_reports_per_item_cost():
+    stats = summarize([0.002, 0.001, 0.003], 1000)
+
+    assert stats == {"median_ms": 2.0, "min_ms": 1.0, "per_item_us": 2.0, "runs": 3}
+
+
+def test_compare_flags_slowdowns_beyond_threshold():
+    baseline = summarize([0.010], 1000)
+    old = _report({"a": {"1000": baseline}, "b": {"1000": baseline}})
+    new = _report(
+        {
+            "a": {"1000": summarize([0.011], 1000)},
+            "b": {"1000": summarize([0.020], 1000)},
+            # Only in the new run, so nothing to compare against
+            "c": {"1000": summarize([0.5], 1000)},
+        }
+    )
+
+    rows, regressions = compare(old, new, threshold=1.25)
+
+    assert [(r[0], r[1]) for r in rows] == [("a", 1000), ("b", 1000)]
+    assert [(r[0], round(r[4], 2)) for r in regressions] == [("b", 2.0)]
+
+
+def test_adversarial_names_still_make_valid_filenames():
+    rng = random.Random(0)
+    for _ in range(200):
+        name = sanitize_filename(adversarial_name(rng), adversarial_name(rng))
+        assert name.endswith(".mp3")
+        assert len(name) <= 200
+        assert not any(c in name for c in '<>:"/\\|?*\n\t')
@@ -1,4 +1,4 @@
-from scraper.models import Track
+from scraper.models import Track, TrackMetadata
 
 
 def test_duration_str_minutes():
@@ -24,3 +24,10 @@ def test_duration_str_exact_minute():
 def test_duration_str_under_minute():
     t = Track(video_id="abc", title="Song", channel="Artist", duration=9)
     assert t.duration_str == "0:09"
+
+
+def test_metadata_names_need_both_artist_and_track():
+    t = Track(video_id="abc", title="Song (Official Video)", channel="ArtistVEVO", duration=60)
+    assert TrackMetadata("Artist", "Song").names(t) == ("Artist", "Song")
+    assert TrackMetadata(artist="Artist").names(t) == ("ArtistVEVO", "Song (Official Video)")
+    assert TrackMetadata().is_empty and not TrackMetadata(release_year=2001).is_empty
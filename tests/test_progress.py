@@ -0,0 +1,144 @@
+import pytest
+
+from scraper.progress import JobStatus, ProgressBus
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def test_flush_coalesces_updates_per_job():
+    clock = FakeClock()
+    bus = ProgressBus(clock=clock)
+    bus.job_started("v1", "Song", slot=0)
+    for i in range(1, 101):
+        clock.advance(0.01)
+        bus.job_progress("v1", i * 10, 1000)
+
+    snapshot = bus.flush()
+
+    assert len(snapshot.jobs) == 1
+    job = snapshot.jobs[0]
+    assert (job.downloaded_bytes, job.total_bytes, job.slot) == (1000, 1000, 0)
+    assert job.fraction == 1.0
+
+
+def test_flush_returns_none_when_nothing_changed():
+    bus = ProgressBus()
+    bus.job_started("v1", "Song")
+    assert bus.flush() is not None
+    assert bus.flush() is None
+
+
+def test_every_finished_job_is_delivered_in_order():
+    bus = ProgressBus()
+    bus.start_batch(3)
+    for vid in ("v1", "v2", "v3"):
+        bus.job_started(vid, vid)
+        bus.job_progress(vid, 1, 2)
+    bus.job_finished("v1", "v1", path="/a.mp3")
+    bus.job_finished("v2", "v2", error="boom")
+    bus.job_fetched("v3")
+
+    snapshot = bus.flush()
+
+    assert [(j.video_id, j.status) for j in snapshot.finished] == [
+        ("v1", JobStatus.DONE),
+        ("v2", JobStatus.FAILED),
+    ]
+    assert snapshot.finished[1].error == "boom"
+    # Jobs that finished in this window are not repeated as in-flight updates
+    assert [(j.video_id, j.status) for j in snapshot.jobs] == [("v3", JobStatus.TRANSCODING)]
+    assert (snapshot.batch.done, snapshot.batch.failed, snapshot.batch.total) == (1, 1, 3)
+
+
+def test_speed_is_smoothed_and_gives_eta():
+    clock = FakeClock()
+    bus = ProgressBus(smoothing=1.0, clock=clock)
+    bus.job_started("v1", "Song")
+    clock.advance(1)
+    bus.job_progress("v1", 1000, 10_000)
+    clock.advance(1)
+    # A burst is damped rather than taken at face value
+    bus.job_progress("v1", 5000, 10_000)
+
+    job = bus.flush().jobs[0]
+
+    assert 1000 < job.speed < 4000
+    assert job.eta == pytest.approx(5000 / job.speed)
+
+
+def test_batch_speed_sums_active_downloads():
+    clock = FakeClock()
+    bus = ProgressBus(clock=clock)
+    bus.job_started("v1", "a")
+    bus.job_started("v2", "b")
+    clock.advance(1)
+    bus.job_progress("v1", 100, None)
+    bus.job_progress("v2", 300, None)
+
+    assert bus.flush().batch.speed == pytest.approx(400)
+
+    bus.job_fetched("v2")
+    assert bus.flush().batch.speed == pytest.approx(100)
+
+
+def test_batch_eta_follows_track_rate():
+    clock = FakeClock()
+    bus = ProgressBus(clock=clock)
+    bus.start_batch(10)
+    assert bus.flush().batch.eta is None
+    for vid in ("v1", "v2"):
+        clock.advance(2)
+        bus.job_finished(vid, vid)
+
+    batch = bus.flush().batch
+
+    assert batch.track_rate == pytest.approx(0.5)
+    assert batch.eta == pytest.approx(16)
+
+
+def test_retrying_job_keeps_its_delay():
+    bus = ProgressBus()
+    bus.job_started("v1", "Song", slot=1)
+    bus.job_retrying("v1", 4.0, "HTTP 429")
+
+    job = bus.flush().jobs[0]
+
+    assert (job.status, job.retry_delay, job.error) == (JobStatus.RETRYING, 4.0, "HTTP 429")
+    assert job.eta is None
+
+
+def test_unsubscribe_stops_delivery():
+    bus = ProgressBus()
+    seen = []
+    unsubscribe = bus.subscribe(seen.append)
+    bus.job_started("v1", "Song")
+    bus.flush()
+    unsubscribe()
+    bus.job_started("v2", "Song")
+    bus.flush()
+
+    assert [[j.video_id for j in s.jobs] for s in seen] == [["v1"]]
+
+
+def test_stopping_flusher_delivers_final_results():
+    bus = ProgressBus()
+    seen = []
+    bus.subscribe(seen.append)
+    stop = bus.start_flusher(fps=1000)
+    bus.start_batch(1)
+    bus.job_finished("v1", "Song")
+    bus.finish_batch()
+    stop()
+
+    finished = [j.video_id for s in seen for j in s.finished]
+    assert finished == ["v1"]
+    assert seen[-1].batch.finished
@@ -0,0 +1,192 @@
+import errno
+import io
+import random
+import threading
+
+from yt_dlp.networking.common import Response
+from yt_dlp.networking.exceptions import HTTPError
+from yt_dlp.utils import DownloadError, ExtractorError
+
+from scraper.retry import (
+    ErrorKind,
+    RetryPolicy,
+    RetryScheduler,
+    TokenBucket,
+    classify_error,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _http_error(status):
+    return HTTPError(Response(io.BytesIO(b""), "https://www.youtube.com", {}, status=status))
+
+
+def _wrapped(inner):
+    """Mimic how yt-dlp wraps an extractor failure in a DownloadError."""
+    try:
+        raise ExtractorError("Unable to download webpage", cause=inner)
+    except ExtractorError as e:
+        return DownloadError(f"ERROR: {e}", (type(e), e, None))
+
+
+def test_classify_http_429_by_status():
+    assert classify_error(_wrapped(_http_error(429))) is ErrorKind.RATE_LIMIT
+
+
+def test_classify_rate_limit_by_message():
+    assert classify_error(RuntimeError("HTTP Error 429: Too Many Requests")) is ErrorKind.RATE_LIMIT
+
+
+def test_classify_permanent():
+    assert classify_error(DownloadError("ERROR: [youtube] x: Private video")) is ErrorKind.PERMANENT
+    assert classify_error(DownloadError("ERROR: Video unavailable")) is ErrorKind.PERMANENT
+    assert classify_error(FileNotFoundError("ffmpeg")) is ErrorKind.PERMANENT
+
+
+def test_classify_transient():
+    assert classify_error(_wrapped(_http_error(503))) is ErrorKind.TRANSIENT
+    assert classify_error(TimeoutError()) is ErrorKind.TRANSIENT
+    assert classify_error(ConnectionResetError()) is ErrorKind.TRANSIENT
+    assert classify_error(RuntimeError("something odd")) is ErrorKind.TRANSIENT
+
+
+def test_backoff_grows_and_is_capped():
+    policy = RetryPolicy(base_delay=1.0, rate_limit_delay=10.0, max_delay=60.0)
+    rng = random.Random(0)
+    for attempt in range(1, 10):
+        cap = min(60.0, 2 ** (attempt - 1))
+        assert 0 <= policy.delay(attempt, ErrorKind.TRANSIENT, rng) <= cap
+        rl_cap = min(60.0, 10.0 * 2 ** (attempt - 1))
+        assert rl_cap / 2 <= policy.delay(attempt, ErrorKind.RATE_LIMIT, rng) <= rl_cap
+
+
+def test_token_bucket_refills_at_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=2.0, clock=clock)
+
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0.5
+    clock.now = 0.5
+    assert bucket.try_acquire() == 0
+
+
+def test_token_bucket_adapts_to_rate_limits():
+    bucket = TokenBucket(rate=1.0, min_rate=0.1, max_rate=2.0, increase=0.5, clock=FakeClock())
+
+    bucket.on_rate_limited()
+    assert bucket.rate == 0.5
+    assert bucket.try_acquire() > 0  # drained
+    for _ in range(3):
+        bucket.on_rate_limited()
+    assert bucket.rate == 0.1
+    for _ in range(10):
+        bucket.on_success()
+    assert bucket.rate == 2.0
+
+
+def _scheduler(**kwargs):
+    kwargs.setdefault("bucket", TokenBucket(rate=1e9, capacity=1e9, max_rate=1e9))
+    return RetryScheduler(**kwargs)
+
+
+def test_scheduler_drains_and_finishes():
+    scheduler = _scheduler()
+    scheduler.add(["a", "b"])
+
+    jobs = [scheduler.next_job(), scheduler.next_job()]
+    assert [j.item for j in jobs] == ["a", "b"]
+    for job in jobs:
+        scheduler.succeeded(job)
+    assert scheduler.next_job() is None
+
+
+def test_scheduler_requeues_with_delay():
+    clock = FakeClock()
+    scheduler = _scheduler(policy=RetryPolicy(base_delay=4.0), clock=clock, rng=random.Random(1))
+    scheduler.add(["a", "b"])
+
+    a = scheduler.next_job()
+    delay = scheduler.failed(a, TimeoutError())
+    assert 0 <= delay <= 4.0
+    assert a.attempt == 2
+    assert scheduler.retries == 1
+
+    # "b" was queued first-come; the retried "a" waits for its delay
+    assert scheduler.next_job().item == "b"
+    clock.now = delay
+    again = scheduler.next_job()
+    assert again is a
+
+
+def test_scheduler_gives_up_on_permanent_errors():
+    scheduler = _scheduler()
+    scheduler.add(["a"])
+    job = scheduler.next_job()
+
+    assert scheduler.failed(job, RuntimeError("Private video")) is None
+    assert job.last_kind is ErrorKind.PERMANENT
+    assert scheduler.next_job() is None
+
+
+def test_scheduler_rate_limit_slows_bucket():
+    bucket = TokenBucket(rate=1.0, clock=FakeClock())
+    scheduler = RetryScheduler(bucket=bucket, clock=FakeClock())
+    scheduler.add(["a"])
+    job = scheduler.next_job()
+
+    scheduler.failed(job, RuntimeError("HTTP Error 429: Too Many Requests"))
+    assert bucket.rate == 0.5
+
+
+def test_waiting_worker_picks_up_retry():
+    scheduler = _scheduler(policy=RetryPolicy(base_delay=0.01))
+    scheduler.add(["a"])
+    job = scheduler.next_job()
+    picked = []
+
+    waiter = threading.Thread(target=lambda: picked.append(scheduler.next_job()))
+    waiter.start()
+    scheduler.failed(job, TimeoutError())
+    waiter.join(timeout=5)
+
+    assert picked and picked[0].item == "a"
+
+
+def test_cancel_releases_waiting_workers():
+    scheduler = _scheduler()
+    scheduler.add(["a"])
+    scheduler.next_job()
+    result = []
+
+    waiter = threading.Thread(target=lambda: result.append(scheduler.next_job()))
+    waiter.start()
+    scheduler.cancel()
+    waiter.join(timeout=5)
+
+    assert result == [None]
+
+
+def test_due_jobs_go_in_priority_order():
+    clock = FakeClock()
+    scheduler = _scheduler(policy=RetryPolicy(base_delay=1.0), clock=clock, priority=len)
+    scheduler.add(["ccc", "a", "bb"])
+
+    first = scheduler.next_job()
+    assert first.item == "a"
+    scheduler.failed(first, TimeoutError())
+    # A retry waits out its backoff, then competes on priority again
+    assert scheduler.next_job().item == "bb"
+    clock.now = 10
+    assert [scheduler.next_job().item for _ in range(2)] == ["a", "ccc"]
+
+
+def test_classify_full_disk_as_permanent():
+    assert classify_error(OSError(errno.ENOSPC, "No space left on device")) is ErrorKind.PERMANENT
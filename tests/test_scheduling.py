@@ -0,0 +1,168 @@
+import errno
+import threading
+
+import pytest
+
+from scraper.models import Track
+from scraper.scheduling import (
+    ESTIMATED_BYTES_PER_SECOND,
+    BandwidthLimiter,
+    DiskSpaceGuard,
+    InsufficientDiskSpace,
+    JobOrder,
+    estimated_size,
+    order_key,
+    parse_size,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_size():
+    assert parse_size("500") == 500
+    assert parse_size("500K") == 500 * 1024
+    assert parse_size("1.5g") == 3 * 1024**3 // 2
+    assert parse_size("2GiB") == 2 * 1024**3
+    assert parse_size("3 MB") == 3 * 1024**2
+    for bad in ("", "fast", "-1M", "2X"):
+        with pytest.raises(ValueError):
+            parse_size(bad)
+
+
+def test_order_keys():
+    tracks = [Track("a", "A", "C", 200), Track("b", "B", "C", 30), Track("c", "C", "C", 7200)]
+
+    assert order_key(JobOrder.PLAYLIST) is None
+    assert [t.video_id for t in sorted(tracks, key=order_key(JobOrder.SHORTEST))] == [
+        "b",
+        "a",
+        "c",
+    ]
+    assert [t.video_id for t in sorted(tracks, key=order_key(JobOrder.LARGEST))] == [
+        "c",
+        "a",
+        "b",
+    ]
+    assert estimated_size(tracks[1]) == 30 * ESTIMATED_BYTES_PER_SECOND
+
+
+def test_bandwidth_limiter_lets_a_burst_through_then_paces():
+    clock = FakeClock()
+    limiter = BandwidthLimiter(rate=1000, clock=clock)
+
+    assert limiter.reserve(600) == 0
+    assert limiter.reserve(400) == 0
+    # Over budget: the next 500 bytes are only due in half a second
+    assert limiter.reserve(500) == pytest.approx(0.5)
+    # Another download joining in queues up behind the first
+    assert limiter.reserve(500) == pytest.approx(1.0)
+    clock.now = 1.0
+    assert limiter.reserve(0) == 0
+    clock.now = 100.0
+    # Idle time only refills up to the burst
+    assert limiter.reserve(1500) == pytest.approx(0.5)
+
+
+def test_bandwidth_limiter_wait_can_be_cancelled():
+    limiter = BandwidthLimiter(rate=10, burst=0)
+    cancelled = threading.Event()
+    cancelled.set()
+
+    assert not limiter.consume(1000, cancelled)
+    with pytest.raises(ValueError):
+        BandwidthLimiter(rate=0)
+
+
+def test_disk_guard_counts_downloads_in_flight():
+    free = [10_000]
+    changes = []
+    guard = DiskSpaceGuard(
+        "downloads",
+        min_free=2_000,
+        on_change=lambda paused, space: changes.append((paused, space)),
+        poll_interval=0.01,
+        free_space=lambda: free[0],
+    )
+
+    assert guard.admit(5_000)
+    assert guard.admit(3_000)
+    admitted = threading.Event()
+    waiter = threading.Thread(target=lambda: admitted.set() if guard.admit(4_000) else None)
+    waiter.start()
+    while not guard.paused:
+        threading.Event().wait(0.01)
+    assert not admitted.is_set()
+
+    # One track is finished: its reservation is returned, its bytes now used
+    free[0] = 6_000
+    guard.release(5_000)
+    assert not admitted.wait(0.1)
+    # The other finishes and its raw file is removed
+    free[0] = 9_000
+    guard.release(3_000)
+    waiter.join(5)
+
+    assert admitted.is_set()
+    assert changes == [(True, 10_000), (False, 9_000)]
+
+
+def test_disk_guard_fails_a_download_nothing_in_flight_can_make_room_for():
+    changes = []
+    guard = DiskSpaceGuard(
+        "downloads",
+        min_free=1024**3,
+        on_change=lambda paused, space: changes.append(paused),
+        free_space=lambda: 1024**3 + 100 * 1024**2,
+    )
+
+    assert guard.admit(50 * 1024**2)
+    guard.release(50 * 1024**2)
+    # A three-hour mix: no release is coming, so waiting would never end
+    with pytest.raises(InsufficientDiskSpace) as error:
+        guard.admit(200 * 1024**2)
+
+    assert str(error.value) == (
+        "not enough disk space: 1.1 GB free in downloads, "
+        "a download of about 200.0 MB must leave 1.0 GB free"
+    )
+    assert error.value.errno == errno.ENOSPC
+    assert changes == []
+
+
+def test_disk_guard_gives_up_after_the_pause_window():
+    clock = FakeClock()
+    changes = []
+    guard = DiskSpaceGuard(
+        "downloads",
+        min_free=100,
+        on_change=lambda paused, space: changes.append(paused),
+        poll_interval=0.01,
+        max_wait=60,
+        free_space=lambda: 150,
+        clock=clock,
+    )
+    assert guard.admit(40)
+    threading.Timer(0.05, setattr, (clock, "now", 60.0)).start()
+
+    # The in-flight download never finishes; the wait still ends
+    with pytest.raises(InsufficientDiskSpace, match=r"paused for 1 min"):
+        guard.admit(40)
+    # Nothing is waiting any more
+    assert not guard.paused
+    assert changes == [True, False]
+
+
+def test_disk_guard_wait_can_be_cancelled():
+    guard = DiskSpaceGuard("downloads", min_free=100, free_space=lambda: 150, poll_interval=5)
+    assert guard.admit(40)
+    cancelled = threading.Event()
+    threading.Timer(0.05, cancelled.set).start()
+
+    assert not guard.admit(40, cancelled)
+    assert guard.paused
@@ -0,0 +1,83 @@
+import pytest
+
+from scraper.models import Track
+from scraper.search import FilterError, TrackFilter, TrackIndex, parse_duration, parse_filter
+
+TRACKS = [
+    Track("v1", "Around the World", "Daft Punk", 429),
+    Track("v2", "One More Time", "Daft Punk", 320),
+    Track("v3", "Windowlicker", "Aphex Twin", 366),
+    Track("v4", "Xtal", "Aphex Twin", 294),
+    Track("v5", "Teardrop", "Massive Attack", 330),
+]
+
+
+def _ids(tracks):
+    return [t.video_id for t in tracks]
+
+
+def _search(index, query):
+    return _ids(index.search(parse_filter(query)))
+
+
+def test_parse_duration():
+    assert parse_duration("45") == 45
+    assert parse_duration("3:05") == 185
+    assert parse_duration("1:00:00") == 3600
+    with pytest.raises(FilterError):
+        parse_duration("3m")
+
+
+def test_parse_filter_structured_parts():
+    flt = parse_filter('daft channel:"Aphex Twin" duration:2:00-5:30')
+    assert flt == TrackFilter(("daft",), "aphex twin", 120, 330)
+    assert parse_filter("duration:<3:00").max_duration == 179
+    assert parse_filter("duration:>=60").min_duration == 60
+    assert parse_filter('"one more').terms == ("one more",)
+    assert parse_filter("  ").is_empty
+    with pytest.raises(FilterError):
+        parse_filter("duration:soon")
+
+
+def test_word_prefix_matching_in_list_order():
+    index = TrackIndex(TRACKS)
+
+    assert _search(index, "daft") == ["v1", "v2"]
+    assert _search(index, "D") == ["v1", "v2"]
+    assert _search(index, "twin x") == ["v4"]
+    assert _search(index, "window") == ["v3"]
+    # Matches start at word boundaries
+    assert _search(index, "indow") == []
+    assert _search(index, '"more time"') == ["v2"]
+    assert _search(index, '"time more"') == []
+
+
+def test_structured_filters():
+    index = TrackIndex(TRACKS)
+
+    assert _search(index, "channel:daft") == []
+    assert _search(index, 'channel:"daft punk"') == ["v1", "v2"]
+    assert _search(index, "duration:5:00-6:00") == ["v2", "v5"]
+    assert _search(index, "duration:<5:00 aphex") == ["v4"]
+
+
+def test_narrowing_reuses_previous_matches():
+    index = TrackIndex(TRACKS)
+    assert _search(index, "a") == ["v1", "v3", "v4", "v5"]
+    assert _search(index, "aph") == ["v3", "v4"]
+    assert _search(index, "aphex w") == ["v3"]
+    # Widening again must not be limited by the narrower result
+    assert _search(index, "a") == ["v1", "v3", "v4", "v5"]
+
+
+def test_prepend_append_and_remove_keep_list_order():
+    index = TrackIndex(TRACKS[1:3])
+    index.prepend([TRACKS[0]])
+    index.append(TRACKS[3:])
+    assert _search(index, "t") == ["v1", "v2", "v3", "v4", "v5"]
+
+    index.remove(["v2", "v4"])
+    assert _search(index, "t") == ["v1", "v3", "v5"]
+    assert _search(index, "xtal") == []
+    assert _search(index, "channel:\"aphex twin\"") == ["v3"]
+    assert len(index) == 3 and "v2" not in index
@@ -0,0 +1,132 @@
+import functools
+import threading
+from unittest.mock import patch
+
+import pytest
+import yt_dlp
+
+from scraper.session import SessionPool, YoutubeDLSession
+
+
+_REAL_YOUTUBEDL = yt_dlp.YoutubeDL
+
+
+class FakeYDL:
+    instances: list["FakeYDL"] = []
+
+    def __init__(self, params):
+        self.params = dict(params)
+        self.params["outtmpl"] = {"default": "%(title)s [%(id)s].%(ext)s"}
+        self.hooks = []
+        self.closed = False
+        self.urls = []
+        FakeYDL.instances.append(self)
+
+    @functools.cached_property
+    def cookiejar(self):
+        return object()
+
+    def add_progress_hook(self, hook):
+        self.hooks.append(hook)
+
+    def extract_info(self, url, download):
+        self.urls.append(url)
+        for hook in self.hooks:
+            hook({"status": "finished"})
+        path = self.params["outtmpl"]["default"].replace("%(ext)s", "webm")
+        return {"requested_downloads": [{"filepath": path}]}
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_ydl():
+    FakeYDL.instances = []
+    with patch("scraper.session.yt_dlp.YoutubeDL", FakeYDL):
+        yield
+
+
+def test_session_swaps_outtmpl_and_hook_per_job():
+    session = YoutubeDLSession("cookies.txt")
+    seen_a, seen_b = [], []
+
+    path_a = session.fetch_audio("a", "dl", progress_hook=seen_a.append)
+    path_b = session.fetch_audio("b", "dl", progress_hook=seen_b.append)
+    session.fetch_audio("c", "dl")
+
+    assert path_a.replace("\\", "/") == "dl/.raw/a.webm"
+    assert path_b.replace("\\", "/") == "dl/.raw/b.webm"
+    assert seen_a == seen_b == [{"status": "finished"}]
+    # One YoutubeDL served every job
+    assert len(FakeYDL.instances) == 1
+    assert FakeYDL.instances[0].urls[-1] == "https://www.youtube.com/watch?v=c"
+
+
+def test_only_owner_session_loads_cookie_file():
+    owner = YoutubeDLSession("cookies.txt")
+    borrower = YoutubeDLSession("cookies.txt", owner.cookiejar)
+
+    assert FakeYDL.instances[0].params["cookiefile"] == "cookies.txt"
+    assert "cookiefile" not in FakeYDL.instances[1].params
+    assert borrower.cookiejar is owner.cookiejar
+
+
+def test_pool_reuses_sessions():
+    pool = SessionPool("cookies.txt", size=2)
+    for vid in ("a", "b", "c"):
+        pool.fetch_audio(vid, "dl")
+
+    assert len(FakeYDL.instances) == 1
+
+
+def test_pool_caps_concurrent_sessions():
+    pool = SessionPool("cookies.txt", size=2)
+    barrier = threading.Barrier(2, timeout=5)
+
+    def worker():
+        with pool.session():
+            barrier.wait()
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(FakeYDL.instances) == 2
+    assert FakeYDL.instances[1].cookiejar is FakeYDL.instances[0].cookiejar
+
+
+def test_pool_close_closes_sessions():
+    pool = SessionPool("cookies.txt", size=1)
+    pool.fetch_audio("a", "dl")
+    pool.close()
+
+    assert all(ydl.closed for ydl in FakeYDL.instances)
+
+
+def test_shared_cookiejar_with_real_youtubedl(tmp_path):
+    cookie_file = tmp_path / "cookies.txt"
+    cookie_file.write_text(
+        "# Netscape HTTP Cookie File\n"
+        ".youtube.com\tTRUE\t/\tTRUE\t2147483647\tSID\tabc\n"
+    )
+    with patch("scraper.session.yt_dlp.YoutubeDL", _REAL_YOUTUBEDL):
+        owner = YoutubeDLSession(str(cookie_file))
+        borrower = YoutubeDLSession(str(cookie_file), owner.cookiejar)
+        assert borrower.cookiejar is owner.cookiejar
+        assert any(c.name == "SID" for c in borrower.cookiejar)
+        borrower.close()
+        owner.close()
+
+
+def test_pool_streams_on_a_pooled_session():
+    pool = SessionPool("cookies.txt", size=1)
+    pool.fetch_audio("a", "dl")
+
+    with patch("scraper.session.stream_to_file", return_value="dl/out.opus") as stream:
+        assert pool.stream_audio("b", dst_for=str) == "dl/out.opus"
+
+    assert len(FakeYDL.instances) == 1
+    assert stream.call_args[0][:2] == (FakeYDL.instances[0], "b")
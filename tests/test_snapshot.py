@@ -0,0 +1,49 @@
+import json
+import os
+
+from scraper.models import Track
+from scraper.snapshot import PlaylistSnapshot, merge_tracks
+
+
+def test_load_missing_snapshot(tmp_path):
+    snapshot = PlaylistSnapshot(str(tmp_path / "downloads"))
+    assert snapshot.load() is None
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    snapshot = PlaylistSnapshot(str(tmp_path))
+    tracks = [Track("v1", "Song A", "Artist A", 180), Track("v2", "Song B", "Artist B", 0)]
+    snapshot.save(tracks)
+
+    assert PlaylistSnapshot(str(tmp_path)).load() == tracks
+    assert not os.path.exists(snapshot.path + ".tmp")
+
+
+def test_empty_snapshot_is_not_missing(tmp_path):
+    snapshot = PlaylistSnapshot(str(tmp_path))
+    snapshot.save([])
+    assert snapshot.load() == []
+
+
+def test_corrupt_snapshot_is_ignored(tmp_path):
+    snapshot = PlaylistSnapshot(str(tmp_path))
+    with open(snapshot.path, "w") as f:
+        f.write('{"version": 1, "tracks": [')
+    assert snapshot.load() is None
+
+
+def test_unknown_version_is_ignored(tmp_path):
+    snapshot = PlaylistSnapshot(str(tmp_path))
+    with open(snapshot.path, "w") as f:
+        json.dump({"version": 999, "tracks": []}, f)
+    assert snapshot.load() is None
+
+
+def test_merge_puts_new_first_and_dedupes():
+    cached = [Track("v2", "B", "X", 1), Track("v3", "C", "X", 1)]
+    new = [Track("v1", "A", "X", 1), Track("v3", "C (re-liked)", "X", 1)]
+
+    merged = merge_tracks(new, cached)
+
+    assert [t.video_id for t in merged] == ["v1", "v3", "v2"]
+    assert merged[1].title == "C (re-liked)"
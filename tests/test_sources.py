@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from scraper.catalog import LibraryCatalog
+from scraper.sources import LIKED_PLAYLIST, Source, SourceIndex, playlist_id, sources_for
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("liked", "LL"),
+        ("PLabc_123-x", "PLabc_123-x"),
+        ("https://www.youtube.com/playlist?list=PLabc", "PLabc"),
+        ("youtube.com/watch?v=xyz&list=PLdef&index=3", "PLdef"),
+    ],
+)
+def test_playlist_id(value, expected):
+    assert playlist_id(value) == expected
+
+
+@pytest.mark.parametrize("value", ["https://www.youtube.com/watch?v=xyz", "not a playlist"])
+def test_playlist_id_rejects_anything_else(value):
+    with pytest.raises(ValueError):
+        playlist_id(value)
+
+
+def test_sources_for_crosses_playlists_with_profiles():
+    sources = sources_for(["liked", "PLa", "LL"], ["me.txt", "work/cookies.txt", "me.txt"])
+
+    assert [s.key for s in sources] == ["me:LL", "me:PLa", "work/cookies:LL", "work/cookies:PLa"]
+    assert sources[2].cookie_file == "work/cookies.txt"
+
+
+def test_only_liked_playlists_are_synced_incrementally():
+    assert Source().newest_first and Source(LIKED_PLAYLIST, "other.txt").newest_first
+    assert not Source("PLa").newest_first
+
+
+def test_default_source_keeps_the_original_snapshot_file():
+    assert Source().snapshot_filename == "liked_snapshot.json"
+    assert Source("PLa", "work/cookies.txt").snapshot_filename == "snapshot_work_cookies_PLa.json"
+
+
+def _index(tmp_path):
+    return SourceIndex(LibraryCatalog(str(tmp_path / "library.db")))
+
+
+def test_index_records_every_source_of_a_track(tmp_path):
+    index = _index(tmp_path)
+    index.record("me:LL", ["v1", "v2"])
+    index.record("work:LL", ["v2", "v3"])
+
+    assert index.sources("v2") == ["me:LL", "work:LL"]
+    assert index.sources("v3") == ["work:LL"]
+    assert index.counts() == {"me:LL": 2, "work:LL": 2}
+    assert index.shared() == {"v2": ["me:LL", "work:LL"]}
+
+
+def test_recording_a_source_again_replaces_its_tracks(tmp_path):
+    index = _index(tmp_path)
+    index.record("me:LL", ["v1", "v2"])
+    first_seen = index._catalog.query("SELECT first_seen FROM track_sources WHERE video_id = 'v2'")
+    time.sleep(0.01)
+    index.record("me:LL", ["v2", "v3"])
+
+    assert index.video_ids("me:LL") == {"v2", "v3"}
+    assert index.sources("v1") == []
+    assert (
+        index._catalog.query("SELECT first_seen FROM track_sources WHERE video_id = 'v2'")
+        == first_seen
+    )
@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.startup import check_budget
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _loaded_after(imports: str, module: str) -> bool:
+    code = f"import sys, {imports}; sys.exit({module!r} in sys.modules)"
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT).returncode == 1
+
+
+@pytest.mark.parametrize(
+    "imports",
+    [
+        "app",
+        "tui.app",
+        "tui.screens.loading, tui.screens.browse, tui.screens.resume",
+        "scraper.tracker, scraper.snapshot, scraper.jobqueue, scraper.defaults",
+        "scraper.sources",
+        "scraper.enrich",
+    ],
+)
+def test_first_screen_does_not_import_yt_dlp(imports):
+    assert not _loaded_after(imports, "yt_dlp")
+
+
+@pytest.mark.parametrize(
+    "imports", ["scraper.downloader", "scraper.headless", "scraper.watch", "tui.screens.download"]
+)
+def test_batches_load_optional_stages_only_when_enabled(imports):
+    assert not _loaded_after(imports, "numpy")
+    # Not mutagen itself: yt-dlp imports it while probing optional dependencies
+    assert not _loaded_after(imports, "scraper.tagging")
+
+
+def test_check_budget_reports_regressions():
+    results = {"import_ms": 120.0, "browse_ms": 900.0, "deferred_loaded": []}
+
+    assert check_budget(results, {"import_ms": 200, "browse_ms": 1000}) == []
+    assert check_budget(results, {"browse_ms": 500}) == ["browse_ms: 900 ms over budget of 500 ms"]
+    assert check_budget({**results, "deferred_loaded": ["yt_dlp"]}, {}) == [
+        "loaded before first frame: yt_dlp"
+    ]
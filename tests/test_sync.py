@@ -0,0 +1,149 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from scraper.models import Track
+from scraper.snapshot import PlaylistSnapshot
+from scraper.sources import Source
+from scraper.sync import stream_liked_videos, sync_liked_videos, sync_playlist, sync_sources
+
+
+@patch("scraper.sync.fetch_new_playlist_videos")
+@patch("scraper.sync.fetch_playlist")
+def test_full_fetch_without_snapshot(mock_full, mock_new, tmp_path):
+    snapshot = PlaylistSnapshot(str(tmp_path))
+    mock_full.return_value = [Track("v1", "A", "X", 1)]
+
+    tracks, new = sync_liked_videos(snapshot)
+
+    assert tracks == new == [Track("v1", "A", "X", 1)]
+    mock_new.assert_not_called()
+    assert snapshot.load() == tracks
+
+
+@patch("scraper.sync.fetch_new_playlist_videos")
+@patch("scraper.sync.fetch_playlist")
+def test_incremental_merges_with_snapshot(mock_full, mock_new, tmp_path):
+    snapshot = PlaylistSnapshot(str(tmp_path))
+    snapshot.save([Track("v2", "B", "X", 1), Track("v3", "C", "X", 1)])
+    mock_new.return_value = [Track("v1", "A", "X", 1)]
+
+    tracks, new = sync_liked_videos(snapshot)
+
+    mock_full.assert_not_called()
+    assert mock_new.call_args[0][1] == {"v2", "v3"}
+    assert new == [Track("v1", "A", "X", 1)]
+    assert [t.video_id for t in tracks] == ["v1", "v2", "v3"]
+    assert [t.video_id for t in snapshot.load()] == ["v1", "v2", "v3"]
+
+
+@patch("scraper.sync.fetch_new_playlist_videos")
+@patch("scraper.sync.fetch_playlist")
+def test_full_flag_ignores_snapshot(mock_full, mock_new, tmp_path):
+    snapshot = PlaylistSnapshot(str(tmp_path))
+    snapshot.save([Track("v_old", "Old", "X", 1)])
+    mock_full.return_value = [Track("v1", "A", "X", 1)]
+
+    tracks, _ = sync_liked_videos(snapshot, full=True)
+
+    mock_new.assert_not_called()
+    assert snapshot.load() == tracks == [Track("v1", "A", "X", 1)]
+
+
+@patch("scraper.sync.iter_playlist")
+def test_stream_saves_snapshot_when_exhausted(mock_iter, tmp_path):
+    snapshot = PlaylistSnapshot(str(tmp_path))
+    mock_iter.return_value = iter([[Track("v1", "A", "X", 1)], [Track("v2", "B", "X", 1)]])
+
+    batches = list(stream_liked_videos(snapshot))
+
+    assert batches == [[Track("v1", "A", "X", 1)], [Track("v2", "B", "X", 1)]]
+    assert [t.video_id for t in snapshot.load()] == ["v1", "v2"]
+
+
+@patch("scraper.sync.iter_playlist")
+def test_interrupted_stream_keeps_old_snapshot(mock_iter, tmp_path):
+    snapshot = PlaylistSnapshot(str(tmp_path))
+    snapshot.save([Track("v_old", "Old", "X", 1)])
+    mock_iter.return_value = iter([[Track("v1", "A", "X", 1)], [Track("v2", "B", "X", 1)]])
+
+    stream = stream_liked_videos(snapshot)
+    next(stream)
+    stream.close()
+
+    assert [t.video_id for t in snapshot.load()] == ["v_old"]
+
+
+@patch("scraper.sync.fetch_new_playlist_videos")
+@patch("scraper.sync.fetch_playlist")
+def test_other_playlists_are_always_fetched_in_full(mock_full, mock_new, tmp_path):
+    snapshot = PlaylistSnapshot(str(tmp_path))
+    snapshot.save([Track("v1", "A", "X", 1), Track("v2", "B", "X", 1)])
+    mock_full.return_value = [Track("v2", "B", "X", 1), Track("v3", "C", "X", 1)]
+
+    tracks, new = sync_playlist(snapshot, Source("PLabc", "me.txt"))
+
+    mock_new.assert_not_called()
+    assert mock_full.call_args[0][0] == "https://www.youtube.com/playlist?list=PLabc"
+    assert mock_full.call_args[1]["cookie_file"] == "me.txt"
+    assert [t.video_id for t in tracks] == ["v2", "v3"]
+    assert new == [Track("v3", "C", "X", 1)]
+
+
+def _fake_sync(playlists, barrier=None):
+    """A sync that serves playlists[source.key] as (all, new), or raises it."""
+
+    def sync(snapshot, source, on_progress, full):
+        if barrier is not None:
+            barrier.wait(timeout=5)
+        outcome = playlists[source.key]
+        if isinstance(outcome, Exception):
+            raise outcome
+        tracks, new = outcome
+        if on_progress:
+            on_progress(len(tracks), len(tracks))
+        return [Track(v, v, "X", 1) for v in tracks], [Track(v, v, "X", 1) for v in new]
+
+    return sync
+
+
+def test_sync_sources_runs_concurrently_and_dedupes(tmp_path):
+    sources = [Source(cookie_file="me.txt"), Source(cookie_file="work.txt")]
+    playlists = {
+        "me:LL": (["v1", "v2", "v3"], ["v1"]),
+        # v2 is new to this account but "me" already had it
+        "work:LL": (["v2", "v4"], ["v2", "v4"]),
+    }
+    progress = []
+
+    # Both syncs must be running at once to get past the barrier
+    result = sync_sources(
+        sources,
+        str(tmp_path),
+        on_progress=lambda current, total: progress.append((current, total)),
+        sync=_fake_sync(playlists, threading.Barrier(2)),
+    )
+
+    assert [t.video_id for t in result.tracks] == ["v1", "v2", "v3", "v4"]
+    assert [t.video_id for t in result.new] == ["v1", "v4"]
+    assert result.by_source == {"me:LL": ["v1", "v2", "v3"], "work:LL": ["v2", "v4"]}
+    assert result.sources("v2") == ["me:LL", "work:LL"]
+    assert progress[-1] == (5, 5)
+
+
+def test_sync_sources_keeps_going_when_one_source_fails(tmp_path):
+    sources = [Source("PLa"), Source("PLb")]
+    playlists = {"cookies:PLa": RuntimeError("cookies expired"), "cookies:PLb": (["v1"], [])}
+
+    result = sync_sources(sources, str(tmp_path), sync=_fake_sync(playlists))
+
+    assert [t.video_id for t in result.tracks] == ["v1"]
+    assert result.errors == {"cookies:PLa": "cookies expired"}
+
+
+def test_single_source_failure_propagates(tmp_path):
+    playlists = {"cookies:LL": RuntimeError("cookies expired")}
+
+    with pytest.raises(RuntimeError, match="cookies expired"):
+        sync_sources([Source()], str(tmp_path), sync=_fake_sync(playlists))
@@ -0,0 +1,232 @@
+import base64
+import os
+import struct
+import threading
+
+from mutagen.flac import Picture
+from mutagen.id3 import ID3
+from mutagen.mp4 import MP4
+from mutagen.ogg import OggPage
+from mutagen.oggopus import OggOpus
+
+from scraper.catalog import LibraryCatalog
+from scraper.models import Track, TrackMetadata
+from scraper.tagging import Tagger, ThumbnailCache, thumbnail_url
+
+JPEG = b"\xff\xd8\xff\xe0" + b"cover" * 20
+PNG = b"\x89PNG\r\n\x1a\n" + b"art" * 20
+TRACK = Track("v1", "Song (Official Video)", "ArtistVEVO", 200)
+METADATA = TrackMetadata("Artist", "Song", "Album", 2019, "https://img/cover.jpg")
+
+
+def _cache(tmp_path, images, max_bytes=10_000):
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        if url not in images:
+            raise OSError("HTTP Error 404: Not Found")
+        return images[url]
+
+    cache = ThumbnailCache(
+        LibraryCatalog(str(tmp_path / "library.db")), str(tmp_path / "thumbs"), max_bytes, fetch
+    )
+    return cache, fetched
+
+
+def _stored_files(tmp_path):
+    return sorted(name for _, _, files in os.walk(tmp_path / "thumbs") for name in files)
+
+
+def test_thumbnails_are_fetched_once_and_stored_by_content(tmp_path):
+    cache, fetched = _cache(tmp_path, {"a": JPEG, "b": JPEG, "c": PNG})
+
+    images = [cache.get(url) for url in ("a", "a", "b", "c", "missing")]
+
+    assert images == [JPEG, JPEG, JPEG, PNG, None]
+    assert fetched == ["a", "b", "c", "missing"]
+    # Two URLs serving the same image share one file
+    assert len(_stored_files(tmp_path)) == 2
+    assert cache.total_size() == len(JPEG) + len(PNG)
+
+
+def test_least_recently_used_thumbnails_are_evicted(tmp_path):
+    images = {name: b"\xff\xd8\xff" + name.encode() * 100 for name in "abc"}
+    cache, fetched = _cache(tmp_path, images, max_bytes=250)
+
+    cache.get("a")
+    cache.get("b")
+    cache.get("a")  # b is now the least recently used
+    cache.get("c")
+
+    assert cache.total_size() <= 250
+    assert len(_stored_files(tmp_path)) == 2
+    cache.get("a")
+    cache.get("b")
+    assert fetched == ["a", "b", "c", "b"]
+
+
+def test_concurrent_requests_share_one_download(tmp_path):
+    release = threading.Event()
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        release.wait(5)
+        return JPEG
+
+    cache = ThumbnailCache(LibraryCatalog(str(tmp_path / "library.db")), str(tmp_path), fetch=fetch)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("a"))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert fetched == ["a"]
+    assert results == [JPEG] * 4
+
+
+def test_a_request_arriving_during_a_retry_waits_for_it(tmp_path):
+    first_failed, second_started, release = threading.Event(), threading.Event(), threading.Event()
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        if len(fetched) == 1:
+            first_failed.wait(5)
+            raise OSError("HTTP Error 503: Service Unavailable")
+        second_started.set()
+        release.wait(5)
+        return JPEG
+
+    cache = ThumbnailCache(LibraryCatalog(str(tmp_path / "library.db")), str(tmp_path), fetch=fetch)
+    results = {}
+
+    def get(name):
+        thread = threading.Thread(target=lambda: results.setdefault(name, cache.get("a")))
+        thread.start()
+        return thread
+
+    threads = [get("first")]
+    while not fetched:
+        threading.Event().wait(0.01)
+    threads.append(get("second"))
+    threading.Event().wait(0.05)
+    first_failed.set()
+    # The second caller downloads again; a third must wait on the same lock
+    assert second_started.wait(5)
+    threads.append(get("third"))
+    threading.Event().wait(0.05)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert fetched == ["a", "a"]
+    assert results == {"first": None, "second": JPEG, "third": JPEG}
+
+
+def test_images_ffmpeg_cant_convert_are_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr("scraper.tagging.FFMPEG", str(tmp_path / "no-ffmpeg"))
+    cache, _ = _cache(tmp_path, {"a": b"RIFF....WEBPVP8 "})
+
+    assert cache.get("a") is None
+
+
+def _tagger(tmp_path):
+    cache, fetched = _cache(tmp_path, {"https://img/cover.jpg": JPEG, thumbnail_url("v1"): PNG})
+    return Tagger(cache), fetched
+
+
+def test_mp3_gets_id3_tags_and_the_audio_is_untouched(tmp_path):
+    path = tmp_path / "song.mp3"
+    audio = b"\xff\xfb\x90\x00" * 100
+    path.write_bytes(audio)
+    tagger, _ = _tagger(tmp_path)
+
+    assert tagger.tag(str(path), TRACK, METADATA)
+
+    tags = ID3(path)
+    assert (str(tags["TPE1"]), str(tags["TIT2"]), str(tags["TALB"])) == ("Artist", "Song", "Album")
+    assert str(tags["TDRC"]) == "2019"
+    (cover,) = tags.getall("APIC")
+    assert (cover.mime, cover.type, cover.data) == ("image/jpeg", 3, JPEG)
+    assert path.read_bytes().endswith(audio)
+
+
+def test_without_metadata_the_channel_title_and_video_thumbnail_are_used(tmp_path):
+    path = tmp_path / "song.mp3"
+    path.write_bytes(b"\xff\xfb\x90\x00" * 10)
+    tagger, fetched = _tagger(tmp_path)
+
+    assert tagger.tag(str(path), TRACK)
+
+    tags = ID3(path)
+    assert (str(tags["TPE1"]), str(tags["TIT2"])) == ("ArtistVEVO", "Song (Official Video)")
+    assert "TALB" not in tags
+    assert tags.getall("APIC")[0].mime == "image/png"
+    assert fetched == [thumbnail_url("v1")]
+
+
+def _opus_file(path):
+    head = b"OpusHead" + struct.pack("<BBHIhB", 1, 2, 312, 48000, 0, 0)
+    tags = b"OpusTags" + struct.pack("<I", 6) + b"vendor" + struct.pack("<I", 0)
+    pages = []
+    for sequence, packet in enumerate([head, tags, b"\xfc\xff\xfe"]):
+        page = OggPage()
+        page.serial, page.sequence, page.packets = 1, sequence, [packet]
+        page.first = sequence == 0
+        page.last = sequence == 2
+        page.position = 960 if page.last else 0
+        pages.append(page.write())
+    path.write_bytes(b"".join(pages))
+
+
+def test_opus_gets_vorbis_comments_and_a_picture_block(tmp_path):
+    path = tmp_path / "song.opus"
+    _opus_file(path)
+    tagger, _ = _tagger(tmp_path)
+
+    assert tagger.tag(str(path), TRACK, METADATA)
+
+    audio = OggOpus(path)
+    assert (audio["artist"], audio["title"], audio["date"]) == (["Artist"], ["Song"], ["2019"])
+    picture = Picture(base64.b64decode(audio["metadata_block_picture"][0]))
+    assert (picture.type, picture.mime, picture.data) == (3, "image/jpeg", JPEG)
+
+
+def _m4a_file(path):
+    def atom(name, data):
+        return struct.pack(">I", 8 + len(data)) + name + data
+
+    mvhd = atom(b"mvhd", b"\0" * 4 + struct.pack(">IIII", 0, 0, 1000, 1000) + b"\0" * 80)
+    path.write_bytes(
+        atom(b"ftyp", b"M4A \0\0\0\0M4A isom") + atom(b"moov", mvhd) + atom(b"mdat", b"\0" * 16)
+    )
+
+
+def test_m4a_gets_itunes_atoms(tmp_path):
+    path = tmp_path / "song.m4a"
+    _m4a_file(path)
+    tagger, _ = _tagger(tmp_path)
+
+    assert tagger.tag(str(path), TRACK, METADATA)
+
+    audio = MP4(path)
+    assert audio["\xa9ART"] == ["Artist"]
+    assert (audio["\xa9alb"], audio["\xa9day"]) == (["Album"], ["2019"])
+    assert bytes(audio["covr"][0]) == JPEG
+
+
+def test_formats_mutagen_cannot_write_are_left_alone(tmp_path):
+    path = tmp_path / "song.webm"
+    path.write_bytes(b"\x1a\x45\xdf\xa3webm")
+    corrupt = tmp_path / "corrupt.opus"
+    corrupt.write_bytes(b"not ogg")
+    tagger, fetched = _tagger(tmp_path)
+
+    assert not tagger.tag(str(path), TRACK, METADATA)
+    assert not tagger.tag(str(corrupt), TRACK, METADATA)
+    assert path.read_bytes() == b"\x1a\x45\xdf\xa3webm"
+    assert fetched == ["https://img/cover.jpg"]
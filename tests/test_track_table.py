@@ -0,0 +1,110 @@
+from scraper.models import Track, TrackMetadata
+from tui.widgets.track_table import TrackListModel
+
+
+def _tracks(*ids):
+    return [Track(v, f"Song {v}", "Artist", 100) for v in ids]
+
+
+def test_append_and_prepend_skip_known_ids():
+    model = TrackListModel(_tracks("b", "c"))
+
+    assert model.prepend(_tracks("a", "b")) == _tracks("a")
+    assert model.append(_tracks("c", "d")) == _tracks("d")
+    assert [t.video_id for t in model] == ["a", "b", "c", "d"]
+    assert "d" in model and len(model) == 4
+
+
+def test_remove_drops_rows_and_their_selection():
+    model = TrackListModel(_tracks("a", "b", "c"))
+    model.toggle("a")
+    model.toggle("b")
+
+    assert model.remove(["b", "c", "missing"]) == 2
+    assert [t.video_id for t in model] == ["a"]
+    assert model.selected == {"a"}
+    assert model.remove(["b"]) == 0
+
+
+def test_toggle_and_bulk_selection():
+    model = TrackListModel(_tracks("a", "b", "c"))
+
+    assert model.toggle("b") is True
+    assert model.toggle("b") is False
+    assert model.toggle("missing") is False
+
+    model.select_all()
+    assert model.selected == {"a", "b", "c"}
+    model.toggle("a")
+    assert [t.video_id for t in model.selected_tracks()] == ["b", "c"]
+    model.deselect_all()
+    assert model.selected == set()
+
+
+def test_bulk_operations_on_large_list_are_set_operations():
+    tracks = [Track(f"v{i}", "T", "C", 1) for i in range(50_000)]
+    model = TrackListModel(tracks)
+    model.select_all()
+
+    assert model.remove(f"v{i}" for i in range(0, 50_000, 2)) == 25_000
+    assert len(model.selected) == len(model) == 25_000
+    assert model[0].video_id == "v1"
+
+
+def test_filter_limits_visible_and_select_all_matching():
+    model = TrackListModel(
+        [
+            Track("a", "Blue", "X", 100),
+            Track("b", "Red", "Y", 100),
+            Track("c", "Blue Moon", "Y", 100),
+        ]
+    )
+    model.set_filter("blue")
+
+    assert [t.video_id for t in model.visible] == ["a", "c"]
+    model.select_all()
+    assert model.selected == {"a", "c"}
+
+    # New and removed tracks are reflected in the filtered view
+    model.append([Track("d", "Bluebird", "Z", 100)])
+    model.remove(["a"])
+    assert [t.video_id for t in model.visible] == ["c", "d"]
+
+    model.set_filter("")
+    assert not model.is_filtered
+    assert len(model.visible) == 3
+
+
+def test_attach_index_catches_up_with_changes_made_while_building():
+    model = TrackListModel(_tracks("b", "c", "d"))
+    index = TrackListModel.build_index(model.tracks)
+    model.prepend(_tracks("a"))
+    model.append(_tracks("e"))
+    model.remove(["c"])
+
+    model.attach_index(index)
+    model.set_filter("song")
+    assert [t.video_id for t in model.visible] == ["a", "b", "d", "e"]
+
+
+def test_metadata_fills_in_as_it_arrives():
+    model = TrackListModel(_tracks("a", "b"))
+    model.set_metadata({"a": TrackMetadata("Artist A", album="Album")})
+    model.set_metadata({"b": TrackMetadata(release_year=1999)})
+
+    assert model.metadata == {
+        "a": TrackMetadata("Artist A", album="Album"),
+        "b": TrackMetadata(release_year=1999),
+    }
+
+
+def test_duplicates_can_be_deselected_in_one_go():
+    model = TrackListModel(_tracks("a", "b", "c"))
+    model.select_all()
+    model.set_duplicates({"b": "lib1"})
+    model.set_duplicates({"c": "a"})
+
+    model.deselect(model.duplicates)
+
+    assert model.duplicates == {"b": "lib1", "c": "a"}
+    assert model.selected == {"a"}
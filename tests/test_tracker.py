@@ -1,6 +1,7 @@
 import json
 import os
 
+from scraper.models import AudioAnalysis, Track
 from scraper.tracker import ProgressTracker
 
 
@@ -41,14 +42,126 @@ def test_creates_downloads_dir(tmp_path):
     assert os.path.isdir(downloads)
 
 
-def test_manifest_json_format(tmp_path):
+def test_concurrent_mark_and_save(tmp_path):
+    import threading
+
     downloads = str(tmp_path / "downloads")
     tracker = ProgressTracker(downloads)
     tracker.load()
-    tracker.mark_downloaded("b_vid")
-    tracker.mark_downloaded("a_vid")
-    tracker.save()
 
-    with open(os.path.join(downloads, "manifest.json")) as f:
-        data = json.load(f)
-    assert data["downloaded"] == ["a_vid", "b_vid"]  # sorted
+    def worker(start):
+        for i in range(start, start + 50):
+            tracker.mark_downloaded(f"vid{i}")
+            tracker.save()
+
+    threads = [threading.Thread(target=worker, args=(n * 50,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    tracker2 = ProgressTracker(downloads)
+    tracker2.load()
+    assert all(tracker2.is_downloaded(f"vid{i}") for i in range(200))
+
+
+def test_mark_is_durable_without_save(tmp_path):
+    downloads = str(tmp_path / "downloads")
+    tracker = ProgressTracker(downloads)
+    tracker.load()
+    tracker.mark_downloaded("vid1")
+
+    tracker2 = ProgressTracker(downloads)
+    tracker2.load()
+    assert tracker2.is_downloaded("vid1")
+
+
+def test_mark_records_track_metadata(tmp_path):
+    downloads = str(tmp_path / "downloads")
+    path = os.path.join(downloads, "Artist - Song.mp3")
+    tracker = ProgressTracker(downloads)
+    tracker.load()
+    with open(path, "wb") as f:
+        f.write(b"x" * 42)
+
+    tracker.mark_downloaded(
+        "vid1", track=Track("vid1", "Song", "Artist", 200), path=path, source_format="webm"
+    )
+
+    entry = tracker.catalog.get("vid1")
+    assert entry.path == path
+    assert entry.size == 42
+    assert entry.duration == 200
+    assert entry.channel == "Artist"
+    assert entry.title == "Song"
+    assert entry.source_format == "webm"
+    assert entry.output_format == "mp3"
+    assert entry.downloaded_at > 0
+
+
+def test_mark_records_non_mp3_output(tmp_path):
+    downloads = str(tmp_path / "downloads")
+    tracker = ProgressTracker(downloads)
+    tracker.load()
+    path = os.path.join(downloads, "Artist - Song.opus")
+    with open(path, "wb") as f:
+        f.write(b"x" * 7)
+
+    tracker.mark_downloaded("vid1", path=path, source_format="webm")
+
+    entry = tracker.catalog.get("vid1")
+    assert (entry.path, entry.size, entry.output_format) == (path, 7, "opus")
+    reloaded = ProgressTracker(downloads)
+    reloaded.load()
+    assert reloaded.is_downloaded("vid1")
+
+
+def test_analysis_round_trips_and_survives_reopening(tmp_path):
+    downloads = str(tmp_path / "downloads")
+    tracker = ProgressTracker(downloads)
+    tracker.load()
+    analysis = AudioAnalysis(200.0, -9.5, -0.3, leading_silence=1.2, trailing_silence=0.0)
+
+    assert tracker.analysis("vid1") is None
+    tracker.record_analysis("vid1", analysis)
+    tracker.record_analysis("vid2", AudioAnalysis(3.0, None, -60.0))
+
+    reloaded = ProgressTracker(downloads)
+    assert reloaded.analysis("vid1") == analysis
+    assert reloaded.analysis("vid2").loudness is None
+
+
+def test_migrates_legacy_manifest_and_journal(tmp_path):
+    downloads = str(tmp_path / "downloads")
+    os.makedirs(downloads)
+    with open(os.path.join(downloads, "manifest.json"), "w") as f:
+        json.dump({"downloaded": ["a", "b"]}, f, indent=2)
+    with open(os.path.join(downloads, "manifest.journal"), "w") as f:
+        f.write('{"downloaded": "c"}\n{"downloa')
+
+    tracker = ProgressTracker(downloads)
+    tracker.load()
+    assert all(tracker.is_downloaded(v) for v in ("a", "b", "c"))
+    assert len(tracker.catalog) == 3
+    # Legacy files are left in place
+    assert os.path.exists(os.path.join(downloads, "manifest.json"))
+
+
+def test_migration_runs_once(tmp_path):
+    downloads = str(tmp_path / "downloads")
+    os.makedirs(downloads)
+    manifest = os.path.join(downloads, "manifest.json")
+    with open(manifest, "w") as f:
+        json.dump({"downloaded": ["a"]}, f)
+
+    tracker = ProgressTracker(downloads)
+    tracker.load()
+    tracker.close()
+
+    # IDs added to the old manifest after migration are not re-imported
+    with open(manifest, "w") as f:
+        json.dump({"downloaded": ["a", "late"]}, f)
+    tracker2 = ProgressTracker(downloads)
+    tracker2.load()
+    assert tracker2.is_downloaded("a")
+    assert not tracker2.is_downloaded("late")
@@ -0,0 +1,239 @@
+import os
+import pickle
+import subprocess
+import sys
+from functools import partial
+from unittest.mock import patch
+
+import pytest
+
+from scraper.transcode import (
+    OutputFormat,
+    OutputMode,
+    StreamEncoder,
+    TranscodeError,
+    convert,
+    transcode_to_mp3,
+)
+
+
+def _completed(returncode=0, stderr=""):
+    return subprocess.CompletedProcess(args=[], returncode=returncode, stdout="", stderr=stderr)
+
+
+@patch("scraper.transcode.subprocess.run")
+def test_transcode_writes_then_renames(mock_run, tmp_path):
+    dst = str(tmp_path / "Artist - Title.mp3")
+
+    def fake_run(cmd, **kwargs):
+        with open(cmd[-1], "wb") as f:
+            f.write(b"mp3")
+        return _completed()
+
+    mock_run.side_effect = fake_run
+
+    assert transcode_to_mp3("raw.webm", dst) == dst
+
+    cmd = mock_run.call_args[0][0]
+    assert cmd[0] == "ffmpeg"
+    assert cmd[cmd.index("-i") + 1] == "raw.webm"
+    assert cmd[cmd.index("-codec:a") + 1] == "libmp3lame"
+    assert cmd[-1] == dst + ".part"
+    assert (tmp_path / "Artist - Title.mp3").read_bytes() == b"mp3"
+    assert not (tmp_path / "Artist - Title.mp3.part").exists()
+
+
+@patch("scraper.transcode.subprocess.run")
+def test_transcode_failure_cleans_up(mock_run, tmp_path):
+    dst = str(tmp_path / "out.mp3")
+
+    def fake_run(cmd, **kwargs):
+        with open(cmd[-1], "wb") as f:
+            f.write(b"partial")
+        return _completed(1, "some warning\nInvalid data found when processing input\n")
+
+    mock_run.side_effect = fake_run
+
+    with pytest.raises(TranscodeError, match="Invalid data found"):
+        transcode_to_mp3("raw.webm", dst)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def _ffmpeg_writes(returncode=0):
+    def fake_run(cmd, **kwargs):
+        with open(cmd[-1], "wb") as f:
+            f.write(b"out")
+        return _completed(returncode, "" if returncode == 0 else "Could not write header\n")
+
+    return fake_run
+
+
+def _raw(tmp_path, name="vid1.webm"):
+    src = tmp_path / name
+    src.write_bytes(b"raw")
+    return str(src)
+
+
+@pytest.mark.parametrize(
+    "output_format, src, extension",
+    [
+        (OutputFormat(OutputMode.NATIVE), "vid.webm", ".webm"),
+        (OutputFormat(OutputMode.REMUX), "vid.webm", ".opus"),
+        (OutputFormat(OutputMode.REMUX), "vid.m4a", ".m4a"),
+        (OutputFormat(OutputMode.REMUX), "vid.flv", ".mka"),
+        (OutputFormat(OutputMode.MP3), "vid.m4a", ".mp3"),
+        (OutputFormat(OutputMode.OPUS, "96k"), "vid.m4a", ".opus"),
+    ],
+)
+def test_output_extension(output_format, src, extension):
+    assert output_format.extension(src) == extension
+
+
+@patch("scraper.transcode.subprocess.run")
+def test_native_moves_the_file_without_ffmpeg(mock_run, tmp_path):
+    src = _raw(tmp_path)
+    dst = str(tmp_path / "Artist - Title.webm")
+
+    assert convert(src, dst, OutputFormat(OutputMode.NATIVE)) == dst
+
+    mock_run.assert_not_called()
+    assert (tmp_path / "Artist - Title.webm").read_bytes() == b"raw"
+    assert not os.path.exists(src)
+
+
+@patch("scraper.transcode.subprocess.run")
+def test_remux_copies_the_stream(mock_run, tmp_path):
+    mock_run.side_effect = _ffmpeg_writes()
+    dst = str(tmp_path / "Artist - Title.opus")
+
+    assert convert(_raw(tmp_path), dst, OutputFormat(OutputMode.REMUX, threads=2)) == dst
+
+    cmd = mock_run.call_args[0][0]
+    assert cmd[cmd.index("-codec:a") + 1] == "copy"
+    assert cmd[cmd.index("-f") + 1] == "opus"
+    assert cmd[cmd.index("-threads") + 1] == "2"
+
+
+@patch("scraper.transcode.subprocess.run")
+def test_remux_falls_back_to_native_file(mock_run, tmp_path):
+    mock_run.side_effect = _ffmpeg_writes(returncode=1)
+    src = _raw(tmp_path)
+
+    path = convert(src, str(tmp_path / "Artist - Title.opus"), OutputFormat(OutputMode.REMUX))
+
+    assert path == str(tmp_path / "Artist - Title.webm")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["Artist - Title.webm"]
+
+
+@patch("scraper.transcode.subprocess.run")
+def test_opus_source_is_copied_unless_a_bitrate_is_asked_for(mock_run, tmp_path):
+    mock_run.side_effect = _ffmpeg_writes()
+    dst = str(tmp_path / "out.opus")
+
+    convert(_raw(tmp_path), dst, OutputFormat(OutputMode.OPUS))
+    cmd = mock_run.call_args[0][0]
+    assert cmd[cmd.index("-codec:a") + 1] == "copy"
+
+    convert(_raw(tmp_path), dst, OutputFormat(OutputMode.OPUS, bitrate="96k"))
+    cmd = mock_run.call_args[0][0]
+    assert cmd[cmd.index("-codec:a") + 1] == "libopus"
+    assert cmd[cmd.index("-b:a") + 1] == "96k"
+
+
+@patch("scraper.transcode.subprocess.run")
+def test_mp3_bitrate(mock_run, tmp_path):
+    mock_run.side_effect = _ffmpeg_writes()
+
+    convert(_raw(tmp_path), str(tmp_path / "out.mp3"), OutputFormat(OutputMode.MP3, "320k"))
+
+    cmd = mock_run.call_args[0][0]
+    assert cmd[cmd.index("-codec:a") + 1] == "libmp3lame"
+    assert cmd[cmd.index("-b:a") + 1] == "320k"
+    assert "-threads" not in cmd
+
+
+def test_bound_converter_pickles_for_the_process_pool():
+    bound = partial(convert, output_format=OutputFormat(OutputMode.OPUS, "128k", 1))
+
+    assert pickle.loads(pickle.dumps(bound)).keywords == bound.keywords
+
+
+# Stands in for ffmpeg: copies stdin to the output path (the last argument),
+# or reads a little and fails when FAKE_FFMPEG_FAIL is set
+_FAKE_FFMPEG = """\
+import os, sys
+if os.environ.get("FAKE_FFMPEG_FAIL"):
+    sys.stdin.buffer.read(16)
+    sys.stderr.write("pipe:0: Invalid data found when processing input\\n")
+    sys.exit(1)
+with open(sys.argv[-1], "wb") as out:
+    out.write(sys.stdin.buffer.read())
+"""
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    script = tmp_path / "fake_ffmpeg.py"
+    script.write_text(f"#!{sys.executable}\n{_FAKE_FFMPEG}")
+    script.chmod(0o755)
+    monkeypatch.setattr("scraper.transcode.FFMPEG", str(script))
+    out = tmp_path / "out"
+    out.mkdir()
+    return out
+
+
+def test_stream_encoder_pipes_chunks_through_ffmpeg(fake_ffmpeg):
+    dst = str(fake_ffmpeg / "Artist - Title.mp3")
+
+    with StreamEncoder(dst, OutputFormat(OutputMode.MP3, "192k"), "webm") as encoder:
+        for chunk in (b"one", b"two", b"three"):
+            encoder.write(chunk)
+        assert encoder.finish() == dst
+
+    cmd = encoder._process.args
+    assert cmd[cmd.index("-i") + 1] == "pipe:0"
+    assert cmd[cmd.index("-b:a") + 1] == "192k"
+    assert os.listdir(fake_ffmpeg) == ["Artist - Title.mp3"]
+    assert (fake_ffmpeg / "Artist - Title.mp3").read_bytes() == b"onetwothree"
+
+
+def test_stream_encoder_copies_opus_and_keeps_native_without_ffmpeg(fake_ffmpeg):
+    opus = OutputFormat(OutputMode.OPUS)
+    with StreamEncoder(str(fake_ffmpeg / "a.opus"), opus, ".webm") as encoder:
+        encoder.write(b"opus")
+        encoder.finish()
+    cmd = encoder._process.args
+    assert cmd[cmd.index("-codec:a") + 1] == "copy"
+
+    native = OutputFormat(OutputMode.NATIVE)
+    with patch("scraper.transcode.subprocess.Popen") as popen:
+        with StreamEncoder(str(fake_ffmpeg / "b.webm"), native, "webm") as encoder:
+            encoder.write(b"raw")
+            encoder.finish()
+    popen.assert_not_called()
+    assert (fake_ffmpeg / "b.webm").read_bytes() == b"raw"
+
+
+def test_stream_encoder_failure_raises_and_cleans_up(fake_ffmpeg, monkeypatch):
+    monkeypatch.setenv("FAKE_FFMPEG_FAIL", "1")
+
+    with pytest.raises(TranscodeError, match="Invalid data found"):
+        with StreamEncoder(str(fake_ffmpeg / "out.mp3"), OutputFormat(), "webm") as encoder:
+            for _ in range(64):
+                encoder.write(b"x" * 65536)
+            encoder.finish()
+
+    assert os.listdir(fake_ffmpeg) == []
+
+
+def test_stream_encoder_abort_kills_ffmpeg_and_removes_partial_output(fake_ffmpeg):
+    dst = str(fake_ffmpeg / "out.mp3")
+
+    with pytest.raises(KeyboardInterrupt):
+        with StreamEncoder(dst, OutputFormat(), "webm") as encoder:
+            encoder.write(b"half a song")
+            raise KeyboardInterrupt
+
+    assert encoder._process.returncode is not None
+    assert os.listdir(fake_ffmpeg) == []
@@ -0,0 +1,222 @@
+import io
+import json
+import signal
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from scraper.headless import EXIT_CANCELLED, EXIT_OK, EXIT_SYNC_FAILED
+from scraper.watch import StatusServer, WatchStatus, run_watch
+
+
+class _Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _poll_events(status, failed=True):
+    status.record("sync_start", {"full": False})
+    status.record("sync_done", {"selected": 3})
+    for video_id in ("v1", "v2", "v3"):
+        status.record("start", {"video_id": video_id, "title": video_id.upper()})
+    status.record("done", {"video_id": "v1", "path": "/music/v1.mp3"})
+    if failed:
+        status.record("failed", {"video_id": "v2", "title": "V2", "error": "Video unavailable"})
+    status.record("batch_progress", {"speed": 2048, "eta": 12.5})
+
+
+def test_status_follows_a_poll():
+    clock = _Clock()
+    status = WatchStatus(interval=900, clock=clock)
+    clock.now += 10
+    _poll_events(status)
+
+    snapshot = status.snapshot()
+    assert status.busy
+    assert snapshot["state"] == "downloading"
+    assert snapshot["polls"] == 1
+    assert snapshot["queue"] == {
+        "selected": 3,
+        "completed": 1,
+        "failed": 1,
+        "pending": 1,
+        "paused_for_disk": None,
+        "active": [{"video_id": "v3", "title": "V3"}],
+    }
+    assert snapshot["throughput"]["speed"] == 2048
+    assert snapshot["recent_failures"] == [
+        {"time": 1010.0, "video_id": "v2", "title": "V2", "error": "Video unavailable"}
+    ]
+
+    status.record("done", {"video_id": "v3"})
+    status.record("summary", {"status": "failed", "downloaded": 2, "failed": 1})
+    status.poll_finished(next_poll_at=1910.0)
+    clock.now = 1000 + 3600
+    snapshot = status.snapshot()
+    assert not status.busy
+    assert snapshot["state"] == "idle"
+    assert snapshot["queue"]["active"] == []
+    assert snapshot["last_poll"] == {
+        "finished_at": 1010.0,
+        "status": "failed",
+        "downloaded": 2,
+        "failed": 1,
+    }
+    assert snapshot["next_poll_at"] == 1910.0
+    assert snapshot["throughput"]["downloads_per_hour"] == 2.0
+    json.dumps(snapshot)
+
+
+def test_recent_failures_are_capped():
+    status = WatchStatus(interval=60, max_failures=2)
+    for poll in range(3):
+        status.record("sync_start", {})
+        status.record("sync_failed", {"error": f"HTTP Error 503 ({poll})"})
+        status.record("summary", {"status": "sync_failed"})
+
+    failures = status.snapshot()["recent_failures"]
+    assert [f["error"] for f in failures] == ["HTTP Error 503 (1)", "HTTP Error 503 (2)"]
+    assert status.snapshot()["polls"] == 3
+
+
+def test_status_is_served_on_a_local_port():
+    status = WatchStatus(interval=60)
+    _poll_events(status, failed=False)
+    server = StatusServer(status, port=0)
+    server.start()
+    try:
+        with urllib.request.urlopen(server.url, timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("application/json")
+            body = json.load(response)
+        host, port = server.address
+        with urllib.request.urlopen(f"http://{host}:{port}/healthz", timeout=5) as response:
+            assert response.read() == b"ok\n"
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"http://{host}:{port}/", timeout=5)
+        assert error.value.code == 404
+    finally:
+        server.close()
+
+    assert host == "127.0.0.1"
+    assert body["state"] == "downloading"
+    assert body["queue"]["completed"] == 1
+
+
+def _fake_run(calls, stop, polls=3, code=EXIT_OK):
+    def run(reporter, full, **kwargs):
+        calls.append((full, kwargs))
+        reporter.emit("sync_start", full=full)
+        reporter.emit("summary", status="ok", selected=0, downloaded=0, failed=0)
+        if len(calls) == polls:
+            stop.set()
+        return code
+
+    return run
+
+
+def _events(out):
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_polls_until_stopped_and_only_the_first_is_full():
+    calls, stop, out = [], threading.Event(), io.StringIO()
+
+    code = run_watch(
+        interval=0.01,
+        status_port=None,
+        stop=stop,
+        stream=out,
+        run=_fake_run(calls, stop),
+        handle_signals=False,
+        full=True,
+        limit=5,
+    )
+
+    assert code == EXIT_OK
+    assert calls == [(True, {"limit": 5}), (False, {"limit": 5}), (False, {"limit": 5})]
+    events = _events(out)
+    assert events[0]["event"] == "watch_start"
+    assert events[0]["status_url"] is None
+    assert events[-1] == {"event": "watch_stop", "time": events[-1]["time"], "polls": 3}
+
+
+def test_a_failed_poll_does_not_stop_the_watch():
+    calls, stop = [], threading.Event()
+
+    run_watch(
+        interval=0.01,
+        status_port=None,
+        stop=stop,
+        stream=io.StringIO(),
+        run=_fake_run(calls, stop, polls=2, code=EXIT_SYNC_FAILED),
+        handle_signals=False,
+    )
+
+    assert len(calls) == 2
+
+
+def test_a_cancelled_poll_stops_the_watch():
+    calls = []
+
+    code = run_watch(
+        interval=0.01,
+        status_port=None,
+        stream=io.StringIO(),
+        run=_fake_run(calls, threading.Event(), code=EXIT_CANCELLED),
+        handle_signals=False,
+    )
+
+    assert code == EXIT_OK
+    assert len(calls) == 1
+
+
+def test_sigterm_interrupts_a_running_poll_and_stops_the_watch():
+    previous = signal.getsignal(signal.SIGTERM)
+    out, calls = io.StringIO(), []
+
+    def run(reporter, full, **kwargs):
+        calls.append(full)
+        reporter.emit("sync_start", full=full)
+        try:
+            signal.raise_signal(signal.SIGTERM)
+        except KeyboardInterrupt:
+            # What BatchDownloader.run and run_headless do: clean up, report
+            reporter.emit("summary", status="cancelled")
+            return EXIT_CANCELLED
+        return EXIT_OK
+
+    code = run_watch(interval=60, status_port=0, stream=out, run=run)
+
+    assert code == EXIT_OK
+    assert calls == [False]
+    assert [e["event"] for e in _events(out)] == [
+        "watch_start",
+        "sync_start",
+        "summary",
+        "watch_stop",
+    ]
+    assert signal.getsignal(signal.SIGTERM) is previous
+
+
+def test_a_signal_between_polls_ends_the_wait():
+    stop = threading.Event()
+    calls = []
+
+    def run(reporter, full, **kwargs):
+        calls.append(full)
+        reporter.emit("summary", status="ok")
+        # Delivered while idle: it only has to wake the sleeping loop
+        main = threading.main_thread().ident
+        threading.Timer(0.05, signal.pthread_kill, (main, signal.SIGTERM)).start()
+        return EXIT_OK
+
+    code = run_watch(interval=30, status_port=None, stop=stop, stream=io.StringIO(), run=run)
+
+    assert code == EXIT_OK
+    assert calls == [False]
+    assert stop.is_set()
@@ -1,7 +1,23 @@
+import io
+import os
+import threading
 from unittest.mock import MagicMock, patch
 
-from scraper.models import Track
-from scraper.ytdlp_client import download_track, fetch_liked_videos
+import pytest
+
+from scraper.models import Track, TrackMetadata
+from scraper.transcode import OutputFormat, OutputMode
+from scraper.ytdlp_client import (
+    DownloadCancelled,
+    StreamingUnsupported,
+    fetch_audio,
+    fetch_liked_videos,
+    fetch_metadata,
+    fetch_new_liked_videos,
+    iter_liked_videos,
+    read_preview,
+    stream_to_file,
+)
 
 
 def _make_entry(video_id="vid1", title="Test Song", uploader="Test Artist", duration=200):
@@ -60,60 +76,248 @@ def test_empty_playlist(mock_ydl_cls):
 
 
 @patch("scraper.ytdlp_client.yt_dlp.YoutubeDL")
-def test_download_track_calls_ydl_correctly(mock_ydl_cls):
+def test_fetch_audio_skips_postprocessing(mock_ydl_cls):
     mock_ydl = MagicMock()
     mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
     mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+    mock_ydl.extract_info.return_value = {
+        "requested_downloads": [{"filepath": "dl/.raw/vid1.webm"}]
+    }
 
-    download_track("vid1", "Artist", "Title", downloads_dir="dl")
+    result = fetch_audio("vid1", downloads_dir="dl")
 
-    # Verify constructor was called with correct opts
     opts = mock_ydl_cls.call_args[0][0]
-    assert opts["format"] == "bestaudio/best"
-    assert opts["cookiefile"] == "cookies.txt"
+    assert "postprocessors" not in opts
+    assert opts["outtmpl"].replace("\\", "/") == "dl/.raw/vid1.%(ext)s"
+    mock_ydl.extract_info.assert_called_once_with(
+        "https://www.youtube.com/watch?v=vid1", download=True
+    )
+    assert result == "dl/.raw/vid1.webm"
 
-    # Verify postprocessor is FFmpegExtractAudio with mp3
-    pp = opts["postprocessors"]
-    assert len(pp) == 1
-    assert pp[0]["key"] == "FFmpegExtractAudio"
-    assert pp[0]["preferredcodec"] == "mp3"
 
-    # Verify correct URL was downloaded
-    mock_ydl.download.assert_called_once_with(["https://www.youtube.com/watch?v=vid1"])
+@patch("scraper.ytdlp_client.yt_dlp.YoutubeDL")
+def test_fetch_audio_falls_back_to_prepare_filename(mock_ydl_cls):
+    mock_ydl = MagicMock()
+    mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+    mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+    mock_ydl.extract_info.return_value = {"id": "vid1"}
+    mock_ydl.prepare_filename.return_value = "dl/.raw/vid1.m4a"
+
+    assert fetch_audio("vid1", downloads_dir="dl") == "dl/.raw/vid1.m4a"
 
 
 @patch("scraper.ytdlp_client.yt_dlp.YoutubeDL")
-def test_download_track_returns_path(mock_ydl_cls):
+def test_fetch_metadata_reads_music_fields_without_processing(mock_ydl_cls):
     mock_ydl = MagicMock()
     mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
     mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+    mock_ydl.extract_info.return_value = {
+        "id": "vid1",
+        "artists": ["Artist", "Guest"],
+        "track": "Song",
+        "album": "Album",
+        "release_date": "20190412",
+        "thumbnails": [
+            {"url": "small.jpg", "preference": -10, "width": 120},
+            {"url": "large.jpg", "preference": -1, "width": 1280},
+        ],
+    }
 
-    result = download_track("vid1", "Artist", "Title", downloads_dir="downloads")
+    metadata = fetch_metadata("vid1")
 
-    assert result == "downloads\\Artist - Title.mp3" or result == "downloads/Artist - Title.mp3"
+    assert metadata == TrackMetadata("Artist, Guest", "Song", "Album", 2019, "large.jpg")
+    mock_ydl.extract_info.assert_called_once_with(
+        "https://www.youtube.com/watch?v=vid1", download=False, process=False
+    )
 
 
 @patch("scraper.ytdlp_client.yt_dlp.YoutubeDL")
-def test_download_track_with_progress_hook(mock_ydl_cls):
+def test_fetch_metadata_of_a_plain_upload_is_empty(mock_ydl_cls):
     mock_ydl = MagicMock()
     mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
     mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+    mock_ydl.extract_info.return_value = {"id": "vid1", "title": "Vlog", "upload_date": "20200101"}
 
-    hook = MagicMock()
-    download_track("vid1", "Artist", "Title", progress_hook=hook)
+    assert fetch_metadata("vid1").is_empty
 
-    opts = mock_ydl_cls.call_args[0][0]
-    assert "progress_hooks" in opts
-    assert opts["progress_hooks"] == [hook]
+
+@patch("scraper.ytdlp_client.yt_dlp.YoutubeDL")
+def test_fetch_new_stops_after_run_of_known_ids(mock_ydl_cls):
+    mock_ydl = MagicMock()
+    mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+    mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+    pulled = []
+
+    def entries():
+        ids = ["n1", "k1", "n2", "k2", "k3", "k4", "never1", "never2"]
+        for vid in ids:
+            pulled.append(vid)
+            yield _make_entry(vid, f"Song {vid}")
+
+    mock_ydl.extract_info.return_value = {"entries": entries()}
+
+    tracks = fetch_new_liked_videos({"k1", "k2", "k3", "k4"}, stop_after=3)
+
+    assert [t.video_id for t in tracks] == ["n1", "n2"]
+    # The generator was not drained past the known run
+    assert pulled == ["n1", "k1", "n2", "k2", "k3", "k4"]
+    assert mock_ydl.extract_info.call_args.kwargs["process"] is False
 
 
 @patch("scraper.ytdlp_client.yt_dlp.YoutubeDL")
-def test_download_track_without_progress_hook(mock_ydl_cls):
+def test_fetch_new_reports_progress(mock_ydl_cls):
     mock_ydl = MagicMock()
     mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
     mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+    mock_ydl.extract_info.return_value = {
+        "playlist_count": 5,
+        "entries": [_make_entry("v1"), _make_entry("v2")],
+    }
+    progress = []
 
-    download_track("vid1", "Artist", "Title")
+    tracks = fetch_new_liked_videos(set(), on_progress=lambda c, t: progress.append((c, t)))
 
-    opts = mock_ydl_cls.call_args[0][0]
-    assert "progress_hooks" not in opts
+    assert len(tracks) == 2
+    assert progress == [(1, 5), (2, 5)]
+
+
+@patch("scraper.ytdlp_client.yt_dlp.YoutubeDL")
+def test_iter_liked_videos_yields_batches(mock_ydl_cls):
+    mock_ydl = MagicMock()
+    mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+    mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+    mock_ydl.extract_info.return_value = {
+        "entries": (_make_entry(f"v{i}") for i in range(5))
+    }
+
+    batches = list(iter_liked_videos(batch_size=2))
+
+    assert [[t.video_id for t in b] for b in batches] == [["v0", "v1"], ["v2", "v3"], ["v4"]]
+    assert mock_ydl.extract_info.call_args.kwargs["process"] is False
+
+
+@patch("scraper.ytdlp_client.yt_dlp.YoutubeDL")
+def test_iter_liked_videos_closes_session_when_abandoned(mock_ydl_cls):
+    mock_ydl = MagicMock()
+    mock_ydl_cls.return_value.__enter__ = MagicMock(return_value=mock_ydl)
+    mock_ydl_cls.return_value.__exit__ = MagicMock(return_value=False)
+    mock_ydl.extract_info.return_value = {
+        "entries": (_make_entry(f"v{i}") for i in range(100))
+    }
+
+    stream = iter_liked_videos(batch_size=10)
+    next(stream)
+    stream.close()
+
+    mock_ydl_cls.return_value.__exit__.assert_called_once()
+
+
+class _Response(io.BytesIO):
+    def __init__(self, body, status, headers):
+        super().__init__(body)
+        self.status = status
+        self.headers = headers
+
+
+class _StreamingYDL:
+    """Serves one format's bytes, honouring Range headers like googlevideo does."""
+
+    def __init__(self, body, protocol="https", filesize=None, chunk_size=None):
+        self.body = body
+        self.info = {
+            "id": "vid1",
+            "ext": "webm",
+            "protocol": protocol,
+            "url": "https://media.example/audio",
+            "http_headers": {"User-Agent": "test"},
+            "filesize": filesize,
+        }
+        if chunk_size:
+            self.info["downloader_options"] = {"http_chunk_size": chunk_size}
+        self.ranges = []
+
+    def extract_info(self, url, download):
+        assert download is False
+        return dict(self.info)
+
+    def urlopen(self, request):
+        assert request.headers["User-Agent"] == "test"
+        start, end = (int(n) for n in request.headers["Range"][6:].split("-"))
+        self.ranges.append((start, end))
+        part = self.body[start : end + 1]
+        content_range = f"bytes {start}-{start + len(part) - 1}/{len(self.body)}"
+        return _Response(part, 206, {"Content-Range": content_range})
+
+
+def test_stream_to_file_reads_in_ranges_and_reports_progress(tmp_path):
+    ydl = _StreamingYDL(b"0123456789" * 10, chunk_size=30)
+    seen = []
+    dst = str(tmp_path / "Artist - Title.webm")
+
+    path = stream_to_file(
+        ydl,
+        "vid1",
+        lambda ext: dst if ext == "webm" else None,
+        OutputFormat(OutputMode.NATIVE),
+        seen.append,
+    )
+
+    assert path == dst
+    assert (tmp_path / "Artist - Title.webm").read_bytes() == b"0123456789" * 10
+    assert os.listdir(tmp_path) == ["Artist - Title.webm"]
+    # The size comes from the first Content-Range when yt-dlp doesn't know it
+    assert ydl.ranges == [(0, 29), (30, 59), (60, 89), (90, 99)]
+    downloading = [d for d in seen if d["status"] == "downloading"]
+    assert downloading[-1]["downloaded_bytes"] == downloading[-1]["total_bytes"] == 100
+    assert seen[-1] == {"status": "finished", "downloaded_bytes": 100, "filename": dst}
+
+
+def test_stream_to_file_cancel_removes_partial_output(tmp_path):
+    ydl = _StreamingYDL(b"x" * 100, filesize=100, chunk_size=10)
+    cancelled = threading.Event()
+
+    def hook(d):
+        if d["downloaded_bytes"] >= 20:
+            cancelled.set()
+
+    with pytest.raises(DownloadCancelled):
+        stream_to_file(
+            ydl,
+            "vid1",
+            lambda ext: str(tmp_path / "out.webm"),
+            OutputFormat(OutputMode.NATIVE),
+            hook,
+            cancelled,
+        )
+
+    assert len(ydl.ranges) == 3
+    assert os.listdir(tmp_path) == []
+
+
+def test_stream_to_file_refuses_fragmented_formats(tmp_path):
+    ydl = _StreamingYDL(b"", protocol="m3u8_native")
+
+    with pytest.raises(StreamingUnsupported):
+        stream_to_file(ydl, "vid1", lambda ext: str(tmp_path / "out"), OutputFormat())
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_stream_to_file_detects_a_truncated_stream(tmp_path):
+    ydl = _StreamingYDL(b"x" * 50, filesize=100)
+
+    with pytest.raises(ConnectionError, match="IncompleteRead"):
+        stream_to_file(
+            ydl, "vid1", lambda ext: str(tmp_path / "out.webm"), OutputFormat(OutputMode.NATIVE)
+        )
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_read_preview_asks_for_the_start_of_the_stream():
+    ydl = _StreamingYDL(b"0123456789" * 10)
+
+    assert read_preview(ydl, "vid1", max_bytes=25) == b"0123456789012345678901234"
+    assert ydl.ranges == [(0, 24)]
+    with pytest.raises(StreamingUnsupported):
+        read_preview(_StreamingYDL(b"", protocol="m3u8_native"), "vid1")
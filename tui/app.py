@@ -1,14 +1,42 @@
 from textual.app import App
 
+from scraper.defaults import DEFAULT_MAX_WORKERS
+from scraper.scheduling import SchedulePolicy
+from scraper.sources import Source
+from scraper.transcode import OutputFormat
 from tui.screens.loading import LoadingScreen
 
 
 class MusicScraperApp(App):
     TITLE = "YouTube Music Scraper"
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        trace_path: str | None = None,
+        metrics_path: str | None = None,
+        output_format: OutputFormat = OutputFormat(),
+        streaming: bool = False,
+        sources: list[Source] | None = None,
+        enrich: bool = True,
+        tags: bool = True,
+        dedupe: bool = False,
+        schedule: SchedulePolicy = SchedulePolicy(),
+    ) -> None:
         super().__init__()
         self.tracker = None
+        self.job_queue = None
+        self.metadata = None
+        self.sources = sources or [Source()]
+        self.max_workers = max_workers
+        self.trace_path = trace_path
+        self.metrics_path = metrics_path
+        self.output_format = output_format
+        self.streaming = streaming
+        self.enrich = enrich
+        self.tags = tags
+        self.dedupe = dedupe
+        self.schedule = schedule
 
     def on_mount(self) -> None:
         self.push_screen(LoadingScreen())
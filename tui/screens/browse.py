@@ -1,9 +1,19 @@
+import threading
+from typing import TYPE_CHECKING
+
 from textual.app import ComposeResult
+from textual.events import Key
 from textual.screen import Screen
-from textual.widgets import Button, DataTable, Footer, Header, Label
+from textual.widgets import Button, Footer, Header, Input, Label
 
-from scraper.models import Track
+from scraper.defaults import DEFAULT_COOKIE_FILE, DEFAULT_DEDUPE_WORKERS, DEFAULT_ENRICH_WORKERS
+from scraper.models import Track, TrackMetadata
+from scraper.search import FilterError
 from scraper.tracker import ProgressTracker
+from tui.widgets.track_table import TrackListModel, TrackTable
+
+if TYPE_CHECKING:
+    from scraper.enrich import MetadataCache
 
 
 class BrowseScreen(Screen):
@@ -12,6 +22,8 @@ class BrowseScreen(Screen):
         ("d", "download", "Download"),
         ("a", "select_all", "Select All"),
         ("n", "deselect_all", "Deselect All"),
+        ("u", "skip_duplicates", "Skip Duplicates"),
+        ("slash", "focus_filter", "Filter"),
     ]
 
     CSS = """
@@ -22,6 +34,12 @@ class BrowseScreen(Screen):
         background: $surface;
         color: $text-muted;
     }
+    #filter {
+        dock: top;
+    }
+    #tracks-table {
+        height: 1fr;
+    }
     #empty-message {
         text-align: center;
         margin-top: 3;
@@ -40,57 +58,237 @@ class BrowseScreen(Screen):
     """
 
     def __init__(
-        self, tracks: list[Track], already_downloaded: int, tracker: ProgressTracker
+        self,
+        tracks: list[Track],
+        already_downloaded: int,
+        tracker: ProgressTracker,
+        sync_message: str | None = None,
+        metadata: "MetadataCache | None" = None,
+        dedupe: bool = False,
+        cookie_file: str = DEFAULT_COOKIE_FILE,
     ) -> None:
         super().__init__()
-        self.tracks = tracks
+        self.model = TrackListModel(tracks)
         self.already_downloaded = already_downloaded
         self.tracker = tracker
-        self.selected: set[str] = set()
-        self._track_by_row: dict = {}
-        self._check_col = None
+        self.sync_message = sync_message
+        # Listed tracks are enriched into metadata; None leaves them as listed
+        self.metadata = metadata
+        self.dedupe = dedupe
+        self.cookie_file = cookie_file
+        self._sync_error: str | None = None
+        self._filter_error: str | None = None
+        # Built on first use by an enrichment worker; it imports yt-dlp
+        self._enricher = None
+        self._enrich_pool = None
+        self._enrich_lock = threading.Lock()
+        # Likewise for duplicate checks; it imports yt-dlp and NumPy
+        self._finder = None
+        self._dedupe_pool = None
+        self._dedupe_lock = threading.Lock()
+        self._backfilled = threading.Event()
+        self._closed = False
+
+    @property
+    def tracks(self) -> list[Track]:
+        return self.model.tracks
+
+    @property
+    def selected(self) -> set[str]:
+        return self.model.selected
 
     def compose(self) -> ComposeResult:
         yield Header()
-        if self.tracks:
-            yield DataTable(id="tracks-table", cursor_type="row")
-        else:
-            yield Label("No new tracks to display.", id="empty-message")
+        yield Input(
+            placeholder="Filter: words, channel:NAME, duration:<3:00 or 2:00-5:00  (press /)",
+            id="filter",
+        )
+        yield TrackTable(self.model, id="tracks-table")
+        yield Label("No new tracks to display.", id="empty-message")
         yield Button("Download Selected", id="download-btn", disabled=True)
         yield Label("0 selected", id="selected-count")
         yield Label(self._info_text(), id="info")
         yield Footer()
 
     def on_mount(self) -> None:
-        self._populate_table()
+        self._update_empty()
+        self.query_one("#tracks-table", TrackTable).focus()
+        # Index the list in the background so the first keystroke is instant
+        tracks = self.model.tracks
+        self.run_worker(lambda: self._build_index(tracks), thread=True, exclusive=True)
+        self._enrich(tracks)
+        self._check_duplicates(tracks)
+
+    def on_unmount(self) -> None:
+        self._closed = True
+        with self._enrich_lock:
+            if self._enricher is not None:
+                self._enricher.close()
+            if self._enrich_pool is not None:
+                self._enrich_pool.close()
+        with self._dedupe_lock:
+            if self._finder is not None:
+                self._finder.close()
+            if self._dedupe_pool is not None:
+                self._dedupe_pool.close()
 
-    def _populate_table(self) -> None:
-        if not self.tracks:
+    def _enrich(self, tracks: list[Track]) -> None:
+        """Resolve artist, album and year for tracks in the background."""
+        if not tracks or self.metadata is None:
             return
-        table = self.query_one("#tracks-table", DataTable)
-        table.clear(columns=True)
-        self._check_col, *_ = table.add_columns("✓", "Title", "Channel", "Duration")
-        self._track_by_row = {}
-        for track in self.tracks:
-            row_key = table.add_row(
-                "[ ]", track.title, track.channel, track.duration_str, key=track.video_id
-            )
-            self._track_by_row[row_key] = track
+        video_ids = [t.video_id for t in tracks]
+        self.run_worker(lambda: self._enrich_tracks(video_ids), thread=True, group="enrich")
+
+    def _enrich_tracks(self, video_ids: list[str]) -> None:
+        from scraper.enrich import Enricher
+        from scraper.session import SessionPool
+
+        with self._enrich_lock:
+            if self._closed:
+                return
+            if self._enricher is None:
+                self._enrich_pool = SessionPool(self.cookie_file, size=DEFAULT_ENRICH_WORKERS)
+                self._enricher = Enricher(
+                    self.metadata, self._enrich_pool.fetch_metadata, DEFAULT_ENRICH_WORKERS
+                )
+            enricher = self._enricher
+        enricher.enrich(video_ids, on_resolved=self._on_enriched)
+
+    def _on_enriched(self, metadata: dict[str, TrackMetadata]) -> None:
+        if not self._closed:
+            self.app.call_from_thread(self._show_metadata, metadata)
+
+    def _show_metadata(self, metadata: dict[str, TrackMetadata]) -> None:
+        self.query_one("#tracks-table", TrackTable).set_metadata(metadata)
+
+    def _check_duplicates(self, tracks: list[Track]) -> None:
+        """Flag tracks that sound like a downloaded or listed one, in the background."""
+        if not tracks or not self.dedupe:
+            return
+        video_ids = [t.video_id for t in tracks]
+        self.run_worker(lambda: self._find_duplicates(video_ids), thread=True, group="dedupe")
+
+    def _find_duplicates(self, video_ids: list[str]) -> None:
+        from scraper.fingerprint import DuplicateFinder, FingerprintIndex, fingerprint_bytes
+        from scraper.session import SessionPool
+
+        with self._dedupe_lock:
+            if self._closed:
+                return
+            first = self._finder is None
+            if first:
+                pool = SessionPool(self.cookie_file, size=DEFAULT_DEDUPE_WORKERS)
+                self._dedupe_pool = pool
+                self._finder = DuplicateFinder(
+                    FingerprintIndex(self.tracker.catalog),
+                    lambda video_id: fingerprint_bytes(pool.fetch_preview(video_id)),
+                    DEFAULT_DEDUPE_WORKERS,
+                )
+            finder = self._finder
+        if first:
+            # Files downloaded before --dedupe was first used
+            finder.backfill()
+            self._backfilled.set()
+        self._backfilled.wait()
+        finder.find(video_ids, on_found=self._on_duplicates)
+
+    def _on_duplicates(self, found: dict) -> None:
+        if not self._closed:
+            self.app.call_from_thread(self._show_duplicates, found)
+
+    def _show_duplicates(self, found: dict) -> None:
+        position = {t.video_id: i for i, t in enumerate(self.model)}
+        flagged = {}
+        for video_id, matches in found.items():
+            for match in matches:
+                other = match.video_id
+                if self.tracker.is_downloaded(other):
+                    flagged[video_id] = other
+                elif video_id in position and other in position:
+                    # Of two listed copies, the one further down is flagged
+                    first, later = sorted((video_id, other), key=position.__getitem__)
+                    flagged.setdefault(later, first)
+        if flagged:
+            self.query_one("#tracks-table", TrackTable).set_duplicates(flagged)
+            self._update_info()
+
+    def _build_index(self, tracks: list[Track]) -> None:
+        index = self.model.build_index(tracks)
+        self.app.call_from_thread(self.model.attach_index, index)
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        if event.input.id != "filter":
+            return
+        try:
+            self.query_one("#tracks-table", TrackTable).set_filter(event.value)
+            self._filter_error = None
+        except FilterError as e:
+            self._filter_error = str(e)
+        self._update_empty()
+        self._update_info()
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        if event.input.id == "filter":
+            self.query_one("#tracks-table", TrackTable).focus()
 
-    def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
-        table = self.query_one("#tracks-table", DataTable)
-        video_id = str(event.row_key.value)
+    def action_focus_filter(self) -> None:
+        self.query_one("#filter", Input).focus()
 
-        if video_id in self.selected:
-            self.selected.discard(video_id)
-            table.update_cell(event.row_key, self._check_col, "[ ]")
+    def on_key(self, event: Key) -> None:
+        filter_box = self.query_one("#filter", Input)
+        if event.key == "escape" and filter_box.has_focus:
+            event.stop()
+            filter_box.value = ""
+            self.query_one("#tracks-table", TrackTable).focus()
+
+    def _update_empty(self) -> None:
+        """Show the table or the empty message, whichever applies."""
+        empty = not len(self.model.visible)
+        self.query_one("#tracks-table", TrackTable).display = not empty
+        message = self.query_one("#empty-message", Label)
+        if self.model.is_filtered:
+            message.update("No tracks match the filter.")
         else:
-            self.selected.add(video_id)
-            table.update_cell(event.row_key, self._check_col, "[X]")
+            message.update("No new tracks to display.")
+        message.display = empty
 
-        count = len(self.selected)
-        self.query_one("#selected-count", Label).update(f"{count} selected")
-        self.query_one("#download-btn", Button).disabled = count == 0
+    def add_tracks(self, tracks: list[Track], already_downloaded: int = 0) -> None:
+        """Merge tracks found by a background sync into the list, newest first."""
+        self.sync_message = None
+        self.already_downloaded += already_downloaded
+        if added := self.query_one("#tracks-table", TrackTable).prepend(tracks):
+            self._update_empty()
+            self._enrich(added)
+            self._check_duplicates(added)
+        self._update_info()
+
+    def append_tracks(self, tracks: list[Track], already_downloaded: int = 0) -> None:
+        """Append a batch streamed in while the playlist is still being fetched."""
+        self.already_downloaded += already_downloaded
+        if added := self.query_one("#tracks-table", TrackTable).append(tracks):
+            self._update_empty()
+            self._enrich(added)
+            self._check_duplicates(added)
+        self._update_info()
+
+    def set_sync_message(self, message: str) -> None:
+        self.sync_message = message
+        self._update_info()
+
+    def finish_sync(self) -> None:
+        self.sync_message = None
+        self._update_info()
+
+    def sync_failed(self, error: str) -> None:
+        self.sync_message = None
+        self._sync_error = error
+        self._update_info()
+
+    def _update_info(self) -> None:
+        self.query_one("#info", Label).update(self._info_text())
+
+    def on_track_table_selection_changed(self, event: TrackTable.SelectionChanged) -> None:
+        self._update_selection_ui()
 
     def action_quit(self) -> None:
         self.app.exit()
@@ -98,29 +296,37 @@ class BrowseScreen(Screen):
     def action_download(self) -> None:
         if not self.selected:
             return
-        selected_tracks = [t for t in self.tracks if t.video_id in self.selected]
+        self.download_tracks(self.model.selected_tracks())
 
+    def download_tracks(self, tracks: list[Track]) -> None:
         from tui.screens.download import DownloadScreen
 
-        self.app.push_screen(DownloadScreen(selected_tracks, self.tracker))
+        self.app.push_screen(
+            DownloadScreen(
+                tracks,
+                self.tracker,
+                max_workers=self.app.max_workers,
+                job_queue=self.app.job_queue,
+                trace_path=self.app.trace_path,
+                metrics_path=self.app.metrics_path,
+                output_format=self.app.output_format,
+                streaming=self.app.streaming,
+                cookie_file=self.cookie_file,
+                metadata=self.app.metadata,
+                tags=self.app.tags,
+                dedupe=self.dedupe,
+                schedule=self.app.schedule,
+            )
+        )
 
     def action_select_all(self) -> None:
-        if not self.tracks:
-            return
-        table = self.query_one("#tracks-table", DataTable)
-        for track in self.tracks:
-            self.selected.add(track.video_id)
-            table.update_cell(track.video_id, self._check_col, "[X]")
-        self._update_selection_ui()
+        self.query_one("#tracks-table", TrackTable).select_all()
 
     def action_deselect_all(self) -> None:
-        if not self.tracks:
-            return
-        table = self.query_one("#tracks-table", DataTable)
-        for track in self.tracks:
-            self.selected.discard(track.video_id)
-            table.update_cell(track.video_id, self._check_col, "[ ]")
-        self._update_selection_ui()
+        self.query_one("#tracks-table", TrackTable).deselect_all()
+
+    def action_skip_duplicates(self) -> None:
+        self.query_one("#tracks-table", TrackTable).deselect(self.model.duplicates)
 
     def _update_selection_ui(self) -> None:
         count = len(self.selected)
@@ -132,29 +338,27 @@ class BrowseScreen(Screen):
             self.action_download()
 
     def on_screen_resume(self) -> None:
-        self.tracks = [t for t in self.tracks if not self.tracker.is_downloaded(t.video_id)]
-        self.selected.clear()
-        self._populate_table()
-
-        count_label = self.query_one("#selected-count", Label)
-        count_label.update("0 selected")
-        self.query_one("#download-btn", Button).disabled = True
-        self.query_one("#info", Label).update(self._info_text())
-
-        if not self.tracks:
-            try:
-                self.query_one("#tracks-table", DataTable).remove()
-            except Exception:
-                pass
-            # Check if empty message already exists
-            try:
-                self.query_one("#empty-message", Label)
-            except Exception:
-                self.mount(Label("No new tracks to display.", id="empty-message"), before="#download-btn")
+        table = self.query_one("#tracks-table", TrackTable)
+        table.remove([t.video_id for t in self.model if self.tracker.is_downloaded(t.video_id)])
+        table.deselect_all()
+        self._update_empty()
+        self._update_info()
 
     def _info_text(self) -> str:
-        new = len(self.tracks)
+        new = len(self.model)
         already = self.already_downloaded
         if already:
-            return f"{new} new tracks ({already} already downloaded)"
-        return f"{new} tracks"
+            text = f"{new} new tracks ({already} already downloaded)"
+        else:
+            text = f"{new} tracks"
+        if self.model.is_filtered:
+            text += f", {len(self.model.visible)} matching"
+        if duplicates := sum(1 for video_id in self.model.duplicates if video_id in self.model):
+            text += f", {duplicates} likely duplicates"
+        if self._filter_error:
+            text += f" — {self._filter_error}"
+        if self.sync_message:
+            text += f" — {self.sync_message}"
+        elif self._sync_error:
+            text += f" — sync failed: {self._sync_error}"
+        return text
@@ -1,15 +1,28 @@
+import os
+
 from textual.app import ComposeResult
+from textual.containers import Horizontal, Vertical
 from textual.events import Key
 from textual.screen import Screen
 from textual.widgets import Footer, Header, Label, ProgressBar
 
+from scraper.defaults import DEFAULT_COOKIE_FILE
+from scraper.downloader import DEFAULT_MAX_WORKERS, BatchDownloader
+from scraper.enrich import MetadataCache
+from scraper.jobqueue import JobQueue
+from scraper.metrics import BatchMetrics
 from scraper.models import Track
+from scraper.progress import DEFAULT_FPS, JobProgress, JobStatus, ProgressBus, ProgressSnapshot
+from scraper.scheduling import SchedulePolicy
 from scraper.tracker import ProgressTracker
-from scraper.ytdlp_client import download_track
+from scraper.transcode import OutputFormat
 
 
 class DownloadScreen(Screen):
-    BINDINGS = [("escape", "go_back", "Back")]
+    BINDINGS = [
+        ("escape", "go_back", "Back"),
+        ("t", "show_timings", "Timings"),
+    ]
 
     CSS = """
     #current-track {
@@ -18,10 +31,25 @@ class DownloadScreen(Screen):
     #progress-label {
         margin: 0 2;
     }
-    #track-progress-label {
+    #stage-stats {
+        margin: 0 2;
+        color: $text-muted;
+    }
+    #jobs {
+        height: auto;
         margin: 0 2;
+    }
+    .job-row {
+        height: 1;
+    }
+    .job-title {
+        width: 1fr;
         color: $text-muted;
     }
+    .job-row ProgressBar {
+        width: auto;
+        margin: 0;
+    }
     #error-log {
         margin: 1 2;
         color: $error;
@@ -31,85 +59,209 @@ class DownloadScreen(Screen):
     }
     """
 
-    def __init__(self, tracks: list[Track], tracker: ProgressTracker) -> None:
+    def __init__(
+        self,
+        tracks: list[Track],
+        tracker: ProgressTracker,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        job_queue: JobQueue | None = None,
+        trace_path: str | None = None,
+        metrics_path: str | None = None,
+        output_format: OutputFormat = OutputFormat(),
+        streaming: bool = False,
+        cookie_file: str = DEFAULT_COOKIE_FILE,
+        metadata: MetadataCache | None = None,
+        tags: bool = False,
+        dedupe: bool = False,
+        schedule: SchedulePolicy = SchedulePolicy(),
+    ) -> None:
         super().__init__()
         self.tracks = tracks
         self.tracker = tracker
+        self.job_queue = job_queue
+        self.metrics = BatchMetrics(trace_path, metrics_path)
+        self.output_format = output_format
+        self.streaming = streaming
+        self.cookie_file = cookie_file
+        self.metadata = metadata
+        self.tags = tags
+        self.dedupe = dedupe
+        self.schedule = schedule
+        self.max_workers = max(1, min(max_workers, len(tracks)))
         self._done = False
+        self._errors: list[str] = []
+        # slot -> video_id of the job its row is showing
+        self._slot_jobs: dict[int, str] = {}
 
     def compose(self) -> ComposeResult:
         yield Header()
         yield Label("Starting downloads...", id="current-track")
         yield Label(f"0 / {len(self.tracks)}", id="progress-label")
         yield ProgressBar(total=len(self.tracks), show_eta=False, id="batch-progress")
-        yield Label("Track progress:", id="track-progress-label")
-        yield ProgressBar(total=100, show_eta=False, id="track-progress")
+        yield Label("", id="stage-stats")
+        with Vertical(id="jobs"):
+            for slot in range(self.max_workers):
+                with Horizontal(id=f"job-{slot}", classes="job-row"):
+                    yield Label("", id=f"job-title-{slot}", classes="job-title")
+                    yield ProgressBar(total=100, show_eta=False, id=f"job-progress-{slot}")
         yield Label("", id="error-log")
         yield Footer()
 
     def on_mount(self) -> None:
+        for slot in range(self.max_workers):
+            self.query_one(f"#job-{slot}").display = False
+        self._progress = ProgressBus()
+        self._progress.subscribe(self._render_progress)
+        tagger = None
+        if self.tags:
+            from scraper.tagging import THUMBNAIL_SUBDIR, Tagger, ThumbnailCache
+
+            thumbnails = os.path.join("downloads", THUMBNAIL_SUBDIR)
+            tagger = Tagger(ThumbnailCache(self.tracker.catalog, thumbnails))
+        fingerprints = None
+        if self.dedupe:
+            from scraper.fingerprint import FingerprintIndex
+
+            fingerprints = FingerprintIndex(self.tracker.catalog)
+        self._downloader = BatchDownloader(
+            self.tracker,
+            cookie_file=self.cookie_file,
+            max_workers=self.max_workers,
+            job_queue=self.job_queue,
+            progress=self._progress,
+            metrics=self.metrics,
+            output_format=self.output_format,
+            streaming=self.streaming,
+            metadata=self.metadata,
+            tagger=tagger,
+            fingerprints=fingerprints,
+            schedule=self.schedule,
+        )
+        # Workers only touch the bus; the UI reads it at a fixed frame rate
+        self._flush_timer = self.set_interval(1 / DEFAULT_FPS, self._progress.flush)
+        self._stats_timer = self.set_interval(0.5, self._update_stage_stats)
         self.run_worker(self._download_batch, thread=True)
 
-    def _progress_hook(self, d: dict) -> None:
-        if d.get("status") == "downloading":
-            total = d.get("total_bytes") or d.get("total_bytes_estimate") or 0
-            downloaded = d.get("downloaded_bytes", 0)
-            if total > 0:
-                pct = min(downloaded * 100 / total, 100)
-            else:
-                pct = 0
-            self.app.call_from_thread(self._update_track_progress, pct)
-        elif d.get("status") == "finished":
-            self.app.call_from_thread(self._update_track_progress, 100)
-
-    def _update_track_progress(self, pct: float) -> None:
-        self.query_one("#track-progress", ProgressBar).update(progress=pct)
+    def _render_progress(self, snapshot: ProgressSnapshot) -> None:
+        for job in snapshot.jobs:
+            self._render_job(job)
+        for job in snapshot.finished:
+            self._release_slot(job)
+            if job.status is JobStatus.FAILED:
+                self._errors.append(f"{job.title}: {job.error}")
+                self.query_one("#error-log", Label).update("\n".join(self._errors))
+
+        batch = snapshot.batch
+        self.query_one("#batch-progress", ProgressBar).update(progress=batch.completed)
+        text = f"{batch.completed} / {len(self.tracks)}"
+        if batch.speed > 0:
+            text += f"  ·  {format_rate(batch.speed)}"
+        if batch.eta is not None and not batch.finished:
+            text += f"  ·  ETA {format_eta(batch.eta)}"
+        self.query_one("#progress-label", Label).update(text)
+        if batch.finished:
+            self._show_summary(batch.failed)
+
+    def _render_job(self, job: JobProgress) -> None:
+        if job.slot is None:
+            return
+        if job.status is JobStatus.DOWNLOADING:
+            if self._slot_jobs.get(job.slot) != job.video_id:
+                self._slot_jobs[job.slot] = job.video_id
+                self.query_one(f"#job-{job.slot}").display = True
+                self.query_one("#current-track", Label).update(f"Downloading: {job.title}")
+            text = job.title
+            if job.speed > 0:
+                text += f"  ({format_rate(job.speed)}"
+                if job.eta is not None:
+                    text += f", {format_eta(job.eta)} left"
+                text += ")"
+            self.query_one(f"#job-title-{job.slot}", Label).update(text)
+            self.query_one(f"#job-progress-{job.slot}", ProgressBar).update(
+                progress=job.fraction * 100
+            )
+            return
+        self._release_slot(job)
+        if job.status is JobStatus.RETRYING:
+            self.query_one("#current-track", Label).update(
+                f"Retrying in {job.retry_delay:.0f}s: {job.title}"
+            )
+
+    def _release_slot(self, job: JobProgress) -> None:
+        """Hide the job's row, unless the slot has moved on to another job."""
+        if job.slot is not None and self._slot_jobs.get(job.slot) == job.video_id:
+            del self._slot_jobs[job.slot]
+            self.query_one(f"#job-{job.slot}").display = False
+            self.query_one(f"#job-progress-{job.slot}", ProgressBar).update(progress=0)
+
+    def _update_stage_stats(self) -> None:
+        parts = []
+        for stage in self._downloader.stats().values():
+            text = (
+                f"{stage.name.capitalize()}: {stage.active}/{stage.workers} active, "
+                f"{stage.queued} queued, {stage.tracks_per_sec * 60:.1f} tracks/min"
+            )
+            if stage.retries:
+                text += f", {stage.retries} retries"
+            parts.append(text)
+        guard = self._downloader.disk_guard
+        if guard is not None and guard.paused:
+            parts.append(f"Paused: {guard.free / 1024**3:.1f} GB free on disk")
+        self.query_one("#stage-stats", Label).update("  |  ".join(parts))
 
     def _download_batch(self) -> None:
-        total = len(self.tracks)
-        errors: list[str] = []
-
-        for i, track in enumerate(self.tracks):
-            self.app.call_from_thread(self._update_track_label, track.title, i, total)
-            self.app.call_from_thread(self._update_track_progress, 0)
-
-            try:
-                download_track(
-                    track.video_id,
-                    track.channel,
-                    track.title,
-                    progress_hook=self._progress_hook,
-                )
-                self.tracker.mark_downloaded(track.video_id)
-                self.tracker.save()
-            except Exception as e:
-                errors.append(f"{track.title}: {e}")
-                error_label = self.query_one("#error-log", Label)
-                error_label.update("\n".join(errors))
-
-            self.query_one("#batch-progress", ProgressBar).update(progress=i + 1)
-
-        progress_label = self.query_one("#progress-label", Label)
-        progress_label.update(f"{total} / {total}")
+        self._downloader.run(self.tracks)
 
+    def _show_summary(self, failed: int) -> None:
+        if self._done:
+            return
+        self._flush_timer.stop()
+        self._stats_timer.stop()
+        self._update_stage_stats()
+        total = len(self.tracks)
         current_label = self.query_one("#current-track", Label)
-        if errors:
+        if failed:
             current_label.update(
-                f"Done! {total - len(errors)} succeeded, {len(errors)} failed. Press any key to go back."
+                f"Done! {total - failed} succeeded, {failed} failed. "
+                "Press t for timings, any other key to go back."
             )
         else:
-            current_label.update("All downloads complete! Press any key to go back.")
+            current_label.update(
+                "All downloads complete! Press t for timings, any other key to go back."
+            )
 
         self._done = True
 
-    def _update_track_label(self, title: str, index: int, total: int) -> None:
-        self.query_one("#current-track", Label).update(f"Downloading: {title}")
-        self.query_one("#progress-label", Label).update(f"{index} / {total}")
-
     def on_key(self, event: Key) -> None:
-        if self._done:
+        if self._done and event.key != "t":
             event.prevent_default()
             self.app.pop_screen()
 
+    def action_show_timings(self) -> None:
+        from tui.screens.timings import TimingsScreen
+
+        self.app.push_screen(TimingsScreen(self.metrics))
+
     def action_go_back(self) -> None:
         self.app.pop_screen()
+
+    def on_unmount(self) -> None:
+        # Leaving mid-batch (Escape, or quitting the app) stops the downloads
+        # and removes partial output; finished tracks are kept
+        self._downloader.cancel()
+
+
+def format_rate(bytes_per_sec: float) -> str:
+    for unit in ("B/s", "KB/s", "MB/s"):
+        if bytes_per_sec < 1024:
+            return f"{bytes_per_sec:.0f} {unit}" if unit == "B/s" else f"{bytes_per_sec:.1f} {unit}"
+        bytes_per_sec /= 1024
+    return f"{bytes_per_sec:.1f} GB/s"
+
+
+def format_eta(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds + 0.5), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
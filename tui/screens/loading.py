@@ -24,6 +24,7 @@ class LoadingScreen(Screen):
     def __init__(self) -> None:
         super().__init__()
         self._last_update = 0.0
+        self._browse = None
 
     def compose(self) -> ComposeResult:
         with Middle():
@@ -42,32 +43,144 @@ class LoadingScreen(Screen):
             self.app.call_from_thread(self._update_progress, current, total)
 
     def _update_progress(self, current: int, total: int) -> None:
+        if self._browse is not None:
+            self._browse.set_sync_message(f"fetching liked videos... {current} / {total}")
+            return
         self.query_one("#status", Label).update(
             f"Fetching liked videos... {current} / {total}"
         )
         bar = self.query_one("#fetch-progress", ProgressBar)
         bar.update(total=total, progress=current)
 
-    def _show_browse(self, tracks, already_count, tracker) -> None:
+    def _show_browse(self, tracks, already_count, tracker, sync_message=None):
         from tui.screens.browse import BrowseScreen
 
         self.app.tracker = tracker
-        self.app.push_screen(BrowseScreen(tracks, already_count, tracker))
+        self._browse = BrowseScreen(
+            tracks,
+            already_count,
+            tracker,
+            sync_message=sync_message,
+            metadata=self.app.metadata if self.app.enrich else None,
+            dedupe=self.app.dedupe,
+            # Lookups and downloads use the first account, like headless mode
+            cookie_file=self.app.sources[0].cookie_file,
+        )
+        self.app.push_screen(self._browse)
+        self._offer_resume(self._browse)
+        return self._browse
 
-    async def _startup(self) -> None:
-        from scraper.tracker import ProgressTracker
-        from scraper.ytdlp_client import fetch_liked_videos
+    def _offer_resume(self, browse) -> None:
+        """Ask to resume the batch a previous run left unfinished, if there is one."""
+        from tui.screens.resume import ResumeScreen
 
-        tracks = fetch_liked_videos(on_progress=self._on_fetch_progress)
+        job_queue = self.app.job_queue
+        unfinished = [
+            t for t in job_queue.unfinished() if not browse.tracker.is_downloaded(t.video_id)
+        ]
+        if not unfinished:
+            return
 
-        self.app.call_from_thread(
-            self._update_progress, len(tracks), len(tracks)
-        )
+        def on_answer(resume: bool | None) -> None:
+            if resume:
+                browse.download_tracks(unfinished)
+            else:
+                job_queue.clear()
+
+        self.app.push_screen(ResumeScreen(len(unfinished)), on_answer)
 
+    async def _startup(self) -> None:
+        # Only light modules before the first screen; scraper.sync pulls in
+        # yt-dlp and its extractors, which take longer to import than the
+        # cached playlist takes to display
+        from scraper.enrich import MetadataCache
+        from scraper.jobqueue import JobQueue
+        from scraper.snapshot import PlaylistSnapshot
+        from scraper.sources import SourceIndex
+        from scraper.tracker import ProgressTracker
+
+        sources = self.app.sources
         tracker = ProgressTracker("downloads")
         tracker.load()
+        self.app.job_queue = JobQueue(tracker.catalog)
+        self.app.metadata = MetadataCache(tracker.catalog)
+        snapshots = [PlaylistSnapshot("downloads", s.snapshot_filename) for s in sources]
+        loaded = [snapshot.load() for snapshot in snapshots]
+
+        if len(sources) == 1 and loaded[0] is None:
+            from scraper.sync import stream_playlist
+
+            batches = stream_playlist(snapshots[0], sources[0], on_progress=self._on_fetch_progress)
+            self._stream_playlist(batches, tracker, SourceIndex(tracker.catalog), sources[0].key)
+            return
+
+        # Show the cached lists right away, then reconcile in the background
+        cached = []
+        seen = set()
+        for tracks in loaded:
+            for track in tracks or []:
+                if track.video_id not in seen:
+                    seen.add(track.video_id)
+                    cached.append(track)
+        new_tracks = [t for t in cached if not tracker.is_downloaded(t.video_id)]
+        already_count = len(cached) - len(new_tracks)
+        if len(sources) == 1:
+            message = "checking for new likes..." if sources[0].newest_first else "syncing..."
+        else:
+            message = f"syncing {len(sources)} playlists..."
+        browse = self.app.call_from_thread(
+            self._show_browse, new_tracks, already_count, tracker, message
+        )
 
-        new_tracks = [t for t in tracks if not tracker.is_downloaded(t.video_id)]
-        already_count = len(tracks) - len(new_tracks)
-
-        self.app.call_from_thread(self._show_browse, new_tracks, already_count, tracker)
+        from scraper.sync import sync_sources
+
+        # Warm the download pipeline too, so pressing d doesn't stall on imports
+        import tui.screens.download  # noqa: F401
+
+        try:
+            result = sync_sources(sources, "downloads")
+        except Exception as e:
+            self.app.call_from_thread(browse.sync_failed, str(e))
+            return
+        index = SourceIndex(tracker.catalog)
+        for key, video_ids in result.by_source.items():
+            index.record(key, video_ids)
+
+        added = [t for t in result.new if not tracker.is_downloaded(t.video_id)]
+        self.app.call_from_thread(browse.add_tracks, added, len(result.new) - len(added))
+        if result.errors:
+            failed = ", ".join(result.errors)
+            self.app.call_from_thread(
+                browse.sync_failed, f"{len(result.errors)} of {len(sources)} sources ({failed})"
+            )
+
+    def _stream_playlist(self, batches, tracker, index, source_key) -> None:
+        """Open BrowseScreen on the first batch and append the rest as they arrive."""
+        browse = None
+        video_ids = []
+        try:
+            for batch in batches:
+                video_ids.extend(t.video_id for t in batch)
+                new_tracks = [t for t in batch if not tracker.is_downloaded(t.video_id)]
+                already_count = len(batch) - len(new_tracks)
+                if browse is None:
+                    browse = self.app.call_from_thread(
+                        self._show_browse,
+                        new_tracks,
+                        already_count,
+                        tracker,
+                        "fetching liked videos...",
+                    )
+                else:
+                    self.app.call_from_thread(browse.append_tracks, new_tracks, already_count)
+        except Exception as e:
+            if browse is None:
+                raise
+            self.app.call_from_thread(browse.sync_failed, str(e))
+            return
+
+        index.record(source_key, video_ids)
+        if browse is None:
+            self.app.call_from_thread(self._show_browse, [], 0, tracker)
+        else:
+            self.app.call_from_thread(browse.finish_sync)
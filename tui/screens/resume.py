@@ -0,0 +1,58 @@
+from textual.app import ComposeResult
+from textual.containers import Horizontal, Vertical
+from textual.screen import ModalScreen
+from textual.widgets import Button, Label
+
+
+class ResumeScreen(ModalScreen[bool]):
+    """Asks whether to resume a download batch that was interrupted."""
+
+    BINDINGS = [
+        ("y", "resume", "Resume"),
+        ("n", "discard", "Discard"),
+        ("escape", "discard", "Discard"),
+    ]
+
+    CSS = """
+    ResumeScreen {
+        align: center middle;
+    }
+    #resume-dialog {
+        width: 60;
+        height: auto;
+        padding: 1 2;
+        border: thick $primary;
+        background: $surface;
+    }
+    #resume-buttons {
+        height: auto;
+        margin-top: 1;
+        align: center middle;
+    }
+    #resume-buttons Button {
+        margin: 0 1;
+    }
+    """
+
+    def __init__(self, count: int) -> None:
+        super().__init__()
+        self.count = count
+
+    def compose(self) -> ComposeResult:
+        noun = "track" if self.count == 1 else "tracks"
+        with Vertical(id="resume-dialog"):
+            yield Label(
+                f"The last download batch was interrupted with {self.count} {noun} unfinished."
+            )
+            with Horizontal(id="resume-buttons"):
+                yield Button("Resume", id="resume-btn", variant="primary")
+                yield Button("Discard", id="discard-btn")
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        self.dismiss(event.button.id == "resume-btn")
+
+    def action_resume(self) -> None:
+        self.dismiss(True)
+
+    def action_discard(self) -> None:
+        self.dismiss(False)
@@ -0,0 +1,96 @@
+from textual.app import ComposeResult
+from textual.containers import Vertical
+from textual.screen import ModalScreen
+from textual.widgets import Label
+
+from scraper.metrics import PHASES, BatchMetrics
+
+_REFRESH_INTERVAL = 1.0
+_SLOWEST = 5
+
+
+class TimingsScreen(ModalScreen[None]):
+    """Where the batch's time went: per-phase totals and percentiles, and the
+    slowest tracks. Refreshes while the batch is still running."""
+
+    BINDINGS = [
+        ("escape", "close", "Close"),
+        ("t", "close", "Close"),
+    ]
+
+    CSS = """
+    TimingsScreen {
+        align: center middle;
+    }
+    #timings-dialog {
+        width: 90;
+        height: auto;
+        padding: 1 2;
+        border: thick $primary;
+        background: $surface;
+    }
+    #timings-phases, #timings-slowest {
+        margin-top: 1;
+    }
+    #timings-hint {
+        margin-top: 1;
+        color: $text-muted;
+    }
+    """
+
+    def __init__(self, metrics: BatchMetrics) -> None:
+        super().__init__()
+        self.metrics = metrics
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="timings-dialog"):
+            yield Label("", id="timings-title")
+            yield Label("", id="timings-phases")
+            yield Label("", id="timings-slowest")
+            yield Label("Press t or Escape to close.", id="timings-hint")
+
+    def on_mount(self) -> None:
+        self._refresh_timings()
+        self.set_interval(_REFRESH_INTERVAL, self._refresh_timings)
+
+    def _refresh_timings(self) -> None:
+        tracks = self.metrics.tracks()
+        finished = sum(1 for t in tracks if t.status is not None)
+        retries = sum(t.retries for t in tracks)
+        self.query_one("#timings-title", Label).update(
+            f"Batch timings: {finished} tracks finished in {self.metrics.elapsed:.1f}s, "
+            f"{retries} retries"
+        )
+        self.query_one("#timings-phases", Label).update(phase_table(self.metrics))
+
+        lines = ["Slowest tracks:"]
+        for timing in self.metrics.slowest(_SLOWEST):
+            phase = timing.slowest_phase
+            if phase is None:
+                continue
+            lines.append(
+                f"  {timing.total_seconds:7.1f}s  {_clip(timing.title or timing.video_id, 52):<52}"
+                f"  mostly {phase} ({timing.phase_seconds(phase):.1f}s)"
+            )
+        self.query_one("#timings-slowest", Label).update("\n".join(lines))
+
+    def action_close(self) -> None:
+        self.dismiss(None)
+
+
+def phase_table(metrics: BatchMetrics) -> str:
+    summary = metrics.summary()
+    grand_total = sum(s.total for s in summary.values()) or 1.0
+    header = ("phase", "tracks", "total", "share", "p50", "p95", "max")
+    lines = ["{:<10} {:>6} {:>9} {:>6} {:>8} {:>8} {:>8}".format(*header)]
+    for phase in PHASES:
+        s = summary[phase]
+        lines.append(
+            f"{phase:<10} {s.count:>6} {s.total:>8.1f}s {s.total / grand_total:>6.0%}"
+            f" {s.p50:>7.2f}s {s.p95:>7.2f}s {s.max:>7.2f}s"
+        )
+    return "\n".join(lines)
+
+
+def _clip(text: str, width: int) -> str:
+    return text if len(text) <= width else text[: width - 1] + "…"
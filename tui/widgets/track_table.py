@@ -0,0 +1,465 @@
+from collections.abc import Iterable, Sequence
+
+from rich.cells import set_cell_size
+from rich.segment import Segment
+from textual.binding import Binding
+from textual.cache import LRUCache
+from textual.events import Click, Resize
+from textual.geometry import Size
+from textual.message import Message
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+from scraper.models import Track, TrackMetadata
+from scraper.search import TrackFilter, TrackIndex, parse_filter
+
+_CHECK_WIDTH = 3
+_YEAR_WIDTH = 4
+_DURATION_WIDTH = 8
+_GAP = 2
+
+
+class TrackListModel:
+    """Ordered tracks, the current selection and an optional filter.
+
+    Independent of any widget: bulk operations touch only this in-memory
+    state, and the table reads `visible` when it draws the rows on screen.
+    The search index is built on first use, or ahead of time on a worker
+    thread with build_index() and attach_index(). metadata holds whatever
+    enrichment has resolved so far, by video_id; duplicates maps tracks that
+    sound like another one to the video_id of that one.
+    """
+
+    def __init__(self, tracks: Iterable[Track] = ()):
+        self._tracks: list[Track] = []
+        self._ids: set[str] = set()
+        self.selected: set[str] = set()
+        self._index: TrackIndex | None = None
+        self._filter = TrackFilter()
+        self._view: Sequence[Track] | None = None
+        self.metadata: dict[str, TrackMetadata] = {}
+        self.duplicates: dict[str, str] = {}
+        self.append(tracks)
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def __getitem__(self, index: int) -> Track:
+        return self._tracks[index]
+
+    def __iter__(self):
+        return iter(self._tracks)
+
+    def __contains__(self, video_id: str) -> bool:
+        return video_id in self._ids
+
+    @property
+    def tracks(self) -> list[Track]:
+        return list(self._tracks)
+
+    @property
+    def visible(self) -> Sequence[Track]:
+        """The tracks passing the filter, in list order."""
+        return self._tracks if self._view is None else self._view
+
+    @property
+    def is_filtered(self) -> bool:
+        return self._view is not None
+
+    @property
+    def is_indexed(self) -> bool:
+        return self._index is not None
+
+    def _fresh(self, tracks: Iterable[Track]) -> list[Track]:
+        fresh = []
+        for track in tracks:
+            if track.video_id not in self._ids:
+                self._ids.add(track.video_id)
+                fresh.append(track)
+        return fresh
+
+    def append(self, tracks: Iterable[Track]) -> list[Track]:
+        """Add tracks at the end, skipping known IDs. Returns the ones added."""
+        fresh = self._fresh(tracks)
+        self._tracks.extend(fresh)
+        if fresh and self._index is not None:
+            self._index.append(fresh)
+            self._refilter()
+        return fresh
+
+    def prepend(self, tracks: Iterable[Track]) -> list[Track]:
+        """Add tracks at the start, skipping known IDs. Returns the ones added."""
+        fresh = self._fresh(tracks)
+        if fresh:
+            self._tracks[:0] = fresh
+            if self._index is not None:
+                self._index.prepend(fresh)
+                self._refilter()
+        return fresh
+
+    def remove(self, video_ids: Iterable[str]) -> int:
+        """Drop tracks (and their selection) in one pass. Returns how many went."""
+        doomed = self._ids.intersection(video_ids)
+        if not doomed:
+            return 0
+        self._tracks = [t for t in self._tracks if t.video_id not in doomed]
+        self._ids -= doomed
+        self.selected -= doomed
+        if self._index is not None:
+            self._index.remove(doomed)
+            self._refilter()
+        return len(doomed)
+
+    def set_metadata(self, metadata: dict[str, TrackMetadata]) -> None:
+        self.metadata.update(metadata)
+
+    def set_duplicates(self, duplicates: dict[str, str]) -> None:
+        self.duplicates.update(duplicates)
+
+    # -- filtering -----------------------------------------------------------
+
+    @staticmethod
+    def build_index(tracks: list[Track]) -> TrackIndex:
+        """Index a snapshot of the tracks; safe to run off the UI thread."""
+        return TrackIndex(tracks)
+
+    def attach_index(self, index: TrackIndex) -> None:
+        """Adopt an index built by build_index, catching up on later changes.
+
+        Tracks only ever arrive at either end, so anything added since the
+        snapshot is a run at the start or the end of the list.
+        """
+        if self._index is not None:
+            return
+        head = []
+        for track in self._tracks:
+            if track.video_id in index:
+                break
+            head.append(track)
+        index.prepend(head)
+        index.append(t for t in self._tracks[len(head):] if t.video_id not in index)
+        index.remove([vid for vid in index.video_ids() if vid not in self._ids])
+        self._index = index
+        self._refilter()
+
+    def set_filter(self, query: str) -> None:
+        """Show only the tracks matching a filter expression.
+
+        Raises FilterError (keeping the previous filter) if it can't be parsed.
+        """
+        flt = parse_filter(query)
+        if self._index is None and not flt.is_empty:
+            self._index = TrackIndex(self._tracks)
+        self._filter = flt
+        self._refilter()
+
+    def _refilter(self) -> None:
+        self._view = None if self._filter.is_empty else self._index.search(self._filter)
+
+    # -- selection -----------------------------------------------------------
+
+    def is_selected(self, video_id: str) -> bool:
+        return video_id in self.selected
+
+    def toggle(self, video_id: str) -> bool:
+        """Flip one track's selection. Returns True if it is now selected."""
+        if video_id in self.selected:
+            self.selected.discard(video_id)
+            return False
+        if video_id in self._ids:
+            self.selected.add(video_id)
+            return True
+        return False
+
+    def select_all(self) -> None:
+        """Select every visible track (every match, while filtered)."""
+        if self._view is None:
+            self.selected = set(self._ids)
+        else:
+            self.selected.update(t.video_id for t in self._view)
+
+    def deselect_all(self) -> None:
+        self.selected = set()
+
+    def deselect(self, video_ids: Iterable[str]) -> None:
+        self.selected.difference_update(video_ids)
+
+    def selected_tracks(self) -> list[Track]:
+        """Selected tracks in list order."""
+        return [t for t in self._tracks if t.video_id in self.selected]
+
+
+class TrackTable(ScrollView, can_focus=True):
+    """Virtualized table of a TrackListModel.
+
+    Only the rows in view are rendered (Textual's line API), so the cost of a
+    redraw does not depend on the number of tracks. Mutations go through the
+    table so it can resize its scroll area and redraw once.
+    """
+
+    BINDINGS = [
+        Binding("enter,space", "toggle", "Toggle", show=False),
+        Binding("up", "cursor_up", "Up", show=False),
+        Binding("down", "cursor_down", "Down", show=False),
+        Binding("pageup", "page_up", "Page Up", show=False),
+        Binding("pagedown", "page_down", "Page Down", show=False),
+        Binding("home", "scroll_home", "Home", show=False),
+        Binding("end", "scroll_end", "End", show=False),
+    ]
+
+    COMPONENT_CLASSES = {
+        "track-table--header",
+        "track-table--cursor",
+        "track-table--selected",
+        "track-table--duplicate",
+    }
+
+    DEFAULT_CSS = """
+    TrackTable {
+        height: 1fr;
+        background: $surface;
+        color: $foreground;
+    }
+    TrackTable > .track-table--header {
+        text-style: bold;
+        background: $panel;
+        color: $foreground;
+    }
+    TrackTable > .track-table--cursor {
+        background: $block-cursor-blurred-background;
+        color: $block-cursor-blurred-foreground;
+    }
+    TrackTable:focus > .track-table--cursor {
+        background: $block-cursor-background;
+        color: $block-cursor-foreground;
+        text-style: $block-cursor-text-style;
+    }
+    TrackTable > .track-table--selected {
+        color: $accent;
+    }
+    TrackTable > .track-table--duplicate {
+        color: $warning;
+    }
+    """
+
+    class SelectionChanged(Message):
+        """Posted whenever the set of selected tracks changes."""
+
+        def __init__(self, table: "TrackTable", count: int) -> None:
+            super().__init__()
+            self.table = table
+            self.count = count
+
+        @property
+        def control(self) -> "TrackTable":
+            return self.table
+
+    def __init__(self, model: TrackListModel, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.model = model
+        self.cursor_row = 0
+        self._line_cache: LRUCache[tuple, Strip] = LRUCache(1024)
+
+    # -- mutations -----------------------------------------------------------
+
+    def append(self, tracks: Iterable[Track]) -> list[Track]:
+        added = self.model.append(tracks)
+        if added:
+            self._rows_changed()
+        return added
+
+    def prepend(self, tracks: Iterable[Track]) -> list[Track]:
+        added = self.model.prepend(tracks)
+        if added:
+            if not self.model.is_filtered and len(self.model) > len(added):
+                # Keep the cursor on the same track
+                self.cursor_row += len(added)
+            self._rows_changed()
+        return added
+
+    def remove(self, video_ids: Iterable[str]) -> int:
+        had_selection = bool(self.model.selected)
+        removed = self.model.remove(video_ids)
+        if removed:
+            self._rows_changed()
+            if had_selection:
+                self._selection_changed()
+        return removed
+
+    def set_filter(self, query: str) -> None:
+        """Filter the rows; raises FilterError if the query can't be parsed."""
+        self.model.set_filter(query)
+        self.cursor_row = 0
+        self.scroll_to(y=0, animate=False, immediate=True)
+        self._rows_changed()
+
+    def set_metadata(self, metadata: dict[str, TrackMetadata]) -> None:
+        """Fill in resolved columns; only rows in view are redrawn."""
+        self.model.set_metadata(metadata)
+        self.refresh()
+
+    def set_duplicates(self, duplicates: dict[str, str]) -> None:
+        """Mark tracks as likely duplicates; only rows in view are redrawn."""
+        self.model.set_duplicates(duplicates)
+        self.refresh()
+
+    def toggle(self, video_id: str) -> None:
+        self.model.toggle(video_id)
+        self._selection_changed()
+
+    def select_all(self) -> None:
+        self.model.select_all()
+        self._selection_changed()
+
+    def deselect_all(self) -> None:
+        self.model.deselect_all()
+        self._selection_changed()
+
+    def deselect(self, video_ids: Iterable[str]) -> None:
+        self.model.deselect(video_ids)
+        self._selection_changed()
+
+    def _rows_changed(self) -> None:
+        self.cursor_row = max(0, min(self.cursor_row, len(self.model.visible) - 1))
+        self._update_virtual_size()
+        self.refresh()
+
+    def _selection_changed(self) -> None:
+        self.refresh()
+        self.post_message(self.SelectionChanged(self, len(self.model.selected)))
+
+    # -- cursor --------------------------------------------------------------
+
+    @property
+    def _page_rows(self) -> int:
+        return max(1, self.scrollable_content_region.height - 1)
+
+    def move_cursor(self, row: int) -> None:
+        if not len(self.model.visible):
+            return
+        self.cursor_row = max(0, min(row, len(self.model.visible) - 1))
+        top = round(self.scroll_offset.y)
+        if self.cursor_row < top:
+            self.scroll_to(y=self.cursor_row, animate=False, immediate=True)
+        elif self.cursor_row >= top + self._page_rows:
+            self.scroll_to(y=self.cursor_row - self._page_rows + 1, animate=False, immediate=True)
+        self.refresh()
+
+    def action_cursor_up(self) -> None:
+        self.move_cursor(self.cursor_row - 1)
+
+    def action_cursor_down(self) -> None:
+        self.move_cursor(self.cursor_row + 1)
+
+    def action_page_up(self) -> None:
+        self.move_cursor(self.cursor_row - self._page_rows)
+
+    def action_page_down(self) -> None:
+        self.move_cursor(self.cursor_row + self._page_rows)
+
+    def action_scroll_home(self) -> None:
+        self.move_cursor(0)
+
+    def action_scroll_end(self) -> None:
+        self.move_cursor(len(self.model.visible) - 1)
+
+    def action_toggle(self) -> None:
+        if len(self.model.visible):
+            self.toggle(self.model.visible[self.cursor_row].video_id)
+
+    def on_click(self, event: Click) -> None:
+        if event.y == 0:
+            return
+        row = round(self.scroll_offset.y) + event.y - 1
+        if 0 <= row < len(self.model.visible):
+            self.move_cursor(row)
+            self.action_toggle()
+
+    # -- rendering -----------------------------------------------------------
+
+    def on_mount(self) -> None:
+        self._update_virtual_size()
+
+    def on_resize(self, event: Resize) -> None:
+        self._line_cache.clear()
+        self._update_virtual_size()
+
+    def notify_style_update(self) -> None:
+        super().notify_style_update()
+        self._line_cache.clear()
+
+    def _update_virtual_size(self) -> None:
+        # One extra line for the header, which is drawn over the scroll area
+        rows = len(self.model.visible)
+        self.virtual_size = Size(self.scrollable_content_region.width, rows + 1)
+
+    def _column_widths(self, width: int) -> tuple[int, int, int]:
+        fixed = _CHECK_WIDTH + _YEAR_WIDTH + _DURATION_WIDTH + 5 * _GAP
+        flexible = max(0, width - fixed)
+        title = flexible * 9 // 20
+        artist = flexible * 6 // 20
+        return title, artist, flexible - title - artist
+
+    def _cells(
+        self, check: str, title: str, artist: str, album: str, year: str, duration: str, width: int
+    ) -> str:
+        title_width, artist_width, album_width = self._column_widths(width)
+        gap = " " * _GAP
+        return (
+            set_cell_size(check, _CHECK_WIDTH)
+            + gap
+            + set_cell_size(title, title_width)
+            + gap
+            + set_cell_size(artist, artist_width)
+            + gap
+            + set_cell_size(album, album_width)
+            + gap
+            + set_cell_size(year, _YEAR_WIDTH)
+            + gap
+            + duration.rjust(_DURATION_WIDTH)[-_DURATION_WIDTH:]
+        )
+
+    def render_line(self, y: int) -> Strip:
+        width = self.scrollable_content_region.width
+        if y == 0:
+            text = self._cells("✓", "Title", "Artist", "Album", "Year", "Duration", width)
+            style = self.get_component_rich_style("track-table--header")
+            return Strip([Segment(set_cell_size(text, width), style)], width)
+
+        row = round(self.scroll_offset.y) + y - 1
+        if row >= len(self.model.visible):
+            return Strip.blank(width, self.rich_style)
+        track = self.model.visible[row]
+        selected = self.model.is_selected(track.video_id)
+        cursor = row == self.cursor_row
+        # Until enrichment resolves a track, its channel stands in for the artist
+        metadata = self.model.metadata.get(track.video_id) or TrackMetadata()
+        duplicate = track.video_id in self.model.duplicates
+        key = (track.video_id, selected, cursor, self.has_focus, width, metadata, duplicate)
+        strip = self._line_cache.get(key)
+        if strip is None:
+            text = self._cells(
+                "[X]" if selected else "[ ]",
+                f"≈ {track.title}" if duplicate else track.title,
+                metadata.artist or track.channel,
+                metadata.album or "",
+                str(metadata.release_year or ""),
+                track.duration_str,
+                width,
+            )
+            style = self.rich_style
+            if duplicate:
+                style += self.get_component_rich_style("track-table--duplicate")
+            if selected:
+                style += self.get_component_rich_style("track-table--selected")
+            if cursor:
+                style += self.get_component_rich_style("track-table--cursor")
+            strip = Strip([Segment(set_cell_size(text, width), style)], width)
+            self._line_cache[key] = strip
+        return strip
+
+    def on_focus(self) -> None:
+        self.refresh()
+
+    def on_blur(self) -> None:
+        self.refresh()